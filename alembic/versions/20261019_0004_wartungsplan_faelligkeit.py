@@ -0,0 +1,51 @@
+"""wartungsplan: vorberechnete faelligkeit und erinnerungsstatus
+
+Revision ID: 0004_wp_faelligkeit
+Revises: 0003_mqtt_konf
+Create Date: 2026-10-19
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+
+
+revision = '0004_wp_faelligkeit'
+down_revision = '0003_mqtt_konf'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+    if 'Wartungsplan' not in insp.get_table_names():
+        return
+    spalten = {c['name'] for c in insp.get_columns('Wartungsplan')}
+    if 'FaelligkeitStufe' not in spalten:
+        op.add_column(
+            'Wartungsplan',
+            sa.Column('FaelligkeitStufe', sa.Integer, nullable=False, server_default='0'),
+        )
+    if 'ErinnerungFaellig' not in spalten:
+        op.add_column(
+            'Wartungsplan',
+            sa.Column('ErinnerungFaellig', sa.Integer, nullable=False, server_default='0'),
+        )
+    if 'FaelligkeitBerechnetAm' not in spalten:
+        op.add_column('Wartungsplan', sa.Column('FaelligkeitBerechnetAm', sa.Date, nullable=True))
+    if 'ErinnerungGesendetFuer' not in spalten:
+        op.add_column('Wartungsplan', sa.Column('ErinnerungGesendetFuer', sa.Date, nullable=True))
+    indizes = {i['name'] for i in insp.get_indexes('Wartungsplan')}
+    if 'idx_wartungsplan_aktiv_stufe' not in indizes:
+        op.create_index('idx_wartungsplan_aktiv_stufe', 'Wartungsplan', ['Aktiv', 'FaelligkeitStufe'])
+
+
+def downgrade() -> None:
+    op.drop_index('idx_wartungsplan_aktiv_stufe', table_name='Wartungsplan')
+    with op.batch_alter_table('Wartungsplan') as batch:
+        batch.drop_column('ErinnerungGesendetFuer')
+        batch.drop_column('FaelligkeitBerechnetAm')
+        batch.drop_column('ErinnerungFaellig')
+        batch.drop_column('FaelligkeitStufe')
@@ -0,0 +1,52 @@
+"""wartungen: abdeckende indizes fuer plan-/durchfuehrungslisten
+
+Revision ID: 0005_wartung_indizes
+Revises: 0004_wp_faelligkeit
+Create Date: 2026-10-19
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+
+
+revision = '0005_wartung_indizes'
+down_revision = '0004_wp_faelligkeit'
+branch_labels = None
+depends_on = None
+
+
+def _index_namen(insp, tabelle):
+    return {i['name'] for i in insp.get_indexes(tabelle)}
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+    tabellen = insp.get_table_names()
+    if 'Wartungsdurchfuehrung' in tabellen:
+        vorhanden = _index_namen(insp, 'Wartungsdurchfuehrung')
+        if 'idx_wartungsdurchfuehrung_plan_datum' not in vorhanden:
+            op.create_index(
+                'idx_wartungsdurchfuehrung_plan_datum', 'Wartungsdurchfuehrung',
+                ['WartungsplanID', 'DurchgefuehrtAm'],
+            )
+        if 'idx_wartungsdurchfuehrung_plan' in vorhanden:
+            op.drop_index('idx_wartungsdurchfuehrung_plan', table_name='Wartungsdurchfuehrung')
+    if 'WartungAbteilungZugriff' in tabellen:
+        vorhanden = _index_namen(insp, 'WartungAbteilungZugriff')
+        if 'idx_wartung_abteilung_abteilung_wartung' not in vorhanden:
+            op.create_index(
+                'idx_wartung_abteilung_abteilung_wartung', 'WartungAbteilungZugriff',
+                ['AbteilungID', 'WartungID'],
+            )
+        if 'idx_wartung_abteilung_abteilung' in vorhanden:
+            op.drop_index('idx_wartung_abteilung_abteilung', table_name='WartungAbteilungZugriff')
+
+
+def downgrade() -> None:
+    op.create_index('idx_wartung_abteilung_abteilung', 'WartungAbteilungZugriff', ['AbteilungID'])
+    op.drop_index('idx_wartung_abteilung_abteilung_wartung', table_name='WartungAbteilungZugriff')
+    op.create_index('idx_wartungsdurchfuehrung_plan', 'Wartungsdurchfuehrung', ['WartungsplanID'])
+    op.drop_index('idx_wartungsdurchfuehrung_plan_datum', table_name='Wartungsdurchfuehrung')
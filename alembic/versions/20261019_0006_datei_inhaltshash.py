@@ -0,0 +1,36 @@
+"""datei: inhaltshash (etag) und index auf dateipfad
+
+Revision ID: 0006_datei_inhaltshash
+Revises: 0005_wartung_indizes
+Create Date: 2026-10-19
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+
+
+revision = '0006_datei_inhaltshash'
+down_revision = '0005_wartung_indizes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+    if 'Datei' not in insp.get_table_names():
+        return
+    spalten = {c['name'] for c in insp.get_columns('Datei')}
+    if 'Inhaltshash' not in spalten:
+        op.add_column('Datei', sa.Column('Inhaltshash', sa.Text, nullable=True))
+    indizes = {i['name'] for i in insp.get_indexes('Datei')}
+    if 'idx_datei_dateipfad' not in indizes:
+        op.create_index('idx_datei_dateipfad', 'Datei', ['Dateipfad'])
+
+
+def downgrade() -> None:
+    op.drop_index('idx_datei_dateipfad', table_name='Datei')
+    with op.batch_alter_table('Datei') as batch:
+        batch.drop_column('Inhaltshash')
@@ -0,0 +1,49 @@
+"""bericht_job: warteschlange fuer asynchrone pdf-/zip-berichte
+
+Revision ID: 0007_bericht_job
+Revises: 0006_datei_inhaltshash
+Create Date: 2026-10-19
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+
+
+revision = '0007_bericht_job'
+down_revision = '0006_datei_inhaltshash'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+    if 'BerichtJob' in insp.get_table_names():
+        return
+    op.create_table(
+        'BerichtJob',
+        sa.Column('ID', sa.Integer, primary_key=True, autoincrement=True),
+        sa.Column('MitarbeiterID', sa.Integer, sa.ForeignKey('Mitarbeiter.ID', ondelete='CASCADE'), nullable=False),
+        sa.Column('Typ', sa.Text, nullable=False),
+        sa.Column('Parameter', sa.Text, nullable=True),
+        sa.Column('Status', sa.Text, nullable=False, server_default='wartend'),
+        sa.Column('Fortschritt', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('Gesamt', sa.Integer, nullable=False, server_default='1'),
+        sa.Column('Dateiname', sa.Text, nullable=True),
+        sa.Column('Mimetype', sa.Text, nullable=True),
+        sa.Column('Fehlermeldung', sa.Text, nullable=True),
+        sa.Column('ErstelltAm', sa.Text, nullable=True),
+        sa.Column('GestartetAm', sa.Text, nullable=True),
+        sa.Column('FertigAm', sa.Text, nullable=True),
+        sa.Column('LetzteAbfrageAm', sa.Text, nullable=True),
+    )
+    op.create_index('idx_bericht_job_status', 'BerichtJob', ['Status', 'ID'])
+    op.create_index('idx_bericht_job_mitarbeiter', 'BerichtJob', ['MitarbeiterID'])
+
+
+def downgrade() -> None:
+    op.drop_index('idx_bericht_job_mitarbeiter', table_name='BerichtJob')
+    op.drop_index('idx_bericht_job_status', table_name='BerichtJob')
+    op.drop_table('BerichtJob')
@@ -0,0 +1,37 @@
+"""server_session: serverseitige session-daten (cookie enthaelt nur die id)
+
+Revision ID: 0008_server_session
+Revises: 0007_bericht_job
+Create Date: 2026-10-19
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+
+
+revision = '0008_server_session'
+down_revision = '0007_bericht_job'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+    if 'ServerSession' in insp.get_table_names():
+        return
+    op.create_table(
+        'ServerSession',
+        sa.Column('session_id', sa.Text, primary_key=True),
+        sa.Column('payload', sa.Text, nullable=False),
+        sa.Column('updated_at', sa.Integer, nullable=False),
+        sa.Column('expires_at', sa.Integer, nullable=False),
+    )
+    op.create_index('IX_ServerSession_expires', 'ServerSession', ['expires_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('IX_ServerSession_expires', table_name='ServerSession')
+    op.drop_table('ServerSession')
@@ -0,0 +1,88 @@
+"""workload-indizes: zusammengesetzte und partielle indizes fuer die haeufigsten abfragen
+
+Ersetzt einspaltige Indizes (bzw. Flag-Indizes mit geringer Selektivitaet) durch
+zusammengesetzte Indizes in Filter-/Sortierreihenfolge der Abfragen:
+
+- Benachrichtigung: ungelesene je Mitarbeiter, neueste zuerst (Badge, Dropdown)
+- SchichtbuchBemerkungen: Bemerkungen eines Themas ohne geloeschte, nach Datum
+- print_jobs: naechster offener Auftrag je Agent (ORDER BY id)
+- Lagerbuchung: Buchungen eines Artikels nach Buchungsdatum
+
+Partiell (nur die wenigen offenen Zeilen einer wachsenden Tabelle):
+
+- BenachrichtigungVersand: Versand-Warteschlange (Status = 'pending')
+- print_jobs: Lease-Recovery (status = 'leased')
+
+Revision ID: 0009_workload_indizes
+Revises: 0008_server_session
+Create Date: 2026-10-19
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+
+
+revision = '0009_workload_indizes'
+down_revision = '0008_server_session'
+branch_labels = None
+depends_on = None
+
+
+# (Tabelle, neuer Index, Spalten, partielle Bedingung SQLite/Postgres, ersetzte Indizes)
+_INDIZES = [
+    ('Benachrichtigung', 'idx_benachrichtigung_mitarbeiter_gelesen_erstellt',
+     ['MitarbeiterID', 'Gelesen', 'ErstelltAm'], None,
+     [('idx_benachrichtigung_mitarbeiter', ['MitarbeiterID']), ('idx_benachrichtigung_gelesen', ['Gelesen'])]),
+    ('SchichtbuchBemerkungen', 'idx_bemerkung_thema_geloescht_datum',
+     ['ThemaID', 'Gelöscht', 'Datum'], None,
+     [('idx_bemerkung_thema', ['ThemaID']), ('idx_bemerkung_geloescht', ['Gelöscht'])]),
+    ('BenachrichtigungVersand', 'idx_benachrichtigung_versand_offen',
+     ['ID'], ("Status = 'pending'", "\"Status\" = 'pending'"),
+     [('idx_benachrichtigung_versand_status', ['Status'])]),
+    ('print_jobs', 'idx_print_jobs_agent_status_id',
+     ['agent_id', 'status', 'id'], None,
+     [('idx_print_jobs_agent_status', ['agent_id', 'status'])]),
+    ('print_jobs', 'idx_print_jobs_leased',
+     ['lease_until'], ("status = 'leased'", "status = 'leased'"),
+     []),
+    ('Lagerbuchung', 'idx_lagerbuchung_ersatzteil_datum',
+     ['ErsatzteilID', 'Buchungsdatum'], None,
+     [('idx_lagerbuchung_ersatzteil', ['ErsatzteilID'])]),
+]
+
+
+def _index_namen(insp, tabelle):
+    return {i['name'] for i in insp.get_indexes(tabelle)}
+
+
+def _where_kwargs(bedingung):
+    if not bedingung:
+        return {}
+    return {
+        'sqlite_where': sa.text(bedingung[0]),
+        'postgresql_where': sa.text(bedingung[1]),
+    }
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+    tabellen = insp.get_table_names()
+    for tabelle, name, spalten, bedingung, ersetzt in _INDIZES:
+        if tabelle not in tabellen:
+            continue
+        vorhanden = _index_namen(insp, tabelle)
+        if name not in vorhanden:
+            op.create_index(name, tabelle, spalten, **_where_kwargs(bedingung))
+        for alt_name, _ in ersetzt:
+            if alt_name in vorhanden:
+                op.drop_index(alt_name, table_name=tabelle)
+
+
+def downgrade() -> None:
+    for tabelle, name, _, _, ersetzt in reversed(_INDIZES):
+        for alt_name, alt_spalten in ersetzt:
+            op.create_index(alt_name, tabelle, alt_spalten)
+        op.drop_index(name, table_name=tabelle)
@@ -0,0 +1,32 @@
+"""ersatzteil: artikelfotoversion (cache-busting ohne stat je listenzeile)
+
+Revision ID: 0010_artikelfoto_version
+Revises: 0009_workload_indizes
+Create Date: 2026-10-19
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+
+
+revision = '0010_artikelfoto_version'
+down_revision = '0009_workload_indizes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+    if 'Ersatzteil' not in insp.get_table_names():
+        return
+    spalten = {c['name'] for c in insp.get_columns('Ersatzteil')}
+    if 'ArtikelfotoVersion' not in spalten:
+        op.add_column('Ersatzteil', sa.Column('ArtikelfotoVersion', sa.Text, nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('Ersatzteil') as batch:
+        batch.drop_column('ArtikelfotoVersion')
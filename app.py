@@ -18,6 +18,9 @@ from utils.navigation_history import (
 from utils.csrf import csrf
 from utils.rate_limit import limiter
 from utils.security_headers import init_security_headers
+from utils.server_session import init_server_session
+from utils.stammdaten_cache import init_stammdaten_cache
+from utils.static_assets import assets_bauen, init_static_assets
 import click
 import logging
 import os
@@ -128,6 +131,15 @@ limiter.init_app(app)
 # Security-Header (Flask-Talisman)
 init_security_headers(app)
 
+# Session-Daten serverseitig, Cookie nur mit Session-ID (SESSION_BACKEND)
+init_server_session(app)
+
+# Stammdaten-Cache: Invalidierung über Redis an alle Worker verteilen (falls Redis konfiguriert)
+init_stammdaten_cache(app)
+
+# Statische Assets mit Inhaltshash im Namen (static/dist/), vorkomprimiert und immutable
+init_static_assets(app)
+
 def run_startup_tasks(app):
     """Einmalige Startup-Aufgaben: Alembic-Migration, Cleanup, Nachversand.
 
@@ -155,6 +167,13 @@ def run_startup_tasks(app):
             logger = logging.getLogger(__name__)
             logger.warning(f"Fehler beim Nachversand ausstehender Benachrichtigungen: {str(e)}")
 
+        try:
+            from modules.wartungen.faelligkeit_job import fuehre_faelligkeits_lauf_aus
+            fuehre_faelligkeits_lauf_aus()
+        except Exception as e:
+            logger = logging.getLogger(__name__)
+            logger.warning(f"Fehler beim Berechnen der Wartungs-Fälligkeiten: {str(e)}")
+
 
 # Unter Gunicorn (preload_app=True) setzt gunicorn_config.py diese Variable vor
 # dem App-Import auf "1" im Master und auf "0" in Worker-Prozessen. Dev-Server
@@ -186,17 +205,14 @@ def schichtbuch_datum_filter(value):
     return format_schichtbuch_datum(value)
 
 
-@app.template_filter('wartung_faelligkeit_td_class')
-def wartung_faelligkeit_td_class(value):
-    """CSS-Klasse für <td> (Bootstrap table-*)."""
-    from modules.wartungen.services import naechste_faelligkeit_stufe
-
+@app.template_filter('wartung_stufe_td_class')
+def wartung_stufe_td_class(stufe):
+    """CSS-Klasse für <td> (Bootstrap table-*) aus vorberechneter Wartungsplan.FaelligkeitStufe."""
     return {
-        0: '',
         1: 'table-info',
         2: 'table-warning',
         3: 'table-danger',
-    }[naechste_faelligkeit_stufe(value)]
+    }.get(stufe or 0, '')
 
 
 @app.template_filter('safe_color')
@@ -206,17 +222,14 @@ def safe_color_filter(value, fallback='inherit'):
     return validate_css_color(value, fallback=fallback)
 
 
-@app.template_filter('wartung_faelligkeit_badge_class')
-def wartung_faelligkeit_badge_class(value):
-    """CSS-Klasse für Badges (Bootstrap text-bg-*)."""
-    from modules.wartungen.services import naechste_faelligkeit_stufe
-
+@app.template_filter('wartung_stufe_badge_class')
+def wartung_stufe_badge_class(stufe):
+    """CSS-Klasse für Badges (Bootstrap text-bg-*) aus vorberechneter Wartungsplan.FaelligkeitStufe."""
     return {
-        0: '',
         1: 'text-bg-info',
         2: 'text-bg-warning text-dark',
         3: 'text-bg-danger',
-    }[naechste_faelligkeit_stufe(value)]
+    }.get(stufe or 0, '')
 
 
 @app.before_request
@@ -224,7 +237,10 @@ def _ensure_menue_sichtbarkeit():
     """Lädt user_menue_sichtbarkeit für eingeloggte Benutzer (auch nach Admin-Änderungen)."""
     if session.get('user_id') and not session.get('is_guest'):
         from utils.menue_definitions import get_menue_sichtbarkeit_fuer_mitarbeiter
-        session['user_menue_sichtbarkeit'] = get_menue_sichtbarkeit_fuer_mitarbeiter(session['user_id'])
+        sichtbarkeit = get_menue_sichtbarkeit_fuer_mitarbeiter(session['user_id'])
+        # Nur bei Änderung zuweisen: unveränderte Sessions werden nicht neu gespeichert
+        if session.get('user_menue_sichtbarkeit') != sichtbarkeit:
+            session['user_menue_sichtbarkeit'] = sichtbarkeit
 
 
 _PASSWORT_WECHSEL_ERLAUBTE_ENDPUNKTE = {
@@ -243,7 +259,7 @@ _technik_mqtt_lazy_started = False
 def _start_technik_mqtt_lazy():
     """Flask-Dev-Server (ohne Gunicorn post_fork): MQTT/Redis-Threads einmalig starten."""
     global _technik_mqtt_lazy_started
-    if _technik_mqtt_lazy_started:
+    if _technik_mqtt_lazy_started or app.config.get('TESTING'):
         return None
     _technik_mqtt_lazy_started = True
     try:
@@ -251,6 +267,16 @@ def _start_technik_mqtt_lazy():
         start_technik_mqtt_threads()
     except Exception as e:
         app.logger.debug('Technik-MQTT Lazy-Start: %s', e)
+    try:
+        from modules.wartungen.faelligkeit_job import start_faelligkeit_job_thread
+        start_faelligkeit_job_thread()
+    except Exception as e:
+        app.logger.debug('Wartungs-Fälligkeits-Job Lazy-Start: %s', e)
+    try:
+        from utils.reports.bericht_jobs import start_bericht_worker
+        start_bericht_worker()
+    except Exception as e:
+        app.logger.debug('Bericht-Worker Lazy-Start: %s', e)
     return None
 
 
@@ -316,7 +342,7 @@ def health_check():
 
 
 # Blueprints registrieren
-from modules import auth_bp, schichtbuch_bp, admin_bp, ersatzteile_bp, dashboard_bp, import_bp, errors_bp, diverses_bp, search_bp, produktion_bp, wartungen_bp, print_agent_bp, technik_bp
+from modules import auth_bp, schichtbuch_bp, admin_bp, ersatzteile_bp, dashboard_bp, import_bp, errors_bp, diverses_bp, search_bp, produktion_bp, wartungen_bp, print_agent_bp, technik_bp, berichte_bp
 
 app.register_blueprint(auth_bp)
 app.register_blueprint(schichtbuch_bp)
@@ -331,6 +357,7 @@ app.register_blueprint(produktion_bp)
 app.register_blueprint(wartungen_bp)
 app.register_blueprint(print_agent_bp)
 app.register_blueprint(technik_bp)
+app.register_blueprint(berichte_bp)
 
 # MQTT/Redis-Hintergrundthreads: brauchen app.app_context() für MqttKonfiguration
 try:
@@ -339,6 +366,30 @@ try:
 except Exception as _mqtt_app_ref_exc:
     logging.getLogger(__name__).debug('set_flask_app (MQTT): %s', _mqtt_app_ref_exc)
 
+try:
+    from modules.wartungen.faelligkeit_job import set_flask_app as _wartung_job_set_flask_app
+    _wartung_job_set_flask_app(app)
+except Exception as _wartung_job_app_ref_exc:
+    logging.getLogger(__name__).debug('set_flask_app (Wartungs-Job): %s', _wartung_job_app_ref_exc)
+
+try:
+    from utils.reports.office_pool import set_flask_app as _office_pool_set_flask_app
+    _office_pool_set_flask_app(app)
+except Exception as _office_pool_app_ref_exc:
+    logging.getLogger(__name__).debug('set_flask_app (LibreOffice-Pool): %s', _office_pool_app_ref_exc)
+
+try:
+    from utils.reports.bericht_jobs import set_flask_app as _bericht_jobs_set_flask_app
+    _bericht_jobs_set_flask_app(app)
+except Exception as _bericht_jobs_app_ref_exc:
+    logging.getLogger(__name__).debug('set_flask_app (Bericht-Jobs): %s', _bericht_jobs_app_ref_exc)
+
+try:
+    from utils.passwort_hash import set_flask_app as _passwort_hash_set_flask_app
+    _passwort_hash_set_flask_app(app)
+except Exception as _passwort_hash_app_ref_exc:
+    logging.getLogger(__name__).debug('set_flask_app (Passwort-Hash): %s', _passwort_hash_app_ref_exc)
+
 
 @app.route('/service-worker.js')
 def service_worker():
@@ -376,6 +427,50 @@ def index():
     return redirect(url_for('auth.login'))
 
 
+@app.cli.command('assets-bauen')
+def cli_assets_bauen():
+    """
+    Baut die gehashten, vorkomprimierten Assets unter static/dist/ (sonst beim App-Start).
+
+    Beispiel: flask --app app assets-bauen
+    """
+    manifest = assets_bauen(app.static_folder)
+    click.echo(f'{len(manifest)} Assets unter static/dist/ gebaut.')
+
+
+@app.cli.command('artikeleinstellungen-index')
+def cli_artikeleinstellungen_index():
+    """
+    Baut den Ordner-Index der Etikettierungs-Artikeleinstellungen komplett neu auf.
+
+    Sonst wird er beim Aufruf der Etikettierungsseite inkrementell (Ordner-mtimes) aktualisiert.
+
+    Beispiel: flask --app app artikeleinstellungen-index
+    """
+    from utils.artikeleinstellungen_index import index_neu_aufbauen
+
+    struktur = index_neu_aufbauen()
+    anzahl = sum(len(artikel) for artikel in struktur.values())
+    click.echo(f'{len(struktur)} Linien, {anzahl} Artikel indiziert.')
+
+
+@app.cli.command('technik-ingest')
+def cli_technik_ingest():
+    """
+    Eigenständiger MQTT-Ingest für die Technik-Beleuchtung (außerhalb von Gunicorn).
+
+    Bewirbt sich per Redis-Lock mit Fencing-Token um die MQTT-Leitung und schreibt Zustände in den
+    Redis-Hash und -Stream; mehrere Instanzen (auch auf verschiedenen Servern) übernehmen
+    gegenseitig bei Ausfall. Die Web-Worker mit TECHNIK_INGEST_EXTERN=true starten, dann lesen
+    sie nur noch. Beenden mit SIGTERM/Strg+C.
+
+    Beispiel: flask --app app technik-ingest
+    """
+    from modules.technik.mqtt_runtime import technik_ingest_ausfuehren
+
+    technik_ingest_ausfuehren()
+
+
 @app.cli.command('push-test')
 @click.argument('mitarbeiter_id', type=int)
 def cli_push_test(mitarbeiter_id):
@@ -456,6 +551,24 @@ def cli_vapid_verify():
     raise SystemExit(1)
 
 
+@app.cli.command('wartung-faelligkeit')
+def cli_wartung_faelligkeit():
+    """
+    Berechnet die Fälligkeitsstufen aller Wartungspläne neu und verschickt fällige Erinnerungen.
+
+    Läuft sonst periodisch im Hintergrund (WARTUNG_FAELLIGKEIT_INTERVALL_SEKUNDEN); z. B. für Cron,
+    wenn WARTUNG_FAELLIGKEIT_JOB_AKTIV=false gesetzt ist.
+
+    Beispiel: flask --app app wartung-faelligkeit
+    """
+    from modules.wartungen.faelligkeit_job import fuehre_faelligkeits_lauf_aus
+
+    ergebnis = fuehre_faelligkeits_lauf_aus()
+    click.echo(
+        f"{ergebnis['aktualisiert']} Pläne aktualisiert, {ergebnis['erinnerungen']} Erinnerungen versendet."
+    )
+
+
 # ========== App starten ==========
 #
 # In Produktion wird die App über gunicorn gestartet (siehe
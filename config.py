@@ -52,6 +52,32 @@ class Config:
     IMPORT_FOLDER = os.path.join(UPLOAD_BASE_FOLDER, 'Import')
     # Technik-Übersichten (SVG-Layouts); bei Docker-Volume unter …/Daten/Technik/Layouts editierbar ohne Image-Rebuild
     TECHNIK_LAYOUTS_FOLDER = os.path.join(UPLOAD_BASE_FOLDER, 'Technik', 'Layouts')
+    # Verlauf der Lampen-Schaltzustände (modules/technik/beleuchtung_verlauf.py), eine Datei je Tag; 0 Tage = unbegrenzt
+    TECHNIK_VERLAUF_FOLDER = os.environ.get('TECHNIK_VERLAUF_FOLDER') or os.path.join(UPLOAD_BASE_FOLDER, 'Technik', 'Verlauf')
+    TECHNIK_VERLAUF_TAGE = int(os.environ.get('TECHNIK_VERLAUF_TAGE', '730'))
+    # true: MQTT-Ingest nur im eigenen Prozess (flask technik-ingest), Gunicorn-Worker lesen nur den Redis-Stream
+    TECHNIK_INGEST_EXTERN = os.environ.get('TECHNIK_INGEST_EXTERN', 'False').lower() == 'true'
+    # Verkleinerte WebP-Varianten hochgeladener Fotos (utils/bild_derivate.py); jederzeit löschbar
+    BILD_DERIVATE_FOLDER = os.environ.get('BILD_DERIVATE_FOLDER') or os.path.join(UPLOAD_BASE_FOLDER, 'Cache', 'Bilder')
+    BILD_DERIVATE_MAX_AGE = int(os.environ.get('BILD_DERIVATE_MAX_AGE', str(7 * 24 * 3600)))
+    # Browser-Cache (privat) für Anhänge mit Inhaltshash-ETag; danach Revalidierung per 304
+    ANHANG_CACHE_MAX_AGE = int(os.environ.get('ANHANG_CACHE_MAX_AGE', str(24 * 3600)))
+    TECHNIK_LAYOUT_MAX_AGE = int(os.environ.get('TECHNIK_LAYOUT_MAX_AGE', '300'))
+    # Konvertierte Berichts-PDFs (utils/reports/report_cache.py); LRU-begrenzt, 0 MB = aus
+    REPORT_CACHE_FOLDER = os.environ.get('REPORT_CACHE_FOLDER') or os.path.join(UPLOAD_BASE_FOLDER, 'Cache', 'Berichte')
+    REPORT_CACHE_MAX_MB = int(os.environ.get('REPORT_CACHE_MAX_MB', '200'))
+    # Ergebnisse asynchroner Bericht-Jobs (utils/reports/bericht_jobs.py)
+    REPORT_JOB_FOLDER = os.environ.get('REPORT_JOB_FOLDER') or os.path.join(UPLOAD_BASE_FOLDER, 'Cache', 'Berichtjobs')
+    # Ordner-Index der Artikeleinstellungen (utils/artikeleinstellungen_index.py); jederzeit löschbar
+    ARTIKELEINSTELLUNGEN_INDEX_DATEI = os.environ.get('ARTIKELEINSTELLUNGEN_INDEX_DATEI') or os.path.join(UPLOAD_BASE_FOLDER, 'Cache', 'artikeleinstellungen_index.json')
+    # Höchstens so oft (Sekunden) die Ordner-mtimes auf der Freigabe prüfen
+    ARTIKELEINSTELLUNGEN_INDEX_PRUEFEN_SEKUNDEN = int(os.environ.get('ARTIKELEINSTELLUNGEN_INDEX_PRUEFEN_SEKUNDEN', '60'))
+    # Stammdaten-Cache je Prozess (utils/stammdaten_cache.py); maximales Alter in anderen Workern
+    STAMMDATEN_CACHE_SEKUNDEN = int(os.environ.get('STAMMDATEN_CACHE_SEKUNDEN', '30'))
+    # Versionen über Redis abgleichen (Änderungen in allen Workern nach ~1 s sichtbar)
+    STAMMDATEN_CACHE_REDIS = os.environ.get('STAMMDATEN_CACHE_REDIS', 'True').lower() == 'true'
+    # Statische Assets mit Inhaltshash + .gz/.br unter static/dist/ (utils/static_assets.py)
+    STATIC_ASSETS_FINGERPRINT = os.environ.get('STATIC_ASSETS_FINGERPRINT', 'True').lower() == 'true'
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'pdf', 'doc', 'docx', 'xls', 'xlsx', 'txt'}
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16 MB max file size
     
@@ -61,6 +87,11 @@ class Config:
     SESSION_COOKIE_SAMESITE = os.environ.get('SESSION_COOKIE_SAMESITE', 'Lax')
     # SESSION_COOKIE_SECURE wird pro Umgebung gesetzt (Development=False, Production=True).
     SESSION_COOKIE_SECURE = os.environ.get('SESSION_COOKIE_SECURE', 'False').lower() == 'true'
+    # Session-Daten serverseitig (utils/server_session.py): db (Standard), redis oder cookie
+    # (bisheriges Verhalten, alles im signierten Cookie). Redis-URL wie bei BIS_REDIS_URL.
+    SESSION_BACKEND = os.environ.get('SESSION_BACKEND', 'db').strip().lower()
+    # Unveränderte Sessions verlängern den Ablauf höchstens so oft (spart Schreibzugriffe)
+    SESSION_VERLAENGERN_NACH_SEKUNDEN = int(os.environ.get('SESSION_VERLAENGERN_NACH_SEKUNDEN', '300'))
     REMEMBER_COOKIE_HTTPONLY = True
     REMEMBER_COOKIE_SAMESITE = os.environ.get('REMEMBER_COOKIE_SAMESITE', 'Lax')
     REMEMBER_COOKIE_SECURE = os.environ.get('REMEMBER_COOKIE_SECURE', 'False').lower() == 'true'
@@ -129,6 +160,37 @@ class Config:
     BENACHRICHTIGUNGEN_CLEANUP_NUR_GELESENE = os.environ.get('BENACHRICHTIGUNGEN_CLEANUP_NUR_GELESENE', 'True').lower() == 'true'
     BENACHRICHTIGUNGEN_CLEANUP_LIMIT_PRO_MITARBEITER = int(os.environ.get('BENACHRICHTIGUNGEN_CLEANUP_LIMIT_PRO_MITARBEITER', 0)) or None
 
+    # Wartungen: periodische Fälligkeitsberechnung + Erinnerungen (modules.wartungen.faelligkeit_job)
+    WARTUNG_FAELLIGKEIT_JOB_AKTIV = os.environ.get('WARTUNG_FAELLIGKEIT_JOB_AKTIV', 'True').lower() == 'true'
+    WARTUNG_FAELLIGKEIT_INTERVALL_SEKUNDEN = int(os.environ.get('WARTUNG_FAELLIGKEIT_INTERVALL_SEKUNDEN', 900))
+
+    # LibreOffice-Pool für DOCX->PDF (utils/reports/office_pool.py), Werte pro Worker-Prozess
+    LIBREOFFICE_POOL_GROESSE = int(os.environ.get('LIBREOFFICE_POOL_GROESSE', 2))
+    LIBREOFFICE_POOL_MAX_DOKUMENTE = int(os.environ.get('LIBREOFFICE_POOL_MAX_DOKUMENTE', 100))
+    LIBREOFFICE_TIMEOUT_SEKUNDEN = int(os.environ.get('LIBREOFFICE_TIMEOUT_SEKUNDEN', 30))
+    LIBREOFFICE_POOL_WARTEZEIT_SEKUNDEN = int(os.environ.get('LIBREOFFICE_POOL_WARTEZEIT_SEKUNDEN', 60))
+    LIBREOFFICE_PROFIL_ORDNER = os.environ.get('LIBREOFFICE_PROFIL_ORDNER') or None
+
+    # Asynchrone Bericht-Jobs (utils/reports/bericht_jobs.py), Threads pro Worker-Prozess
+    REPORT_JOB_AKTIV = os.environ.get('REPORT_JOB_AKTIV', 'True').lower() == 'true'
+    REPORT_JOB_WORKER = int(os.environ.get('REPORT_JOB_WORKER', 1))
+    REPORT_JOB_TIMEOUT_SEKUNDEN = int(os.environ.get('REPORT_JOB_TIMEOUT_SEKUNDEN', 1800))
+    REPORT_JOB_AUFBEWAHRUNG_STUNDEN = int(os.environ.get('REPORT_JOB_AUFBEWAHRUNG_STUNDEN', 24))
+
+    # Passwort-Hashing (utils/passwort_hash.py): Werkzeug-Methode für neue Hashes (abweichende
+    # gespeicherte Hashes werden beim Login ersetzt) und Prozess-Pool je Worker (0 = im Request)
+    PASSWORT_HASH_METHODE = os.environ.get('PASSWORT_HASH_METHODE', 'scrypt')
+    PASSWORT_HASH_PROZESSE = int(os.environ.get('PASSWORT_HASH_PROZESSE', 2))
+    PASSWORT_HASH_WARTESCHLANGE = int(os.environ.get('PASSWORT_HASH_WARTESCHLANGE', 32))
+    PASSWORT_HASH_WARTEZEIT_SEKUNDEN = int(os.environ.get('PASSWORT_HASH_WARTEZEIT_SEKUNDEN', 10))
+
+    # Benachrichtigungs-Glocke per SSE (utils/benachrichtigungen_live.py): offene Streams je
+    # Worker-Prozess (jeder belegt einen gthread-Thread, 0 = nur Polling) und Laufzeit je Stream.
+    # Beleuchtungs-Streams zählen mit. Standard: alle Gunicorn-Threads bis auf 4 für normale Requests
+    BENACHRICHTIGUNGEN_SSE_MAX_STREAMS = int(os.environ.get(
+        'BENACHRICHTIGUNGEN_SSE_MAX_STREAMS', max(int(os.environ.get('GUNICORN_THREADS', 16)) - 4, 0)))
+    BENACHRICHTIGUNGEN_SSE_MAX_SEKUNDEN = int(os.environ.get('BENACHRICHTIGUNGEN_SSE_MAX_SEKUNDEN', 300))
+
     # Passwort-Policy (Laenge, Zeichenklassen): True = volle Regeln aus utils.security.
     # Ueber BIS_PASSWORT_POLICY_STRENG=true|false steuerbar; wird in Development/Production unterschiedlich vorbelegt.
     PASSWORT_POLICY_STRENG = os.environ.get('BIS_PASSWORT_POLICY_STRENG', 'true').lower() in ('1', 'true', 'yes')
@@ -139,6 +201,8 @@ class DevelopmentConfig(Config):
     DEBUG = True
     # Lokaler/kleiner Pilot: verschärfte Passwortregeln standardmaessig aus (nur nicht leer).
     PASSWORT_POLICY_STRENG = os.environ.get('BIS_PASSWORT_POLICY_STRENG', 'false').lower() in ('1', 'true', 'yes')
+    # Geänderte CSS/JS ohne Neustart sichtbar: ungehashte Dateinamen
+    STATIC_ASSETS_FINGERPRINT = os.environ.get('STATIC_ASSETS_FINGERPRINT', 'False').lower() == 'true'
     # Einstweilen aus: sonst erscheint jede SQL-Abfrage in der Konsole (sqlite3 Trace).
     # Wieder aktivieren oder per Umgebungsvariable: SQL_TRACING=true
     # SQL_TRACING = True
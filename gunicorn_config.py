@@ -21,8 +21,10 @@ Design:
 Umgebungsvariablen (jeweils mit sinnvollem Default):
 - ``GUNICORN_BIND``      (Default ``0.0.0.0:5000``)
 - ``GUNICORN_WORKERS``   (Default ``2``; empfohlen 2-4 bei SQLite+WAL)
-- ``GUNICORN_THREADS``   (Default ``4``)
-- ``GUNICORN_TIMEOUT``   (Default ``120``; LibreOffice-Konvertierung kann dauern)
+- ``GUNICORN_THREADS``   (Default ``16``; 4 für normale Requests, der Rest für offene
+  SSE-Streams, siehe ``BENACHRICHTIGUNGEN_SSE_MAX_STREAMS``)
+- ``GUNICORN_TIMEOUT``   (Default ``120``; direkte PDF-Exporte konvertieren im Request,
+  Bericht-Jobs unter /berichte/jobs laufen in Hintergrund-Threads)
 - ``GUNICORN_LOGLEVEL``  (Default ``info``)
 """
 
@@ -37,7 +39,7 @@ os.environ.setdefault('BIS_RUN_STARTUP_TASKS', '1')
 
 bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
 workers = int(os.environ.get('GUNICORN_WORKERS', '2'))
-threads = int(os.environ.get('GUNICORN_THREADS', '4'))
+threads = int(os.environ.get('GUNICORN_THREADS', '16'))
 worker_class = 'gthread'
 timeout = int(os.environ.get('GUNICORN_TIMEOUT', '120'))
 graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', '30'))
@@ -58,11 +60,32 @@ def post_fork(server, worker):
         dispose_all_engines()
     except Exception as exc:
         server.log.warning('post_fork: dispose_all_engines fehlgeschlagen: %s', exc)
+    # Forkserver und Hash-Prozesse vorab starten, damit der erste Login nicht darauf wartet
+    try:
+        from utils.passwort_hash import passwort_pool_vorwaermen
+        passwort_pool_vorwaermen()
+    except Exception as exc:
+        server.log.warning('post_fork: Passwort-Hash-Pool: %s', exc)
     try:
         from modules.technik.mqtt_runtime import start_technik_mqtt_threads
         start_technik_mqtt_threads()
     except Exception as exc:
         server.log.warning('post_fork: Technik-MQTT-Threads: %s', exc)
+    try:
+        from modules.wartungen.faelligkeit_job import start_faelligkeit_job_thread
+        start_faelligkeit_job_thread()
+    except Exception as exc:
+        server.log.warning('post_fork: Wartungs-Fälligkeits-Job: %s', exc)
+    try:
+        from utils.reports.bericht_jobs import start_bericht_worker
+        start_bericht_worker()
+    except Exception as exc:
+        server.log.warning('post_fork: Bericht-Worker: %s', exc)
+    try:
+        from utils.reports.office_pool import office_pool_vorwaermen
+        office_pool_vorwaermen()
+    except Exception as exc:
+        server.log.warning('post_fork: LibreOffice-Pool: %s', exc)
 
 
 def on_starting(server):
@@ -6,7 +6,6 @@ Mitarbeiter, Abteilungen, Bereiche, Gewerke, Tätigkeiten, Status
 import logging
 
 from flask import render_template, request, redirect, url_for, flash, jsonify
-from werkzeug.security import generate_password_hash
 from . import admin_bp
 from utils import get_db_connection, admin_required, menue_zugriff_erforderlich
 from utils.zebra_client import (
@@ -18,7 +17,8 @@ from utils.zebra_client import (
     zpl_test_label_preview_segments,
 )
 from utils.etikett_druck import FUNKTIONEN_ADMIN
-from utils.helpers import row_to_dict
+from utils.passwort_hash import passwort_hash_erzeugen
+from utils.stammdaten_cache import get_stammdaten, stammdaten_aendern, stammdaten_cache_leeren
 from utils.menue_definitions import get_alle_menue_definitionen, get_menue_sichtbarkeit_fuer_mitarbeiter
 from utils.auth_redirect import LOGIN_STARTSEITEN_AUSWAHL, normalisiere_startseite_endpunkt
 from utils.db_sql import upsert_ignore
@@ -61,200 +61,111 @@ def ajax_response(message, success=True, status_code=None, **extra):
 @admin_required
 @menue_zugriff_erforderlich('admin')
 def dashboard():
-    """Admin Dashboard - Übersicht aller Stammdaten"""
-    with get_db_connection() as conn:
-        mitarbeiter = conn.execute('''
-            SELECT m.ID, m.Personalnummer, m.Vorname, m.Nachname, m.Email, m.Handynummer, m.Aktiv,
-                   a.Bezeichnung AS PrimaerAbteilung, m.PrimaerAbteilungID,
-                   m.StartseiteNachLoginEndpunkt
-            FROM Mitarbeiter m
-            LEFT JOIN Abteilung a ON m.PrimaerAbteilungID = a.ID
-            ORDER BY m.Nachname, m.Vorname
-        ''').fetchall()
-        
-        # Alle zusätzlichen Abteilungen in einer Query laden
-        mitarbeiter_abteilungen = {}
-        if mitarbeiter:
-            mitarbeiter_ids = [m['ID'] for m in mitarbeiter]
-            placeholders = ','.join(['?'] * len(mitarbeiter_ids))
-            abteilungen_rows = conn.execute(f'''
-                SELECT MitarbeiterID, AbteilungID
-                FROM MitarbeiterAbteilung
-                WHERE MitarbeiterID IN ({placeholders})
-            ''', mitarbeiter_ids).fetchall()
-            
-            for row in abteilungen_rows:
-                mid = row['MitarbeiterID']
-                if mid not in mitarbeiter_abteilungen:
-                    mitarbeiter_abteilungen[mid] = []
-                mitarbeiter_abteilungen[mid].append(row['AbteilungID'])
-        
-        # Alle Berechtigungen in einer Query laden
-        mitarbeiter_berechtigungen = {}
-        if mitarbeiter:
-            mitarbeiter_ids = [m['ID'] for m in mitarbeiter]
-            placeholders = ','.join(['?'] * len(mitarbeiter_ids))
-            berechtigungen_rows = conn.execute(f'''
-                SELECT MitarbeiterID, BerechtigungID
-                FROM MitarbeiterBerechtigung
-                WHERE MitarbeiterID IN ({placeholders})
-            ''', mitarbeiter_ids).fetchall()
-            
-            for row in berechtigungen_rows:
-                mid = row['MitarbeiterID']
-                if mid not in mitarbeiter_berechtigungen:
-                    mitarbeiter_berechtigungen[mid] = []
-                mitarbeiter_berechtigungen[mid].append(row['BerechtigungID'])
-        
-        # Abteilungen hierarchisch laden
-        abteilungen = conn.execute('''
-            SELECT a.ID, a.Bezeichnung, a.ParentAbteilungID, a.Aktiv, a.Sortierung,
-                   p.Bezeichnung AS ParentBezeichnung
-            FROM Abteilung a
-            LEFT JOIN Abteilung p ON a.ParentAbteilungID = p.ID
-            ORDER BY COALESCE(p.Bezeichnung, a.Bezeichnung), a.Bezeichnung
-        ''').fetchall()
-        
-        bereiche = conn.execute('SELECT ID, Bezeichnung, Aktiv FROM Bereich ORDER BY Bezeichnung').fetchall()
-        gewerke = conn.execute('''
-            SELECT G.ID, G.Bezeichnung, B.Bezeichnung AS Bereich, G.BereichID, G.Aktiv
-            FROM Gewerke G
-            JOIN Bereich B ON G.BereichID = B.ID
-            ORDER BY B.Bezeichnung, G.Bezeichnung
-        ''').fetchall()
-        taetigkeiten = conn.execute('SELECT ID, Bezeichnung, Sortierung, Aktiv FROM Taetigkeit ORDER BY Sortierung ASC, Bezeichnung ASC').fetchall()
-        status = conn.execute('SELECT ID, Bezeichnung, Farbe, Sortierung, Aktiv FROM Status ORDER BY Sortierung ASC, Bezeichnung ASC').fetchall()
-        
-        # Ersatzteil-Verwaltung
-        ersatzteil_kategorien = conn.execute('SELECT ID, Bezeichnung, Beschreibung, Aktiv, Sortierung FROM ErsatzteilKategorie ORDER BY Sortierung ASC, Bezeichnung ASC').fetchall()
-        lieferanten = conn.execute('SELECT ID, Name, Kontaktperson, Telefon, Email, Strasse, PLZ, Ort, Website, CsvExportReihenfolge, Aktiv FROM Lieferant WHERE Gelöscht = 0 ORDER BY Name').fetchall()
-        fremdfirmen = wartungen_services.list_fremdfirmen(conn, nur_aktiv=False)
-        kostenstellen = conn.execute('SELECT ID, Bezeichnung, Beschreibung, Aktiv, Sortierung FROM Kostenstelle ORDER BY Sortierung ASC, Bezeichnung ASC').fetchall()
-        lagerorte = conn.execute('SELECT ID, Bezeichnung, Beschreibung, Aktiv, Sortierung FROM Lagerort ORDER BY Sortierung ASC, Bezeichnung ASC').fetchall()
-        lagerplaetze = conn.execute('SELECT ID, Bezeichnung, Beschreibung, Aktiv, Sortierung FROM Lagerplatz ORDER BY Sortierung ASC, Bezeichnung ASC').fetchall()
-        
-        # Firmendaten laden (nur erste Zeile, sollte nur eine geben)
-        firmendaten_row = conn.execute('SELECT * FROM Firmendaten LIMIT 1').fetchone()
-        firmendaten = row_to_dict(firmendaten_row) if firmendaten_row else None
-        
-        # Berechtigungen laden
-        berechtigungen = conn.execute('SELECT ID, Schluessel, Bezeichnung, Beschreibung, Aktiv FROM Berechtigung ORDER BY Bezeichnung').fetchall()
-
-        # Menü-Sichtbarkeit pro Mitarbeiter laden
-        mitarbeiter_menue_sichtbarkeit = {}
-        if mitarbeiter:
-            placeholders = ','.join(['?'] * len([m['ID'] for m in mitarbeiter]))
-            mitarbeiter_ids = [m['ID'] for m in mitarbeiter]
-            sichtbarkeit_rows = conn.execute(f'''
-                SELECT MitarbeiterID, MenueSchluessel, Sichtbar
-                FROM MitarbeiterMenueSichtbarkeit
-                WHERE MitarbeiterID IN ({placeholders})
-            ''', mitarbeiter_ids).fetchall()
-            for row in sichtbarkeit_rows:
-                mid = row['MitarbeiterID']
-                if mid not in mitarbeiter_menue_sichtbarkeit:
-                    mitarbeiter_menue_sichtbarkeit[mid] = {}
-                mitarbeiter_menue_sichtbarkeit[mid][row['MenueSchluessel']] = bool(row['Sichtbar'])
-            # Sicherstellen, dass jeder Mitarbeiter einen Eintrag hat (leeres Dict = alles Standard)
-            for m in mitarbeiter:
-                if m['ID'] not in mitarbeiter_menue_sichtbarkeit:
-                    mitarbeiter_menue_sichtbarkeit[m['ID']] = {}
-
-        # Effektive Menü-Sichtbarkeit (wie in der Sidebar) pro Mitarbeiter
-        mitarbeiter_menue_effektiv = {}
-        for m in mitarbeiter:
-            mitarbeiter_menue_effektiv[m['ID']] = get_menue_sichtbarkeit_fuer_mitarbeiter(m['ID'], conn)
-
-        # Zebra-Drucker und Etikettenformate laden
-        if _table_has_column(conn, 'zebra_printers', 'agent_id'):
-            zebra_printers = conn.execute('''
-                SELECT p.id, p.name, p.ip_address, p.description, p.ort, p.active,
-                       p.agent_id, a.name AS agent_name
-                FROM zebra_printers p
-                LEFT JOIN print_agents a ON p.agent_id = a.id
-                ORDER BY COALESCE(p.ort, ''), p.name
-            ''').fetchall()
-        else:
-            zebra_printers = conn.execute('''
-                SELECT p.id, p.name, p.ip_address, p.description, p.ort, p.active,
-                       NULL AS agent_id, NULL AS agent_name
-                FROM zebra_printers p
-                ORDER BY COALESCE(p.ort, ''), p.name
-            ''').fetchall()
-        print_agents_list = conn.execute('''
-            SELECT id, name, standort, active
-            FROM print_agents
-            ORDER BY name
-        ''').fetchall()
-        if _table_has_column(conn, 'label_formats', 'zpl_zusatz'):
-            label_formats = conn.execute('''
-                SELECT id, name, description, width_mm, height_mm, orientation, zpl_header, zpl_zusatz
-                FROM label_formats
-                ORDER BY name
-            ''').fetchall()
-        else:
-            label_formats = conn.execute('''
-                SELECT id, name, description, width_mm, height_mm, orientation, zpl_header, '' AS zpl_zusatz
-                FROM label_formats
-                ORDER BY name
-            ''').fetchall()
-        
-        # Etiketten laden mit zpl_header aus label_formats
-        etiketten = conn.execute('''
-            SELECT e.id, e.bezeichnung, e.etikettformat_id, e.druckbefehle,
-                   lf.zpl_header
-            FROM Etikett e
-            LEFT JOIN label_formats lf ON e.etikettformat_id = lf.id
-            ORDER BY e.bezeichnung
-        ''').fetchall()
+    """Admin Dashboard - Rahmen; die Abschnitte (Tabs) lädt die Seite per admin.abschnitt nach"""
+    return render_template('admin.html')
+
+
+def _abschnitt_mitarbeiter(conn):
+    """Mitarbeiter inkl. Abteilungen, Berechtigungen und Menü-Sichtbarkeit (nicht gecacht)."""
+    mitarbeiter = conn.execute('''
+        SELECT m.ID, m.Personalnummer, m.Vorname, m.Nachname, m.Email, m.Handynummer, m.Aktiv,
+               a.Bezeichnung AS PrimaerAbteilung, m.PrimaerAbteilungID,
+               m.StartseiteNachLoginEndpunkt
+        FROM Mitarbeiter m
+        LEFT JOIN Abteilung a ON m.PrimaerAbteilungID = a.ID
+        ORDER BY m.Nachname, m.Vorname
+    ''').fetchall()
+
+    # Zusätzliche Abteilungen, Berechtigungen und Menü-Sichtbarkeit je eine Query
+    mitarbeiter_abteilungen = {}
+    for row in conn.execute('SELECT MitarbeiterID, AbteilungID FROM MitarbeiterAbteilung'):
+        mitarbeiter_abteilungen.setdefault(row['MitarbeiterID'], []).append(row['AbteilungID'])
+
+    mitarbeiter_berechtigungen = {}
+    for row in conn.execute('SELECT MitarbeiterID, BerechtigungID FROM MitarbeiterBerechtigung'):
+        mitarbeiter_berechtigungen.setdefault(row['MitarbeiterID'], []).append(row['BerechtigungID'])
+
+    # Leeres Dict = alles Standard
+    mitarbeiter_menue_sichtbarkeit = {m['ID']: {} for m in mitarbeiter}
+    for row in conn.execute('SELECT MitarbeiterID, MenueSchluessel, Sichtbar FROM MitarbeiterMenueSichtbarkeit'):
+        if row['MitarbeiterID'] in mitarbeiter_menue_sichtbarkeit:
+            mitarbeiter_menue_sichtbarkeit[row['MitarbeiterID']][row['MenueSchluessel']] = bool(row['Sichtbar'])
+
+    # Effektive Menü-Sichtbarkeit (wie in der Sidebar) pro Mitarbeiter
+    mitarbeiter_menue_effektiv = {
+        m['ID']: get_menue_sichtbarkeit_fuer_mitarbeiter(m['ID'], conn) for m in mitarbeiter
+    }
 
-        druck_konfig_rows = conn.execute('''
-            SELECT k.id, k.funktion_code, k.etikett_id, k.drucker_id, k.prioritaet, k.aktiv,
-                   e.bezeichnung AS etikett_bezeichnung
-            FROM etikett_druck_konfig k
-            JOIN Etikett e ON e.id = k.etikett_id
-            ORDER BY k.funktion_code, k.prioritaet DESC, k.id
-        ''').fetchall()
-        konfig_abt = {}
-        for row in conn.execute(
-            'SELECT konfig_id, abteilung_id FROM etikett_druck_konfig_abteilung'
-        ):
-            konfig_abt.setdefault(row['konfig_id'], []).append(row['abteilung_id'])
-        etikett_druck_konfigen = []
-        for r in druck_konfig_rows:
-            d = dict(r)
-            d['abteilung_ids'] = konfig_abt.get(r['id'], [])
-            etikett_druck_konfigen.append(d)
-
-    menue_definitionen = get_alle_menue_definitionen()
-
-    return render_template('admin.html',
-                           mitarbeiter=mitarbeiter,
-                           mitarbeiter_abteilungen=mitarbeiter_abteilungen,
-                           mitarbeiter_berechtigungen=mitarbeiter_berechtigungen,
-                           mitarbeiter_menue_sichtbarkeit=mitarbeiter_menue_sichtbarkeit,
-                           mitarbeiter_menue_effektiv=mitarbeiter_menue_effektiv,
-                           menue_definitionen=menue_definitionen,
-                           abteilungen=abteilungen,
-                           bereiche=bereiche,
-                           gewerke=gewerke,
-                           taetigkeiten=taetigkeiten,
-                           status=status,
-                           ersatzteil_kategorien=ersatzteil_kategorien,
-                           lieferanten=lieferanten,
-                           fremdfirmen=fremdfirmen,
-                           kostenstellen=kostenstellen,
-                           lagerorte=lagerorte,
-                           lagerplaetze=lagerplaetze,
-                           firmendaten=firmendaten,
-                           berechtigungen=berechtigungen,
-                           zebra_printers=zebra_printers,
-                           print_agents_list=print_agents_list,
-                           label_formats=label_formats,
-                           etiketten=etiketten,
-                           etikett_druck_konfigen=etikett_druck_konfigen,
-                           druck_funktionen=FUNKTIONEN_ADMIN,
-                           login_startseiten_auswahl=LOGIN_STARTSEITEN_AUSWAHL)
+    return {
+        'mitarbeiter': mitarbeiter,
+        'mitarbeiter_abteilungen': mitarbeiter_abteilungen,
+        'mitarbeiter_berechtigungen': mitarbeiter_berechtigungen,
+        'mitarbeiter_menue_sichtbarkeit': mitarbeiter_menue_sichtbarkeit,
+        'mitarbeiter_menue_effektiv': mitarbeiter_menue_effektiv,
+        'menue_definitionen': get_alle_menue_definitionen(),
+        'abteilungen': get_stammdaten('abteilungen', conn),
+        'berechtigungen': get_stammdaten('berechtigungen', conn),
+        'login_startseiten_auswahl': LOGIN_STARTSEITEN_AUSWAHL,
+    }
+
+
+def _abschnitt_firmendaten(conn):
+    zeilen = get_stammdaten('firmendaten', conn)
+    return {'firmendaten': zeilen[0] if zeilen else None}
+
+
+def _abschnitt_etikettendrucker(conn):
+    return {
+        'abteilungen': get_stammdaten('abteilungen', conn),
+        'zebra_printers': get_stammdaten('zebra_printers', conn),
+        'print_agents_list': get_stammdaten('print_agents', conn),
+        'etiketten': get_stammdaten('etiketten', conn),
+        'etikett_druck_konfigen': get_stammdaten('etikett_druck_konfigen', conn),
+        'druck_funktionen': FUNKTIONEN_ADMIN,
+    }
+
+
+def _stammdaten_abschnitt(**variablen):
+    """Abschnitt, der nur Stammdaten aus dem Cache braucht (Template-Variable -> Abfrage)."""
+    def laden(conn):
+        return {var: get_stammdaten(name, conn) for var, name in variablen.items()}
+    return laden
+
+
+# Tab-ID (ohne 'tab-') -> Loader(conn) -> Template-Variablen für _admin_<tab>.html
+ADMIN_ABSCHNITTE = {
+    'mitarbeiter': _abschnitt_mitarbeiter,
+    'berechtigungen': _stammdaten_abschnitt(berechtigungen='berechtigungen'),
+    'abteilung': _stammdaten_abschnitt(abteilungen='abteilungen'),
+    'bereich': _stammdaten_abschnitt(bereiche='bereiche'),
+    'gewerk': _stammdaten_abschnitt(bereiche='bereiche', gewerke='gewerke'),
+    'fremdfirma': _stammdaten_abschnitt(fremdfirmen='fremdfirmen'),
+    'taetigkeit': _stammdaten_abschnitt(taetigkeiten='taetigkeiten'),
+    'status': _stammdaten_abschnitt(status='status'),
+    'kategorie': _stammdaten_abschnitt(ersatzteil_kategorien='ersatzteil_kategorien'),
+    'kostenstelle': _stammdaten_abschnitt(kostenstellen='kostenstellen'),
+    'lagerort': _stammdaten_abschnitt(lagerorte='lagerorte'),
+    'lagerplatz': _stammdaten_abschnitt(lagerplaetze='lagerplaetze'),
+    'lieferant': _stammdaten_abschnitt(lieferanten='lieferanten'),
+    'firmendaten': _abschnitt_firmendaten,
+    'etikettendrucker': _abschnitt_etikettendrucker,
+    'etiketten': _stammdaten_abschnitt(
+        label_formats='label_formats', etiketten='etiketten', zebra_printers='zebra_printers'
+    ),
+}
+
+
+@admin_bp.route('/abschnitt/<name>')
+@admin_required
+@menue_zugriff_erforderlich('admin')
+def abschnitt(name):
+    """Ein Abschnitt des Admin-Dashboards als HTML-Fragment (JSON: success, html)"""
+    laden = ADMIN_ABSCHNITTE.get(name)
+    if laden is None:
+        return jsonify({'success': False, 'message': 'Unbekannter Abschnitt.'}), 404
+    with get_db_connection() as conn:
+        daten = laden(conn)
+    return jsonify({'success': True, 'html': render_template(f'_admin_{name}.html', **daten)})
 
 
 # ========== Zebra-Drucker Verwaltung ==========
@@ -262,6 +173,7 @@ def dashboard():
 @admin_bp.route('/zebra/printers', methods=['POST'])
 @admin_required
 @menue_zugriff_erforderlich('admin')
+@stammdaten_aendern('zebra_printers')
 def zebra_printer_save():
     """
     Zebra-Drucker anlegen oder aktualisieren.
@@ -309,6 +221,7 @@ def zebra_printer_save():
 @admin_bp.route('/zebra/printers/toggle/<int:pid>', methods=['POST'])
 @admin_required
 @menue_zugriff_erforderlich('admin')
+@stammdaten_aendern('zebra_printers')
 def zebra_printer_toggle(pid):
     """Aktiv-Status eines Zebra-Druckers umschalten."""
     try:
@@ -366,6 +279,7 @@ def druck_agents_uebersicht():
 @admin_bp.route('/druck-agents/save', methods=['POST'])
 @admin_required
 @menue_zugriff_erforderlich('admin_druck_agents')
+@stammdaten_aendern('print_agents')
 def druck_agents_save():
     """Druck-Agent anlegen oder aktualisieren. Beim Anlegen wird ein Token erzeugt."""
     from utils.zebra_client import generate_agent_token, hash_agent_token
@@ -456,6 +370,7 @@ def druck_agents_rotate_token(aid):
 @admin_bp.route('/druck-agents/<int:aid>/toggle', methods=['POST'])
 @admin_required
 @menue_zugriff_erforderlich('admin_druck_agents')
+@stammdaten_aendern('print_agents')
 def druck_agents_toggle(aid):
     """Aktiviert/Deaktiviert einen Druck-Agent."""
     try:
@@ -586,6 +501,7 @@ def druck_queue_abbrechen(job_id):
 @admin_bp.route('/zebra/labels', methods=['POST'])
 @admin_required
 @menue_zugriff_erforderlich('admin')
+@stammdaten_aendern('label_formats')
 def zebra_label_save():
     """
     Etikettenformat anlegen oder aktualisieren.
@@ -724,6 +640,7 @@ def zebra_test():
 @admin_bp.route('/zebra/etiketten/save', methods=['POST'])
 @admin_required
 @menue_zugriff_erforderlich('admin')
+@stammdaten_aendern('Etikett')
 def zebra_etikett_save():
     """
     Etikett anlegen oder aktualisieren.
@@ -771,6 +688,7 @@ def zebra_etikett_save():
 @admin_bp.route('/zebra/druck_konfig/save', methods=['POST'])
 @admin_required
 @menue_zugriff_erforderlich('admin')
+@stammdaten_aendern('etikett_druck_konfig', 'etikett_druck_konfig_abteilung')
 def zebra_druck_konfig_save():
     """Druckfunktion-Konfiguration anlegen oder aktualisieren."""
     kid = request.form.get('id', type=int)
@@ -830,6 +748,7 @@ def zebra_druck_konfig_save():
 @admin_bp.route('/zebra/druck_konfig/delete/<int:kid>', methods=['POST'])
 @admin_required
 @menue_zugriff_erforderlich('admin')
+@stammdaten_aendern('etikett_druck_konfig', 'etikett_druck_konfig_abteilung')
 def zebra_druck_konfig_delete(kid):
     try:
         with get_db_connection() as conn:
@@ -920,7 +839,7 @@ def mitarbeiter_add():
                 'muss beim ersten Login geändert werden.'
             )
 
-        passwort_hash = generate_password_hash(initial_passwort)
+        passwort_hash = passwort_hash_erzeugen(initial_passwort)
         with get_db_connection() as conn:
             try:
                 conn.execute(
@@ -965,7 +884,7 @@ def mitarbeiter_update(mid):
                 (vorname, nachname, email, handynummer, aktiv, startseite_ep, mid),
             )
             if passwort:
-                passwort_hash = generate_password_hash(passwort)
+                passwort_hash = passwort_hash_erzeugen(passwort)
                 try:
                     conn.execute(
                         'UPDATE Mitarbeiter SET Passwort = ?, PasswortWechselErforderlich = 1 WHERE ID = ?',
@@ -1016,7 +935,7 @@ def mitarbeiter_reset_password(mid):
             nachname = mitarbeiter['Nachname']
 
             neues_passwort = generiere_zufalls_passwort()
-            neues_passwort_hash = generate_password_hash(neues_passwort)
+            neues_passwort_hash = passwort_hash_erzeugen(neues_passwort)
             try:
                 conn.execute(
                     'UPDATE Mitarbeiter SET Passwort = ?, PasswortWechselErforderlich = 1 WHERE ID = ?',
@@ -1042,6 +961,7 @@ def mitarbeiter_reset_password(mid):
 @admin_bp.route('/abteilung/add', methods=['POST'])
 @admin_required
 @menue_zugriff_erforderlich('admin')
+@stammdaten_aendern('Abteilung')
 def abteilung_add():
     """Abteilung anlegen"""
     bezeichnung = request.form.get('bezeichnung')
@@ -1067,6 +987,7 @@ def abteilung_add():
 @admin_bp.route('/abteilung/update/<int:aid>', methods=['POST'])
 @admin_required
 @menue_zugriff_erforderlich('admin')
+@stammdaten_aendern('Abteilung')
 def abteilung_update(aid):
     """Abteilung aktualisieren"""
     bezeichnung = request.form.get('bezeichnung')
@@ -1094,6 +1015,7 @@ def abteilung_update(aid):
 @admin_bp.route('/abteilung/delete/<int:aid>', methods=['POST'])
 @admin_required
 @menue_zugriff_erforderlich('admin')
+@stammdaten_aendern('Abteilung')
 def abteilung_delete(aid):
     """Abteilung deaktivieren"""
     try:
@@ -1110,6 +1032,7 @@ def abteilung_delete(aid):
 @admin_bp.route('/mitarbeiter/<int:mid>/abteilungen', methods=['POST'])
 @admin_required
 @menue_zugriff_erforderlich('admin')
+@stammdaten_aendern('MitarbeiterAbteilung')
 def mitarbeiter_abteilungen(mid):
     """Mitarbeiter-Abteilungen zuweisen"""
     primaer_abteilung_id = request.form.get('primaer_abteilung_id')
@@ -1149,6 +1072,7 @@ def mitarbeiter_abteilungen(mid):
 @admin_bp.route('/bereich/add', methods=['POST'])
 @admin_required
 @menue_zugriff_erforderlich('admin')
+@stammdaten_aendern('Bereich')
 def bereich_add():
     """Bereich anlegen"""
     bezeichnung = request.form.get('bezeichnung')
@@ -1166,6 +1090,7 @@ def bereich_add():
 @admin_bp.route('/bereich/update/<int:bid>', methods=['POST'])
 @admin_required
 @menue_zugriff_erforderlich('admin')
+@stammdaten_aendern('Bereich')
 def bereich_update(bid):
     """Bereich aktualisieren"""
     bezeichnung = request.form.get('bezeichnung')
@@ -1182,6 +1107,7 @@ def bereich_update(bid):
 @admin_bp.route('/bereich/delete/<int:bid>', methods=['POST'])
 @admin_required
 @menue_zugriff_erforderlich('admin')
+@stammdaten_aendern('Bereich')
 def bereich_delete(bid):
     """Bereich deaktivieren"""
     try:
@@ -1198,6 +1124,7 @@ def bereich_delete(bid):
 @admin_bp.route('/gewerk/add', methods=['POST'])
 @admin_required
 @menue_zugriff_erforderlich('admin')
+@stammdaten_aendern('Gewerke')
 def gewerk_add():
     """Gewerk anlegen"""
     bezeichnung = request.form.get('bezeichnung')
@@ -1216,6 +1143,7 @@ def gewerk_add():
 @admin_bp.route('/gewerk/update/<int:gid>', methods=['POST'])
 @admin_required
 @menue_zugriff_erforderlich('admin')
+@stammdaten_aendern('Gewerke')
 def gewerk_update(gid):
     """Gewerk aktualisieren"""
     bezeichnung = request.form.get('bezeichnung')
@@ -1233,6 +1161,7 @@ def gewerk_update(gid):
 @admin_bp.route('/gewerk/delete/<int:gid>', methods=['POST'])
 @admin_required
 @menue_zugriff_erforderlich('admin')
+@stammdaten_aendern('Gewerke')
 def gewerk_delete(gid):
     """Gewerk deaktivieren"""
     try:
@@ -1249,6 +1178,7 @@ def gewerk_delete(gid):
 @admin_bp.route('/taetigkeit/add', methods=['POST'])
 @admin_required
 @menue_zugriff_erforderlich('admin')
+@stammdaten_aendern('Taetigkeit')
 def taetigkeit_add():
     """Tätigkeit anlegen"""
     bezeichnung = request.form.get('bezeichnung')
@@ -1267,6 +1197,7 @@ def taetigkeit_add():
 @admin_bp.route('/taetigkeit/update/<int:tid>', methods=['POST'])
 @admin_required
 @menue_zugriff_erforderlich('admin')
+@stammdaten_aendern('Taetigkeit')
 def taetigkeit_update(tid):
     """Tätigkeit aktualisieren"""
     bezeichnung = request.form.get('bezeichnung')
@@ -1284,6 +1215,7 @@ def taetigkeit_update(tid):
 @admin_bp.route('/taetigkeit/delete/<int:tid>', methods=['POST'])
 @admin_required
 @menue_zugriff_erforderlich('admin')
+@stammdaten_aendern('Taetigkeit')
 def taetigkeit_delete(tid):
     """Tätigkeit deaktivieren"""
     try:
@@ -1300,6 +1232,7 @@ def taetigkeit_delete(tid):
 @admin_bp.route('/status/add', methods=['POST'])
 @admin_required
 @menue_zugriff_erforderlich('admin')
+@stammdaten_aendern('Status')
 def status_add():
     """Status anlegen"""
     bezeichnung = request.form.get('bezeichnung')
@@ -1319,6 +1252,7 @@ def status_add():
 @admin_bp.route('/status/update/<int:sid>', methods=['POST'])
 @admin_required
 @menue_zugriff_erforderlich('admin')
+@stammdaten_aendern('Status')
 def status_update(sid):
     """Status aktualisieren"""
     bezeichnung = request.form.get('bezeichnung')
@@ -1337,6 +1271,7 @@ def status_update(sid):
 @admin_bp.route('/status/delete/<int:sid>', methods=['POST'])
 @admin_required
 @menue_zugriff_erforderlich('admin')
+@stammdaten_aendern('Status')
 def status_delete(sid):
     """Status deaktivieren"""
     try:
@@ -1353,6 +1288,7 @@ def status_delete(sid):
 @admin_bp.route('/ersatzteil-kategorie/add', methods=['POST'])
 @admin_required
 @menue_zugriff_erforderlich('admin')
+@stammdaten_aendern('ErsatzteilKategorie')
 def ersatzteil_kategorie_add():
     """ErsatzteilKategorie anlegen"""
     bezeichnung = request.form.get('bezeichnung')
@@ -1375,6 +1311,7 @@ def ersatzteil_kategorie_add():
 @admin_bp.route('/ersatzteil-kategorie/update/<int:kid>', methods=['POST'])
 @admin_required
 @menue_zugriff_erforderlich('admin')
+@stammdaten_aendern('ErsatzteilKategorie')
 def ersatzteil_kategorie_update(kid):
     """ErsatzteilKategorie aktualisieren"""
     bezeichnung = request.form.get('bezeichnung')
@@ -1398,6 +1335,7 @@ def ersatzteil_kategorie_update(kid):
 @admin_bp.route('/ersatzteil-kategorie/delete/<int:kid>', methods=['POST'])
 @admin_required
 @menue_zugriff_erforderlich('admin')
+@stammdaten_aendern('ErsatzteilKategorie')
 def ersatzteil_kategorie_delete(kid):
     """ErsatzteilKategorie deaktivieren"""
     try:
@@ -1414,6 +1352,7 @@ def ersatzteil_kategorie_delete(kid):
 @admin_bp.route('/kostenstelle/add', methods=['POST'])
 @admin_required
 @menue_zugriff_erforderlich('admin')
+@stammdaten_aendern('Kostenstelle')
 def kostenstelle_add():
     """Kostenstelle anlegen"""
     bezeichnung = request.form.get('bezeichnung')
@@ -1436,6 +1375,7 @@ def kostenstelle_add():
 @admin_bp.route('/kostenstelle/update/<int:kid>', methods=['POST'])
 @admin_required
 @menue_zugriff_erforderlich('admin')
+@stammdaten_aendern('Kostenstelle')
 def kostenstelle_update(kid):
     """Kostenstelle aktualisieren"""
     bezeichnung = request.form.get('bezeichnung')
@@ -1459,6 +1399,7 @@ def kostenstelle_update(kid):
 @admin_bp.route('/kostenstelle/delete/<int:kid>', methods=['POST'])
 @admin_required
 @menue_zugriff_erforderlich('admin')
+@stammdaten_aendern('Kostenstelle')
 def kostenstelle_delete(kid):
     """Kostenstelle deaktivieren"""
     try:
@@ -1475,6 +1416,7 @@ def kostenstelle_delete(kid):
 @admin_bp.route('/lagerort/add', methods=['POST'])
 @admin_required
 @menue_zugriff_erforderlich('admin')
+@stammdaten_aendern('Lagerort')
 def lagerort_add():
     """Lagerort anlegen"""
     bezeichnung = request.form.get('bezeichnung')
@@ -1497,6 +1439,7 @@ def lagerort_add():
 @admin_bp.route('/lagerort/update/<int:lid>', methods=['POST'])
 @admin_required
 @menue_zugriff_erforderlich('admin')
+@stammdaten_aendern('Lagerort')
 def lagerort_update(lid):
     """Lagerort aktualisieren"""
     bezeichnung = request.form.get('bezeichnung')
@@ -1520,6 +1463,7 @@ def lagerort_update(lid):
 @admin_bp.route('/lagerort/delete/<int:lid>', methods=['POST'])
 @admin_required
 @menue_zugriff_erforderlich('admin')
+@stammdaten_aendern('Lagerort')
 def lagerort_delete(lid):
     """Lagerort deaktivieren"""
     try:
@@ -1536,6 +1480,7 @@ def lagerort_delete(lid):
 @admin_bp.route('/lagerplatz/add', methods=['POST'])
 @admin_required
 @menue_zugriff_erforderlich('admin')
+@stammdaten_aendern('Lagerplatz')
 def lagerplatz_add():
     """Lagerplatz anlegen"""
     bezeichnung = request.form.get('bezeichnung')
@@ -1558,6 +1503,7 @@ def lagerplatz_add():
 @admin_bp.route('/lagerplatz/update/<int:lid>', methods=['POST'])
 @admin_required
 @menue_zugriff_erforderlich('admin')
+@stammdaten_aendern('Lagerplatz')
 def lagerplatz_update(lid):
     """Lagerplatz aktualisieren"""
     bezeichnung = request.form.get('bezeichnung')
@@ -1581,6 +1527,7 @@ def lagerplatz_update(lid):
 @admin_bp.route('/lagerplatz/delete/<int:lid>', methods=['POST'])
 @admin_required
 @menue_zugriff_erforderlich('admin')
+@stammdaten_aendern('Lagerplatz')
 def lagerplatz_delete(lid):
     """Lagerplatz deaktivieren"""
     try:
@@ -1597,6 +1544,7 @@ def lagerplatz_delete(lid):
 @admin_bp.route('/lieferant/add', methods=['POST'])
 @admin_required
 @menue_zugriff_erforderlich('admin')
+@stammdaten_aendern('Lieferant')
 def lieferant_add():
     """Lieferant anlegen"""
     name = request.form.get('name')
@@ -1624,6 +1572,7 @@ def lieferant_add():
 @admin_bp.route('/lieferant/update/<int:lid>', methods=['POST'])
 @admin_required
 @menue_zugriff_erforderlich('admin')
+@stammdaten_aendern('Lieferant')
 def lieferant_update(lid):
     """Lieferant aktualisieren"""
     name = request.form.get('name')
@@ -1653,6 +1602,7 @@ def lieferant_update(lid):
 @admin_bp.route('/lieferant/delete/<int:lid>', methods=['POST'])
 @admin_required
 @menue_zugriff_erforderlich('admin')
+@stammdaten_aendern('Lieferant')
 def lieferant_delete(lid):
     """Lieferant soft-delete"""
     try:
@@ -1669,6 +1619,7 @@ def lieferant_delete(lid):
 @admin_bp.route('/fremdfirma/add', methods=['POST'])
 @admin_required
 @menue_zugriff_erforderlich('admin')
+@stammdaten_aendern('Fremdfirma')
 def fremdfirma_add():
     """Fremdfirma anlegen (nur Admin)."""
     name = (request.form.get('firmenname') or '').strip()
@@ -1688,6 +1639,7 @@ def fremdfirma_add():
 @admin_bp.route('/fremdfirma/update/<int:fid>', methods=['POST'])
 @admin_required
 @menue_zugriff_erforderlich('admin')
+@stammdaten_aendern('Fremdfirma')
 def fremdfirma_update(fid):
     """Fremdfirma aktualisieren."""
     name = (request.form.get('firmenname') or '').strip()
@@ -1820,9 +1772,8 @@ DATABASE_SCHEMA = {
             'Gelöscht': 'INTEGER NOT NULL DEFAULT 0'
         },
         'indexes': [
-            'idx_bemerkung_thema',
-            'idx_bemerkung_mitarbeiter',
-            'idx_bemerkung_geloescht'
+            'idx_bemerkung_thema_geloescht_datum',
+            'idx_bemerkung_mitarbeiter'
         ]
     },
     'SchichtbuchThemaSichtbarkeit': {
@@ -1900,9 +1851,8 @@ DATABASE_SCHEMA = {
             'ErstelltAm': 'DATETIME DEFAULT CURRENT_TIMESTAMP'
         },
         'indexes': [
-            'idx_benachrichtigung_mitarbeiter',
-            'idx_benachrichtigung_thema',
-            'idx_benachrichtigung_gelesen'
+            'idx_benachrichtigung_mitarbeiter_gelesen_erstellt',
+            'idx_benachrichtigung_thema'
         ]
     },
     'ErsatzteilKategorie': {
@@ -2019,7 +1969,7 @@ DATABASE_SCHEMA = {
             'ErstelltAm': 'DATETIME DEFAULT CURRENT_TIMESTAMP'
         },
         'indexes': [
-            'idx_lagerbuchung_ersatzteil',
+            'idx_lagerbuchung_ersatzteil_datum',
             'idx_lagerbuchung_thema',
             'idx_lagerbuchung_kostenstelle',
             'idx_lagerbuchung_verwendet_von',
@@ -2329,6 +2279,7 @@ def database_repair():
                             errors.append(f'Index {index_name}: {str(e)}')
             
             conn.commit()
+            stammdaten_cache_leeren()
             
             return jsonify({
                 'success': True,
@@ -2452,6 +2403,7 @@ def login_logs():
 @admin_bp.route('/firmendaten', methods=['GET', 'POST'])
 @admin_required
 @menue_zugriff_erforderlich('admin')
+@stammdaten_aendern('Firmendaten')
 def firmendaten():
     """Firmendaten anzeigen und bearbeiten"""
     if request.method == 'POST':
@@ -2538,6 +2490,7 @@ def firmendaten():
 @admin_bp.route('/berechtigung/add', methods=['POST'])
 @admin_required
 @menue_zugriff_erforderlich('admin')
+@stammdaten_aendern('Berechtigung')
 def berechtigung_add():
     """Berechtigung anlegen"""
     schluessel = request.form.get('schluessel', '').strip()
@@ -2573,6 +2526,7 @@ def berechtigung_add():
 @admin_bp.route('/berechtigung/update/<int:bid>', methods=['POST'])
 @admin_required
 @menue_zugriff_erforderlich('admin')
+@stammdaten_aendern('Berechtigung')
 def berechtigung_update(bid):
     """Berechtigung aktualisieren"""
     bezeichnung = request.form.get('bezeichnung', '').strip()
@@ -2597,6 +2551,7 @@ def berechtigung_update(bid):
 @admin_bp.route('/berechtigung/toggle/<int:bid>', methods=['POST'])
 @admin_required
 @menue_zugriff_erforderlich('admin')
+@stammdaten_aendern('Berechtigung')
 def berechtigung_toggle(bid):
     """Berechtigung aktivieren/deaktivieren"""
     try:
@@ -2859,3 +2814,14 @@ def mqtt_konfiguration_test():
     else:
         _log_admin_mqtt.warning('Admin MQTT-Test: fehlgeschlagen — %s', msg)
     return jsonify(result), 200 if result.get('ok') else 400
+
+
+# ========== LibreOffice-Pool (PDF-Export) ==========
+
+@admin_bp.route('/office-pool/status', methods=['GET'])
+@admin_required
+@menue_zugriff_erforderlich('admin')
+def office_pool_status():
+    """Queue-/Slot-Metriken des LibreOffice-Pools des bedienenden Worker-Prozesses (JSON)."""
+    from utils.reports.office_pool import office_pool_metriken
+    return jsonify(office_pool_metriken())
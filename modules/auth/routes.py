@@ -5,7 +5,6 @@ Auth Routes - Login, Logout
 import base64
 import traceback
 from flask import render_template, request, redirect, url_for, session, flash, make_response, jsonify, current_app, g
-from werkzeug.security import check_password_hash, generate_password_hash
 from datetime import datetime, timedelta
 from . import auth_bp
 from utils import get_db_connection
@@ -13,6 +12,12 @@ from utils.helpers import get_client_ip
 from utils.decorators import login_required
 from utils.rate_limit import limiter, login_ratelimit_key
 from utils.security import validate_passwort_policy
+from utils.passwort_hash import (
+    PasswortHashUeberlastet,
+    passwort_hash_erzeugen,
+    passwort_neu_hashen_noetig,
+    passwort_pruefen,
+)
 from utils.auth_redirect import resolve_post_login_redirect_url
 from utils.db_sql import upsert_ignore, upsert_replace
 from utils.webauthn import (
@@ -55,6 +60,19 @@ def _log_login_attempt(conn, personalnummer, mitarbeiter_id, erfolgreich, reques
         traceback.print_exc()
 
 
+def _passwort_neu_hashen(conn, mitarbeiter_id, passwort):
+    """Ersetzt einen Hash mit veralteten Parametern (nach erfolgreicher Prüfung beim Login)."""
+    try:
+        conn.execute(
+            'UPDATE Mitarbeiter SET Passwort = ? WHERE ID = ?',
+            (passwort_hash_erzeugen(passwort), mitarbeiter_id)
+        )
+        conn.commit()
+    except Exception as e:
+        # Login nicht blockieren; beim nächsten Login erneut versuchen
+        print(f"Passwort-Rehash fehlgeschlagen (Mitarbeiter {mitarbeiter_id}): {e}")
+
+
 @auth_bp.route('/login', methods=['GET', 'POST'])
 @limiter.limit('10/minute;50/hour', methods=['POST'], key_func=login_ratelimit_key)
 def login():
@@ -86,9 +104,11 @@ def login():
                     flash('Ungültige Personalnummer oder Passwort.', 'danger')
                     return render_template('login.html', personalnummer=personalnummer, remember_me=remember_me_checkbox)
 
-                if user and check_password_hash(user['Passwort'], passwort):
+                if user and passwort_pruefen(user['Passwort'], passwort):
                     # Erfolgreiche Anmeldung loggen
                     _log_login_attempt(conn, personalnummer, user['ID'], True, request, None)
+                    if passwort_neu_hashen_noetig(user['Passwort']):
+                        _passwort_neu_hashen(conn, user['ID'], passwort)
                     
                     session['user_id'] = user['ID']
                     # Row-Objekt (SQLite/SQLAlchemy) hat kein .get() wie dict
@@ -184,6 +204,9 @@ def login():
                     # Fehlgeschlagene Anmeldung loggen
                     _log_login_attempt(conn, personalnummer, user['ID'] if user else None, False, request, 'Ungültiges Passwort')
                     flash('Ungültige Personalnummer oder Passwort.', 'danger')
+        except PasswortHashUeberlastet:
+            flash('Zu viele gleichzeitige Anmeldungen. Bitte in einigen Sekunden erneut versuchen.', 'warning')
+            return render_template('login.html', personalnummer=personalnummer, remember_me=remember_me_checkbox), 503
         except Exception as e:
             flash('Ein Fehler ist aufgetreten. Bitte versuchen Sie es erneut.', 'danger')
             print(f"Login error: {e}")
@@ -268,12 +291,12 @@ def passwort_aendern():
                     return redirect(url_for('auth.logout'))
                 
                 # Altes Passwort prüfen
-                if not check_password_hash(user['Passwort'], altes_passwort):
+                if not passwort_pruefen(user['Passwort'], altes_passwort):
                     flash('Das alte Passwort ist nicht korrekt.', 'danger')
                     return render_template('passwort_aendern.html')
                 
                 # Neues Passwort hashen und speichern; ggf. Wechsel-Flag zurücksetzen.
-                neues_passwort_hash = generate_password_hash(neues_passwort)
+                neues_passwort_hash = passwort_hash_erzeugen(neues_passwort)
                 try:
                     conn.execute(
                         'UPDATE Mitarbeiter SET Passwort = ?, PasswortWechselErforderlich = 0 WHERE ID = ?',
@@ -0,0 +1,12 @@
+"""
+Berichte Module
+Asynchrone PDF-Exporte und ZIP-Sammelexporte (Job anlegen, Status abfragen, herunterladen)
+"""
+
+from flask import Blueprint
+
+berichte_bp = Blueprint('berichte', __name__, url_prefix='/berichte')
+
+from . import routes
+
+__all__ = ['berichte_bp']
@@ -0,0 +1,153 @@
+"""
+Berichte Routes
+
+Endpunkte:
+
+- POST /berichte/jobs                  -> Job anlegen (JSON: typ + id bzw. monat)
+- GET  /berichte/jobs/<id>             -> Status für Polling
+- GET  /berichte/jobs/<id>/download    -> fertige Datei
+
+Berechtigungen entsprechen den direkten Export-Routen des jeweiligen Moduls; Status und
+Download sieht nur der Auftraggeber.
+"""
+
+import os
+import re
+
+from flask import flash, jsonify, redirect, request, send_file, session, url_for
+
+from utils.abteilungen import get_sichtbare_abteilungen_fuer_mitarbeiter
+from utils.database import get_db_connection
+from utils.decorators import login_required
+from utils.menue_definitions import ist_menue_zugriff_erlaubt
+from utils.reports.bericht_jobs import (
+    abfrage_vermerken,
+    job_anlegen,
+    job_laden,
+    job_ordner,
+    job_status_dict,
+)
+
+from . import berichte_bp
+
+# Menüpunkte wie bei den direkten Export-Routen (mindestens einer muss sichtbar sein)
+_MENUE_JE_TYP = {
+    'bestellung': ('bestellwesen_bestellungen',),
+    'angebotsanfrage': ('bestellwesen_angebote',),
+    'thema': ('schichtbuch_liste', 'schichtbuch_aufgabenlisten'),
+    'bestellungen_monat': ('bestellwesen_bestellungen',),
+}
+
+
+def _bestellungen_des_monats(conn, mitarbeiter_id, monat):
+    """IDs exportierbarer (freigegebener/bestellter) Bestellungen eines Monats, mit demselben
+    Sichtbarkeitsfilter wie die Bestellliste."""
+    query = '''
+        SELECT b.ID FROM Bestellung b
+        WHERE b.Gelöscht = 0
+          AND b.Status IN ('Freigegeben', 'Bestellt')
+          AND b.ErstelltAm >= ? AND b.ErstelltAm < ?
+    '''
+    jahr, mon = (int(x) for x in monat.split('-'))
+    naechster = f'{jahr + 1}-01' if mon == 12 else f'{jahr}-{mon + 1:02d}'
+    params = [f'{monat}-01', f'{naechster}-01']
+    if 'admin' not in session.get('user_berechtigungen', []):
+        sichtbare_abteilungen = get_sichtbare_abteilungen_fuer_mitarbeiter(mitarbeiter_id, conn)
+        if not sichtbare_abteilungen:
+            return []
+        placeholders = ','.join(['?'] * len(sichtbare_abteilungen))
+        query += f'''
+            AND EXISTS (
+                SELECT 1 FROM BestellungSichtbarkeit bs
+                WHERE bs.BestellungID = b.ID AND bs.AbteilungID IN ({placeholders})
+            )
+        '''
+        params.extend(sichtbare_abteilungen)
+    query += ' ORDER BY b.ErstelltAm, b.ID'
+    return [r['ID'] for r in conn.execute(query, params).fetchall()]
+
+
+@berichte_bp.route('/jobs', methods=['POST'])
+@login_required
+def job_erstellen():
+    """Bericht-Job anlegen; Antwort 202 mit Job-ID und Status-URL."""
+    mitarbeiter_id = session.get('user_id')
+    daten = request.get_json(silent=True) or request.form
+    typ = (daten.get('typ') or '').strip()
+
+    if typ not in _MENUE_JE_TYP:
+        return jsonify({'success': False, 'message': 'Unbekannter Berichtstyp.'}), 400
+    if not any(ist_menue_zugriff_erlaubt(s) for s in _MENUE_JE_TYP[typ]):
+        return jsonify({
+            'success': False,
+            'message': 'Zugriff verweigert. Diese Funktion steht Ihnen nicht zur Verfügung.',
+        }), 403
+
+    with get_db_connection() as conn:
+        if typ == 'bestellungen_monat':
+            monat = (daten.get('monat') or '').strip()
+            if not re.fullmatch(r'\d{4}-(0[1-9]|1[0-2])', monat):
+                return jsonify({'success': False, 'message': 'Monat im Format JJJJ-MM angeben.'}), 400
+            ids = _bestellungen_des_monats(conn, mitarbeiter_id, monat)
+            if not ids:
+                return jsonify({
+                    'success': False,
+                    'message': 'Keine freigegebenen oder bestellten Bestellungen in diesem Monat.',
+                }), 404
+            job_id = job_anlegen(conn, mitarbeiter_id, typ, {'monat': monat, 'ids': ids}, gesamt=len(ids))
+        else:
+            try:
+                objekt_id = int(daten.get('id'))
+            except (TypeError, ValueError):
+                return jsonify({'success': False, 'message': 'Ungültige ID.'}), 400
+            if typ == 'thema':
+                from modules.schichtbuch.services import check_thema_berechtigung
+                if not check_thema_berechtigung(objekt_id, mitarbeiter_id, conn):
+                    return jsonify({
+                        'success': False,
+                        'message': 'Sie haben keine Berechtigung, dieses Thema zu exportieren.',
+                    }), 403
+            job_id = job_anlegen(conn, mitarbeiter_id, typ, {'id': objekt_id})
+
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'status_url': url_for('berichte.job_status', job_id=job_id),
+    }), 202
+
+
+@berichte_bp.route('/jobs/<int:job_id>')
+@login_required
+def job_status(job_id):
+    """Status eines eigenen Jobs; bei ``fertig`` inklusive Download-URL."""
+    with get_db_connection() as conn:
+        job = job_laden(conn, job_id, session.get('user_id'))
+        if not job:
+            return jsonify({'success': False, 'message': 'Job nicht gefunden.'}), 404
+        abfrage_vermerken(conn, job_id)
+
+    status = job_status_dict(job)
+    if job['Status'] == 'fertig':
+        status['download_url'] = url_for('berichte.job_download', job_id=job_id)
+    response = jsonify({'success': True, 'job': status})
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+
+@berichte_bp.route('/jobs/<int:job_id>/download')
+@login_required
+def job_download(job_id):
+    """Fertige Datei eines eigenen Jobs ausliefern."""
+    with get_db_connection() as conn:
+        job = job_laden(conn, job_id, session.get('user_id'))
+
+    pfad = None
+    if job and job['Status'] == 'fertig' and job['Dateiname']:
+        pfad = os.path.join(job_ordner(job_id), os.path.basename(job['Dateiname']))
+    if not pfad or not os.path.isfile(pfad):
+        flash('Der Bericht ist nicht mehr verfügbar. Bitte erneut exportieren.', 'warning')
+        return redirect(url_for('auth.profil'))
+
+    response = send_file(pfad, mimetype=job['Mimetype'], as_attachment=True, download_name=job['Dateiname'])
+    response.headers['Cache-Control'] = 'no-store'
+    return response
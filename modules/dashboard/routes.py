@@ -3,7 +3,12 @@ Dashboard Routes
 Routes für Dashboard-Übersicht und API-Endpunkte
 """
 
-from flask import render_template, request, redirect, url_for, session, jsonify, current_app
+import queue
+import time
+
+from flask import (
+    Response, render_template, request, redirect, url_for, session, jsonify, current_app, stream_with_context,
+)
 from . import dashboard_bp
 from utils import get_db_connection, get_sichtbare_abteilungen_fuer_mitarbeiter, login_required, menue_zugriff_erforderlich
 from utils.menue_definitions import ist_menue_zugriff_erlaubt
@@ -13,6 +18,7 @@ from utils.benachrichtigungen import (
     ziel_url_fuer_benachrichtigung,
     build_ungelesen_benachrichtigungen_api_dict,
 )
+from utils.benachrichtigungen_live import abbestellen, abonnieren, benachrichtigung_geaendert, ungelesen_stand
 from . import services
 
 
@@ -103,11 +109,55 @@ def benachrichtigungen():
 @login_required
 @menue_zugriff_erforderlich('dashboard')
 def api_benachrichtigungen_ungelesen():
-    """Ungelesene Benachrichtigungen für Glocke/Toasts (alle Module, inkl. ziel_url)."""
+    """Ungelesene Benachrichtigungen für Glocke/Toasts (alle Module, inkl. ziel_url).
+
+    Mit passendem If-None-Match nur 304 (ETag aus Anzahl/IDs der ungelesenen Zeilen).
+    """
     user_id = session.get('user_id')
     with get_db_connection() as conn:
-        payload = build_ungelesen_benachrichtigungen_api_dict(user_id, conn, limit=20)
-    return jsonify(payload)
+        stand = ungelesen_stand(conn, user_id)
+        if request.if_none_match.contains(stand):
+            response = current_app.response_class(status=304)
+        else:
+            response = jsonify(build_ungelesen_benachrichtigungen_api_dict(user_id, conn, limit=20))
+    response.set_etag(stand)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+@dashboard_bp.route('/api/benachrichtigungen/stream')
+@login_required
+@menue_zugriff_erforderlich('dashboard')
+def api_benachrichtigungen_stream():
+    """SSE: meldet ``geaendert``, sobald sich die Benachrichtigungen des Benutzers ändern.
+
+    Ist das Stream-Limit dieses Prozesses erreicht, 204 (EventSource verbindet sich dann nicht
+    neu, der Client bleibt beim Polling). Nach ``BENACHRICHTIGUNGEN_SSE_MAX_SEKUNDEN`` endet der
+    Stream, damit belegte Threads wieder frei werden; der Browser verbindet sich neu.
+    """
+    user_id = session.get('user_id')
+    q = abonnieren(user_id)
+    if q is None:
+        return '', 204
+    ende = time.monotonic() + int(current_app.config.get('BENACHRICHTIGUNGEN_SSE_MAX_SEKUNDEN', 300))
+
+    @stream_with_context
+    def gen():
+        try:
+            yield 'retry: 5000\n\n'
+            while time.monotonic() < ende:
+                try:
+                    q.get(timeout=min(25, max(0.1, ende - time.monotonic())))
+                    yield 'event: geaendert\ndata: {}\n\n'
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+        finally:
+            abbestellen(user_id, q)
+
+    resp = Response(gen(), mimetype='text/event-stream')
+    resp.headers['Cache-Control'] = 'no-cache'
+    resp.headers['X-Accel-Buffering'] = 'no'
+    return resp
 
 
 @dashboard_bp.route('/api/benachrichtigungen')
@@ -172,6 +222,7 @@ def api_benachrichtigung_gelesen(benachrichtigung_id):
             WHERE ID = ?
         ''', (benachrichtigung_id,))
         conn.commit()
+    benachrichtigung_geaendert(user_id)
     
     return jsonify({'success': True, 'message': 'Benachrichtigung als gelesen markiert'})
 
@@ -189,6 +240,7 @@ def api_alle_benachrichtigungen_gelesen():
             WHERE MitarbeiterID = ? AND Gelesen = 0
         ''', (user_id,))
         conn.commit()
+    benachrichtigung_geaendert(user_id)
     
     return jsonify({'success': True, 'message': 'Alle Benachrichtigungen als gelesen markiert'})
 
@@ -216,6 +268,7 @@ def api_benachrichtigung_loeschen(benachrichtigung_id):
             WHERE ID = ?
         ''', (benachrichtigung_id,))
         conn.commit()
+    benachrichtigung_geaendert(user_id)
     
     return jsonify({'success': True, 'message': 'Benachrichtigung gelöscht'})
 
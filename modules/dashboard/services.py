@@ -287,7 +287,7 @@ def get_wartungen_zusammenfassung(conn, mitarbeiter_id, is_admin):
         if not nf:
             plaene_ohne_termin += 1
             continue
-        st = wartungen_services.naechste_faelligkeit_stufe(nf)
+        st = r['FaelligkeitStufe']
         if st == 0:
             plaene_term_ok += 1
         elif st == 1:
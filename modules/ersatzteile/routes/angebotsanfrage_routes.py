@@ -2,7 +2,7 @@
 Angebotsanfrage Routes - Angebotsanfragen-Verwaltung
 """
 
-from flask import render_template, request, redirect, url_for, session, jsonify, flash, send_from_directory, current_app, make_response
+from flask import render_template, request, redirect, url_for, session, jsonify, flash, current_app, make_response
 from datetime import datetime
 import os
 from werkzeug.utils import secure_filename
@@ -15,7 +15,10 @@ from utils.file_handling import (
     originale_loeschen_aus_formular,
     loesche_import_kopie_nach_upload,
 )
+from utils.bild_derivate import bild_derivat_antwort
+from utils.datei_auslieferung import nicht_geaendert_antwort, sende_anhang
 from utils.reports import generate_angebotsanfrage_pdf
+from utils.stammdaten_cache import get_stammdaten
 from ..services import get_dateien_fuer_bereich, speichere_datei, get_datei_typ_aus_dateiname
 
 
@@ -512,8 +515,8 @@ def angebotsanfrage_neu():
     
     # GET: Formular anzeigen
     with get_db_connection() as conn:
-        lieferanten = conn.execute('SELECT ID, Name FROM Lieferant WHERE Aktiv = 1 AND Gelöscht = 0 ORDER BY Name').fetchall()
-        kostenstellen = conn.execute('SELECT ID, Bezeichnung FROM Kostenstelle WHERE Aktiv = 1 ORDER BY Sortierung, Bezeichnung').fetchall()
+        lieferanten = get_stammdaten('lieferanten', conn, nur_aktiv=True)
+        kostenstellen = get_stammdaten('kostenstellen', conn, nur_aktiv=True)
         
         # Wenn Query-Parameter vorhanden, vorausgefüllte Daten laden
         vorausgefuelltes_ersatzteil = None
@@ -597,7 +600,7 @@ def angebotsanfrage_detail(angebotsanfrage_id):
         ''', (angebotsanfrage_id,)).fetchall()
         
         # Kostenstellen für Dropdown
-        kostenstellen = conn.execute('SELECT ID, Bezeichnung FROM Kostenstelle WHERE Aktiv = 1 ORDER BY Sortierung, Bezeichnung').fetchall()
+        kostenstellen = get_stammdaten('kostenstellen', conn, nur_aktiv=True)
         
         # PDF-Dateien aus Ordner laden
         # Dateien aus Datei-Tabelle laden
@@ -1253,6 +1256,10 @@ def angebotsanfrage_datei_anzeigen(filepath):
     if not filepath.startswith('Bestellwesen/Angebote/'):
         flash('Ungültiger Dateipfad.', 'danger')
         return redirect(url_for('ersatzteile.angebotsanfrage_liste'))
+
+    nicht_geaendert = nicht_geaendert_antwort(filepath)
+    if nicht_geaendert is not None:
+        return nicht_geaendert
     
     from utils.security import resolve_under_base, PathTraversalError
     try:
@@ -1280,10 +1287,11 @@ def angebotsanfrage_datei_anzeigen(filepath):
         except:
             pass
     
-    return send_from_directory(
-        os.path.dirname(full_path),
-        os.path.basename(full_path)
-    )
+    derivat = bild_derivat_antwort(full_path, request.args.get('groesse'))
+    if derivat is not None:
+        return derivat
+
+    return sende_anhang(full_path, filepath)
 
 
 @ersatzteile_bp.route('/angebotsanfragen/<int:angebotsanfrage_id>/pdf')
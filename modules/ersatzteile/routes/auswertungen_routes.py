@@ -7,6 +7,7 @@ from datetime import datetime
 from .. import ersatzteile_bp
 from utils import get_db_connection, login_required, get_sichtbare_abteilungen_fuer_mitarbeiter, menue_zugriff_erforderlich
 from utils.abteilungen import get_untergeordnete_abteilungen
+from utils.stammdaten_cache import get_stammdaten
 from ..services.auswertung_services import (
     get_bestellungen_auswertung,
     get_ersatzteilwert_auswertung,
@@ -92,9 +93,7 @@ def auswertungen():
         )
         
         # Filter-Optionen laden
-        lieferanten = conn.execute(
-            'SELECT ID, Name FROM Lieferant WHERE Aktiv = 1 AND Gelöscht = 0 ORDER BY Name'
-        ).fetchall()
+        lieferanten = get_stammdaten('lieferanten', conn, nur_aktiv=True)
         
         abteilungen = get_abteilungen_fuer_filter(mitarbeiter_id, conn, is_admin=is_admin)
     
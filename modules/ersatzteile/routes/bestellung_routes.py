@@ -2,8 +2,8 @@
 Bestellung Routes - Bestellungs-Verwaltung
 """
 
-from flask import render_template, request, redirect, url_for, session, jsonify, flash, current_app, make_response, send_from_directory
-from datetime import datetime, date, timedelta
+from flask import render_template, request, redirect, url_for, session, jsonify, flash, current_app, make_response
+from datetime import datetime
 import os
 from werkzeug.utils import secure_filename
 from .. import ersatzteile_bp
@@ -23,8 +23,12 @@ from utils.file_handling import (
     originale_loeschen_aus_formular,
     loesche_import_kopie_nach_upload,
 )
+from utils.bild_derivate import bild_derivat_antwort
+from utils.datei_auslieferung import nicht_geaendert_antwort, sende_anhang
 from utils.reports import generate_bestellung_pdf, generate_bestellung_csv_bytes
-from ..services import get_dateien_fuer_bereich
+from utils.stammdaten_cache import get_stammdaten
+from utils.benachrichtigungen import loesche_benachrichtigungen_fuer_bestellung
+from ..services import cursor_parsen, get_bestellung_liste_seite, get_dateien_fuer_bereich
 
 
 def _normalize_artikelnummer_key(value):
@@ -118,12 +122,8 @@ def _prefill_dict_bestellung_neu(request):
 
 def _render_bestellung_neu_mit_prefill(mitarbeiter_id, form_prefill):
     with get_db_connection() as conn:
-        lieferanten = conn.execute(
-            'SELECT ID, Name FROM Lieferant WHERE Aktiv = 1 AND Gelöscht = 0 ORDER BY Name'
-        ).fetchall()
-        kostenstellen = conn.execute(
-            'SELECT ID, Bezeichnung FROM Kostenstelle WHERE Aktiv = 1 ORDER BY Sortierung, Bezeichnung'
-        ).fetchall()
+        lieferanten = get_stammdaten('lieferanten', conn, nur_aktiv=True)
+        kostenstellen = get_stammdaten('kostenstellen', conn, nur_aktiv=True)
         from utils import get_abteilungsbaum_fuer_sichtbarkeit
 
         auswaehlbare_abteilungen = get_abteilungsbaum_fuer_sichtbarkeit(mitarbeiter_id, conn)
@@ -137,169 +137,78 @@ def _render_bestellung_neu_mit_prefill(mitarbeiter_id, form_prefill):
     )
 
 
+def _bestellung_liste_filter():
+    """Filterparameter der Bestellliste aus der Query (Liste und Nachladen)."""
+    return {
+        'status_filter_list': request.args.getlist('status'),
+        'lieferant_filter': request.args.get('lieferant'),
+        'abteilung_filter': request.args.get('abteilung'),
+        'prioritaet_filter_list': request.args.getlist('prioritaet'),
+    }
+
+
 @ersatzteile_bp.route('/bestellungen')
 @login_required
 @menue_zugriff_erforderlich('bestellwesen_bestellungen')
 def bestellung_liste():
-    """Liste aller Bestellungen mit Filter"""
+    """Liste aller Bestellungen mit Filter (erste Seite, weitere per Lazy Load)"""
     mitarbeiter_id = session.get('user_id')
-    
-    # Filterparameter - mehrere Status möglich
-    status_filter_list = request.args.getlist('status')
-    lieferant_filter = request.args.get('lieferant')
-    abteilung_filter = request.args.get('abteilung')
-    prioritaet_filter_list = request.args.getlist('prioritaet')
+    filter_werte = _bestellung_liste_filter()
     
     with get_db_connection() as conn:
         # Sichtbare Abteilungen für den Mitarbeiter ermitteln
         sichtbare_abteilungen = get_sichtbare_abteilungen_fuer_mitarbeiter(mitarbeiter_id, conn)
         is_admin = 'admin' in session.get('user_berechtigungen', [])
         
-        # Basis-Query
-        query = '''
-            SELECT 
-                b.ID,
-                b.Status,
-                b.Gelöscht,
-                b.ErstelltAm,
-                b.FreigegebenAm,
-                b.BestelltAm,
-                b.FreigabeBemerkung,
-                b.Lieferdatum,
-                COALESCE(b.Prioritaet, 3) AS Prioritaet,
-                l.Name AS LieferantName,
-                m1.Vorname || ' ' || m1.Nachname AS ErstelltVon,
-                m2.Vorname || ' ' || m2.Nachname AS FreigegebenVon,
-                m3.Vorname || ' ' || m3.Nachname AS BestelltVon,
-                abt.Bezeichnung AS Abteilung,
-                COALESCE(SUM(bp.Menge * COALESCE(bp.Preis, 0)), 0) AS Gesamtbetrag,
-                COUNT(bp.ID) AS PositionenAnzahl
-            FROM Bestellung b
-            LEFT JOIN Lieferant l ON b.LieferantID = l.ID
-            LEFT JOIN Mitarbeiter m1 ON b.ErstelltVonID = m1.ID
-            LEFT JOIN Mitarbeiter m2 ON b.FreigegebenVonID = m2.ID
-            LEFT JOIN Mitarbeiter m3 ON b.BestelltVonID = m3.ID
-            LEFT JOIN Abteilung abt ON b.ErstellerAbteilungID = abt.ID
-            LEFT JOIN BestellungPosition bp ON b.ID = bp.BestellungID
-            WHERE 1=1
-        '''
-        params = []
-
-        filter_geloescht = 'Gelöscht' in status_filter_list
-        status_ohne_geloescht = [s for s in status_filter_list if s != 'Gelöscht']
-
-        if filter_geloescht and not status_ohne_geloescht:
-            query += ' AND b.Gelöscht = 1'
-        elif filter_geloescht and status_ohne_geloescht:
-            placeholders = ','.join(['?'] * len(status_ohne_geloescht))
-            query += f' AND (b.Gelöscht = 1 OR (b.Gelöscht = 0 AND b.Status IN ({placeholders})))'
-            params.extend(status_ohne_geloescht)
-        else:
-            query += ' AND b.Gelöscht = 0'
-            if status_ohne_geloescht:
-                placeholders = ','.join(['?'] * len(status_ohne_geloescht))
-                query += f' AND b.Status IN ({placeholders})'
-                params.extend(status_ohne_geloescht)
-            else:
-                query += " AND b.Status != 'Erledigt' AND b.Status != 'Storniert'"
-        
-        # Sichtbarkeitsfilter: Nur Bestellungen mit Sichtbarkeit für sichtbare Abteilungen
-        if not is_admin and sichtbare_abteilungen:
-            placeholders = ','.join(['?'] * len(sichtbare_abteilungen))
-            query += f'''
-                AND EXISTS (
-                    SELECT 1 FROM BestellungSichtbarkeit bs
-                    WHERE bs.BestellungID = b.ID 
-                    AND bs.AbteilungID IN ({placeholders})
-                )
-            '''
-            params.extend(sichtbare_abteilungen)
-        elif not is_admin:
-            # Keine Berechtigung - keine Bestellungen anzeigen
-            query += ' AND 1=0'
-        
-        # Lieferant-Filter
-        if lieferant_filter:
-            query += ' AND b.LieferantID = ?'
-            params.append(lieferant_filter)
-        
-        # Abteilung-Filter
-        if abteilung_filter:
-            query += ' AND b.ErstellerAbteilungID = ?'
-            params.append(abteilung_filter)
-        
-        # Prioritäts-Filter (mehrere Prioritäten möglich)
-        if prioritaet_filter_list:
-            prioritaet_values = [int(p) for p in prioritaet_filter_list if p.isdigit() and 1 <= int(p) <= 5]
-            if prioritaet_values:
-                placeholders = ','.join(['?'] * len(prioritaet_values))
-                query += f' AND COALESCE(b.Prioritaet, 3) IN ({placeholders})'
-                params.extend(prioritaet_values)
-        
-        query += ' GROUP BY b.ID ORDER BY b.ErstelltAm DESC'
-        
-        bestellungen_raw = conn.execute(query, params).fetchall()
-        heute = date.today()
-        grenze = timedelta(days=14)
-        bestellungen = []
-        for b in bestellungen_raw:
-            row = {k: b[k] for k in b.keys()}
-            ld_raw = row.get('Lieferdatum')
-            row['LieferdatumKritisch'] = False
-            if ld_raw:
-                try:
-                    ld = datetime.strptime(str(ld_raw)[:10], '%Y-%m-%d').date()
-                    row['LieferdatumKritisch'] = heute > ld + grenze
-                except ValueError:
-                    pass
-            bestellungen.append(row)
-        
-        # Positionen für alle Bestellungen laden
-        positionen_dict = {}
-        if bestellungen:
-            bestellung_ids = [str(b['ID']) for b in bestellungen]
-            placeholders = ','.join(['?'] * len(bestellung_ids))
-            positionen_query = f'''
-                SELECT 
-                    p.BestellungID,
-                    p.*,
-                    e.ID AS ErsatzteilID,
-                    COALESCE(p.Bestellnummer, e.Bestellnummer) AS Bestellnummer,
-                    COALESCE(p.Bezeichnung, e.Bezeichnung) AS Bezeichnung,
-                    COALESCE(p.Einheit, e.Einheit, 'Stück') AS Einheit
-                FROM BestellungPosition p
-                LEFT JOIN Ersatzteil e ON p.ErsatzteilID = e.ID
-                WHERE p.BestellungID IN ({placeholders})
-                ORDER BY p.BestellungID, p.ID
-            '''
-            positionen = conn.execute(positionen_query, bestellung_ids).fetchall()
-            
-            # Positionen nach BestellungID gruppieren
-            for pos in positionen:
-                bestellung_id = pos['BestellungID']
-                if bestellung_id not in positionen_dict:
-                    positionen_dict[bestellung_id] = []
-                positionen_dict[bestellung_id].append(pos)
+        bestellungen, positionen_dict, naechster_cursor = get_bestellung_liste_seite(
+            conn, sichtbare_abteilungen, is_admin, **filter_werte
+        )
         
         # Lieferanten für Filter laden
-        lieferanten = conn.execute('SELECT ID, Name FROM Lieferant WHERE Aktiv = 1 AND Gelöscht = 0 ORDER BY Name').fetchall()
+        lieferanten = get_stammdaten('lieferanten', conn, nur_aktiv=True)
         
         # Abteilungen für Filter laden
-        abteilungen = conn.execute('SELECT ID, Bezeichnung FROM Abteilung ORDER BY Sortierung, Bezeichnung').fetchall()
+        abteilungen = get_stammdaten('abteilungen_liste', conn)
     
     return render_template(
         'bestellung_liste.html',
         bestellungen=bestellungen,
         positionen_dict=positionen_dict,
-        status_filter_list=status_filter_list,
-        lieferant_filter=lieferant_filter,
-        abteilung_filter=abteilung_filter,
-        prioritaet_filter_list=prioritaet_filter_list,
+        naechster_cursor=naechster_cursor,
         lieferanten=lieferanten,
-        abteilungen=abteilungen
+        abteilungen=abteilungen,
+        **filter_werte
     )
 
 
+@ersatzteile_bp.route('/bestellungen/load_more')
+@login_required
+@menue_zugriff_erforderlich('bestellwesen_bestellungen')
+def bestellung_liste_load_more():
+    """AJAX-Route zum Nachladen der nächsten Seite (Lazy Load, Cursor ``nach``)"""
+    mitarbeiter_id = session.get('user_id')
+    filter_werte = _bestellung_liste_filter()
+    nach = cursor_parsen(request.args.get('nach'))
+    if nach is None:
+        return jsonify({'success': False, 'message': 'Ungültiger Cursor.'}), 400
+    
+    with get_db_connection() as conn:
+        sichtbare_abteilungen = get_sichtbare_abteilungen_fuer_mitarbeiter(mitarbeiter_id, conn)
+        is_admin = 'admin' in session.get('user_berechtigungen', [])
+        bestellungen, positionen_dict, naechster_cursor = get_bestellung_liste_seite(
+            conn, sichtbare_abteilungen, is_admin, nach=nach, **filter_werte
+        )
+    
+    kontext = dict(bestellungen=bestellungen, positionen_dict=positionen_dict, **filter_werte)
+    return jsonify({
+        'success': True,
+        'anzahl': len(bestellungen),
+        'zeilen_html': render_template('_bestellung_liste_zeilen.html', **kontext),
+        'karten_html': render_template('_bestellung_liste_karten.html', **kontext),
+        'naechster_cursor': naechster_cursor,
+    })
+
+
 @ersatzteile_bp.route('/bestellungen/<int:bestellung_id>/loeschen', methods=['POST'])
 @login_required
 @menue_zugriff_erforderlich('bestellwesen_bestellungen')
@@ -455,7 +364,7 @@ def bestellung_detail(bestellung_id):
         ''', (bestellung_id,)).fetchall()
         
         # Kostenstellen für Dropdown
-        kostenstellen = conn.execute('SELECT ID, Bezeichnung FROM Kostenstelle WHERE Aktiv = 1 ORDER BY Sortierung, Bezeichnung').fetchall()
+        kostenstellen = get_stammdaten('kostenstellen', conn, nur_aktiv=True)
         
         # Gesamtsumme berechnen
         gesamtbetrag = 0
@@ -741,8 +650,8 @@ def bestellung_neu():
 
     # GET: Formular anzeigen
     with get_db_connection() as conn:
-        lieferanten = conn.execute('SELECT ID, Name FROM Lieferant WHERE Aktiv = 1 AND Gelöscht = 0 ORDER BY Name').fetchall()
-        kostenstellen = conn.execute('SELECT ID, Bezeichnung FROM Kostenstelle WHERE Aktiv = 1 ORDER BY Sortierung, Bezeichnung').fetchall()
+        lieferanten = get_stammdaten('lieferanten', conn, nur_aktiv=True)
+        kostenstellen = get_stammdaten('kostenstellen', conn, nur_aktiv=True)
         
         # Auswählbare Abteilungen für Sichtbarkeit
         from utils import get_abteilungsbaum_fuer_sichtbarkeit
@@ -800,14 +709,7 @@ def bestellung_anfrage_zurueckziehen(bestellung_id):
             )
 
             # Alle bestehenden Benachrichtigungen für diese Bestellung löschen
-            conn.execute(
-                '''
-                DELETE FROM Benachrichtigung 
-                WHERE Modul = 'bestellwesen' 
-                AND (Zusatzdaten LIKE ? OR Zusatzdaten LIKE ?)
-                ''',
-                (f'%"bestellung_id":{bestellung_id}%', f'%"bestellung_id": {bestellung_id}%')
-            )
+            loesche_benachrichtigungen_fuer_bestellung(bestellung_id, conn)
 
             conn.commit()
 
@@ -1174,12 +1076,7 @@ def bestellung_freigeben(bestellung_id):
         conn.commit()
         
         # Alle bestehenden Benachrichtigungen für diese Bestellung löschen (egal ob gelesen oder nicht)
-        # Pattern muss sowohl "bestellung_id":123 als auch "bestellung_id": 123 matchen
-        conn.execute('''
-            DELETE FROM Benachrichtigung 
-            WHERE Modul = 'bestellwesen' 
-            AND (Zusatzdaten LIKE ? OR Zusatzdaten LIKE ?)
-        ''', (f'%"bestellung_id":{bestellung_id}%', f'%"bestellung_id": {bestellung_id}%'))
+        loesche_benachrichtigungen_fuer_bestellung(bestellung_id, conn)
         conn.commit()
         
         # Benachrichtigungen erstellen
@@ -1219,12 +1116,7 @@ def bestellung_als_bestellt(bestellung_id):
         conn.commit()
         
         # Alle bestehenden Benachrichtigungen für diese Bestellung löschen (egal ob gelesen oder nicht)
-        # Pattern muss sowohl "bestellung_id":123 als auch "bestellung_id": 123 matchen
-        conn.execute('''
-            DELETE FROM Benachrichtigung 
-            WHERE Modul = 'bestellwesen' 
-            AND (Zusatzdaten LIKE ? OR Zusatzdaten LIKE ?)
-        ''', (f'%"bestellung_id":{bestellung_id}%', f'%"bestellung_id": {bestellung_id}%'))
+        loesche_benachrichtigungen_fuer_bestellung(bestellung_id, conn)
         conn.commit()
         
         # Benachrichtigungen erstellen
@@ -1299,14 +1191,7 @@ def bestellung_bestellstatus_zuruecksetzen(bestellung_id):
                 ''',
                 (bestellung_id,),
             )
-            conn.execute(
-                '''
-                DELETE FROM Benachrichtigung
-                WHERE Modul = 'bestellwesen'
-                AND (Zusatzdaten LIKE ? OR Zusatzdaten LIKE ?)
-                ''',
-                (f'%"bestellung_id":{bestellung_id}%', f'%"bestellung_id": {bestellung_id}%'),
-            )
+            loesche_benachrichtigungen_fuer_bestellung(bestellung_id, conn)
             conn.commit()
 
         flash(
@@ -2485,6 +2370,10 @@ def rechnung_anzeigen(filepath):
     if not filepath.startswith('Bestellwesen/Rechnungen/'):
         flash('Ungültiger Dateipfad.', 'danger')
         return redirect(url_for('ersatzteile.bestellung_liste'))
+
+    nicht_geaendert = nicht_geaendert_antwort(filepath)
+    if nicht_geaendert is not None:
+        return nicht_geaendert
     
     try:
         from utils.security import resolve_under_base, PathTraversalError
@@ -2508,12 +2397,11 @@ def rechnung_anzeigen(filepath):
         else:
             mimetype = 'application/octet-stream'
 
-        return send_from_directory(
-            os.path.dirname(full_path),
-            os.path.basename(full_path),
-            mimetype=mimetype,
-            as_attachment=False
-        )
+        derivat = bild_derivat_antwort(full_path, request.args.get('groesse'))
+        if derivat is not None:
+            return derivat
+
+        return sende_anhang(full_path, filepath, mimetype=mimetype)
     except Exception:
         current_app.logger.exception('Rechnung anzeigen Fehler')
         flash('Fehler beim Laden der Datei.', 'danger')
@@ -2538,6 +2426,10 @@ def bestellung_datei_anzeigen(bestellung_id, filepath):
     if not any(filepath.startswith(prefix) for prefix in expected_prefixes):
         flash('Ungültiger Dateipfad.', 'danger')
         return redirect(url_for('ersatzteile.bestellung_detail', bestellung_id=bestellung_id))
+
+    nicht_geaendert = nicht_geaendert_antwort(filepath)
+    if nicht_geaendert is not None:
+        return nicht_geaendert
     
     try:
         # Berechtigungsprüfung: Prüfe ob Benutzer Zugriff auf die Bestellung hat
@@ -2568,16 +2460,7 @@ def bestellung_datei_anzeigen(bestellung_id, filepath):
             flash('Datei nicht gefunden.', 'danger')
             return redirect(url_for('ersatzteile.bestellung_detail', bestellung_id=bestellung_id))
         
-        # Dateiname extrahieren
-        filename = os.path.basename(full_path)
-        directory = os.path.dirname(full_path)
-        
-        return send_from_directory(
-            directory,
-            filename,
-            mimetype='application/pdf',
-            as_attachment=False  # Im Browser anzeigen
-        )
+        return sende_anhang(full_path, filepath, mimetype='application/pdf')
     except Exception as e:
         flash(f'Fehler beim Laden der Datei: {str(e)}', 'danger')
         print(f"Bestellung Datei anzeigen Fehler: {e}")
@@ -2598,6 +2481,10 @@ def auftragsbestätigung_anzeigen(filepath):
     if not filepath.startswith('Bestellwesen/Auftragsbestätigungen/'):
         flash('Ungültiger Dateipfad.', 'danger')
         return redirect(url_for('ersatzteile.bestellung_liste'))
+
+    nicht_geaendert = nicht_geaendert_antwort(filepath)
+    if nicht_geaendert is not None:
+        return nicht_geaendert
     
     try:
         # Bestellung-ID aus Pfad extrahieren (Bestellwesen/Auftragsbestätigungen/{id}/...)
@@ -2642,13 +2529,12 @@ def auftragsbestätigung_anzeigen(filepath):
             mimetype = 'image/png'
         else:
             mimetype = 'application/octet-stream'
-        
-        return send_from_directory(
-            os.path.dirname(full_path),
-            os.path.basename(full_path),
-            mimetype=mimetype,
-            as_attachment=False  # Im Browser anzeigen
-        )
+
+        derivat = bild_derivat_antwort(full_path, request.args.get('groesse'))
+        if derivat is not None:
+            return derivat
+
+        return sende_anhang(full_path, filepath, mimetype=mimetype)
     except Exception as e:
         flash(f'Fehler beim Laden der Datei: {str(e)}', 'danger')
         print(f"Auftragsbestätigung anzeigen Fehler: {e}")
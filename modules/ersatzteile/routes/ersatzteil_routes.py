@@ -2,7 +2,7 @@
 Ersatzteil-Routen - CRUD-Operationen für Ersatzteile
 """
 
-from flask import render_template, request, redirect, url_for, session, jsonify, flash, send_from_directory, current_app
+from flask import render_template, request, redirect, url_for, session, jsonify, flash, current_app
 from datetime import datetime
 from io import BytesIO
 import os
@@ -24,6 +24,9 @@ from utils.file_handling import (
     loesche_import_kopie_nach_upload,
 )
 from utils.artikel_seite_bilder import ArtikelSeiteFehler, bild_von_url_laden, bilder_aus_seiten_url
+from utils.bild_derivate import bild_derivat_antwort, derivate_im_hintergrund_erzeugen, neue_datei_version
+from utils.datei_auslieferung import nicht_geaendert_antwort, sende_anhang
+from utils.stammdaten_cache import get_stammdaten
 from ..services import (
     build_ersatzteil_liste_query, 
     get_ersatzteil_liste_filter_options, 
@@ -121,8 +124,12 @@ def ersatzteil_liste():
         filter_options = get_ersatzteil_liste_filter_options(conn)
 
         # Zebra-Defaults für Etikettendruck
-        default_printer = conn.execute('SELECT id, name FROM zebra_printers WHERE active = 1 ORDER BY id LIMIT 1').fetchone()
-        default_label = conn.execute('SELECT id, name FROM label_formats WHERE name = ? LIMIT 1', ('30x30 mm',)).fetchone()
+        default_printer = min(
+            get_stammdaten('zebra_printers', conn, nur_aktiv=True), key=lambda p: p['id'], default=None
+        )
+        default_label = next(
+            (f for f in get_stammdaten('label_formats', conn) if f['name'] == '30x30 mm'), None
+        )
     
     return render_template(
         'ersatzteil_liste.html',
@@ -499,11 +506,11 @@ def ersatzteil_neu():
     
     # GET: Formular anzeigen
     with get_db_connection() as conn:
-        kategorien = conn.execute('SELECT ID, Bezeichnung FROM ErsatzteilKategorie WHERE Aktiv = 1 ORDER BY Sortierung, Bezeichnung').fetchall()
-        lieferanten = conn.execute('SELECT ID, Name FROM Lieferant WHERE Aktiv = 1 AND Gelöscht = 0 ORDER BY Name').fetchall()
-        abteilungen = conn.execute('SELECT ID, Bezeichnung FROM Abteilung WHERE Aktiv = 1 ORDER BY Bezeichnung').fetchall()
-        lagerorte = conn.execute('SELECT ID, Bezeichnung FROM Lagerort WHERE Aktiv = 1 ORDER BY Sortierung, Bezeichnung').fetchall()
-        lagerplaetze = conn.execute('SELECT ID, Bezeichnung FROM Lagerplatz WHERE Aktiv = 1 ORDER BY Sortierung, Bezeichnung').fetchall()
+        kategorien = get_stammdaten('ersatzteil_kategorien', conn, nur_aktiv=True)
+        lieferanten = get_stammdaten('lieferanten', conn, nur_aktiv=True)
+        abteilungen = get_stammdaten('abteilungen_liste', conn, nur_aktiv=True)
+        lagerorte = get_stammdaten('lagerorte', conn, nur_aktiv=True)
+        lagerplaetze = get_stammdaten('lagerplaetze', conn, nur_aktiv=True)
     
     return render_template(
         'ersatzteil_neu.html',
@@ -754,7 +761,11 @@ def ersatzteil_bearbeiten(ersatzteil_id):
                                 if success_upload and not error_message:
                                     # Datenbank aktualisieren
                                     relative_path = f'Ersatzteile/{ersatzteil_id}/{saved_filename}'
-                                    conn.execute('UPDATE Ersatzteil SET ArtikelfotoPfad = ? WHERE ID = ?', (relative_path, ersatzteil_id))
+                                    conn.execute(
+                                        'UPDATE Ersatzteil SET ArtikelfotoPfad = ?, ArtikelfotoVersion = ? WHERE ID = ?',
+                                        (relative_path, neue_datei_version(), ersatzteil_id),
+                                    )
+                                    derivate_im_hintergrund_erzeugen(os.path.join(upload_folder, saved_filename))
                                     loesche_import_kopie_nach_upload(
                                         original_filename,
                                         current_app.config['IMPORT_FOLDER'],
@@ -813,11 +824,11 @@ def ersatzteil_bearbeiten(ersatzteil_id):
             flash('Ersatzteil nicht gefunden.', 'danger')
             return redirect(url_for('ersatzteile.ersatzteil_liste'))
         
-        kategorien = conn.execute('SELECT ID, Bezeichnung FROM ErsatzteilKategorie WHERE Aktiv = 1 ORDER BY Sortierung, Bezeichnung').fetchall()
-        lieferanten = conn.execute('SELECT ID, Name FROM Lieferant WHERE Aktiv = 1 AND Gelöscht = 0 ORDER BY Name').fetchall()
-        abteilungen = conn.execute('SELECT ID, Bezeichnung FROM Abteilung WHERE Aktiv = 1 ORDER BY Bezeichnung').fetchall()
-        lagerorte = conn.execute('SELECT ID, Bezeichnung FROM Lagerort WHERE Aktiv = 1 ORDER BY Sortierung, Bezeichnung').fetchall()
-        lagerplaetze = conn.execute('SELECT ID, Bezeichnung FROM Lagerplatz WHERE Aktiv = 1 ORDER BY Sortierung, Bezeichnung').fetchall()
+        kategorien = get_stammdaten('ersatzteil_kategorien', conn, nur_aktiv=True)
+        lieferanten = get_stammdaten('lieferanten', conn, nur_aktiv=True)
+        abteilungen = get_stammdaten('abteilungen_liste', conn, nur_aktiv=True)
+        lagerorte = get_stammdaten('lagerorte', conn, nur_aktiv=True)
+        lagerplaetze = get_stammdaten('lagerplaetze', conn, nur_aktiv=True)
         zugriffe = conn.execute('SELECT AbteilungID FROM ErsatzteilAbteilungZugriff WHERE ErsatzteilID = ?', (ersatzteil_id,)).fetchall()
         zugriff_ids = [z['AbteilungID'] for z in zugriffe]
     
@@ -935,6 +946,7 @@ def ersatzteil_datei_upload(ersatzteil_id):
                     if not success_upload or error_message:
                         fehler.append(f'{original_filename}: {error_message}')
                         continue
+                    derivate_im_hintergrund_erzeugen(os.path.join(upload_folder, filename))
                     
                     # Datenbankeintrag in Datei-Tabelle - Pfad mit Forward-Slashes für URLs
                     relative_path = f'Ersatzteile/{ersatzteil_id}/{subfolder}/{filename}'
@@ -1077,8 +1089,12 @@ def ersatzteil_artikelfoto_upload(ersatzteil_id):
             
             # Datenbank aktualisieren
             relative_path = f'Ersatzteile/{ersatzteil_id}/{saved_filename}'
-            conn.execute('UPDATE Ersatzteil SET ArtikelfotoPfad = ? WHERE ID = ?', (relative_path, ersatzteil_id))
+            conn.execute(
+                'UPDATE Ersatzteil SET ArtikelfotoPfad = ?, ArtikelfotoVersion = ? WHERE ID = ?',
+                (relative_path, neue_datei_version(), ersatzteil_id),
+            )
             conn.commit()
+            derivate_im_hintergrund_erzeugen(os.path.join(upload_folder, saved_filename))
             
             loesche_import_kopie_nach_upload(
                 original_filename,
@@ -1259,8 +1275,12 @@ def ersatzteil_artikelfoto_upload_von_url(ersatzteil_id):
                 return _detail_redirect()
 
             relative_path = f'Ersatzteile/{ersatzteil_id}/{saved_filename}'
-            conn.execute('UPDATE Ersatzteil SET ArtikelfotoPfad = ? WHERE ID = ?', (relative_path, ersatzteil_id))
+            conn.execute(
+                'UPDATE Ersatzteil SET ArtikelfotoPfad = ?, ArtikelfotoVersion = ? WHERE ID = ?',
+                (relative_path, neue_datei_version(), ersatzteil_id),
+            )
             conn.commit()
+            derivate_im_hintergrund_erzeugen(os.path.join(upload_folder, saved_filename))
 
             loesche_import_kopie_nach_upload(
                 filename,
@@ -1396,8 +1416,8 @@ def ersatzteil_artikelfoto_kopieren_von_artikel(ersatzteil_id):
 
             relative_path = f'Ersatzteile/{ersatzteil_id}/{ziel_name}'
             conn.execute(
-                'UPDATE Ersatzteil SET ArtikelfotoPfad = ? WHERE ID = ?',
-                (relative_path, ersatzteil_id),
+                'UPDATE Ersatzteil SET ArtikelfotoPfad = ?, ArtikelfotoVersion = ? WHERE ID = ?',
+                (relative_path, neue_datei_version(), ersatzteil_id),
             )
             conn.commit()
             flash('Artikelfoto vom anderen Artikel übernommen.', 'success')
@@ -1466,7 +1486,7 @@ def ersatzteil_artikelfoto_loeschen(ersatzteil_id):
                     return redirect(detail_url)
             
             # Datenbank aktualisieren
-            conn.execute('UPDATE Ersatzteil SET ArtikelfotoPfad = NULL WHERE ID = ?', (ersatzteil_id,))
+            conn.execute('UPDATE Ersatzteil SET ArtikelfotoPfad = NULL, ArtikelfotoVersion = NULL WHERE ID = ?', (ersatzteil_id,))
             conn.commit()
             
             flash('Artikelfoto erfolgreich gelöscht.', 'success')
@@ -1614,6 +1634,10 @@ def datei_anzeigen(filepath):
     if not os.path.isfile(full_path):
         flash('Datei nicht gefunden.', 'danger')
         return redirect(url_for('ersatzteile.ersatzteil_liste'))
+
+    nicht_geaendert = nicht_geaendert_antwort(filepath)
+    if nicht_geaendert is not None:
+        return nicht_geaendert
     
     # Ersatzteil-ID aus Pfad extrahieren
     parts = filepath.split('/')
@@ -1628,10 +1652,11 @@ def datei_anzeigen(filepath):
         except:
             pass
     
-    return send_from_directory(
-        os.path.dirname(full_path),
-        os.path.basename(full_path)
-    )
+    derivat = bild_derivat_antwort(full_path, request.args.get('groesse'))
+    if derivat is not None:
+        return derivat
+
+    return sende_anhang(full_path, filepath)
 
 
 @ersatzteile_bp.route('/api/ersatzteil/<int:ersatzteil_id>')
@@ -13,15 +13,19 @@ from utils import (
     menue_zugriff_erforderlich,
 )
 from utils.helpers import build_ersatzteil_zugriff_filter
+from utils.stammdaten_cache import get_stammdaten
 from utils.zebra_client import dispatch_print
 from utils.etikett_druck import (
-    FUNKTION_ERSATZTEIL_ETIKETT,
     FUNKTION_LAGERBEHAELTER_ETIKETT,
     build_print_resolution,
-    etikett_format_substitution,
+    zpl_vorlage,
+)
+from ..services import (
+    ETIKETT_BATCH_MAX_POSITIONEN,
+    create_lagerbuchung,
+    create_inventur_buchung,
+    drucke_ersatzteil_etiketten_batch,
 )
-from ..services import create_lagerbuchung, create_inventur_buchung
-from ..services.ersatzteil_services import zpl_ersatzteil_aus_zeile
 from ..utils import hat_ersatzteil_zugriff, validate_thema_ersatzteil_buchung, prepare_thema_ersatzteil_data
 from modules.schichtbuch.services import get_thema_info_fuer_lagerbuchung
 
@@ -153,7 +157,7 @@ def lagerbuchungen_liste():
         ersatzteile_query += ' ORDER BY e.Bestellnummer'
         ersatzteile = conn.execute(ersatzteile_query, ersatzteile_params).fetchall()
         
-        kostenstellen = conn.execute('SELECT ID, Bezeichnung FROM Kostenstelle WHERE Aktiv = 1 ORDER BY Sortierung, Bezeichnung').fetchall()
+        kostenstellen = get_stammdaten('kostenstellen', conn, nur_aktiv=True)
     
     return render_template(
         'lagerbuchungen_liste.html',
@@ -901,12 +905,7 @@ def lageretiketten_druck():
                 })
 
             etikett = res['etikett']
-            zpl_template = etikett['druckbefehle']
-            zpl = zpl_template.format(
-                allgemein_titel=titel,
-                allgemein_info=info,
-                **etikett_format_substitution(etikett['zpl_header']),
-            )
+            zpl = zpl_vorlage(etikett).render({'allgemein_titel': titel, 'allgemein_info': info})
             d = dispatch_print(conn, res['drucker_id'], zpl, mitarbeiter_id)
             if not d['ok']:
                 return jsonify({
@@ -966,71 +965,44 @@ def lageretiketten_druck_artikel():
         except (TypeError, ValueError):
             printer_id = None
 
+    if len(ids) > ETIKETT_BATCH_MAX_POSITIONEN:
+        return jsonify({
+            'success': False,
+            'message': f'Höchstens {ETIKETT_BATCH_MAX_POSITIONEN} Artikel-IDs je Druck.',
+        }), 400
+
     try:
         with get_db_connection() as conn:
-            res = build_print_resolution(
-                conn, FUNKTION_ERSATZTEIL_ETIKETT, mitarbeiter_id, printer_id
+            # Ein Druckauftrag für alle Artikel (Konfiguration/Vorlage einmal aufgelöst)
+            ergebnis = drucke_ersatzteil_etiketten_batch(
+                [(ersatzteil_id, 1) for ersatzteil_id in ids],
+                conn,
+                mitarbeiter_id,
+                drucker_id_override=printer_id,
+                zugriff_pruefen=lambda ersatzteil_id: hat_ersatzteil_zugriff(mitarbeiter_id, ersatzteil_id, conn),
+                wait_seconds=0,
             )
-            if not res['ok']:
-                return jsonify({'success': False, 'message': res['error_message']}), 400
-            if res['needs_printer_choice']:
-                return jsonify({
-                    'success': True,
-                    'needs_printer_choice': True,
-                    'printers': res['printers'],
-                    'message': 'Drucker wählen.',
-                })
-
-            etikett = res['etikett']
-            drucker_id = res['drucker_id']
-
-            erfolgreich = 0
-            fehlgeschlagen = 0
-            in_warteschlange = 0
-            fehler_meldungen = []
-
-            for ersatzteil_id in ids:
-                # Berechtigung prüfen
-                if not hat_ersatzteil_zugriff(mitarbeiter_id, ersatzteil_id, conn):
-                    fehlgeschlagen += 1
-                    fehler_meldungen.append(f'ID {ersatzteil_id}: Keine Berechtigung')
-                    continue
-
-                # Ersatzteil-Daten laden (für Inhalt)
-                et = conn.execute('''
-                    SELECT e.ID, e.Bezeichnung, e.Bestellnummer, lo.Bezeichnung AS LagerortName, lp.Bezeichnung AS LagerplatzName
-                    FROM Ersatzteil e
-                    LEFT JOIN Lagerort lo ON e.LagerortID = lo.ID
-                    LEFT JOIN Lagerplatz lp ON e.LagerplatzID = lp.ID
-                    WHERE e.ID = ? AND e.Gelöscht = 0
-                ''', (ersatzteil_id,)).fetchone()
-
-                if not et:
-                    fehlgeschlagen += 1
-                    fehler_meldungen.append(f'ID {ersatzteil_id}: Ersatzteil nicht gefunden')
-                    continue
-
-                zpl = zpl_ersatzteil_aus_zeile(et, etikett, 1)
+        if ergebnis['needs_printer_choice']:
+            return jsonify({
+                'success': True,
+                'needs_printer_choice': True,
+                'printers': ergebnis['printers'],
+                'message': 'Drucker wählen.',
+            })
+        if not ergebnis['ok'] and not ergebnis['gedruckt'] and not ergebnis['fehler']:
+            return jsonify({'success': False, 'message': ergebnis['message']}), 400
 
-                # Bei Batch-Drucken nicht synchron warten, sonst dauert es zu lange.
-                d = dispatch_print(conn, drucker_id, zpl, mitarbeiter_id, wait_seconds=0)
-                if d['ok']:
-                    if d['mode'] == 'agent' and d['status'] != 'done':
-                        in_warteschlange += 1
-                    else:
-                        erfolgreich += 1
-                else:
-                    fehlgeschlagen += 1
-                    fehler_meldungen.append(
-                        f'ID {ersatzteil_id}: {d.get("error_message") or "Druck fehlgeschlagen"}'
-                    )
+        erfolgreich = ergebnis['gedruckt'] if not ergebnis['in_warteschlange'] else 0
+        in_warteschlange = ergebnis['gedruckt'] if ergebnis['in_warteschlange'] else 0
+        fehler_meldungen = [f'ID {ersatzteil_id}: {meldung}' for ersatzteil_id, meldung in ergebnis['fehler']]
+        fehlgeschlagen = len(fehler_meldungen)
 
         # Zusammenfassung zurückgeben
         teile = []
         if erfolgreich:
             teile.append(f'{erfolgreich} gedruckt')
         if in_warteschlange:
-            teile.append(f'{in_warteschlange} an Druckwarteschlange uebergeben')
+            teile.append(f'{in_warteschlange} an Druckwarteschlange uebergeben (Auftrag #{ergebnis["job_id"]})')
         if fehlgeschlagen:
             teile.append(f'{fehlgeschlagen} fehlgeschlagen')
         message = ', '.join(teile) + '.' if teile else 'Keine Etiketten gedruckt.'
@@ -2,7 +2,7 @@
 Wareneingang Routes - Wareneingang-Verwaltung
 """
 
-from flask import render_template, request, redirect, url_for, session, flash, send_from_directory, current_app
+from flask import render_template, request, redirect, url_for, session, flash, current_app
 from datetime import datetime
 import os
 from werkzeug.utils import secure_filename
@@ -21,8 +21,11 @@ from utils.file_handling import (
     create_upload_folder,
     originale_loeschen_aus_formular,
     loesche_import_kopie_nach_upload,
+    get_ordner_dateien,
 )
-from ..services import get_dateien_fuer_bereich, speichere_datei, get_datei_typ_aus_dateiname, drucke_ersatzteil_etikett_intern
+from utils.bild_derivate import bild_derivat_antwort
+from utils.datei_auslieferung import nicht_geaendert_antwort, sende_anhang
+from ..services import get_dateien_fuer_bereich, speichere_datei, get_datei_typ_aus_dateiname, drucke_ersatzteil_etiketten_batch
 
 
 def get_lieferschein_dateien(bestellung_id):
@@ -30,35 +33,31 @@ def get_lieferschein_dateien(bestellung_id):
     lieferschein_folder = os.path.join(current_app.config['UPLOAD_BASE_FOLDER'], 'Bestellwesen', 'Lieferscheine', str(bestellung_id))
     dateien = []
     
-    if os.path.exists(lieferschein_folder):
-        try:
-            for filename in os.listdir(lieferschein_folder):
-                file_ext = filename.lower()
-                if file_ext.endswith(('.pdf', '.jpeg', '.jpg', '.png')):
-                    filepath = os.path.join(lieferschein_folder, filename)
-                    if os.path.isfile(filepath):
-                        stat = os.stat(filepath)
-                        # Pfad immer mit Forward-Slash für URL-Kompatibilität
-                        path_for_url = f'Bestellwesen/Lieferscheine/{bestellung_id}/{filename}'
-                        # Dateityp bestimmen
-                        if file_ext.endswith('.pdf'):
-                            file_type = 'pdf'
-                        elif file_ext.endswith(('.jpeg', '.jpg', '.png')):
-                            file_type = 'image'
-                        else:
-                            file_type = 'unknown'
-                        
-                        dateien.append({
-                            'name': filename,
-                            'path': path_for_url,
-                            'size': stat.st_size,
-                            'type': file_type,
-                            'modified': datetime.fromtimestamp(stat.st_mtime)
-                        })
-            # Sortiere nach Änderungsdatum (neueste zuerst)
-            dateien.sort(key=lambda x: x['modified'], reverse=True)
-        except Exception as e:
-            print(f"Fehler beim Scannen des Lieferschein-Ordners: {e}")
+    try:
+        for datei in get_ordner_dateien(lieferschein_folder):
+            file_ext = datei.name.lower()
+            if file_ext.endswith(('.pdf', '.jpeg', '.jpg', '.png')):
+                # Pfad immer mit Forward-Slash für URL-Kompatibilität
+                path_for_url = f'Bestellwesen/Lieferscheine/{bestellung_id}/{datei.name}'
+                # Dateityp bestimmen
+                if file_ext.endswith('.pdf'):
+                    file_type = 'pdf'
+                elif file_ext.endswith(('.jpeg', '.jpg', '.png')):
+                    file_type = 'image'
+                else:
+                    file_type = 'unknown'
+                
+                dateien.append({
+                    'name': datei.name,
+                    'path': path_for_url,
+                    'size': datei.size,
+                    'type': file_type,
+                    'modified': datetime.fromtimestamp(datei.mtime)
+                })
+        # Sortiere nach Änderungsdatum (neueste zuerst)
+        dateien.sort(key=lambda x: x['modified'], reverse=True)
+    except Exception as e:
+        print(f"Fehler beim Scannen des Lieferschein-Ordners: {e}")
     
     return dateien
 
@@ -259,17 +258,17 @@ def wareneingang_bestellung(bestellung_id):
                 # Etiketten drucken, wenn Checkbox aktiviert
                 etikett_druck_fehlgeschlagen = []
                 if etikett_drucken and gebuchte_ersatzteile:
-                    for item in gebuchte_ersatzteile:
-                        ret = drucke_ersatzteil_etikett_intern(
-                            item['ersatzteil_id'],
-                            item['menge'],
-                            conn,
-                            mitarbeiter_id=mitarbeiter_id,
-                            erlaube_druckerwahl_modal=False,
-                        )
-                        erfolg = ret[0]
-                        if not erfolg:
-                            etikett_druck_fehlgeschlagen.append(item['ersatzteil_id'])
+                    # Ein Druckauftrag für alle Positionen statt eines Auftrags je Artikel
+                    ergebnis = drucke_ersatzteil_etiketten_batch(
+                        [(item['ersatzteil_id'], item['menge']) for item in gebuchte_ersatzteile],
+                        conn,
+                        mitarbeiter_id=mitarbeiter_id,
+                        erlaube_druckerwahl_modal=False,
+                    )
+                    if ergebnis['ok']:
+                        etikett_druck_fehlgeschlagen = [i for i, _meldung in ergebnis['fehler']]
+                    else:
+                        etikett_druck_fehlgeschlagen = [item['ersatzteil_id'] for item in gebuchte_ersatzteile]
                 
                 # Erfolgsmeldung
                 if etikett_drucken and gebuchte_ersatzteile:
@@ -422,6 +421,10 @@ def lieferschein_anzeigen(filepath):
     if not filepath.startswith('Bestellwesen/Lieferscheine/'):
         flash('Ungültiger Dateipfad.', 'danger')
         return redirect(url_for('ersatzteile.wareneingang'))
+
+    nicht_geaendert = nicht_geaendert_antwort(filepath)
+    if nicht_geaendert is not None:
+        return nicht_geaendert
     
     try:
         from utils.security import resolve_under_base, PathTraversalError
@@ -445,13 +448,12 @@ def lieferschein_anzeigen(filepath):
             mimetype = 'image/png'
         else:
             mimetype = 'application/octet-stream'
-        
-        return send_from_directory(
-            os.path.dirname(full_path),
-            os.path.basename(full_path),
-            mimetype=mimetype,
-            as_attachment=False  # Im Browser anzeigen
-        )
+
+        derivat = bild_derivat_antwort(full_path, request.args.get('groesse'))
+        if derivat is not None:
+            return derivat
+
+        return sende_anhang(full_path, filepath, mimetype=mimetype)
     except Exception as e:
         flash(f'Fehler beim Laden der Datei: {str(e)}', 'danger')
         print(f"Lieferschein anzeigen Fehler: {e}")
@@ -7,7 +7,9 @@ from .ersatzteil_services import (
     build_ersatzteil_liste_query,
     get_ersatzteil_liste_filter_options,
     get_ersatzteil_detail_data,
-    drucke_ersatzteil_etikett_intern
+    drucke_ersatzteil_etikett_intern,
+    drucke_ersatzteil_etiketten_batch,
+    ETIKETT_BATCH_MAX_POSITIONEN,
 )
 from .lagerbuchung_services import (
     validate_lagerbuchung,
@@ -15,6 +17,12 @@ from .lagerbuchung_services import (
     create_inventur_buchung,
     rueckbuche_lager_fuer_geloeschtes_thema,
 )
+from .bestellung_services import (
+    BESTELLUNG_SEITENGROESSE,
+    build_bestellung_liste_query,
+    cursor_parsen,
+    get_bestellung_liste_seite,
+)
 from .datei_services import (
     get_dateien_fuer_bereich,
     speichere_datei,
@@ -28,10 +36,16 @@ __all__ = [
     'get_ersatzteil_liste_filter_options',
     'get_ersatzteil_detail_data',
     'drucke_ersatzteil_etikett_intern',
+    'drucke_ersatzteil_etiketten_batch',
+    'ETIKETT_BATCH_MAX_POSITIONEN',
     'validate_lagerbuchung',
     'create_lagerbuchung',
     'create_inventur_buchung',
     'rueckbuche_lager_fuer_geloeschtes_thema',
+    'BESTELLUNG_SEITENGROESSE',
+    'build_bestellung_liste_query',
+    'cursor_parsen',
+    'get_bestellung_liste_seite',
     'get_dateien_fuer_bereich',
     'speichere_datei',
     'loesche_datei',
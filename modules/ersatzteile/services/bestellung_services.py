@@ -0,0 +1,211 @@
+"""
+Bestellung Services - Bestellliste mit Keyset-Pagination
+
+Die Liste wird seitenweise (neueste zuerst, ``ErstelltAm DESC, ID DESC``) geladen. Eine Seite
+wird zuerst als CTE über die gefilterten IDs bestimmt; Summen, Positionsanzahl und das
+Kennzeichen „Lieferdatum überschritten“ berechnet die Datenbank nur für diese Zeilen. Die
+nächste Seite setzt an ``(ErstelltAm, ID)`` der letzten Zeile an (Cursor ``nach``), sodass
+die Abfragezeit nicht mit der Bestellhistorie wächst.
+"""
+
+from datetime import date, timedelta
+
+BESTELLUNG_SEITENGROESSE = 50
+# Lieferdatum gilt als kritisch, wenn es länger als so viele Tage zurückliegt
+LIEFERDATUM_KRITISCH_NACH_TAGEN = 14
+
+
+def cursor_aus_zeile(row):
+    """Cursor-String ``<ErstelltAm>|<ID>`` für die Zeile, an der die nächste Seite ansetzt."""
+    return f"{row['ErstelltAm']}|{row['ID']}"
+
+
+def cursor_parsen(wert):
+    """``<ErstelltAm>|<ID>`` -> (ErstelltAm, ID) oder None bei fehlendem/ungültigem Cursor."""
+    if not wert or '|' not in wert:
+        return None
+    erstellt_am, _, bestellung_id = wert.rpartition('|')
+    try:
+        return erstellt_am, int(bestellung_id)
+    except ValueError:
+        return None
+
+
+def build_bestellung_liste_query(
+    sichtbare_abteilungen,
+    is_admin,
+    status_filter_list=None,
+    lieferant_filter=None,
+    abteilung_filter=None,
+    prioritaet_filter_list=None,
+    nach=None,
+    limit=BESTELLUNG_SEITENGROESSE,
+):
+    """
+    Baut die SQL-Query für eine Seite der Bestellliste auf
+
+    Args:
+        sichtbare_abteilungen: Liste von sichtbaren Abteilungs-IDs
+        is_admin: Ob der Mitarbeiter Admin ist (sieht alle Bestellungen)
+        status_filter_list: Status-Filter (inkl. Pseudo-Status 'Gelöscht')
+        lieferant_filter: Optionaler Lieferanten-Filter
+        abteilung_filter: Optionaler Filter auf die Abteilung des Erstellers
+        prioritaet_filter_list: Optionale Prioritäten (1-5)
+        nach: Cursor (ErstelltAm, ID) der letzten bereits geladenen Zeile
+        limit: Maximale Anzahl Zeilen
+
+    Returns:
+        Tuple (query, params)
+    """
+    status_filter_list = status_filter_list or []
+    where = []
+    params = []
+
+    filter_geloescht = 'Gelöscht' in status_filter_list
+    status_ohne_geloescht = [s for s in status_filter_list if s != 'Gelöscht']
+
+    if filter_geloescht and not status_ohne_geloescht:
+        where.append('b.Gelöscht = 1')
+    elif filter_geloescht and status_ohne_geloescht:
+        placeholders = ','.join(['?'] * len(status_ohne_geloescht))
+        where.append(f'(b.Gelöscht = 1 OR (b.Gelöscht = 0 AND b.Status IN ({placeholders})))')
+        params.extend(status_ohne_geloescht)
+    else:
+        where.append('b.Gelöscht = 0')
+        if status_ohne_geloescht:
+            placeholders = ','.join(['?'] * len(status_ohne_geloescht))
+            where.append(f'b.Status IN ({placeholders})')
+            params.extend(status_ohne_geloescht)
+        else:
+            where.append("b.Status NOT IN ('Erledigt', 'Storniert')")
+
+    # Sichtbarkeitsfilter: Nur Bestellungen mit Sichtbarkeit für sichtbare Abteilungen
+    if not is_admin and sichtbare_abteilungen:
+        placeholders = ','.join(['?'] * len(sichtbare_abteilungen))
+        where.append(f'''EXISTS (
+                SELECT 1 FROM BestellungSichtbarkeit bs
+                WHERE bs.BestellungID = b.ID
+                AND bs.AbteilungID IN ({placeholders})
+            )''')
+        params.extend(sichtbare_abteilungen)
+    elif not is_admin:
+        # Keine Berechtigung - keine Bestellungen anzeigen
+        where.append('1=0')
+
+    if lieferant_filter:
+        where.append('b.LieferantID = ?')
+        params.append(lieferant_filter)
+
+    if abteilung_filter:
+        where.append('b.ErstellerAbteilungID = ?')
+        params.append(abteilung_filter)
+
+    if prioritaet_filter_list:
+        prioritaet_values = [int(p) for p in prioritaet_filter_list if str(p).isdigit() and 1 <= int(p) <= 5]
+        if prioritaet_values:
+            placeholders = ','.join(['?'] * len(prioritaet_values))
+            where.append(f'COALESCE(b.Prioritaet, 3) IN ({placeholders})')
+            params.extend(prioritaet_values)
+
+    if nach:
+        where.append('(b.ErstelltAm < ? OR (b.ErstelltAm = ? AND b.ID < ?))')
+        params.extend([nach[0], nach[0], nach[1]])
+
+    params.append(int(limit))
+    kritisch_vor = (date.today() - timedelta(days=LIEFERDATUM_KRITISCH_NACH_TAGEN)).isoformat()
+    params.append(kritisch_vor)
+
+    query = f'''
+        WITH seite AS (
+            SELECT b.ID
+            FROM Bestellung b
+            WHERE {' AND '.join(where)}
+            ORDER BY b.ErstelltAm DESC, b.ID DESC
+            LIMIT ?
+        ),
+        summen AS (
+            SELECT
+                bp.BestellungID,
+                COALESCE(SUM(bp.Menge * COALESCE(bp.Preis, 0)), 0) AS Gesamtbetrag,
+                COUNT(bp.ID) AS PositionenAnzahl
+            FROM BestellungPosition bp
+            WHERE bp.BestellungID IN (SELECT ID FROM seite)
+            GROUP BY bp.BestellungID
+        )
+        SELECT
+            b.ID,
+            b.Status,
+            b.Gelöscht,
+            b.ErstelltAm,
+            b.FreigegebenAm,
+            b.BestelltAm,
+            b.FreigabeBemerkung,
+            b.Lieferdatum,
+            COALESCE(b.Prioritaet, 3) AS Prioritaet,
+            l.Name AS LieferantName,
+            m1.Vorname || ' ' || m1.Nachname AS ErstelltVon,
+            m2.Vorname || ' ' || m2.Nachname AS FreigegebenVon,
+            m3.Vorname || ' ' || m3.Nachname AS BestelltVon,
+            abt.Bezeichnung AS Abteilung,
+            COALESCE(s.Gesamtbetrag, 0) AS Gesamtbetrag,
+            COALESCE(s.PositionenAnzahl, 0) AS PositionenAnzahl,
+            CASE WHEN b.Lieferdatum IS NOT NULL AND b.Lieferdatum != ''
+                      AND SUBSTR(b.Lieferdatum, 1, 10) < ? THEN 1 ELSE 0 END AS LieferdatumKritisch
+        FROM seite
+        JOIN Bestellung b ON b.ID = seite.ID
+        LEFT JOIN summen s ON s.BestellungID = b.ID
+        LEFT JOIN Lieferant l ON b.LieferantID = l.ID
+        LEFT JOIN Mitarbeiter m1 ON b.ErstelltVonID = m1.ID
+        LEFT JOIN Mitarbeiter m2 ON b.FreigegebenVonID = m2.ID
+        LEFT JOIN Mitarbeiter m3 ON b.BestelltVonID = m3.ID
+        LEFT JOIN Abteilung abt ON b.ErstellerAbteilungID = abt.ID
+        ORDER BY b.ErstelltAm DESC, b.ID DESC
+    '''
+    return query, params
+
+
+def get_bestellung_liste_seite(conn, sichtbare_abteilungen, is_admin, limit=BESTELLUNG_SEITENGROESSE, **filter_args):
+    """
+    Lädt eine Seite der Bestellliste samt Positionen dieser Seite
+
+    Args:
+        conn: Datenbankverbindung
+        sichtbare_abteilungen: Liste von sichtbaren Abteilungs-IDs
+        is_admin: Ob der Mitarbeiter Admin ist
+        limit: Seitengröße
+        **filter_args: Filter und Cursor wie bei build_bestellung_liste_query
+
+    Returns:
+        Tuple (bestellungen, positionen_dict, naechster_cursor); der Cursor ist None,
+        wenn keine weiteren Bestellungen folgen.
+    """
+    # Eine Zeile mehr laden, um zu erkennen, ob eine weitere Seite existiert
+    query, params = build_bestellung_liste_query(
+        sichtbare_abteilungen, is_admin, limit=limit + 1, **filter_args
+    )
+    rows = conn.execute(query, params).fetchall()
+    weitere = len(rows) > limit
+    bestellungen = [dict(r) for r in rows[:limit]]
+
+    positionen_dict = {}
+    if bestellungen:
+        bestellung_ids = [b['ID'] for b in bestellungen]
+        placeholders = ','.join(['?'] * len(bestellung_ids))
+        positionen = conn.execute(f'''
+            SELECT
+                p.BestellungID,
+                p.*,
+                e.ID AS ErsatzteilID,
+                COALESCE(p.Bestellnummer, e.Bestellnummer) AS Bestellnummer,
+                COALESCE(p.Bezeichnung, e.Bezeichnung) AS Bezeichnung,
+                COALESCE(p.Einheit, e.Einheit, 'Stück') AS Einheit
+            FROM BestellungPosition p
+            LEFT JOIN Ersatzteil e ON p.ErsatzteilID = e.ID
+            WHERE p.BestellungID IN ({placeholders})
+            ORDER BY p.BestellungID, p.ID
+        ''', bestellung_ids).fetchall()
+        for pos in positionen:
+            positionen_dict.setdefault(pos['BestellungID'], []).append(pos)
+
+    naechster_cursor = cursor_aus_zeile(bestellungen[-1]) if weitere else None
+    return bestellungen, positionen_dict, naechster_cursor
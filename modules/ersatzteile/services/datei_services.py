@@ -5,6 +5,7 @@ Datei-Services - Einheitliche Dateiverwaltung für alle Bereiche
 from datetime import datetime
 import os
 
+from utils.datei_auslieferung import inhaltshash_fuer_upload
 from utils.db_sql import local_now_str
 
 
@@ -58,10 +59,13 @@ def speichere_datei(bereich_typ, bereich_id, dateiname, dateipfad, beschreibung,
     Returns:
         ID der erstellten Datei
     """
+    # Inhaltshash = Grundlage des Download-ETags (fehlt er, wird er beim ersten Abruf nachgetragen)
+    inhaltshash = inhaltshash_fuer_upload(dateipfad)
     cursor = conn.execute('''
-        INSERT INTO Datei (BereichTyp, BereichID, Dateiname, Dateipfad, Beschreibung, Typ, ErstelltVonID, ErstelltAm)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (bereich_typ, bereich_id, dateiname, dateipfad, beschreibung or '', typ or None, mitarbeiter_id, local_now_str()))
+        INSERT INTO Datei (BereichTyp, BereichID, Dateiname, Dateipfad, Beschreibung, Typ, ErstelltVonID, ErstelltAm, Inhaltshash)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (bereich_typ, bereich_id, dateiname, dateipfad, beschreibung or '', typ or None, mitarbeiter_id, local_now_str(),
+          inhaltshash))
 
     return cursor.lastrowid
 
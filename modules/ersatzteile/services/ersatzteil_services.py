@@ -3,11 +3,11 @@ Ersatzteil Services
 Business-Logik für Ersatzteil-Funktionen
 """
 
-import re
 from utils import get_sichtbare_abteilungen_fuer_mitarbeiter
 from utils.helpers import build_ersatzteil_zugriff_filter
+from utils.stammdaten_cache import get_stammdaten
 from utils.zebra_client import dispatch_print
-from utils.etikett_druck import FUNKTION_ERSATZTEIL_ETIKETT, build_print_resolution, etikett_format_substitution
+from utils.etikett_druck import FUNKTION_ERSATZTEIL_ETIKETT, build_print_resolution, zpl_vorlage
 
 
 def build_ersatzteil_liste_query(
@@ -72,6 +72,7 @@ def build_ersatzteil_liste_query(
             e.Preis,
             e.Waehrung,
             e.ArtikelfotoPfad,
+            e.ArtikelfotoVersion,
             k.Bezeichnung AS Kategorie,
             l.Name AS Lieferant,
             lo.Bezeichnung AS LagerortName,
@@ -178,10 +179,10 @@ def get_ersatzteil_liste_filter_options(conn):
         - lagerplaetze: Liste von Lagerplätzen
         - kennzeichen_liste: Liste von Kennzeichen
     """
-    kategorien = conn.execute('SELECT ID, Bezeichnung FROM ErsatzteilKategorie WHERE Aktiv = 1 ORDER BY Sortierung, Bezeichnung').fetchall()
-    lieferanten = conn.execute('SELECT ID, Name FROM Lieferant WHERE Aktiv = 1 AND Gelöscht = 0 ORDER BY Name').fetchall()
-    lagerorte = conn.execute('SELECT ID, Bezeichnung FROM Lagerort WHERE Aktiv = 1 ORDER BY Sortierung, Bezeichnung').fetchall()
-    lagerplaetze = conn.execute('SELECT ID, Bezeichnung FROM Lagerplatz WHERE Aktiv = 1 ORDER BY Sortierung, Bezeichnung').fetchall()
+    kategorien = get_stammdaten('ersatzteil_kategorien', conn, nur_aktiv=True)
+    lieferanten = get_stammdaten('lieferanten', conn, nur_aktiv=True)
+    lagerorte = get_stammdaten('lagerorte', conn, nur_aktiv=True)
+    lagerplaetze = get_stammdaten('lagerplaetze', conn, nur_aktiv=True)
     # Eindeutige Kennzeichen-Werte laden (nur nicht-leere Werte)
     kennzeichen_liste = conn.execute('SELECT DISTINCT Kennzeichen FROM Ersatzteil WHERE Kennzeichen IS NOT NULL AND Kennzeichen != "" AND Gelöscht = 0 ORDER BY Kennzeichen').fetchall()
     
@@ -337,7 +338,7 @@ def get_ersatzteil_detail_data(ersatzteil_id, mitarbeiter_id, conn, upload_folde
     ''', (ersatzteil_id,)).fetchall()
     
     # Kostenstellen für Dropdown
-    kostenstellen = conn.execute('SELECT ID, Bezeichnung FROM Kostenstelle WHERE Aktiv = 1 ORDER BY Sortierung, Bezeichnung').fetchall()
+    kostenstellen = get_stammdaten('kostenstellen', conn, nur_aktiv=True)
     
     return {
         'ersatzteil': ersatzteil,
@@ -350,8 +351,11 @@ def get_ersatzteil_detail_data(ersatzteil_id, mitarbeiter_id, conn, upload_folde
     }
 
 
-def zpl_ersatzteil_aus_zeile(et, etikett_row, anzahl):
-    """Baut ZPL für ein Ersatzteil aus einer Etikett-Zeile (Platzhalter {etikettenformat} aus Etikettenformat)."""
+def zpl_ersatzteil_aus_zeile(et, etikett_row, anzahl, vorlage=None):
+    """Baut ZPL für ein Ersatzteil aus einer Etikett-Zeile (Platzhalter {etikettenformat} aus Etikettenformat).
+
+    ``vorlage``: bereits zerlegte ZplVorlage, sonst aus dem Cache (``zpl_vorlage``).
+    """
     artnr = str(et['ID'])
     bestellnummer = et['Bestellnummer'] or ''
     bezeichnung = et['Bezeichnung'] or ''
@@ -373,19 +377,20 @@ def zpl_ersatzteil_aus_zeile(et, etikett_row, anzahl):
             break
     line1, line2, line3 = lines
 
-    zpl_template = etikett_row['druckbefehle']
-    zpl = zpl_template.format(
-        artikelnummer=artnr,
-        artikel_bestellnummer=bestellnummer,
-        artikel_beschreibung_1=line1,
-        artikel_beschreibung_2=line2,
-        artikel_beschreibung_3=line3,
-        artikel_lagerort=lagerort,
-        artikel_lagerplatz=lagerplatz,
-        **etikett_format_substitution(etikett_row['zpl_header']),
+    if vorlage is None:
+        vorlage = zpl_vorlage(etikett_row)
+    return vorlage.render(
+        {
+            'artikelnummer': artnr,
+            'artikel_bestellnummer': bestellnummer,
+            'artikel_beschreibung_1': line1,
+            'artikel_beschreibung_2': line2,
+            'artikel_beschreibung_3': line3,
+            'artikel_lagerort': lagerort,
+            'artikel_lagerplatz': lagerplatz,
+        },
+        anzahl,
     )
-    zpl = re.sub(r'\^PQ(\d+)', f'^PQ{anzahl}', zpl)
-    return zpl
 
 
 def drucke_ersatzteil_etikett_intern(
@@ -449,3 +454,117 @@ def drucke_ersatzteil_etikett_intern(
         )
     return True, f'{anzahl} Etikett{suffix} fuer Artikel {artnr} gedruckt.'
 
+
+# Obergrenze je Sammeldruck (ein Druckauftrag; Wareneingang mit vielen Positionen passt hinein)
+ETIKETT_BATCH_MAX_POSITIONEN = 500
+
+
+def drucke_ersatzteil_etiketten_batch(
+    positionen,
+    conn,
+    mitarbeiter_id=None,
+    drucker_id_override=None,
+    erlaube_druckerwahl_modal=True,
+    zugriff_pruefen=None,
+    wait_seconds=4.0,
+):
+    """
+    Druckt Etiketten für mehrere Ersatzteile als einen einzigen Druckauftrag.
+
+    Druckkonfiguration und Etikett-Vorlage werden einmal aufgelöst, alle Ersatzteile mit einer
+    Abfrage geladen und die ZPL-Blöcke (je ``^XA … ^XZ``) aneinandergehängt an den Drucker bzw.
+    die Agent-Warteschlange übergeben – statt eines ``dispatch_print`` (bis zu 4 s Wartezeit) je Artikel.
+
+    :param positionen: Liste von (ersatzteil_id, anzahl)
+    :param zugriff_pruefen: optional ``callable(ersatzteil_id) -> bool``; abgelehnte IDs landen in ``fehler``
+    :return: dict mit ``ok``, ``message``, ``gedruckt`` (Positionen), ``etiketten`` (Summe Kopien),
+        ``fehler`` (Liste (ersatzteil_id, Text)), ``in_warteschlange``, ``job_id`` sowie bei
+        Modal-Bedarf ``needs_printer_choice`` und ``printers``.
+    """
+    ergebnis = {
+        'ok': False,
+        'message': '',
+        'gedruckt': 0,
+        'etiketten': 0,
+        'fehler': [],
+        'in_warteschlange': False,
+        'job_id': None,
+        'needs_printer_choice': False,
+        'printers': [],
+    }
+    if not positionen:
+        ergebnis['message'] = 'Keine Etiketten zu drucken.'
+        return ergebnis
+
+    res = build_print_resolution(
+        conn, FUNKTION_ERSATZTEIL_ETIKETT, mitarbeiter_id, drucker_id_override
+    )
+    if not res['ok']:
+        ergebnis['message'] = res['error_message'] or 'Druck nicht möglich.'
+        return ergebnis
+    if res['needs_printer_choice']:
+        if not erlaube_druckerwahl_modal:
+            ergebnis['message'] = (
+                'Automatischer Etikettendruck: Bitte im Admin unter Etikettendrucker einen Standarddrucker hinterlegen.'
+            )
+            return ergebnis
+        ergebnis.update(needs_printer_choice=True, printers=res['printers'], message='Druckerwahl erforderlich.')
+        return ergebnis
+
+    ids = sorted({int(ersatzteil_id) for ersatzteil_id, _anzahl in positionen})
+    placeholders = ','.join(['?'] * len(ids))
+    zeilen = {
+        r['ID']: r
+        for r in conn.execute(f'''
+            SELECT e.ID, e.Bezeichnung, e.Bestellnummer, lo.Bezeichnung AS LagerortName, lp.Bezeichnung AS LagerplatzName
+            FROM Ersatzteil e
+            LEFT JOIN Lagerort lo ON e.LagerortID = lo.ID
+            LEFT JOIN Lagerplatz lp ON e.LagerplatzID = lp.ID
+            WHERE e.ID IN ({placeholders}) AND e.Gelöscht = 0
+        ''', ids).fetchall()
+    }
+
+    etikett = res['etikett']
+    vorlage = zpl_vorlage(etikett)
+    zpl_bloecke = []
+    gedruckte_ids = []
+    for ersatzteil_id, anzahl in positionen:
+        ersatzteil_id = int(ersatzteil_id)
+        if zugriff_pruefen is not None and not zugriff_pruefen(ersatzteil_id):
+            ergebnis['fehler'].append((ersatzteil_id, 'Keine Berechtigung'))
+            continue
+        et = zeilen.get(ersatzteil_id)
+        if not et:
+            ergebnis['fehler'].append((ersatzteil_id, 'Ersatzteil nicht gefunden'))
+            continue
+        zpl_bloecke.append(zpl_ersatzteil_aus_zeile(et, etikett, anzahl, vorlage=vorlage))
+        gedruckte_ids.append(ersatzteil_id)
+        ergebnis['gedruckt'] += 1
+        ergebnis['etiketten'] += anzahl
+
+    if not zpl_bloecke:
+        ergebnis['message'] = 'Keine Etiketten gedruckt.'
+        return ergebnis
+
+    d = dispatch_print(
+        conn, res['drucker_id'], '\n'.join(zpl_bloecke), mitarbeiter_id, wait_seconds=wait_seconds
+    )
+    if not d['ok']:
+        ergebnis['message'] = d.get('error_message') or 'Fehler beim Drucken.'
+        ergebnis['fehler'].extend((i, ergebnis['message']) for i in gedruckte_ids)
+        ergebnis['gedruckt'] = ergebnis['etiketten'] = 0
+        ergebnis['job_id'] = d.get('job_id')
+        return ergebnis
+
+    ergebnis['ok'] = True
+    ergebnis['job_id'] = d.get('job_id')
+    suffix = 'en' if ergebnis['etiketten'] > 1 else ''
+    if d['mode'] == 'agent' and d['status'] != 'done':
+        ergebnis['in_warteschlange'] = True
+        ergebnis['message'] = (
+            f'{ergebnis["etiketten"]} Etikett{suffix} fuer {ergebnis["gedruckt"]} Artikel an Druckwarteschlange '
+            f'uebergeben (Auftrag #{d["job_id"]}).'
+        )
+    else:
+        ergebnis['message'] = f'{ergebnis["etiketten"]} Etikett{suffix} fuer {ergebnis["gedruckt"]} Artikel gedruckt.'
+    return ergebnis
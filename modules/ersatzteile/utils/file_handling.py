@@ -6,6 +6,8 @@ import os
 from datetime import datetime
 from flask import current_app
 
+from utils.file_handling import get_ordner_dateien
+
 
 def allowed_file(filename):
     """Prüft ob Dateityp erlaubt ist"""
@@ -16,126 +18,73 @@ def allowed_file(filename):
 def get_datei_anzahl(ersatzteil_id, typ='bild'):
     """Ermittelt die Anzahl der Dateien für ein Ersatzteil"""
     ersatzteil_folder = os.path.join(current_app.config['ERSATZTEIL_UPLOAD_FOLDER'], str(ersatzteil_id), typ)
-    if not os.path.exists(ersatzteil_folder):
-        return 0
     try:
-        files = os.listdir(ersatzteil_folder)
-        return len([f for f in files if os.path.isfile(os.path.join(ersatzteil_folder, f))])
+        return len(get_ordner_dateien(ersatzteil_folder))
     except Exception as e:
         print(f"Fehler beim Ermitteln der Dateianzahl für Ersatzteil {ersatzteil_id} ({typ}): {e}")
         return 0
 
 
+def _scanne_ordner(folder, url_prefix, endungen):
+    """Dateien mit passender Endung aus dem (gecachten) Ordner-Listing, neueste zuerst."""
+    dateien = []
+    for datei in get_ordner_dateien(folder):
+        if datei.name.lower().endswith(endungen):
+            # Pfad immer mit Forward-Slash für URL-Kompatibilität
+            dateien.append({
+                'name': datei.name,
+                'path': f'{url_prefix}/{datei.name}',
+                'size': datei.size,
+                'modified': datetime.fromtimestamp(datei.mtime)
+            })
+    # Sortiere nach Änderungsdatum (neueste zuerst)
+    dateien.sort(key=lambda x: x['modified'], reverse=True)
+    return dateien
+
+
 def get_bestellung_dateien(bestellung_id):
     """Hilfsfunktion: Scannt Ordner nach PDF-Dateien für eine Bestellung"""
     bestellung_folder = os.path.join(current_app.config['ANGEBOTE_UPLOAD_FOLDER'], 'Bestellungen', str(bestellung_id))
-    dateien = []
-    
-    if os.path.exists(bestellung_folder):
-        try:
-            for filename in os.listdir(bestellung_folder):
-                if filename.lower().endswith('.pdf'):
-                    filepath = os.path.join(bestellung_folder, filename)
-                    if os.path.isfile(filepath):
-                        stat = os.stat(filepath)
-                        # Pfad immer mit Forward-Slash für URL-Kompatibilität
-                        path_for_url = f'Bestellungen/{bestellung_id}/{filename}'
-                        dateien.append({
-                            'name': filename,
-                            'path': path_for_url,
-                            'size': stat.st_size,
-                            'modified': datetime.fromtimestamp(stat.st_mtime)
-                        })
-            # Sortiere nach Änderungsdatum (neueste zuerst)
-            dateien.sort(key=lambda x: x['modified'], reverse=True)
-        except Exception as e:
-            print(f"Fehler beim Scannen des Bestellung-Ordners: {e}")
-    
-    return dateien
+    try:
+        return _scanne_ordner(bestellung_folder, f'Bestellungen/{bestellung_id}', '.pdf')
+    except Exception as e:
+        print(f"Fehler beim Scannen des Bestellung-Ordners: {e}")
+        return []
 
 
 def get_angebotsanfrage_dateien(angebotsanfrage_id):
     """Hilfsfunktion: Scannt Ordner nach PDF-Dateien für eine Angebotsanfrage"""
     angebote_folder = os.path.join(current_app.config['UPLOAD_BASE_FOLDER'], 'Bestellwesen', 'Angebote', str(angebotsanfrage_id))
-    dateien = []
-    
-    if os.path.exists(angebote_folder):
-        try:
-            for filename in os.listdir(angebote_folder):
-                if filename.lower().endswith('.pdf'):
-                    filepath = os.path.join(angebote_folder, filename)
-                    if os.path.isfile(filepath):
-                        stat = os.stat(filepath)
-                        # Pfad immer mit Forward-Slash für URL-Kompatibilität
-                        path_for_url = f'Bestellwesen/Angebote/{angebotsanfrage_id}/{filename}'
-                        dateien.append({
-                            'name': filename,
-                            'path': path_for_url,
-                            'size': stat.st_size,
-                            'modified': datetime.fromtimestamp(stat.st_mtime)
-                        })
-            # Sortiere nach Änderungsdatum (neueste zuerst)
-            dateien.sort(key=lambda x: x['modified'], reverse=True)
-        except Exception as e:
-            print(f"Fehler beim Scannen des Angebotsanfrage-Ordners: {e}")
-    
-    return dateien
+    try:
+        return _scanne_ordner(angebote_folder, f'Bestellwesen/Angebote/{angebotsanfrage_id}', '.pdf')
+    except Exception as e:
+        print(f"Fehler beim Scannen des Angebotsanfrage-Ordners: {e}")
+        return []
 
 
 def get_auftragsbestätigung_dateien(bestellung_id):
     """Hilfsfunktion: Scannt Ordner nach Auftragsbestätigungs-Dateien (PDF, JPEG, JPG, PNG) für eine Bestellung"""
     auftragsbestätigung_folder = os.path.join(current_app.config['UPLOAD_BASE_FOLDER'], 'Bestellwesen', 'Auftragsbestätigungen', str(bestellung_id))
-    dateien = []
-    
-    if os.path.exists(auftragsbestätigung_folder):
-        try:
-            for filename in os.listdir(auftragsbestätigung_folder):
-                file_ext = filename.lower()
-                if file_ext.endswith(('.pdf', '.jpeg', '.jpg', '.png')):
-                    filepath = os.path.join(auftragsbestätigung_folder, filename)
-                    if os.path.isfile(filepath):
-                        stat = os.stat(filepath)
-                        # Pfad immer mit Forward-Slash für URL-Kompatibilität
-                        path_for_url = f'Bestellwesen/Auftragsbestätigungen/{bestellung_id}/{filename}'
-                        dateien.append({
-                            'name': filename,
-                            'path': path_for_url,
-                            'size': stat.st_size,
-                            'modified': datetime.fromtimestamp(stat.st_mtime)
-                        })
-            # Sortiere nach Änderungsdatum (neueste zuerst)
-            dateien.sort(key=lambda x: x['modified'], reverse=True)
-        except Exception as e:
-            print(f"Fehler beim Scannen des Auftragsbestätigung-Ordners: {e}")
-    
-    return dateien
+    try:
+        return _scanne_ordner(
+            auftragsbestätigung_folder,
+            f'Bestellwesen/Auftragsbestätigungen/{bestellung_id}',
+            ('.pdf', '.jpeg', '.jpg', '.png'),
+        )
+    except Exception as e:
+        print(f"Fehler beim Scannen des Auftragsbestätigung-Ordners: {e}")
+        return []
 
 
 def get_lieferschein_dateien(bestellung_id):
     """Hilfsfunktion: Scannt Ordner nach Lieferschein-Dateien (PDF, JPEG, JPG, PNG) für eine Bestellung"""
     lieferschein_folder = os.path.join(current_app.config['UPLOAD_BASE_FOLDER'], 'Bestellwesen', 'Lieferscheine', str(bestellung_id))
-    dateien = []
-    
-    if os.path.exists(lieferschein_folder):
-        try:
-            for filename in os.listdir(lieferschein_folder):
-                file_ext = filename.lower()
-                if file_ext.endswith(('.pdf', '.jpeg', '.jpg', '.png')):
-                    filepath = os.path.join(lieferschein_folder, filename)
-                    if os.path.isfile(filepath):
-                        stat = os.stat(filepath)
-                        # Pfad immer mit Forward-Slash für URL-Kompatibilität
-                        path_for_url = f'Bestellwesen/Lieferscheine/{bestellung_id}/{filename}'
-                        dateien.append({
-                            'name': filename,
-                            'path': path_for_url,
-                            'size': stat.st_size,
-                            'modified': datetime.fromtimestamp(stat.st_mtime)
-                        })
-            # Sortiere nach Änderungsdatum (neueste zuerst)
-            dateien.sort(key=lambda x: x['modified'], reverse=True)
-        except Exception as e:
-            print(f"Fehler beim Scannen des Lieferschein-Ordners: {e}")
-    
-    return dateien
-
+    try:
+        return _scanne_ordner(
+            lieferschein_folder,
+            f'Bestellwesen/Lieferscheine/{bestellung_id}',
+            ('.pdf', '.jpeg', '.jpg', '.png'),
+        )
+    except Exception as e:
+        print(f"Fehler beim Scannen des Lieferschein-Ordners: {e}")
+        return []
@@ -4,7 +4,6 @@ Routes für Produktionsfunktionen
 """
 
 import os
-import re
 from datetime import datetime, timedelta
 
 from flask import (
@@ -21,6 +20,7 @@ from flask import (
 )
 
 from . import produktion_bp
+from utils.artikeleinstellungen_index import artikel_aktualisieren, artikeleinstellungen_struktur
 from utils.database import get_db_connection
 from utils.decorators import (
     guest_allowed,
@@ -46,80 +46,13 @@ from modules.diverses.routes import DRUCKER_LISTE
 
 def get_artikeleinstellungen_struktur():
     """
-    Scannt die Ordnerstruktur für Artikeleinstellungen und erstellt eine hierarchische Datenstruktur.
-    
+    Hierarchische Datenstruktur der Artikeleinstellungen aus dem Ordner-Index
+    (utils/artikeleinstellungen_index.py, inkrementell über Ordner-mtimes aktualisiert).
+
     Returns:
         dict: {linie: {artikel: [fotos]}} mit sortierten Einträgen
     """
-    base_folder = current_app.config.get('UPLOAD_BASE_FOLDER')
-    etikettierung_folder = os.path.join(base_folder, 'Produktion', 'Etikettierung', 'Artikeleinstellungen')
-    
-    struktur = {}
-    
-    # Prüfen ob Ordner existiert
-    if not os.path.exists(etikettierung_folder):
-        return struktur
-    
-    # Erlaubte Bildformate
-    bild_extensions = {'.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp'}
-    
-    # Durch Linien-Ordner iterieren
-    try:
-        linien_ordner = [d for d in os.listdir(etikettierung_folder) 
-                        if os.path.isdir(os.path.join(etikettierung_folder, d))]
-        linien_ordner.sort()  # Alphabetisch sortieren
-        
-        for linie in linien_ordner:
-            linie_path = os.path.join(etikettierung_folder, linie)
-            struktur[linie] = {}
-            
-            # Durch Artikel-Ordner iterieren
-            artikel_ordner = [d for d in os.listdir(linie_path)
-                             if os.path.isdir(os.path.join(linie_path, d))]
-            
-            # Artikel nach Sortiernummer sortieren (numerisch, nicht lexikalisch)
-            def get_sortiernummer(artikel_name):
-                """Extrahiert die Sortiernummer aus dem Artikelnamen (z.B. '01-Artikel' -> 1)"""
-                match = re.match(r'^(\d+)-', artikel_name)
-                if match:
-                    return int(match.group(1))
-                return 9999  # Artikel ohne Sortiernummer ans Ende
-            
-            artikel_ordner.sort(key=get_sortiernummer)
-            
-            for artikel in artikel_ordner:
-                artikel_path = os.path.join(linie_path, artikel)
-                fotos = []
-                
-                # Alle Dateien im Artikel-Ordner durchgehen
-                try:
-                    dateien = [f for f in os.listdir(artikel_path)
-                              if os.path.isfile(os.path.join(artikel_path, f))]
-                    
-                    # Nur Bilddateien filtern
-                    bild_dateien = [f for f in dateien 
-                                   if os.path.splitext(f.lower())[1] in bild_extensions]
-                    
-                    # Fotos sortieren: bizerba.* zuerst, dann alphabetisch
-                    def foto_sort_key(filename):
-                        filename_lower = filename.lower()
-                        if filename_lower.startswith('bizerba'):
-                            return (0, filename_lower)  # bizerba zuerst
-                        return (1, filename_lower)  # andere alphabetisch
-                    
-                    bild_dateien.sort(key=foto_sort_key)
-                    struktur[linie][artikel] = bild_dateien
-                    
-                except (OSError, PermissionError) as e:
-                    # Fehler beim Lesen eines Artikel-Ordners ignorieren
-                    print(f"Warnung: Konnte Artikel-Ordner {artikel_path} nicht lesen: {e}")
-                    struktur[linie][artikel] = []
-                    
-    except (OSError, PermissionError) as e:
-        print(f"Warnung: Konnte Etikettierungs-Ordner nicht lesen: {e}")
-        return {}
-    
-    return struktur
+    return artikeleinstellungen_struktur()
 
 
 @produktion_bp.route('/etiketten-drucken')
@@ -304,6 +237,7 @@ def etikettierung_foto_upload():
     if not success or error_message:
         flash(f'Fehler beim Hochladen: {error_message}', 'danger')
     else:
+        artikel_aktualisieren(linie, artikel)
         loesche_import_kopie_nach_upload(
             original_filename,
             current_app.config['IMPORT_FOLDER'],
@@ -2,7 +2,7 @@
 Schichtbuch Routes - Themenliste, Details, Bemerkungen
 """
 
-from flask import render_template, request, redirect, url_for, session, jsonify, flash, send_from_directory, current_app, Response, make_response
+from flask import render_template, request, redirect, url_for, session, jsonify, flash, current_app, Response, make_response
 from datetime import datetime
 import os
 from werkzeug.utils import secure_filename
@@ -17,6 +17,8 @@ from utils import db_errors
 from utils.db_sql import local_now_str, upsert_ignore
 from utils.helpers import build_sichtbarkeits_filter_query, row_to_dict
 from utils.reports import generate_thema_pdf
+from utils.stammdaten_cache import get_stammdaten
+from utils.benachrichtigungen_live import benachrichtigung_geaendert
 from . import services
 from . import aufgabenliste_services
 from modules.ersatzteile.services import (
@@ -26,18 +28,17 @@ from modules.ersatzteile.services import (
     loesche_datei,
     rueckbuche_lager_fuer_geloeschtes_thema,
 )
-from utils.file_handling import save_uploaded_file, create_upload_folder, originale_loeschen_aus_formular, loesche_import_kopie_nach_upload
+from utils.file_handling import save_uploaded_file, create_upload_folder, originale_loeschen_aus_formular, loesche_import_kopie_nach_upload, get_ordner_dateien
 from utils.security import safe_redirect_target
+from utils.bild_derivate import bild_derivat_antwort, derivate_im_hintergrund_erzeugen
+from utils.datei_auslieferung import nicht_geaendert_antwort, sende_anhang
 
 
 def get_datei_anzahl(thema_id):
     """Ermittelt die Anzahl der Dateien für ein Thema"""
     thema_folder = os.path.join(current_app.config['SCHICHTBUCH_UPLOAD_FOLDER'], str(thema_id))
-    if not os.path.exists(thema_folder):
-        return 0
     try:
-        files = os.listdir(thema_folder)
-        return len([f for f in files if os.path.isfile(os.path.join(thema_folder, f))])
+        return len(get_ordner_dateien(thema_folder))
     except Exception as e:
         print(f"Fehler beim Ermitteln der Dateianzahl für Thema {thema_id}: {e}")
         return 0
@@ -92,8 +93,8 @@ def themaliste():
         zusatz_gewerke_dict = services.get_zusatz_gewerke_fuer_themen(thema_ids, conn)
 
         # Werte für Dropdowns holen
-        status_liste = conn.execute('SELECT ID, Bezeichnung FROM Status WHERE Aktiv = 1 ORDER BY Sortierung ASC').fetchall()
-        bereich_liste = conn.execute('SELECT Bezeichnung FROM Bereich WHERE Aktiv = 1 ORDER BY Bezeichnung').fetchall()
+        status_liste = get_stammdaten('status', conn, nur_aktiv=True)
+        bereich_liste = get_stammdaten('bereiche', conn, nur_aktiv=True)
         if bereich_filter:
             gewerke_liste = conn.execute('''
                 SELECT G.ID, G.Bezeichnung
@@ -104,7 +105,7 @@ def themaliste():
             ''', (bereich_filter,)).fetchall()
         else:
             gewerke_liste = conn.execute('SELECT ID, Bezeichnung FROM Gewerke WHERE Aktiv = 1 ORDER BY Bezeichnung').fetchall()
-        taetigkeiten_liste = conn.execute('SELECT ID, Bezeichnung FROM Taetigkeit WHERE Aktiv = 1 ORDER BY Sortierung ASC').fetchall()
+        taetigkeiten_liste = get_stammdaten('taetigkeiten', conn, nur_aktiv=True)
 
     perms = session.get('user_berechtigungen', [])
     kann_artikel_rueckbuchen = 'admin' in perms or 'artikel_buchen' in perms
@@ -970,12 +971,8 @@ def aufgabenliste_detail(liste_id):
             gewerk_filter=gewerk_filter or None,
             status_filter_list=status_filter_list or None,
         )
-        status_liste = conn.execute(
-            'SELECT ID, Bezeichnung FROM Status WHERE Aktiv = 1 ORDER BY Sortierung ASC'
-        ).fetchall()
-        bereich_liste = conn.execute(
-            'SELECT Bezeichnung FROM Bereich WHERE Aktiv = 1 ORDER BY Bezeichnung'
-        ).fetchall()
+        status_liste = get_stammdaten('status', conn, nur_aktiv=True)
+        bereich_liste = get_stammdaten('bereiche', conn, nur_aktiv=True)
         if bereich_filter:
             gewerke_liste = conn.execute(
                 '''
@@ -1312,7 +1309,8 @@ def thema_dateien(thema_id):
                 'ext': file_ext,
                 'beschreibung': d['Beschreibung'] or '',
                 'id': d['ID'],
-                'url': url_for('schichtbuch.thema_datei_download', thema_id=thema_id, filename=dateiname_mit_timestamp)
+                'url': url_for('schichtbuch.thema_datei_download', thema_id=thema_id, filename=dateiname_mit_timestamp),
+                'thumb_url': url_for('schichtbuch.thema_datei_download', thema_id=thema_id, filename=dateiname_mit_timestamp, groesse='thumb') if file_type == 'image' else None,
             })
     
     return jsonify({'success': True, 'dateien': dateien})
@@ -1324,6 +1322,13 @@ def thema_dateien(thema_id):
 def thema_datei_download(thema_id, filename):
     """Stelle eine Datei zum Download/Anzeigen bereit"""
     user_id = session.get('user_id')
+    # Nur Dateien, die explizit zu diesem Thema-Ordner gehoeren und
+    # deren Dateiname exakt dem angeforderten Namen entspricht.
+    expected_suffix = f'Schichtbuch/Themen/{int(thema_id)}/{filename}'
+
+    nicht_geaendert = nicht_geaendert_antwort(expected_suffix)
+    if nicht_geaendert is not None:
+        return nicht_geaendert
     
     with get_db_connection() as conn:
         berechtigt, thema_exists = services.check_thema_datei_berechtigung(thema_id, user_id, conn)
@@ -1334,9 +1339,6 @@ def thema_datei_download(thema_id, filename):
         if not berechtigt:
             return "Kein Zugriff auf dieses Thema", 403
         
-        # Nur Dateien, die explizit zu diesem Thema-Ordner gehoeren und
-        # deren Dateiname exakt dem angeforderten Namen entspricht.
-        expected_suffix = f'Schichtbuch/Themen/{int(thema_id)}/{filename}'
         datei = conn.execute('''
             SELECT Dateipfad FROM Datei
             WHERE BereichTyp = 'Thema' AND BereichID = ?
@@ -1355,7 +1357,11 @@ def thema_datei_download(thema_id, filename):
     if not os.path.isfile(filepath):
         return "Datei nicht gefunden", 404
 
-    return send_from_directory(os.path.dirname(filepath), os.path.basename(filepath))
+    derivat = bild_derivat_antwort(filepath, request.args.get('groesse'))
+    if derivat is not None:
+        return derivat
+
+    return sende_anhang(filepath, datei['Dateipfad'])
 
 
 @schichtbuch_bp.route('/thema/<int:thema_id>/upload', methods=['POST'])
@@ -1401,6 +1407,7 @@ def thema_datei_upload(thema_id):
     
     if not success:
         return jsonify({'success': False, 'message': error_message}), 400
+    derivate_im_hintergrund_erzeugen(os.path.join(thema_folder, filename))
     
     try:
         with get_db_connection() as conn:
@@ -1517,6 +1524,7 @@ def api_benachrichtigung_gelesen(benachrichtigung_id):
             WHERE ID = ?
         ''', (benachrichtigung_id,))
         conn.commit()
+    benachrichtigung_geaendert(mitarbeiter_id)
     
     return jsonify({'success': True, 'message': 'Benachrichtigung als gelesen markiert'})
 
@@ -1534,6 +1542,7 @@ def api_alle_benachrichtigungen_gelesen():
             WHERE MitarbeiterID = ? AND Gelesen = 0
         ''', (mitarbeiter_id,))
         conn.commit()
+    benachrichtigung_geaendert(mitarbeiter_id)
     
     return jsonify({'success': True, 'message': 'Alle Benachrichtigungen als gelesen markiert'})
 
@@ -8,6 +8,7 @@ from utils import db_errors
 from utils.abteilungen import get_mitarbeiter_abteilungen
 from utils.db_sql import local_now_str, upsert_ignore
 from utils.helpers import build_sichtbarkeits_filter_query
+from utils.stammdaten_cache import get_stammdaten
 
 
 def build_themen_query(sichtbare_abteilungen, bereich_filter=None, gewerk_filter=None, 
@@ -408,8 +409,8 @@ def get_thema_detail_data(thema_id, mitarbeiter_id, conn, is_admin=False):
     ''', (thema_id,)).fetchall()
     
     # Alle Status-Werte für Dropdown
-    status_liste = conn.execute('SELECT * FROM Status ORDER BY Sortierung ASC').fetchall()
-    taetigkeiten = conn.execute('SELECT * FROM Taetigkeit ORDER BY Sortierung ASC').fetchall()
+    status_liste = get_stammdaten('status', conn)
+    taetigkeiten = get_stammdaten('taetigkeiten', conn)
     
     # Bemerkungen zu diesem Thema
     bemerkungen = conn.execute('''
@@ -460,7 +461,7 @@ def get_thema_detail_data(thema_id, mitarbeiter_id, conn, is_admin=False):
     verfuegbare_ersatzteile = get_verfuegbare_ersatzteile_fuer_thema(mitarbeiter_id, conn, is_admin=is_admin)
     
     # Kostenstellen für Dropdown
-    kostenstellen = conn.execute('SELECT ID, Bezeichnung FROM Kostenstelle WHERE Aktiv = 1 ORDER BY Sortierung, Bezeichnung').fetchall()
+    kostenstellen = get_stammdaten('kostenstellen', conn, nur_aktiv=True)
     
     return {
         'thema': thema,
@@ -936,17 +937,11 @@ def get_thema_erstellung_form_data(mitarbeiter_id, conn):
     from utils import get_abteilungsbaum_fuer_sichtbarkeit
     from utils.helpers import row_to_dict
     
-    gewerke = conn.execute('''
-        SELECT G.ID, G.Bezeichnung, B.ID AS BereichID, B.Bezeichnung AS Bereich
-        FROM Gewerke G
-        JOIN Bereich B ON G.BereichID = B.ID
-        WHERE G.Aktiv = 1 AND B.Aktiv = 1
-        ORDER BY B.Bezeichnung, G.Bezeichnung
-    ''').fetchall()
+    gewerke = get_stammdaten('gewerke_aktiv', conn)
 
-    taetigkeiten = conn.execute('SELECT * FROM Taetigkeit WHERE Aktiv = 1 ORDER BY Sortierung ASC').fetchall()
-    status = conn.execute('SELECT * FROM Status WHERE Aktiv = 1 ORDER BY Sortierung ASC').fetchall()
-    bereiche = conn.execute('SELECT * FROM Bereich WHERE Aktiv = 1 ORDER BY Bezeichnung').fetchall()
+    taetigkeiten = get_stammdaten('taetigkeiten', conn, nur_aktiv=True)
+    status = get_stammdaten('status', conn, nur_aktiv=True)
+    bereiche = get_stammdaten('bereiche', conn, nur_aktiv=True)
     
     # Primärabteilung des Mitarbeiters
     mitarbeiter = conn.execute(
@@ -959,7 +954,7 @@ def get_thema_erstellung_form_data(mitarbeiter_id, conn):
     auswaehlbare_abteilungen = get_abteilungsbaum_fuer_sichtbarkeit(mitarbeiter_id, conn)
     
     # Kostenstellen für Dropdown
-    kostenstellen = conn.execute('SELECT ID, Bezeichnung FROM Kostenstelle WHERE Aktiv = 1 ORDER BY Sortierung, Bezeichnung').fetchall()
+    kostenstellen = get_stammdaten('kostenstellen', conn, nur_aktiv=True)
 
     from utils.berechtigungen import ist_admin
     from . import aufgabenliste_services
@@ -983,16 +978,8 @@ def get_thema_erstellung_form_data(mitarbeiter_id, conn):
 
 def get_bereiche_gewerke_fuer_gewerk_select(conn):
     """Aktive Bereiche und Gewerke (mit BereichID) für Gewerk-Dropdowns."""
-    gewerke = conn.execute('''
-        SELECT G.ID, G.Bezeichnung, B.ID AS BereichID
-        FROM Gewerke G
-        JOIN Bereich B ON G.BereichID = B.ID
-        WHERE G.Aktiv = 1 AND B.Aktiv = 1
-        ORDER BY B.Bezeichnung, G.Bezeichnung
-    ''').fetchall()
-    bereiche = conn.execute(
-        'SELECT ID, Bezeichnung FROM Bereich WHERE Aktiv = 1 ORDER BY Bezeichnung'
-    ).fetchall()
+    gewerke = get_stammdaten('gewerke_aktiv', conn)
+    bereiche = get_stammdaten('bereiche', conn, nur_aktiv=True)
     return bereiche, gewerke
 
 
@@ -1146,34 +1133,33 @@ def get_thema_dateien_liste(thema_id, upload_folder):
         Liste von Datei-Dictionaries mit name, size, type, ext (ohne url, wird in Route hinzugefügt)
     """
     import os
+    from utils.file_handling import get_ordner_dateien
     
     thema_folder = os.path.join(upload_folder, str(thema_id))
     
     dateien = []
-    if os.path.exists(thema_folder):
-        for filename in os.listdir(thema_folder):
-            filepath = os.path.join(thema_folder, filename)
-            if os.path.isfile(filepath):
-                # Dateigröße ermitteln
-                file_size = os.path.getsize(filepath)
-                file_size_str = f"{file_size / 1024:.1f} KB" if file_size < 1024*1024 else f"{file_size / (1024*1024):.1f} MB"
-                
-                # Dateiendung ermitteln
-                file_ext = os.path.splitext(filename)[1].lower()
-                
-                # Dateityp kategorisieren
-                if file_ext in ['.jpg', '.jpeg', '.png', '.gif', '.webp']:
-                    file_type = 'image'
-                elif file_ext == '.pdf':
-                    file_type = 'pdf'
-                else:
-                    file_type = 'document'
-                
-                dateien.append({
-                    'name': filename,
-                    'size': file_size_str,
-                    'type': file_type,
-                    'ext': file_ext
-                })
+    for datei in get_ordner_dateien(thema_folder):
+        filename = datei.name
+        # Dateigröße aus dem gecachten Ordner-Listing
+        file_size = datei.size
+        file_size_str = f"{file_size / 1024:.1f} KB" if file_size < 1024*1024 else f"{file_size / (1024*1024):.1f} MB"
+        
+        # Dateiendung ermitteln
+        file_ext = os.path.splitext(filename)[1].lower()
+        
+        # Dateityp kategorisieren
+        if file_ext in ['.jpg', '.jpeg', '.png', '.gif', '.webp']:
+            file_type = 'image'
+        elif file_ext == '.pdf':
+            file_type = 'pdf'
+        else:
+            file_type = 'document'
+        
+        dateien.append({
+            'name': filename,
+            'size': file_size_str,
+            'type': file_type,
+            'ext': file_ext
+        })
     
     return dateien
\ No newline at end of file
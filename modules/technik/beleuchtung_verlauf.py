@@ -0,0 +1,394 @@
+"""
+Verlauf der Lampen-Schaltzustände (Beleuchtung) als kompaktes Binär-Log je Tag.
+
+Der Redis-Hash ``REDIS_HASH_BELEUCHTUNG`` hält nur den letzten Zustand. Zusätzlich schreibt der
+MQTT-Leader jeden Zustandswechsel an eine Tagesdatei ``<TECHNIK_VERLAUF_FOLDER>/JJJJ-MM-TT.bin``
+(UTC-Tag) an: je Wechsel 9 Bytes ``<IIB`` = Sekunden seit 1970 (UTC), Lampen-ID, Zustand
+(0 = aus, 1 = ein, 2 = unbekannt). Dateien werden nur angehängt; ältere als ``TECHNIK_VERLAUF_TAGE``
+löscht der Schreib-Thread.
+
+- ``erfassen(lamp_id, on)``: aus dem MQTT-Callback; legt den Wechsel nur in eine Queue, geschrieben
+  wird gesammelt in einem eigenen Thread (der Ingest blockiert nie auf dem Dateisystem).
+- ``einschaltdauer(von, bis)``: Sekunden eingeschaltet je Lampe im Zeitraum.
+- ``zeitverlauf(von, bis, punkte)``: Einschaltanteil (0..1) je Lampe in ``punkte`` gleich langen Abschnitten.
+
+Gelesene Tage liegen je Prozess spaltenweise im Speicher (``array``, mit kumulierten
+Einschaltsekunden je Lampe); von einer wachsenden Tagesdatei wird nur das neu angehängte Ende
+gelesen. Eine Abfrage braucht dann je Tag, Lampe und Abschnittsgrenze nur ein ``bisect``.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import queue
+import struct
+import threading
+import time
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from datetime import date, datetime, timedelta, timezone
+
+log = logging.getLogger('bis.technik')
+
+ZUSTAND_AUS = 0
+ZUSTAND_EIN = 1
+ZUSTAND_UNBEKANNT = 2
+
+_SATZ = struct.Struct('<IIB')
+# Zustand vor Abfragebeginn höchstens so viele Tage zurück suchen
+RUECKBLICK_TAGE = 31
+MAX_TAGE_IM_SPEICHER = 800
+MAX_PUNKTE = 2000
+# Nicht geschriebene Wechsel (Dateisystem hängt): danach werden neue verworfen statt den Ingest zu bremsen
+MAX_WARTESCHLANGE = 10000
+
+_STANDARD_KONFIG = {
+    'TECHNIK_VERLAUF_TAGE': 730,
+}
+
+_warteschlange: queue.Queue = queue.Queue(maxsize=MAX_WARTESCHLANGE)
+_schreiber: threading.Thread | None = None
+_schreiber_lock = threading.Lock()
+# Nur im Schreib-Thread: letzter geschriebener Zustand je (Ordner, Lampe)
+_letzter_zustand: dict[tuple[str, int], int] = {}
+_aufgeraeumt_am: date | None = None
+_voll_gemeldet = False
+
+_lese_lock = threading.Lock()
+# (Ordner, Tag) -> _Tag (LRU)
+_tage: OrderedDict[tuple[str, date], _Tag] = OrderedDict()
+
+
+class _Lampe:
+    """Wechsel einer Lampe an einem Tag plus kumulierte Einschaltsekunden ab dem ersten Wechsel."""
+
+    __slots__ = ('zeiten', 'zustaende', 'ein_kum')
+
+    def __init__(self):
+        self.zeiten = array('I')
+        self.zustaende = bytearray()
+        self.ein_kum = array('Q')
+
+    def anhaengen(self, ts: int, zustand: int) -> None:
+        kum = 0
+        if self.zeiten:
+            vorher = self.zeiten[-1]
+            # Leader-Wechsel kann Sätze minimal verspätet anhängen: nie rückwärts laufen
+            ts = max(ts, vorher)
+            kum = self.ein_kum[-1] + (ts - vorher if self.zustaende[-1] == ZUSTAND_EIN else 0)
+        # zeiten zuletzt: ein Leser, der per bisect auf zeiten einen Index findet, sieht ihn in allen Spalten
+        self.ein_kum.append(kum)
+        self.zustaende.append(zustand)
+        self.zeiten.append(ts)
+
+    def ein_sekunden(self, start: int, tag_beginn: int, t: int) -> int:
+        """Eingeschaltete Sekunden in [tag_beginn, t); ``start`` = Zustand zu Tagesbeginn."""
+        zeiten = self.zeiten
+        if not zeiten or t <= zeiten[0]:
+            return t - tag_beginn if start == ZUSTAND_EIN else 0
+        vorher = zeiten[0] - tag_beginn if start == ZUSTAND_EIN else 0
+        i = bisect_right(zeiten, t) - 1
+        return vorher + self.ein_kum[i] + (t - zeiten[i] if self.zustaende[i] == ZUSTAND_EIN else 0)
+
+    def end_zustand(self, start: int) -> int:
+        return self.zustaende[len(self.zeiten) - 1] if self.zeiten else start
+
+
+class _Tag:
+    """Wechsel eines Tages je Lampe (aus einer Tagesdatei, ``gelesen`` = verarbeitete Bytes)."""
+
+    __slots__ = ('gelesen', 'lampen')
+
+    def __init__(self):
+        self.gelesen = 0
+        self.lampen: dict[int, _Lampe] = {}
+
+    def anhaengen(self, daten: bytes) -> None:
+        for ts, lampe, zustand in _SATZ.iter_unpack(daten):
+            eintrag = self.lampen.get(lampe)
+            if eintrag is None:
+                eintrag = self.lampen[lampe] = _Lampe()
+            eintrag.anhaengen(ts, zustand)
+        self.gelesen += len(daten)
+
+
+def _app_config():
+    from flask import current_app, has_app_context
+    if has_app_context():
+        return current_app.config
+    from modules.technik.mqtt_runtime import get_flask_app_ref
+    app = get_flask_app_ref()
+    return app.config if app is not None else {}
+
+
+def _konfig(key):
+    wert = _app_config().get(key)
+    return _STANDARD_KONFIG[key] if wert is None else wert
+
+
+def verlauf_ordner() -> str | None:
+    ordner = (_app_config().get('TECHNIK_VERLAUF_FOLDER') or '').strip()
+    return ordner or None
+
+
+def _tag_datei(ordner: str, tag: date) -> str:
+    return os.path.join(ordner, f'{tag.isoformat()}.bin')
+
+
+def _utc_tag(ts: float) -> date:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).date()
+
+
+def _zustand(on) -> int:
+    if on is None:
+        return ZUSTAND_UNBEKANNT
+    return ZUSTAND_EIN if on else ZUSTAND_AUS
+
+
+# --- Schreiben ---------------------------------------------------------------
+
+def erfassen(lamp_id, on, ts: float | None = None) -> None:
+    """Zustand einer Lampe vormerken (nicht blockierend); geschrieben wird nur bei einem Wechsel."""
+    global _voll_gemeldet
+    ordner = verlauf_ordner()
+    if not ordner:
+        return
+    try:
+        lampe = int(lamp_id)
+    except (TypeError, ValueError):
+        return
+    if not 0 <= lampe <= 0xFFFFFFFF:
+        return
+    try:
+        _warteschlange.put_nowait((ordner, int(time.time() if ts is None else ts), lampe, _zustand(on)))
+    except queue.Full:
+        if not _voll_gemeldet:
+            log.warning('Beleuchtungsverlauf: Warteschlange voll, Wechsel werden verworfen (Ordner %s)', ordner)
+            _voll_gemeldet = True
+        return
+    _voll_gemeldet = False
+    _schreiber_starten()
+
+
+def _schreiber_starten() -> None:
+    global _schreiber
+    if _schreiber is not None and _schreiber.is_alive():
+        return
+    with _schreiber_lock:
+        if _schreiber is not None and _schreiber.is_alive():
+            return
+        _schreiber = threading.Thread(target=_schreiber_run, name='bis-beleuchtung-verlauf', daemon=True)
+        _schreiber.start()
+
+
+def _schreiber_run() -> None:
+    while True:
+        eintraege = [_warteschlange.get()]
+        # Kurz sammeln: Schaltgruppen melden viele Lampen in derselben Sekunde
+        time.sleep(0.2)
+        while len(eintraege) < MAX_WARTESCHLANGE:
+            try:
+                eintraege.append(_warteschlange.get_nowait())
+            except queue.Empty:
+                break
+        try:
+            eintraege_schreiben(eintraege)
+        except Exception as e:
+            log.warning('Beleuchtungsverlauf: Schreiben fehlgeschlagen: %s', e)
+
+
+def eintraege_schreiben(eintraege) -> int:
+    """(Ordner, ts, Lampe, Zustand)-Tupel an die Tagesdateien anhängen; gibt die Anzahl Wechsel zurück."""
+    je_datei: dict[tuple[str, date], bytearray] = {}
+    for ordner, ts, lampe, zustand in eintraege:
+        if _letzter_zustand.get((ordner, lampe)) == zustand:
+            continue
+        _letzter_zustand[(ordner, lampe)] = zustand
+        je_datei.setdefault((ordner, _utc_tag(ts)), bytearray()).extend(_SATZ.pack(ts, lampe, zustand))
+
+    geschrieben = 0
+    for (ordner, tag), daten in je_datei.items():
+        try:
+            os.makedirs(ordner, exist_ok=True)
+            # Ein write() je Datei mit O_APPEND: Sätze eines zweiten Schreibers (Leader-Wechsel) mischen sich nicht
+            fd = os.open(_tag_datei(ordner, tag), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, bytes(daten))
+            finally:
+                os.close(fd)
+        except OSError as e:
+            log.warning('Beleuchtungsverlauf: %s nicht schreibbar: %s', _tag_datei(ordner, tag), e)
+            # Beim nächsten Wechsel erneut versuchen statt den Zustand für geschrieben zu halten
+            for _ts, lampe, _z in _SATZ.iter_unpack(bytes(daten)):
+                _letzter_zustand.pop((ordner, lampe), None)
+            continue
+        geschrieben += len(daten) // _SATZ.size
+
+    for ordner in {o for o, _tag in je_datei}:
+        _aufraeumen(ordner)
+    return geschrieben
+
+
+def _aufraeumen(ordner: str) -> None:
+    """Höchstens einmal am Tag Tagesdateien älter als TECHNIK_VERLAUF_TAGE löschen (0 = alles behalten)."""
+    global _aufgeraeumt_am
+    heute = datetime.now(timezone.utc).date()
+    if _aufgeraeumt_am == heute:
+        return
+    _aufgeraeumt_am = heute
+    tage = int(_konfig('TECHNIK_VERLAUF_TAGE') or 0)
+    if tage <= 0:
+        return
+    grenze = (heute - timedelta(days=tage)).isoformat()
+    try:
+        namen = os.listdir(ordner)
+    except OSError:
+        return
+    for name in namen:
+        if name.endswith('.bin') and name[:-4] < grenze:
+            try:
+                os.remove(os.path.join(ordner, name))
+            except OSError as e:
+                log.warning('Beleuchtungsverlauf: %s nicht löschbar: %s', name, e)
+
+
+# --- Lesen -------------------------------------------------------------------
+
+def _tag_laden(ordner: str, tag: date) -> _Tag | None:
+    pfad = _tag_datei(ordner, tag)
+    try:
+        groesse = os.stat(pfad).st_size
+    except OSError:
+        return None
+    # Nur vollständige Sätze (ein Schreiber kann gerade anhängen)
+    groesse -= groesse % _SATZ.size
+    schluessel = (ordner, tag)
+    with _lese_lock:
+        eintrag = _tage.get(schluessel)
+        if eintrag is not None:
+            _tage.move_to_end(schluessel)
+            if eintrag.gelesen == groesse:
+                return eintrag
+        if eintrag is None or eintrag.gelesen > groesse:
+            eintrag = _Tag()
+        # Unter dem Lock nur das neue Ende lesen; parallele Leser sehen die Spalten konsistent (siehe _Lampe)
+        try:
+            with open(pfad, 'rb') as f:
+                f.seek(eintrag.gelesen)
+                daten = f.read(groesse - eintrag.gelesen)
+        except OSError as e:
+            log.warning('Beleuchtungsverlauf: %s nicht lesbar: %s', pfad, e)
+            return None
+        eintrag.anhaengen(daten[:len(daten) - len(daten) % _SATZ.size])
+        _tage[schluessel] = eintrag
+        _tage.move_to_end(schluessel)
+        while len(_tage) > MAX_TAGE_IM_SPEICHER:
+            _tage.popitem(last=False)
+    return eintrag
+
+
+def _tag_beginn(tag: date) -> int:
+    return int(datetime(tag.year, tag.month, tag.day, tzinfo=timezone.utc).timestamp())
+
+
+def _ein_kumuliert(ordner: str, von: int, grenzen: list[int], auswahl) -> dict[int, list[int]]:
+    """Eingeschaltete Sekunden je Lampe in [von, g) für jede Grenze g (aufsteigend, alle >= von).
+
+    Je Tag und Lampe genügt ein ``bisect`` pro Grenze; der Zustand zu Tagesbeginn kommt aus den
+    Vortagen (höchstens ``RUECKBLICK_TAGE``), unbekannt zählt als aus.
+    """
+    werte: dict[int, list[int]] = {}
+    if not grenzen:
+        return werte
+    zustand: dict[int, int] = {}
+    basis: dict[int, int] = {}
+    erster_tag = _utc_tag(von)
+    letzter_tag = _utc_tag(max(von, grenzen[-1] - 1))
+    tag = erster_tag - timedelta(days=RUECKBLICK_TAGE)
+    j = 0
+    while tag <= letzter_tag:
+        daten = _tag_laden(ordner, tag)
+        lampen = daten.lampen if daten is not None else {}
+        for lampe in lampen:
+            if (auswahl is None or lampe in auswahl) and lampe not in zustand:
+                zustand[lampe] = ZUSTAND_UNBEKANNT
+                basis[lampe] = 0
+                werte[lampe] = [0] * len(grenzen)
+        if tag >= erster_tag:
+            beginn = _tag_beginn(tag)
+            ende = beginn + 86400
+            leer = _Lampe()
+            bis_j = j
+            while bis_j < len(grenzen) and (grenzen[bis_j] < ende or tag == letzter_tag):
+                bis_j += 1
+            for lampe, start in zustand.items():
+                verlauf = lampen.get(lampe, leer)
+                abzug = verlauf.ein_sekunden(start, beginn, von) if tag == erster_tag else 0
+                liste = werte[lampe]
+                for k in range(j, bis_j):
+                    liste[k] = basis[lampe] + verlauf.ein_sekunden(start, beginn, grenzen[k]) - abzug
+                basis[lampe] += verlauf.ein_sekunden(start, beginn, ende) - abzug
+            j = bis_j
+        for lampe in zustand:
+            verlauf = lampen.get(lampe)
+            if verlauf is not None:
+                zustand[lampe] = verlauf.end_zustand(zustand[lampe])
+        tag += timedelta(days=1)
+    return werte
+
+
+def _zeitraum(von, bis) -> tuple[int, int, int]:
+    """(von, bis, Ende der Auswertung = min(bis, jetzt)) als Sekunden.
+
+    ``von`` wird auf den aufbewahrten Verlauf begrenzt (``TECHNIK_VERLAUF_TAGE``, bei 0
+    ``MAX_TAGE_IM_SPEICHER``): eine Abfrage liest so höchstens diese Tage plus ``RUECKBLICK_TAGE``.
+    """
+    von, bis = int(von), int(bis)
+    jetzt = int(time.time())
+    if von > jetzt:
+        raise ValueError('von liegt in der Zukunft')
+    tage = int(_konfig('TECHNIK_VERLAUF_TAGE') or 0) or MAX_TAGE_IM_SPEICHER
+    von = max(von, (jetzt // 86400 - tage) * 86400)
+    if bis <= von:
+        raise ValueError('bis muss nach von (und im aufbewahrten Verlauf) liegen')
+    return von, bis, min(bis, jetzt)
+
+
+def einschaltdauer(von, bis, lampen=None, ordner: str | None = None) -> dict[str, int]:
+    """Eingeschaltete Sekunden je Lampe im Zeitraum [von, bis) (Unix-Sekunden)."""
+    von, bis, ende = _zeitraum(von, bis)
+    ordner = ordner or verlauf_ordner()
+    if not ordner:
+        return {}
+    auswahl = {int(l) for l in lampen} if lampen is not None else None
+    return {str(lampe): kum[0] for lampe, kum in sorted(_ein_kumuliert(ordner, von, [ende], auswahl).items())}
+
+
+def zeitverlauf(von, bis, punkte: int = 96, lampen=None, ordner: str | None = None) -> dict:
+    """Einschaltanteil je Lampe in ``punkte`` Abschnitten; Abschnitte nach ``jetzt`` sind None."""
+    von, bis, ende = _zeitraum(von, bis)
+    punkte = max(1, min(int(punkte), MAX_PUNKTE, bis - von))
+    schritt = -(-(bis - von) // punkte)
+    punkte = -(-(bis - von) // schritt)
+    ergebnis = {'von': von, 'bis': bis, 'schritt': schritt, 'lampen': {}}
+    ordner = ordner or verlauf_ordner()
+    if not ordner:
+        return ergebnis
+    auswahl = {int(l) for l in lampen} if lampen is not None else None
+    grenzen = [min(von + i * schritt, bis, ende) for i in range(1, punkte + 1)]
+    laengen = [max(0, g - (von + i * schritt)) for i, g in enumerate(grenzen)]
+    for lampe, kum in sorted(_ein_kumuliert(ordner, von, grenzen, auswahl).items()):
+        vorher = 0
+        anteile = []
+        for wert, laenge in zip(kum, laengen):
+            anteile.append(round((wert - vorher) / laenge, 3) if laenge > 0 else None)
+            vorher = wert
+        ergebnis['lampen'][str(lampe)] = anteile
+    return ergebnis
+
+
+def cache_leeren() -> None:
+    with _lese_lock:
+        _tage.clear()
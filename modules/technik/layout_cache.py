@@ -0,0 +1,195 @@
+"""
+Zwischenspeicher für die Technik-Layouts (SVG-Übersichten der Wanddisplays).
+
+- ``diagramme(data_dir, bauen)``: Diagramm-Liste des Layout-Ordners, gültig solange sich die
+  mtime des Ordners nicht ändert (ein ``stat`` statt ``listdir`` und Namensnormalisierung je Aufruf).
+- ``svg_varianten(pfad)``: minimiertes SVG plus gzip- und (mit ``brotli``) Brotli-Variante und ein
+  Inhalts-ETag, je Prozess im Speicher, gültig solange mtime und Größe der Datei gleich bleiben.
+  Im Request entstehen nur Minimierung und gzip (Stufe 6); Brotli mit Qualität 11 rechnet ein
+  Hintergrund-Thread nach, bis dahin geht gzip raus. Der Speicher ist über die Summe der
+  Varianten begrenzt (``MAX_GESAMT_BYTES``), nicht über die Zahl der Layouts.
+
+Die Layouts liegen im Daten-Volume und werden dort direkt bearbeitet; neue oder geänderte
+Dateien sind ohne Neustart beim nächsten Abruf sichtbar.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+
+try:
+    import brotli
+except ImportError:  # optional: ohne brotli nur .gz
+    brotli = None
+
+log = logging.getLogger('bis.technik')
+
+# Größere Dateien werden unverändert per send_file ausgeliefert
+MAX_CACHE_BYTES = 32 * 1024 * 1024
+# Obergrenze für alle Varianten zusammen je Prozess (älteste zuerst verworfen)
+MAX_GESAMT_BYTES = 64 * 1024 * 1024
+GZIP_STUFE = 6
+BROTLI_QUALITAET = 11
+
+_lock = threading.Lock()
+# data_dir -> (mtime_ns des Ordners, Diagramm-Liste)
+_diagramme: dict[str, tuple[int, list[dict]]] = {}
+# Pfad -> SvgVarianten (LRU)
+_varianten: OrderedDict[str, SvgVarianten] = OrderedDict()
+_gesamt_bytes = 0
+# Pfade, deren Brotli-Variante gerade im Hintergrund entsteht
+_brotli_laeuft: set[str] = set()
+
+_KOMMENTAR = re.compile(rb'<!--.*?-->', re.S)
+# Bereiche, deren Leerraum bedeutsam ist bzw. die nicht angefasst werden
+_GESCHUETZT = re.compile(rb'<!\[CDATA\[.*?\]\]>|<(script|style)\b.*?</\1\s*>', re.S | re.I)
+_ZWISCHEN_TAGS = re.compile(rb'>\s+<')
+
+
+@dataclass(frozen=True)
+class SvgVarianten:
+    schluessel: tuple[int, int]
+    etag: str
+    roh: bytes
+    gzip: bytes
+    br: bytes | None
+
+    @property
+    def groesse(self) -> int:
+        return len(self.roh) + len(self.gzip) + len(self.br or b'')
+
+    def fuer_kodierung(self, kodierung: str | None) -> bytes:
+        if kodierung == 'br':
+            return self.br
+        if kodierung == 'gzip':
+            return self.gzip
+        return self.roh
+
+
+def svg_minimieren(inhalt: bytes) -> bytes:
+    """Kommentare entfernen und Einrückung zwischen Tags auf ein Leerzeichen kürzen.
+
+    Dateien mit ``xml:space`` bleiben unverändert; CDATA, ``<script>`` und ``<style>`` ebenso.
+    """
+    if b'xml:space' in inhalt:
+        return inhalt
+    teile = []
+    pos = 0
+    for m in _GESCHUETZT.finditer(inhalt):
+        teile.append(_abschnitt_minimieren(inhalt[pos:m.start()]))
+        teile.append(m.group(0))
+        pos = m.end()
+    teile.append(_abschnitt_minimieren(inhalt[pos:]))
+    return b''.join(teile).strip()
+
+
+def _abschnitt_minimieren(text: bytes) -> bytes:
+    # Ein Leerzeichen bleibt stehen: zwischen <tspan>-Elementen ist es sichtbar
+    return _ZWISCHEN_TAGS.sub(b'> <', _KOMMENTAR.sub(b'', text))
+
+
+def diagramme(data_dir: str, bauen) -> list[dict]:
+    """Diagramm-Liste aus ``bauen()``; neu gebaut nur, wenn sich die mtime des Ordners ändert."""
+    try:
+        mtime = os.stat(data_dir).st_mtime_ns if data_dir else None
+    except OSError:
+        mtime = None
+    if mtime is None:
+        return bauen()
+    with _lock:
+        eintrag = _diagramme.get(data_dir)
+    if eintrag and eintrag[0] == mtime:
+        return eintrag[1]
+    liste = bauen()
+    with _lock:
+        _diagramme[data_dir] = (mtime, liste)
+    return liste
+
+
+def svg_varianten(pfad: str) -> SvgVarianten | None:
+    """Minimierte und komprimierte Varianten der Datei; None bei Lesefehler oder zu großer Datei."""
+    try:
+        st = os.stat(pfad)
+    except OSError:
+        return None
+    schluessel = (st.st_mtime_ns, st.st_size)
+    with _lock:
+        vorhanden = _varianten.get(pfad)
+        if vorhanden is not None and vorhanden.schluessel == schluessel:
+            _varianten.move_to_end(pfad)
+            return vorhanden
+    if st.st_size > MAX_CACHE_BYTES:
+        return None
+    try:
+        with open(pfad, 'rb') as f:
+            inhalt = f.read()
+    except OSError as e:
+        log.warning('Technik-Layout %s nicht lesbar: %s', pfad, e)
+        return None
+
+    roh = svg_minimieren(inhalt)
+    varianten = SvgVarianten(
+        schluessel=schluessel,
+        etag=hashlib.sha256(roh).hexdigest()[:32],
+        roh=roh,
+        gzip=gzip.compress(roh, compresslevel=GZIP_STUFE, mtime=0),
+        br=None,
+    )
+    log.debug(
+        'Technik-Layout %s: %d -> %d Bytes minimiert, %d gzip', pfad, len(inhalt), len(roh), len(varianten.gzip)
+    )
+    _ablegen(pfad, varianten)
+    if brotli is not None:
+        with _lock:
+            starten = pfad not in _brotli_laeuft
+            _brotli_laeuft.add(pfad)
+        if starten:
+            _im_hintergrund(_brotli_nachreichen, pfad, varianten)
+    return varianten
+
+
+def _ablegen(pfad: str, varianten: SvgVarianten) -> None:
+    global _gesamt_bytes
+    with _lock:
+        alt = _varianten.pop(pfad, None)
+        if alt is not None:
+            _gesamt_bytes -= alt.groesse
+        _varianten[pfad] = varianten
+        _gesamt_bytes += varianten.groesse
+        while _gesamt_bytes > MAX_GESAMT_BYTES and len(_varianten) > 1:
+            _, verworfen = _varianten.popitem(last=False)
+            _gesamt_bytes -= verworfen.groesse
+
+
+def _brotli_nachreichen(pfad: str, varianten: SvgVarianten) -> None:
+    """Brotli-Variante berechnen und eintragen, sofern die Datei inzwischen nicht geändert wurde."""
+    try:
+        br = brotli.compress(varianten.roh, quality=BROTLI_QUALITAET)
+        with _lock:
+            aktuell = _varianten.get(pfad)
+        if aktuell is not None and aktuell.schluessel == varianten.schluessel and aktuell.br is None:
+            _ablegen(pfad, replace(aktuell, br=br))
+    except Exception as e:
+        log.warning('Technik-Layout %s: Brotli fehlgeschlagen: %s', pfad, e)
+    finally:
+        with _lock:
+            _brotli_laeuft.discard(pfad)
+
+
+def _im_hintergrund(ziel, *args) -> None:
+    threading.Thread(target=ziel, args=args, name='bis-layout-brotli', daemon=True).start()
+
+
+def cache_leeren() -> None:
+    global _gesamt_bytes
+    with _lock:
+        _diagramme.clear()
+        _varianten.clear()
+        _gesamt_bytes = 0
@@ -1,6 +1,18 @@
 """
-MQTT-Leader (Redis-Lock) + Beleuchtung-Handler; Redis-Pub-Sub-Listener in jedem Worker.
-Wird pro Gunicorn-Worker bzw. Dev-Prozess gestartet.
+MQTT-Ingest (Leader per Redis-Lock mit Fencing-Token) + Beleuchtung-Handler; in jedem Web-Worker
+ein Leser des Redis-Streams (Beleuchtung) und ein Pub/Sub-Listener (Benachrichtigungen).
+
+Der Ingest läuft entweder in einem der Gunicorn-Worker (Standard, wer den Lock bekommt) oder mit
+``TECHNIK_INGEST_EXTERN=true`` nur im eigenen Prozess ``flask --app app technik-ingest``; die
+Web-Worker lesen dann ausschließlich.
+
+Jede Übernahme der Leitung zieht per ``INCR`` ein neues Fencing-Token; Schreibzugriffe (Hash +
+Stream) prüft ein Lua-Skript gegen den aktuellen Lock, ein abgelöster Leader (z. B. nach einer
+Pause länger als die TTL) kann also nichts mehr überschreiben. Ist im Admin eine MQTT-Client-ID
+eingetragen, nutzt der Client sie mit persistenter Session (QoS 1): Der Broker hält Nachrichten
+während eines Leader-Wechsels vor, der neue Leader bekommt sie nachgeliefert. Ohne Eintrag gilt
+eine Client-ID je Host und Prozess ohne Session (zwei Installationen am selben Broker würden
+sich mit derselben festen ID gegenseitig trennen).
 """
 
 from __future__ import annotations
@@ -8,6 +20,8 @@ from __future__ import annotations
 import json
 import logging
 import os
+import signal
+import socket
 import threading
 import time
 
@@ -15,12 +29,15 @@ import redis
 from redis.exceptions import RedisError
 
 from utils.beleuchtung_redis import (
-    REDIS_CHANNEL_BELEUCHTUNG,
     REDIS_HASH_BELEUCHTUNG,
+    REDIS_STREAM_BELEUCHTUNG,
+    REDIS_STREAM_MAXLEN,
     get_redis_connection_for_technik,
 )
 from modules.technik.beleuchtung_parse import normalize_symcon_payload, parse_topic_lamp_id
-from modules.technik.sse_broadcast import broadcast_dict, count_subscribers
+from modules.technik.beleuchtung_verlauf import erfassen as verlauf_erfassen
+from modules.technik.sse_broadcast import broadcast_dict, count_subscribers, resync_anfordern
+from utils.benachrichtigungen_live import REDIS_CHANNEL_BENACHRICHTIGUNGEN, verteilen_redis_nachricht
 
 log = logging.getLogger('bis.mqtt')
 
@@ -44,8 +61,37 @@ _config_cache_ts: float = 0.0
 _CACHED_TTL = 5.0
 
 LEADER_REDIS_KEY = 'bis:mqtt:leader'
+# Steigt bei jeder Übernahme; der Lock enthält "<token>:<host>:<pid>"
+LEADER_TOKEN_KEY = 'bis:mqtt:leader:token'
 LEADER_TTL_S = 25
 
+# Token der aktuellen Leitung dieses Prozesses (None = nicht Leader)
+_fencing_token: int | None = None
+
+_LUA_VERLAENGERN = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+_LUA_FREIGEBEN = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# KEYS: Lock, Hash, Stream; ARGV: Token, lamp_id, Event-JSON, Stream-Länge
+_LUA_SCHREIBEN = """
+local v = redis.call('GET', KEYS[1])
+if not v or string.sub(v, 1, #ARGV[1] + 1) ~= ARGV[1] .. ':' then
+    return 0
+end
+redis.call('HSET', KEYS[2], ARGV[2], ARGV[3])
+return redis.call('XADD', KEYS[3], 'MAXLEN', '~', ARGV[4], '*', 'event', ARGV[3])
+"""
+
 
 def set_flask_app(app) -> None:
     """Von app.py einmalig setzen, damit Hintergrund-Threads DB-Config lesen dürfen."""
@@ -80,22 +126,46 @@ def _get_mqtt_konfiguration_cached() -> dict | None:
     return _config_cache
 
 
-def ensure_mqtt_leader(redis_c: redis.Redis, my_pid: int) -> bool:
+def leader_ident() -> str:
+    """Kennung dieses Prozesses im Lock (Host + PID, eindeutig auch über mehrere Server)."""
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def ensure_mqtt_leader(redis_c: redis.Redis, ident: str) -> int | None:
+    """Fencing-Token, solange ``ident`` Leader ist (Lock wird verlängert); sonst None."""
     try:
         v = redis_c.get(LEADER_REDIS_KEY)
-        if v is not None and str(v) == str(my_pid):
-            redis_c.expire(LEADER_REDIS_KEY, LEADER_TTL_S)
-            return True
-        ok = redis_c.set(LEADER_REDIS_KEY, str(my_pid), nx=True, ex=LEADER_TTL_S)
-        return bool(ok)
+        if v is not None:
+            token, _, inhaber = str(v).partition(':')
+            if inhaber != ident or not token.isdigit():
+                return None
+            # Nur verlängern, wenn der Lock zwischen GET und EXPIRE nicht gewechselt hat
+            if redis_c.eval(_LUA_VERLAENGERN, 1, LEADER_REDIS_KEY, v, LEADER_TTL_S):
+                return int(token)
+            return None
+        token = int(redis_c.incr(LEADER_TOKEN_KEY))
+        if redis_c.set(LEADER_REDIS_KEY, f'{token}:{ident}', nx=True, ex=LEADER_TTL_S):
+            return token
+        return None
     except RedisError as e:
         log.debug('Redis leader: %s', e)
-        return False
+        return None
+
+
+def zustand_schreiben(redis_c: redis.Redis, token: int, lamp_id: str, event: dict) -> str | None:
+    """Zustand in Hash + Stream schreiben, nur mit gültigem Fencing-Token; gibt die Stream-ID zurück."""
+    daten = json.dumps(event, ensure_ascii=False, default=str)
+    ergebnis = redis_c.eval(
+        _LUA_SCHREIBEN, 3, LEADER_REDIS_KEY, REDIS_HASH_BELEUCHTUNG, REDIS_STREAM_BELEUCHTUNG,
+        token, lamp_id, daten, REDIS_STREAM_MAXLEN,
+    )
+    return ergebnis if ergebnis not in (0, None) else None
 
 
 def _stop_mqtt_client() -> None:
-    global _mqtt_client
+    global _mqtt_client, _fencing_token
     with _mqtt_lock:
+        _fencing_token = None
         m = _mqtt_client
         _mqtt_client = None
     if m is not None:
@@ -132,23 +202,23 @@ def _build_on_message(cfg_prefix: str):
             return
         norm = normalize_symcon_payload(pl)
         on = norm.get('on')
+        # Verlauf unabhängig von Redis; nur Queue, geschrieben wird im Verlauf-Thread
+        verlauf_erfassen(lamp_id, on)
+        token = _fencing_token
+        if token is None:
+            log.debug('MQTT: keine Leitung mehr, topic=%r verworfen', topic)
+            return
         r = get_redis_connection_for_technik()
         if not r:
-            log.warning('MQTT: Redis nicht erreichbar (HSET/PUBLISH übersprungen) für topic=%r lamp_id=%s', topic, lamp_id)
+            log.warning('MQTT: Redis nicht erreichbar (HSET/XADD übersprungen) für topic=%r lamp_id=%s', topic, lamp_id)
             return
         event = {'lamp_id': lamp_id, 'state': norm}
         try:
-            r.hset(
-                REDIS_HASH_BELEUCHTUNG,
-                lamp_id,
-                json.dumps(event, ensure_ascii=False, default=str),
-            )
-            r.publish(
-                REDIS_CHANNEL_BELEUCHTUNG,
-                json.dumps(event, ensure_ascii=False, default=str),
-            )
+            if zustand_schreiben(r, token, lamp_id, event) is None:
+                log.warning('MQTT: Fencing-Token %s abgelöst, Schreiben für lamp_id=%s abgewiesen', token, lamp_id)
+                return
         except RedisError as e:
-            log.warning('Redis HSET/PUBLISH: %s', e)
+            log.warning('Redis HSET/XADD: %s', e)
             return
         if _mqtt_verbose():
             log.info('MQTT vollständig: topic=%r lamp_id=%r on=%r event=%s', topic, lamp_id, on, json.dumps(event, default=str)[:800])
@@ -163,7 +233,7 @@ def _build_on_connect(sub_topic: str):
         if getattr(reason_code, 'is_failure', False):
             log.warning('MQTT on_connect: %s', reason_code)
             return
-        client.subscribe(sub_topic, qos=0)
+        client.subscribe(sub_topic, qos=1)
         log.info('MQTT abonniert: %r', sub_topic)
 
     return _cb
@@ -181,6 +251,18 @@ def _decrypt_mqtt_password(cfg: dict) -> str | None:
     return decrypt_text(raw, sk)
 
 
+def mqtt_client_id(cfg: dict) -> tuple[str, bool]:
+    """(Client-ID, persistente Session) für den Broker.
+
+    Nur eine ausdrücklich konfigurierte ID bekommt eine persistente Session; sie muss je
+    Installation eindeutig sein. Sonst Host + PID mit frischer Session (keine Nachlieferung).
+    """
+    cid = (cfg.get('MqttClientId') or '').strip()
+    if cid:
+        return cid, True
+    return f'bis-technik-{socket.gethostname()}-{os.getpid()}', False
+
+
 def _start_mqtt_if_leader(cfg: dict) -> None:
     global _mqtt_client
     import paho.mqtt.client as mqtt
@@ -198,12 +280,13 @@ def _start_mqtt_if_leader(cfg: dict) -> None:
         ca = (cfg.get('CaPfad') or '').strip() or None
         user = (cfg.get('Benutzername') or '').strip() or None
         pw = _decrypt_mqtt_password(cfg) or ''
-        base_cid = (cfg.get('MqttClientId') or '').strip() or 'bis-technik'
-        cid = f'{base_cid}-{os.getpid()}'
+        # Mit konfigurierter Client-ID persistente Session: Broker liefert QoS-1-Nachrichten aus der Wechselpause nach
+        cid, persistent = mqtt_client_id(cfg)
         c = mqtt.Client(
             callback_api_version=mqtt.CallbackAPIVersion.VERSION2,
             client_id=cid,
             protocol=mqtt.MQTTv311,
+            clean_session=not persistent,
         )
         sub_topic = f'{prefix.rstrip("/")}/#'
         c.on_message = _build_on_message(prefix)
@@ -217,12 +300,13 @@ def _start_mqtt_if_leader(cfg: dict) -> None:
         c.connect(host, port, keepalive=30)
         c.loop_start()
         _mqtt_client = c
-        log.info('MQTT verbunden, subscribe %s', sub_topic)
+        log.info('MQTT verbunden als %r (persistente Session: %s), subscribe %s', cid, persistent, sub_topic)
 
 
 def _supervisor_run():
-    global _no_redis_logged, _not_leader_logged, _supervisor_unreach_logged
+    global _no_redis_logged, _not_leader_logged, _supervisor_unreach_logged, _fencing_token
     my_pid = os.getpid()
+    ident = leader_ident()
     while not _shutdown:
         r = get_redis_connection_for_technik()
         if not r:
@@ -256,7 +340,8 @@ def _supervisor_run():
             continue
         _supervisor_unreach_logged = False
         try:
-            if not ensure_mqtt_leader(r, my_pid):
+            token = ensure_mqtt_leader(r, ident)
+            if token is None:
                 if not _not_leader_logged or _mqtt_verbose():
                     lock_val = r.get(LEADER_REDIS_KEY)
                     if isinstance(lock_val, (bytes, bytearray)):
@@ -270,6 +355,12 @@ def _supervisor_run():
                 _stop_mqtt_client()
             else:
                 _not_leader_logged = False
+                if token != _fencing_token:
+                    if _mqtt_client is not None:
+                        # Lock zwischendurch verloren und neu erhalten: Verbindung gehört zum alten Token
+                        _stop_mqtt_client()
+                    log.info('Technik: MQTT-Leitung übernommen (Fencing-Token %s, %s)', token, ident)
+                    _fencing_token = token
                 cfg = _get_mqtt_konfiguration_cached()
                 if cfg and int(cfg.get('Aktiv') or 0) and (cfg.get('BrokerHost') or '').strip():
                     _start_mqtt_if_leader(cfg)
@@ -284,6 +375,62 @@ def _supervisor_run():
         time.sleep(1.0)
 
 
+def _stream_id(eid: str) -> tuple[int, int]:
+    ms, _, seq = str(eid).partition('-')
+    return int(ms), int(seq or 0)
+
+
+def stream_weiterlesen(r: redis.Redis, letzte_id: str | None, block_ms: int | None = 25000) -> str:
+    """Neue Stream-Einträge an die SSE-Clients dieses Prozesses verteilen; gibt die letzte gelesene ID zurück.
+
+    ``letzte_id=None``: ab dem aktuellen Ende; ``block_ms=None``: nicht warten. Fehlt die zuletzt
+    gelesene ID im Stream (inzwischen gekürzt), gab es eine Lücke: alle Clients laden den
+    vollständigen Stand neu.
+    """
+    if letzte_id is None:
+        ende = r.xrevrange(REDIS_STREAM_BELEUCHTUNG, count=1)
+        return ende[0][0] if ende else '0-0'
+    if letzte_id != '0-0' and not r.xrange(REDIS_STREAM_BELEUCHTUNG, letzte_id, letzte_id, count=1):
+        erste = r.xrange(REDIS_STREAM_BELEUCHTUNG, count=1)
+        if erste and _stream_id(erste[0][0]) > _stream_id(letzte_id):
+            # Erst das Ende merken, dann Resync: Der neu geladene Stand enthält alles bis dahin,
+            # spätere Einträge kommen regulär über den Stream (nichts doppelt in den SSE-Puffer)
+            ende = r.xrevrange(REDIS_STREAM_BELEUCHTUNG, count=1)
+            n = resync_anfordern()
+            log.info('Redis-Stream: Lücke nach %s, Resync für %d Abonnenten (PID %s)', letzte_id, n, os.getpid())
+            return ende[0][0] if ende else letzte_id
+    antwort = r.xread({REDIS_STREAM_BELEUCHTUNG: letzte_id}, count=500, block=block_ms)
+    for _name, eintraege in antwort or []:
+        for eid, felder in eintraege:
+            letzte_id = eid
+            try:
+                o = json.loads(felder.get('event') or '')
+            except (json.JSONDecodeError, TypeError) as je:
+                log.warning('Redis-Stream: ungültiges JSON in %s: %s', eid, je)
+                continue
+            n = count_subscribers()
+            broadcast_dict(o)
+            if _mqtt_verbose():
+                log.info('Redis-Stream -> SSE: lamp_id=%r, %d Abonnenten (PID %s)', o.get('lamp_id', '?'), n, os.getpid())
+    return letzte_id
+
+
+def _redis_stream_run():
+    """Beleuchtung: Redis-Stream lesen; nach Abbruch ab der letzten ID weiter (keine verlorenen Meldungen)."""
+    letzte_id = None
+    while not _shutdown:
+        r = get_redis_connection_for_technik()
+        if not r:
+            time.sleep(2)
+            continue
+        try:
+            while not _shutdown:
+                letzte_id = stream_weiterlesen(r, letzte_id)
+        except (RedisError, OSError) as e:
+            log.info('Redis-Stream: Verbindung ab (%s), lese ab %s weiter.', e, letzte_id)
+            time.sleep(1)
+
+
 def _redis_pubsub_run():
     global _pubsub_unreach_logged
     while not _shutdown:
@@ -309,8 +456,8 @@ def _redis_pubsub_run():
         _pubsub_unreach_logged = False
         try:
             p = r.pubsub(ignore_subscribe_messages=True)
-            p.subscribe(REDIS_CHANNEL_BELEUCHTUNG)
-            log.info('Redis Pub/Sub: Kanal %r abonniert (PID %s)', REDIS_CHANNEL_BELEUCHTUNG, os.getpid())
+            p.subscribe(REDIS_CHANNEL_BENACHRICHTIGUNGEN)
+            log.info('Redis Pub/Sub: Kanal %r abonniert (PID %s)', REDIS_CHANNEL_BENACHRICHTIGUNGEN, os.getpid())
             for m in p.listen():
                 if _shutdown:
                     break
@@ -328,20 +475,7 @@ def _redis_pubsub_run():
                 except (json.JSONDecodeError, TypeError) as je:
                     log.warning('Redis Pub/Sub: ungültiges JSON: %s', je)
                     continue
-                n = count_subscribers()
-                broadcast_dict(o)
-                lid = o.get('lamp_id', '?')
-                if _mqtt_verbose():
-                    if n > 0:
-                        log.info('Redis Pub/Sub -> SSE: lamp_id=%r, %d Abonnenten (PID %s)', lid, n, os.getpid())
-                    else:
-                        log.info(
-                            'Redis Pub/Sub: lamp_id=%r, 0 Abonnenten in diesem Prozess (Gunicorn: anderer Worker hat den Stream; PID %s)',
-                            lid,
-                            os.getpid(),
-                        )
-                else:
-                    log.debug('Redis Pub/Sub -> push lamp_id=%r subs=%d', lid, n)
+                verteilen_redis_nachricht(o)
         except (RedisError, OSError) as e:
             log.info('Redis pubsub: Verbindung ab (%s), Schleife startet neu.', e)
             time.sleep(1)
@@ -351,6 +485,13 @@ _threads_started = False
 _threads_lock = threading.Lock()
 
 
+def _ingest_extern() -> bool:
+    """True: MQTT-Ingest läuft nur in ``flask technik-ingest``, Web-Worker lesen ausschließlich."""
+    if _flask_app is None:
+        return False
+    return bool(_flask_app.config.get('TECHNIK_INGEST_EXTERN'))
+
+
 def start_technik_mqtt_threads():
     global _threads_started, _shutdown
     with _threads_lock:
@@ -358,11 +499,18 @@ def start_technik_mqtt_threads():
             return
         _threads_started = True
         _shutdown = False
-    t1 = threading.Thread(target=_supervisor_run, name='bis-mqtt-supervisor', daemon=True)
-    t2 = threading.Thread(target=_redis_pubsub_run, name='bis-redis-pubsub', daemon=True)
-    t1.start()
-    t2.start()
-    log.info('Technik-MQTT-Hintergrundthreads gestartet (PID %s)', os.getpid())
+    threads = [
+        threading.Thread(target=_redis_stream_run, name='bis-redis-stream', daemon=True),
+        threading.Thread(target=_redis_pubsub_run, name='bis-redis-pubsub', daemon=True),
+    ]
+    if not _ingest_extern():
+        threads.append(threading.Thread(target=_supervisor_run, name='bis-mqtt-supervisor', daemon=True))
+    for t in threads:
+        t.start()
+    log.info(
+        'Technik-MQTT-Hintergrundthreads gestartet (PID %s, Ingest %s)',
+        os.getpid(), 'extern' if _ingest_extern() else 'im Worker',
+    )
 
 
 def stop_technik_mqtt_threads():
@@ -370,3 +518,31 @@ def stop_technik_mqtt_threads():
     _shutdown = True
     _stop_mqtt_client()
     _threads_started = False
+
+
+def technik_ingest_ausfuehren() -> None:
+    """Eigenständiger Ingest-Prozess (``flask technik-ingest``): MQTT-Leitung im Vordergrund bis SIGTERM/SIGINT."""
+    global _shutdown
+
+    def _beenden(signum, frame):
+        global _shutdown
+        log.info('Technik-Ingest: Signal %s, beende (PID %s)', signum, os.getpid())
+        _shutdown = True
+
+    signal.signal(signal.SIGTERM, _beenden)
+    signal.signal(signal.SIGINT, _beenden)
+    _shutdown = False
+    log.info('Technik-Ingest gestartet (%s)', leader_ident())
+    try:
+        _supervisor_run()
+    finally:
+        _stop_mqtt_client()
+        # Lock sofort freigeben statt die TTL abzuwarten (nur den eigenen)
+        r = get_redis_connection_for_technik()
+        if r is not None:
+            try:
+                v = r.get(LEADER_REDIS_KEY)
+                if v is not None and str(v).partition(':')[2] == leader_ident():
+                    r.eval(_LUA_FREIGEBEN, 1, LEADER_REDIS_KEY, v)
+            except RedisError:
+                pass
@@ -4,9 +4,10 @@ Routen für Technik (SVG-Übersichten).
 
 import json
 import os
-import queue
 import logging
 import re
+import time
+from datetime import datetime, timezone
 
 from flask import (
     Response,
@@ -15,7 +16,6 @@ from flask import (
     jsonify,
     render_template,
     request,
-    send_file,
     stream_with_context,
     url_for,
 )
@@ -29,8 +29,17 @@ from utils.beleuchtung_redis import (
 
 # Kurzes Connect-Timeout für Web-Anfragen (kein Blockieren im Sekundenbereich, wenn Redis aus ist)
 _REDIS_CONNECT_TIMEOUT_HTTP = 0.2
+from utils.datei_auslieferung import sende_anhang
 from utils.decorators import login_required, menue_zugriff_erforderlich
-from modules.technik.sse_broadcast import count_subscribers, register_subscriber, unregister_subscriber
+from modules.technik import beleuchtung_verlauf, layout_cache
+from modules.technik.sse_broadcast import (
+    RESYNC,
+    count_subscribers,
+    kennzahlen as sse_kennzahlen,
+    naechste_meldungen,
+    register_subscriber,
+    unregister_subscriber,
+)
 from modules.technik.mqtt_commands import publish_beleuchtung_command
 
 from . import technik_bp
@@ -453,13 +462,18 @@ def _normalize_layout_stem(stem: str) -> str:
 
 
 def _build_layout_diagramme() -> list[dict]:
+    """Diagramme des Layout-Ordners (zwischengespeichert, neu bei geänderter Ordner-mtime)."""
+    data_dir = (current_app.config.get('TECHNIK_LAYOUTS_FOLDER') or '').strip()
+    return layout_cache.diagramme(data_dir, lambda: _layout_diagramme_aus_ordner(data_dir))
+
+
+def _layout_diagramme_aus_ordner(data_dir: str) -> list[dict]:
     known_by_stem = {}
     for d in TECHNIK_STANDARD_DIAGRAMME:
         stem = _normalize_layout_stem(os.path.splitext(d.get('layout_filename') or '')[0])
         if stem:
             known_by_stem[stem] = d
 
-    data_dir = (current_app.config.get('TECHNIK_LAYOUTS_FOLDER') or '').strip()
     files = []
     if data_dir and os.path.isdir(data_dir):
         try:
@@ -508,12 +522,9 @@ def _resolve_technik_layout_file(diagram: dict) -> str | None:
         return None
     if not name.lower().endswith('.svg'):
         return None
+    # Ordner legt create_all_upload_folders beim Start an
     data_dir = (current_app.config.get('TECHNIK_LAYOUTS_FOLDER') or '').strip()
     if data_dir:
-        try:
-            os.makedirs(data_dir, exist_ok=True)
-        except OSError:
-            pass
         p = os.path.join(data_dir, name)
         if os.path.isfile(p):
             return p
@@ -531,7 +542,35 @@ def technik_layout_svg(diagram_id: str):
     path = _resolve_technik_layout_file(d)
     if not path:
         abort(404)
-    return send_file(path, mimetype='image/svg+xml', max_age=0)
+    max_age = int(current_app.config.get('TECHNIK_LAYOUT_MAX_AGE', 300))
+    varianten = layout_cache.svg_varianten(path)
+    if varianten is None:
+        # Sehr große oder gerade nicht lesbare Datei: unverändert ausliefern
+        return sende_anhang(path, mimetype='image/svg+xml', max_age=max_age)
+
+    # Layouts sind im Daten-Volume editierbar: kurz privat cachen, danach per ETag revalidieren
+    kodierung = _svg_kodierung(varianten)
+    etag = varianten.etag + {'br': '-br', 'gzip': '-gz'}.get(kodierung, '')
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = current_app.response_class(varianten.fuer_kodierung(kodierung), mimetype='image/svg+xml')
+        if kodierung:
+            response.headers['Content-Encoding'] = kodierung
+    response.set_etag(etag)
+    response.vary.add('Accept-Encoding')
+    response.cache_control.private = True
+    response.cache_control.max_age = max_age
+    return response
+
+
+def _svg_kodierung(varianten) -> str | None:
+    """Beste vom Client akzeptierte Kodierung (br vor gzip), None = unkomprimiert."""
+    if varianten.br is not None and request.accept_encodings['br']:
+        return 'br'
+    if request.accept_encodings['gzip']:
+        return 'gzip'
+    return None
 
 
 @technik_bp.route('/uebersichten')
@@ -614,27 +653,67 @@ def beleuchtung_command():
     return jsonify({'ok': True, 'id': lamp_id, 'target_on': on_bool, 'topic': info})
 
 
+def _beleuchtung_stand(r) -> tuple[dict, bool]:
+    """Alle Lampen-Zustände aus dem Redis-Hash; (Zustände, Redis erreichbar)."""
+    st = {}
+    if not r:
+        return st, False
+    try:
+        h = r.hgetall(REDIS_HASH_BELEUCHTUNG)
+    except RedisError:
+        return {}, False
+    for k, v in h.items():
+        if not k:
+            continue
+        key = k if isinstance(k, str) else k.decode('utf-8', errors='replace')
+        try:
+            st[key] = json.loads(v)
+        except (json.JSONDecodeError, TypeError):
+            pass
+    return st, True
+
+
 @technik_bp.route('/beleuchtung/zustand')
 @login_required
 @menue_zugriff_erforderlich('technik_uebersichten')
 def beleuchtung_zustand():
     r = get_redis_connection_for_technik(connect_timeout=_REDIS_CONNECT_TIMEOUT_HTTP)
-    st = {}
-    if r:
-        try:
-            h = r.hgetall(REDIS_HASH_BELEUCHTUNG)
-            for k, v in h.items():
-                if not k:
-                    continue
-                key = k if isinstance(k, str) else k.decode('utf-8', errors='replace')
-                try:
-                    st[key] = json.loads(v)
-                except (json.JSONDecodeError, TypeError):
-                    pass
-            return jsonify({'ok': True, 'states': st})
-        except RedisError:
-            return jsonify({'ok': False, 'states': {}})
-    return jsonify({'ok': False, 'states': st})
+    st, ok = _beleuchtung_stand(r)
+    return jsonify({'ok': ok, 'states': st})
+
+
+def _zeitpunkt_param(name: str, standard: int) -> int:
+    """Unix-Sekunden oder ISO-Zeitpunkt (ohne Zone = UTC) aus dem Query-String."""
+    roh = (request.args.get(name) or '').strip()
+    if not roh:
+        return standard
+    if re.match(r'^\d+(\.\d+)?$', roh):
+        return int(float(roh))
+    dt = datetime.fromisoformat(roh.replace('Z', '+00:00'))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp())
+
+
+@technik_bp.route('/beleuchtung/verlauf')
+@login_required
+@menue_zugriff_erforderlich('technik_uebersichten')
+def beleuchtung_verlauf_abfrage():
+    """Einschaltstunden und Zeitverlauf je Lampe; ?von=&bis= (Standard: letzte 24 h), &punkte=, &lampen=1,2."""
+    try:
+        bis = _zeitpunkt_param('bis', int(time.time()))
+        von = _zeitpunkt_param('von', bis - 24 * 3600)
+        punkte = int(request.args.get('punkte') or 96)
+        lampen = [l for l in re.split(r'[,\s]+', request.args.get('lampen') or '') if l] or None
+        if lampen and not all(l.isdigit() for l in lampen):
+            raise ValueError('lampen')
+        verlauf = beleuchtung_verlauf.zeitverlauf(von, bis, punkte=punkte, lampen=lampen)
+        sekunden = beleuchtung_verlauf.einschaltdauer(von, bis, lampen=lampen)
+    except (ValueError, OverflowError, OSError):
+        # OverflowError/OSError: Zeitpunkte außerhalb dessen, was datetime darstellen kann
+        return jsonify({'ok': False, 'message': 'Ungültiger Zeitraum.'}), 400
+    verlauf['einschaltstunden'] = {k: round(v / 3600, 2) for k, v in sekunden.items()}
+    return jsonify({'ok': True, **verlauf})
 
 
 @technik_bp.route('/beleuchtung/stream')
@@ -642,27 +721,13 @@ def beleuchtung_zustand():
 @menue_zugriff_erforderlich('technik_uebersichten')
 def beleuchtung_stream():
     r = get_redis_connection_for_technik(connect_timeout=_REDIS_CONNECT_TIMEOUT_HTTP)
-    q = register_subscriber()
+    # Vor dem Anfangsstand registrieren: Meldungen dazwischen kommen doppelt, aber keine fehlt
+    abonnent = register_subscriber()
     n_after = count_subscribers()
 
     @stream_with_context
     def gen():
-        initial = {}
-        redis_live = False
-        if r:
-            try:
-                h = r.hgetall(REDIS_HASH_BELEUCHTUNG)
-                for k, v in h.items():
-                    if not k:
-                        continue
-                    key = k if isinstance(k, str) else k.decode('utf-8', errors='replace')
-                    try:
-                        initial[key] = json.loads(v)
-                    except (json.JSONDecodeError, TypeError):
-                        pass
-                redis_live = True
-            except RedisError:
-                initial = {}
+        initial, redis_live = _beleuchtung_stand(r)
         log_sse.info(
             'Beleuchtung SSE: Init (PID %s, lokale Abonnenten: %d, redis_ok=%s, remote=%s)',
             os.getpid(),
@@ -673,16 +738,32 @@ def beleuchtung_stream():
         try:
             yield f"event: init\ndata: {json.dumps({'ok': redis_live, 'states': initial}, ensure_ascii=False)}\n\n"
             while True:
-                try:
-                    line = q.get(timeout=25)
-                    yield f"data: {line}\n\n"
-                except queue.Empty:
+                meldungen = naechste_meldungen(abonnent, timeout=25)
+                if meldungen == RESYNC:
+                    # Client lag hinter dem Puffer: vollständigen Stand statt einzelner Meldungen mit Lücke
+                    stand, ok = _beleuchtung_stand(r)
+                    log_sse.info(
+                        'Beleuchtung SSE: Resync (PID %s, %d Meldungen übersprungen, bisher %d Resyncs)',
+                        os.getpid(), abonnent.verpasst, abonnent.resyncs,
+                    )
+                    yield f"event: resync\ndata: {json.dumps({'ok': ok, 'states': stand}, ensure_ascii=False)}\n\n"
+                elif meldungen:
+                    yield ''.join(f"id: {seq}\ndata: {line}\n\n" for seq, line in meldungen)
+                else:
                     yield ': keepalive\n\n'
         finally:
-            unregister_subscriber(q)
+            unregister_subscriber(abonnent)
             log_sse.info('Beleuchtung SSE: Stream beendet (PID %s, lokale Abonnenten: %d)', os.getpid(), count_subscribers())
 
     resp = Response(gen(), mimetype='text/event-stream')
     resp.headers['Cache-Control'] = 'no-cache'
     resp.headers['X-Accel-Buffering'] = 'no'
     return resp
+
+
+@technik_bp.route('/beleuchtung/stream/kennzahlen')
+@login_required
+@menue_zugriff_erforderlich('admin_mqtt')
+def beleuchtung_stream_kennzahlen():
+    """Fan-out-Zähler dieses Worker-Prozesses (Resyncs, übersprungene Meldungen, Nachzügler)."""
+    return jsonify({'ok': True, 'pid': os.getpid(), **sse_kennzahlen()})
@@ -1,47 +1,133 @@
-"""Prozesslokale Fan-out-Warteschlangen für SSE-Clients (Beleuchtung)."""
+"""
+Prozesslokaler Fan-out für SSE-Clients (Beleuchtung).
+
+Statt einer Queue je Client gibt es einen Ringpuffer der letzten ``PUFFER_GROESSE`` Meldungen
+mit fortlaufender Sequenznummer. ``broadcast_dict`` hängt nur an und weckt die wartenden Streams,
+unabhängig von der Zahl der Clients; jeder Abonnent liest ab seiner eigenen Position.
+
+Liegt ein Client so weit zurück, dass seine nächste Meldung schon aus dem Puffer gefallen ist,
+liefert ``naechste_meldungen`` statt einer Lücke ``RESYNC``: der Stream sendet dann den
+vollständigen Stand neu (Event ``resync``), der Client ist danach wieder konsistent. Dasselbe
+erzwingt ``resync_anfordern``, wenn schon die Quelle (Redis-Stream) eine Lücke hatte.
+``kennzahlen()`` zählt Resyncs, dabei übersprungene Meldungen und aktuell nachhängende Clients.
+"""
 
 from __future__ import annotations
 
+import itertools
 import json
-import queue
 import threading
+import time
+from collections import deque
 from typing import Any
 
-_sub_lock = threading.Lock()
-_subscribers: list[queue.Queue] = []
+PUFFER_GROESSE = 256
+# Ab diesem Rückstand gilt ein Client in den Kennzahlen als Nachzügler
+NACHZUEGLER_AB = PUFFER_GROESSE // 2
+
+RESYNC = 'resync'
+
+_cond = threading.Condition()
+_puffer: deque[tuple[int, str]] = deque(maxlen=PUFFER_GROESSE)
+_seq = 0
+_subscribers: set[Abonnent] = set()
+_resyncs = 0
+_verpasst = 0
+
+
+class Abonnent:
+    """Leseposition eines SSE-Streams (Sequenznummer der nächsten erwarteten Meldung)."""
+
+    __slots__ = ('position', 'resyncs', 'verpasst', 'resync')
+
+    def __init__(self, position: int):
+        self.position = position
+        self.resyncs = 0
+        self.verpasst = 0
+        self.resync = False
 
+    def rueckstand(self) -> int:
+        return max(0, _seq + 1 - self.position)
 
-def register_subscriber() -> queue.Queue:
-    q: queue.Queue = queue.Queue(maxsize=64)
-    with _sub_lock:
-        _subscribers.append(q)
-    return q
 
+def register_subscriber() -> Abonnent:
+    """Neuer Abonnent ab der nächsten Meldung (vor dem Lesen des Anfangsstands registrieren)."""
+    with _cond:
+        a = Abonnent(_seq + 1)
+        _subscribers.add(a)
+    return a
 
-def unregister_subscriber(q: queue.Queue) -> None:
-    with _sub_lock:
-        if q in _subscribers:
-            _subscribers.remove(q)
+
+def unregister_subscriber(a: Abonnent) -> None:
+    with _cond:
+        _subscribers.discard(a)
 
 
 def count_subscribers() -> int:
-    with _sub_lock:
+    with _cond:
         return len(_subscribers)
 
 
-def broadcast_dict(payload: dict[str, Any]) -> None:
+def broadcast_dict(payload: dict[str, Any]) -> int:
+    """Meldung an alle Streams dieses Prozesses; gibt ihre Sequenznummer zurück."""
+    global _seq
     line = json.dumps(payload, ensure_ascii=False)
-    with _sub_lock:
-        qs = list(_subscribers)
-    for q in qs:
-        try:
-            q.put_nowait(line)
-        except queue.Full:
-            try:
-                q.get_nowait()
-            except queue.Empty:
-                pass
-            try:
-                q.put_nowait(line)
-            except queue.Full:
-                pass
+    with _cond:
+        _seq += 1
+        _puffer.append((_seq, line))
+        _cond.notify_all()
+        return _seq
+
+
+def resync_anfordern() -> int:
+    """Alle Streams dieses Prozesses senden den vollständigen Stand neu (Quelle hatte eine Lücke)."""
+    with _cond:
+        for a in _subscribers:
+            a.resync = True
+        _cond.notify_all()
+        return len(_subscribers)
+
+
+def naechste_meldungen(a: Abonnent, timeout: float) -> list[tuple[int, str]] | str:
+    """Meldungen ab der Position von ``a`` als (Sequenz, JSON); [] nach ``timeout``, RESYNC bei Überlauf."""
+    global _resyncs, _verpasst
+    frist = time.monotonic() + timeout
+    with _cond:
+        while a.position > _seq and not a.resync:
+            rest = frist - time.monotonic()
+            if rest <= 0:
+                return []
+            _cond.wait(rest)
+        if a.resync:
+            a.resync = False
+            a.resyncs += 1
+            _resyncs += 1
+            a.position = _seq + 1
+            return RESYNC
+        aelteste = _puffer[0][0]
+        if a.position < aelteste:
+            luecke = aelteste - a.position
+            a.resyncs += 1
+            a.verpasst += luecke
+            _resyncs += 1
+            _verpasst += luecke
+            a.position = _seq + 1
+            return RESYNC
+        meldungen = list(itertools.islice(_puffer, a.position - aelteste, None))
+        a.position = _seq + 1
+        return meldungen
+
+
+def kennzahlen() -> dict[str, int]:
+    """Zähler dieses Prozesses seit dem Start (für Admin-Diagnose und Logs)."""
+    with _cond:
+        rueckstaende = [a.rueckstand() for a in _subscribers]
+        return {
+            'abonnenten': len(rueckstaende),
+            'sequenz': _seq,
+            'puffer': PUFFER_GROESSE,
+            'max_rueckstand': max(rueckstaende, default=0),
+            'nachzuegler': sum(1 for r in rueckstaende if r >= NACHZUEGLER_AB),
+            'resyncs': _resyncs,
+            'verpasst': _verpasst,
+        }
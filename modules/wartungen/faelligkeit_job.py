@@ -0,0 +1,152 @@
+"""
+Periodischer Fälligkeits-Job für Wartungspläne.
+
+Berechnet FaelligkeitStufe / ErinnerungFaellig aller Pläne in einem Durchlauf (Listen lesen
+nur noch die gespeicherten Werte) und erzeugt Erinnerungs-Benachrichtigungen – je Plan
+genau einmal pro Fälligkeitstermin (ErinnerungGesendetFuer).
+Wird pro Gunicorn-Worker bzw. Dev-Prozess gestartet; mehrere Worker dürfen parallel laufen,
+der Versand wird über ein bedingtes UPDATE pro Plan beansprucht.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from datetime import date
+
+from utils.database import get_db_connection
+from modules.wartungen.services import berechne_faelligkeit_status
+
+log = logging.getLogger('bis.wartungen')
+
+# Flask-App-Referenz für DB-Zugriff aus dem Hintergrund-Thread (siehe set_flask_app).
+_flask_app = None
+_stop_event = threading.Event()
+_thread_started = False
+_thread_lock = threading.Lock()
+
+
+def set_flask_app(app) -> None:
+    """Von app.py einmalig setzen, damit der Hintergrund-Thread die DB nutzen darf."""
+    global _flask_app
+    _flask_app = app
+
+
+def aktualisiere_faelligkeiten(conn, heute: date | None = None) -> int:
+    """Ein Durchlauf über alle Pläne; schreibt nur geänderte bzw. heute noch nicht berechnete Zeilen.
+    Gibt die Anzahl aktualisierter Pläne zurück."""
+    heute = heute or date.today()
+    heute_str = heute.isoformat()
+    rows = conn.execute('''
+        SELECT ID, NaechsteFaelligkeit, ErinnerungTageVor, IntervallAnzahl,
+               FaelligkeitStufe, ErinnerungFaellig, FaelligkeitBerechnetAm
+        FROM Wartungsplan
+    ''').fetchall()
+    updates = []
+    for r in rows:
+        stufe, erinnerung = berechne_faelligkeit_status(
+            r['NaechsteFaelligkeit'], r['ErinnerungTageVor'], r['IntervallAnzahl'], heute=heute,
+        )
+        berechnet = str(r['FaelligkeitBerechnetAm'] or '')[:10]
+        if stufe == r['FaelligkeitStufe'] and erinnerung == r['ErinnerungFaellig'] and berechnet == heute_str:
+            continue
+        updates.append((stufe, erinnerung, heute_str, r['ID']))
+    if updates:
+        conn.executemany(
+            '''UPDATE Wartungsplan SET FaelligkeitStufe = ?, ErinnerungFaellig = ?, FaelligkeitBerechnetAm = ?
+               WHERE ID = ?''',
+            updates,
+        )
+    return len(updates)
+
+
+def _beanspruche_erinnerung(conn, plan_id) -> bool:
+    """Markiert die Erinnerung für den aktuellen Fälligkeitstermin als versendet.
+    False, wenn ein anderer Worker/Lauf schneller war."""
+    cur = conn.execute('''
+        UPDATE Wartungsplan SET ErinnerungGesendetFuer = NaechsteFaelligkeit
+        WHERE ID = ? AND Aktiv = 1 AND ErinnerungFaellig = 1
+          AND NaechsteFaelligkeit IS NOT NULL
+          AND (ErinnerungGesendetFuer IS NULL OR ErinnerungGesendetFuer <> NaechsteFaelligkeit)
+    ''', (plan_id,))
+    return cur.rowcount == 1
+
+
+def versende_faellige_erinnerungen() -> int:
+    """Erinnerungen für alle aktiven Pläne mit erreichtem Erinnerungsfenster, die für den
+    aktuellen Fälligkeitstermin noch keine erhalten haben. Eine Transaktion pro Plan."""
+    from utils.benachrichtigungen import erstelle_benachrichtigung_fuer_wartung_erinnerung
+    from utils.benachrichtigungen_live import vorgemerkte_senden
+
+    with get_db_connection() as conn:
+        plan_ids = [
+            r['ID'] for r in conn.execute('''
+                SELECT p.ID FROM Wartungsplan p
+                JOIN Wartung w ON p.WartungID = w.ID
+                WHERE p.Aktiv = 1 AND w.Aktiv = 1 AND p.ErinnerungFaellig = 1
+                  AND p.NaechsteFaelligkeit IS NOT NULL
+                  AND (p.ErinnerungGesendetFuer IS NULL
+                       OR p.ErinnerungGesendetFuer <> p.NaechsteFaelligkeit)
+            ''').fetchall()
+        ]
+    gesendet = 0
+    for plan_id in plan_ids:
+        try:
+            with get_db_connection() as conn:
+                if not _beanspruche_erinnerung(conn, plan_id):
+                    continue
+                erstelle_benachrichtigung_fuer_wartung_erinnerung(plan_id, conn)
+                gesendet += 1
+            vorgemerkte_senden()
+        except Exception as e:
+            log.warning('Wartungserinnerung für Plan %s fehlgeschlagen: %s', plan_id, e)
+    return gesendet
+
+
+def fuehre_faelligkeits_lauf_aus() -> dict:
+    """Kompletter Lauf: Fälligkeiten neu berechnen, danach Erinnerungen verschicken."""
+    with get_db_connection() as conn:
+        aktualisiert = aktualisiere_faelligkeiten(conn)
+    erinnerungen = versende_faellige_erinnerungen()
+    if aktualisiert or erinnerungen:
+        log.info(
+            'Wartungs-Fälligkeiten: %d Pläne aktualisiert, %d Erinnerungen (PID %s)',
+            aktualisiert, erinnerungen, os.getpid(),
+        )
+    return {'aktualisiert': aktualisiert, 'erinnerungen': erinnerungen}
+
+
+def _job_run():
+    while not _stop_event.is_set():
+        app = _flask_app
+        intervall = 900
+        if app is not None:
+            intervall = int(app.config.get('WARTUNG_FAELLIGKEIT_INTERVALL_SEKUNDEN', 900))
+            try:
+                with app.app_context():
+                    fuehre_faelligkeits_lauf_aus()
+            except Exception as e:
+                log.warning('Wartungs-Fälligkeitslauf fehlgeschlagen: %s', e)
+        _stop_event.wait(max(intervall, 60))
+
+
+def start_faelligkeit_job_thread():
+    global _thread_started
+    app = _flask_app
+    if app is None or not app.config.get('WARTUNG_FAELLIGKEIT_JOB_AKTIV', True):
+        return
+    with _thread_lock:
+        if _thread_started:
+            return
+        _thread_started = True
+        _stop_event.clear()
+    t = threading.Thread(target=_job_run, name='bis-wartung-faelligkeit', daemon=True)
+    t.start()
+    log.info('Wartungs-Fälligkeits-Job gestartet (PID %s)', os.getpid())
+
+
+def stop_faelligkeit_job_thread():
+    global _thread_started
+    _stop_event.set()
+    _thread_started = False
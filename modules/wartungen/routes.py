@@ -11,7 +11,6 @@ from flask import (
     redirect,
     render_template,
     request,
-    send_from_directory,
     session,
     url_for,
 )
@@ -30,6 +29,9 @@ from utils.file_handling import (
     loesche_import_kopie_nach_upload,
     originale_loeschen_aus_formular,
 )
+from utils.bild_derivate import bild_derivat_antwort, derivate_im_hintergrund_erzeugen
+from utils.datei_auslieferung import nicht_geaendert_antwort, sende_anhang
+from utils.stammdaten_cache import get_stammdaten
 from modules.ersatzteile.services.datei_services import (
     get_dateien_fuer_bereich,
     speichere_datei,
@@ -132,8 +134,7 @@ def _jahresuebersicht_protokoll_query_args(jahr, bereich_id, gewerk_id, abteilun
 def _jahresmatrix_row_hat_faelligkeit(row):
     """Mind. ein aktiver Plan mit nächster Fälligkeit in den Badge-Stufen (innerhalb 7 Tage oder überfällig)."""
     for pm in row.get('aktive_plaene_meta') or []:
-        nf = pm.get('NaechsteFaelligkeit')
-        if nf and services.naechste_faelligkeit_stufe(nf) >= 1:
+        if pm.get('NaechsteFaelligkeit') and (pm.get('FaelligkeitStufe') or 0) >= 1:
             return True
     return False
 
@@ -462,15 +463,8 @@ def wartung_neu():
         return redirect(url_for('wartungen.wartung_liste'))
     mitarbeiter_id = session.get('user_id')
     with get_db_connection() as conn:
-        gewerke = conn.execute('''
-            SELECT g.ID, g.Bezeichnung, b.Bezeichnung AS Bereich
-            FROM Gewerke g JOIN Bereich b ON g.BereichID = b.ID
-            WHERE g.Aktiv = 1 AND b.Aktiv = 1
-            ORDER BY b.Bezeichnung, g.Bezeichnung
-        ''').fetchall()
-        abteilungen = conn.execute(
-            'SELECT ID, Bezeichnung FROM Abteilung WHERE Aktiv = 1 ORDER BY Sortierung, Bezeichnung'
-        ).fetchall()
+        gewerke = get_stammdaten('gewerke_aktiv', conn)
+        abteilungen = get_stammdaten('abteilungen_liste', conn, nur_aktiv=True)
         vorauswahl_gewerk_id = None
         if request.method == 'POST':
             gewerk_id = request.form.get('gewerk_id', type=int)
@@ -632,6 +626,7 @@ def wartung_datei_upload(wartung_id):
                     if not success_upload or error_message:
                         fehler.append(f'{original_filename}: {error_message}')
                         continue
+                    derivate_im_hintergrund_erzeugen(os.path.join(upload_folder, filename))
                     relative_path = f'Wartungen/{wartung_id}/{subfolder}/{filename}'
                     datei_typ_final = typ if typ else datei_typ
                     speichere_datei(
@@ -702,15 +697,8 @@ def wartung_bearbeiten(wartung_id):
             flash('Kein Zugriff auf diese Wartung.', 'danger')
             return redirect(url_for('wartungen.wartung_liste'))
         kann_edit = hat_wartung_stamm_bearbeiten(mitarbeiter_id, wartung_id, conn)
-        gewerke = conn.execute('''
-            SELECT g.ID, g.Bezeichnung, b.Bezeichnung AS Bereich
-            FROM Gewerke g JOIN Bereich b ON g.BereichID = b.ID
-            WHERE g.Aktiv = 1 AND b.Aktiv = 1
-            ORDER BY b.Bezeichnung, g.Bezeichnung
-        ''').fetchall()
-        abteilungen = conn.execute(
-            'SELECT ID, Bezeichnung FROM Abteilung WHERE Aktiv = 1 ORDER BY Sortierung, Bezeichnung'
-        ).fetchall()
+        gewerke = get_stammdaten('gewerke_aktiv', conn)
+        abteilungen = get_stammdaten('abteilungen_liste', conn, nur_aktiv=True)
         ga = [r['ID'] for r in services.get_wartung_abteilungen(conn, wartung_id)]
         if request.method == 'POST':
             if not kann_edit:
@@ -1292,9 +1280,7 @@ def durchfuehrung_neu(plan_id):
             WHERE Aktiv = 1 ORDER BY Nachname, Vorname
         ''').fetchall()
         fremdfirmen = services.list_fremdfirmen(conn, nur_aktiv=True)
-        kostenstellen = conn.execute(
-            'SELECT ID, Bezeichnung FROM Kostenstelle WHERE Aktiv = 1 ORDER BY Sortierung, Bezeichnung',
-        ).fetchall()
+        kostenstellen = get_stammdaten('kostenstellen', conn, nur_aktiv=True)
         if request.method == 'POST':
             speichern_aktion = (request.form.get('speichern_aktion') or 'detail').strip()
             dt = _parse_datetime_local(request.form.get('durchgefuehrt_am'))
@@ -1433,9 +1419,7 @@ def durchfuehrung_mehrere():
             WHERE Aktiv = 1 ORDER BY Nachname, Vorname
         ''').fetchall()
         fremdfirmen = services.list_fremdfirmen(conn, nur_aktiv=True)
-        kostenstellen = conn.execute(
-            'SELECT ID, Bezeichnung FROM Kostenstelle WHERE Aktiv = 1 ORDER BY Sortierung, Bezeichnung',
-        ).fetchall()
+        kostenstellen = get_stammdaten('kostenstellen', conn, nur_aktiv=True)
         if request.method == 'POST':
             speichern_aktion = (request.form.get('speichern_aktion') or '').strip()
             dt = _parse_datetime_local(request.form.get('durchgefuehrt_am'))
@@ -1711,9 +1695,7 @@ def durchfuehrung_detail(durchfuehrung_id):
         serviceberichte = get_dateien_fuer_bereich(
             BEREICH_TYP_WARTUNGSDURCHFUEHRUNG, durchfuehrung_id, conn
         )
-        kostenstellen = conn.execute(
-            'SELECT ID, Bezeichnung FROM Kostenstelle WHERE Aktiv = 1 ORDER BY Sortierung, Bezeichnung'
-        ).fetchall()
+        kostenstellen = get_stammdaten('kostenstellen', conn, nur_aktiv=True)
     return render_template(
         'wartungen/durchfuehrung_detail.html',
         d=d,
@@ -1784,6 +1766,9 @@ def durchfuehrung_datei(filepath):
     except ValueError:
         flash('Ungültiger Pfad.', 'danger')
         return redirect(url_for('wartungen.wartung_liste'))
+    nicht_geaendert = nicht_geaendert_antwort(filepath)
+    if nicht_geaendert is not None:
+        return nicht_geaendert
     mitarbeiter_id = session.get('user_id')
     with get_db_connection() as conn:
         if not hat_wartungsdurchfuehrung_zugriff(mitarbeiter_id, dfid, conn):
@@ -1805,7 +1790,10 @@ def durchfuehrung_datei(filepath):
     if not os.path.isfile(full_path):
         flash('Datei nicht gefunden.', 'danger')
         return redirect(url_for('wartungen.durchfuehrung_detail', durchfuehrung_id=dfid))
-    return send_from_directory(os.path.dirname(full_path), os.path.basename(full_path))
+    derivat = bild_derivat_antwort(full_path, request.args.get('groesse'))
+    if derivat is not None:
+        return derivat
+    return sende_anhang(full_path, filepath)
 
 
 @wartungen_bp.route(
@@ -1879,6 +1867,9 @@ def wartung_datei(filepath):
     if not filepath.startswith('Wartungen/'):
         flash('Ungültiger Pfad.', 'danger')
         return redirect(url_for('wartungen.wartung_liste'))
+    nicht_geaendert = nicht_geaendert_antwort(filepath)
+    if nicht_geaendert is not None:
+        return nicht_geaendert
     parts = filepath.split('/')
     mitarbeiter_id = session.get('user_id')
     if len(parts) >= 2:
@@ -1899,7 +1890,10 @@ def wartung_datei(filepath):
     if not os.path.isfile(full_path):
         flash('Datei nicht gefunden.', 'danger')
         return redirect(url_for('wartungen.wartung_liste'))
-    return send_from_directory(os.path.dirname(full_path), os.path.basename(full_path))
+    derivat = bild_derivat_antwort(full_path, request.args.get('groesse'))
+    if derivat is not None:
+        return derivat
+    return sende_anhang(full_path, filepath)
 
 
 @wartungen_bp.route('/datei-loeschen/<int:datei_id>', methods=['POST'])
@@ -9,6 +9,7 @@ from utils.abteilungen import (
     get_sichtbare_abteilungen_fuer_mitarbeiter,
 )
 from utils.db_sql import local_now_str, month_expr, upsert_ignore
+from utils.stammdaten_cache import get_stammdaten
 
 INTERVALL_EINHEITEN = ('Tag', 'Woche', 'Monat')
 ERINNERUNG_TAGE_VOR_MAX = 365
@@ -47,7 +48,7 @@ def _parse_termin_vereinbart_datum(raw, termin_vereinbart_ja):
     return s[:10]
 
 
-def _erinnerung_ueberschritten(naechste_faelligkeit_raw, erinnerung_tage_vor, intervall_anzahl):
+def _erinnerung_ueberschritten(naechste_faelligkeit_raw, erinnerung_tage_vor, intervall_anzahl, heute=None):
     """True, wenn heute der Beginn des Erinnerungsfensters erreicht/überschritten ist (Fälligkeit minus X Tage)."""
     if erinnerung_tage_vor is None:
         return False
@@ -66,7 +67,7 @@ def _erinnerung_ueberschritten(naechste_faelligkeit_raw, erinnerung_tage_vor, in
     due = _datum_aus_naechste_faelligkeit_feld(naechste_faelligkeit_raw)
     if due is None:
         return False
-    heute = date.today()
+    heute = heute or date.today()
     return heute >= (due - timedelta(days=tage))
 
 
@@ -158,7 +159,7 @@ def _datum_aus_naechste_faelligkeit_feld(wert):
     return None
 
 
-def naechste_faelligkeit_stufe(value):
+def naechste_faelligkeit_stufe(value, heute=None):
     """
     Nächste Fälligkeit (Datum) → Kennzeichnungsstufe wie in Tabellen/Badges.
     0 neutral, 1 innerhalb der nächsten 7 Tage, 2 heute bis 7 Tage überfällig,
@@ -171,7 +172,7 @@ def naechste_faelligkeit_stufe(value):
         d = datetime.strptime(s, '%Y-%m-%d').date()
     except ValueError:
         return 0
-    today = date.today()
+    today = heute or date.today()
     if d > today + timedelta(days=7):
         return 0
     if d > today:
@@ -181,6 +182,35 @@ def naechste_faelligkeit_stufe(value):
     return 3
 
 
+def berechne_faelligkeit_status(naechste_faelligkeit, erinnerung_tage_vor, intervall_anzahl, heute=None):
+    """(FaelligkeitStufe, ErinnerungFaellig) für einen Plan; Grundlage der vorberechneten Spalten."""
+    stufe = naechste_faelligkeit_stufe(naechste_faelligkeit, heute=heute)
+    erinnerung = _erinnerung_ueberschritten(
+        naechste_faelligkeit, erinnerung_tage_vor, intervall_anzahl, heute=heute,
+    )
+    return stufe, 1 if erinnerung else 0
+
+
+def aktualisiere_faelligkeit_status(conn, plan_id, heute=None):
+    """Schreibt FaelligkeitStufe/ErinnerungFaellig eines Plans sofort neu (nach Anlegen, Bearbeiten,
+    Durchführung), damit Listen nicht bis zum nächsten Lauf des Fälligkeits-Jobs veraltet sind."""
+    plan = conn.execute(
+        'SELECT NaechsteFaelligkeit, ErinnerungTageVor, IntervallAnzahl FROM Wartungsplan WHERE ID = ?',
+        (plan_id,),
+    ).fetchone()
+    if not plan:
+        return
+    heute = heute or date.today()
+    stufe, erinnerung = berechne_faelligkeit_status(
+        plan['NaechsteFaelligkeit'], plan['ErinnerungTageVor'], plan['IntervallAnzahl'], heute=heute,
+    )
+    conn.execute(
+        '''UPDATE Wartungsplan SET FaelligkeitStufe = ?, ErinnerungFaellig = ?, FaelligkeitBerechnetAm = ?
+           WHERE ID = ?''',
+        (stufe, erinnerung, heute.isoformat(), plan_id),
+    )
+
+
 def aktualisiere_naechste_faelligkeit_nach_durchfuehrung(conn, plan_id, durchgefuehrt_am):
     """Setzt NaechsteFaelligkeit aus Basisdatum + Intervall; nur bei aktivem Plan.
     Bei HatFestesIntervall: Basis = bisherige NaechsteFaelligkeit, sonst Durchführungstag (Fallback wie im Plan).
@@ -216,6 +246,7 @@ def aktualisiere_naechste_faelligkeit_nach_durchfuehrung(conn, plan_id, durchgef
            WHERE ID = ? AND Aktiv = 1''',
         (neu_str, plan_id),
     )
+    aktualisiere_faelligkeit_status(conn, plan_id)
     return neu_str
 
 
@@ -273,6 +304,45 @@ def _wartung_sichtbar_params(mitarbeiter_id, abteilung_ids):
     return [mitarbeiter_id] + abteilung_ids
 
 
+def _wartung_sichtbarkeit(conn, mitarbeiter_id, is_admin):
+    """(SQL-Bedingung ab ``AND``, Parameter) der Wartungs-Sichtbarkeit für Alias ``w``.
+    Admin: keine Einschränkung. None, wenn der Nutzer keine Abteilung hat (nichts sichtbar)."""
+    if is_admin:
+        return '', []
+    sichtbare = get_mitarbeiter_abteilungen(mitarbeiter_id, conn)
+    if not sichtbare:
+        return None
+    ph = ','.join(['?'] * len(sichtbare))
+    sql = f'''
+          AND (
+            w.ErstelltVonID = ?
+            OR w.ID IN (
+                SELECT WartungID FROM WartungAbteilungZugriff
+                WHERE AbteilungID IN ({ph})
+            )
+          )'''
+    return sql, _wartung_sichtbar_params(mitarbeiter_id, sichtbare)
+
+
+# Vorab aggregierte Join-Quellen statt korrelierter Unterabfragen pro Ergebniszeile.
+# Beide werden vollständig über abdeckende Indizes gelesen
+# (idx_wartungsdurchfuehrung_plan_datum bzw. idx_datei_bereich).
+_LETZTE_DURCHFUEHRUNG_JOIN = '''
+        LEFT JOIN (
+            SELECT WartungsplanID, MAX(DurchgefuehrtAm) AS LetzteDurchfuehrung
+            FROM Wartungsdurchfuehrung
+            GROUP BY WartungsplanID
+        ) ld ON ld.WartungsplanID = p.ID'''
+
+_DATEI_ANZAHL_JOIN = '''
+        LEFT JOIN (
+            SELECT BereichID, COUNT(*) AS DateiAnzahl
+            FROM Datei
+            WHERE BereichTyp = 'Wartungsdurchfuehrung'{einschraenkung}
+            GROUP BY BereichID
+        ) dz ON dz.BereichID = d.ID'''
+
+
 def _wartung_abteilung_sql(abteilung_id):
     """Nur Wartungen mit expliziter Freigabe für die gewählte Abteilung (WartungAbteilungZugriff)."""
     if abteilung_id is None:
@@ -627,7 +697,7 @@ def list_durchfuehrungen_chronologisch_sichtbar(
     col = _CHRONO_SORT_SQL_COL.get((sort_by or '').strip().lower(), _CHRONO_SORT_SQL_COL['id'])
     direc = _CHRONO_SORT_SQL_DIR.get((sort_dir or '').strip().lower(), 'DESC')
     tie = f', d.ID {direc}' if col == _CHRONO_SORT_SQL_COL['datum'] else ''
-    order_clause = f' ORDER BY {col} {direc}{tie} LIMIT ?'
+    order_clause = f'ORDER BY {col} {direc}{tie} LIMIT ?'
     extra = []
     params = []
     if bereich_id is not None:
@@ -647,43 +717,34 @@ def list_durchfuehrungen_chronologisch_sichtbar(
         params.append(str(datum_bis)[:10])
     extra_sql = ' ' + ' '.join(extra) if extra else ''
 
-    base_sql = f'''
-        SELECT d.ID, d.DurchgefuehrtAm, d.Bemerkung,
-               w.ID AS WartungID, w.Bezeichnung AS WartungBez,
-               p.IntervallAnzahl, p.IntervallEinheit,
-               g.Bezeichnung AS Gewerk, b.Bezeichnung AS Bereich,
-               m.Vorname || ' ' || m.Nachname AS ProtokolliertVon,
-               (SELECT COUNT(*) FROM Datei dt
-                WHERE dt.BereichTyp = 'Wartungsdurchfuehrung' AND dt.BereichID = d.ID) AS DateiAnzahl
-        FROM Wartungsdurchfuehrung d
-        JOIN Wartungsplan p ON d.WartungsplanID = p.ID
-        JOIN Wartung w ON p.WartungID = w.ID
-        JOIN Gewerke g ON w.GewerkID = g.ID
-        JOIN Bereich b ON g.BereichID = b.ID
-        LEFT JOIN Mitarbeiter m ON d.ProtokolliertVonID = m.ID
-        WHERE 1=1{extra_sql}
-    '''
-
-    if is_admin:
-        sql = base_sql + order_clause
-        return conn.execute(sql, params + [limit]).fetchall()
-
-    sichtbare = get_mitarbeiter_abteilungen(mitarbeiter_id, conn)
-    if not sichtbare:
+    sicht = _wartung_sichtbarkeit(conn, mitarbeiter_id, is_admin)
+    if sicht is None:
         return []
-    ph = ','.join(['?'] * len(sichtbare))
-    vis = f'''
-        AND w.Aktiv = 1 AND (
-            w.ErstelltVonID = ?
-            OR w.ID IN (
-                SELECT WartungID FROM WartungAbteilungZugriff
-                WHERE AbteilungID IN ({ph})
-            )
+    sicht_sql, sicht_params = sicht
+    aktiv_sql = '' if is_admin else ' AND w.Aktiv = 1'
+    # Dateien nur für die ausgegebene Seite zählen, nicht für alle Durchführungen
+    datei_join = _DATEI_ANZAHL_JOIN.format(einschraenkung=' AND BereichID IN (SELECT ID FROM seite)')
+
+    return conn.execute(f'''
+        WITH seite AS (
+            SELECT d.ID, d.DurchgefuehrtAm, d.Bemerkung,
+                   w.ID AS WartungID, w.Bezeichnung AS WartungBez,
+                   p.IntervallAnzahl, p.IntervallEinheit,
+                   g.Bezeichnung AS Gewerk, b.Bezeichnung AS Bereich,
+                   m.Vorname || ' ' || m.Nachname AS ProtokolliertVon
+            FROM Wartungsdurchfuehrung d
+            JOIN Wartungsplan p ON d.WartungsplanID = p.ID
+            JOIN Wartung w ON p.WartungID = w.ID
+            JOIN Gewerke g ON w.GewerkID = g.ID
+            JOIN Bereich b ON g.BereichID = b.ID
+            LEFT JOIN Mitarbeiter m ON d.ProtokolliertVonID = m.ID
+            WHERE 1=1{extra_sql}{aktiv_sql}{sicht_sql}
+            {order_clause}
         )
-    '''
-    sql = base_sql + vis + order_clause
-    all_params = params + _wartung_sichtbar_params(mitarbeiter_id, sichtbare) + [limit]
-    return conn.execute(sql, all_params).fetchall()
+        SELECT d.*, COALESCE(dz.DateiAnzahl, 0) AS DateiAnzahl
+        FROM seite d{datei_join}
+        ORDER BY {col} {direc}{tie}
+    ''', params + sicht_params + [limit]).fetchall()
 
 
 def get_wartung(conn, wartung_id):
@@ -754,7 +815,8 @@ def update_wartung(conn, wartung_id, gewerk_id, bezeichnung, beschreibung, aktiv
 def list_plaene_fuer_wartung(conn, wartung_id):
     return conn.execute('''
         SELECT ID, IntervallEinheit, IntervallAnzahl, NaechsteFaelligkeit, HatFestesIntervall,
-               ErinnerungTageVor, TerminVereinbart, TerminVereinbartDatum, Aktiv, ErstelltAm
+               ErinnerungTageVor, TerminVereinbart, TerminVereinbartDatum, Aktiv, ErstelltAm,
+               FaelligkeitStufe, ErinnerungFaellig
         FROM Wartungsplan
         WHERE WartungID = ?
         ORDER BY Aktiv DESC, ID DESC
@@ -811,6 +873,7 @@ def create_wartungsplan(
             td,
         ),
     )
+    aktualisiere_faelligkeit_status(conn, cur.lastrowid)
     return cur.lastrowid
 
 
@@ -859,6 +922,7 @@ def update_wartungsplan(
             plan_id,
         ),
     )
+    aktualisiere_faelligkeit_status(conn, plan_id)
 
 
 def update_wartungsplan_wartungstermin(conn, plan_id, zuruecksetzen, termin_datum_raw=None):
@@ -1013,47 +1077,24 @@ def list_plaene_sichtbar(
     else:
         order_sql = 'ORDER BY b.Bezeichnung, w.Bezeichnung, p.ID'
 
-    letzte_df_sql = (
-        '(SELECT MAX(d.DurchgefuehrtAm) FROM Wartungsdurchfuehrung d '
-        'WHERE d.WartungsplanID = p.ID) AS LetzteDurchfuehrung'
-    )
-    if is_admin:
-        return conn.execute(f'''
-            SELECT p.ID, p.IntervallEinheit, p.IntervallAnzahl, p.NaechsteFaelligkeit, p.Aktiv,
-                   p.ErinnerungTageVor, p.TerminVereinbart, p.TerminVereinbartDatum,
-                   w.ID AS WartungID,
-                   w.Bezeichnung AS WartungBez, g.Bezeichnung AS Gewerk, b.Bezeichnung AS Bereich,
-                   {letzte_df_sql}
-            FROM Wartungsplan p
-            JOIN Wartung w ON p.WartungID = w.ID
-            JOIN Gewerke g ON w.GewerkID = g.ID
-            JOIN Bereich b ON g.BereichID = b.ID
-            WHERE w.Aktiv = 1{extra_sql}{abt_sql}
-            {order_sql}
-        ''', params_tail + abt_params).fetchall()
-    sichtbare = get_mitarbeiter_abteilungen(mitarbeiter_id, conn)
-    if not sichtbare:
+    sicht = _wartung_sichtbarkeit(conn, mitarbeiter_id, is_admin)
+    if sicht is None:
         return []
-    ph = ','.join(['?'] * len(sichtbare))
+    sicht_sql, sicht_params = sicht
     return conn.execute(f'''
         SELECT p.ID, p.IntervallEinheit, p.IntervallAnzahl, p.NaechsteFaelligkeit, p.Aktiv,
                p.ErinnerungTageVor, p.TerminVereinbart, p.TerminVereinbartDatum,
+               p.FaelligkeitStufe, p.ErinnerungFaellig,
                w.ID AS WartungID,
                w.Bezeichnung AS WartungBez, g.Bezeichnung AS Gewerk, b.Bezeichnung AS Bereich,
-               {letzte_df_sql}
+               ld.LetzteDurchfuehrung
         FROM Wartungsplan p
         JOIN Wartung w ON p.WartungID = w.ID
         JOIN Gewerke g ON w.GewerkID = g.ID
-        JOIN Bereich b ON g.BereichID = b.ID
-        WHERE w.Aktiv = 1 AND (
-            w.ErstelltVonID = ?
-            OR w.ID IN (
-                SELECT WartungID FROM WartungAbteilungZugriff
-                WHERE AbteilungID IN ({ph})
-            )
-        ){extra_sql}{abt_sql}
+        JOIN Bereich b ON g.BereichID = b.ID{_LETZTE_DURCHFUEHRUNG_JOIN}
+        WHERE w.Aktiv = 1{sicht_sql}{extra_sql}{abt_sql}
         {order_sql}
-    ''', [mitarbeiter_id] + sichtbare + params_tail + abt_params).fetchall()
+    ''', sicht_params + params_tail + abt_params).fetchall()
 
 
 def map_wartung_zu_aktiven_plan_ids(
@@ -1113,11 +1154,8 @@ def map_wartung_aktive_plaene_metadaten(
             'ErinnerungTageVor': r['ErinnerungTageVor'],
             'TerminVereinbart': r['TerminVereinbart'],
             'TerminVereinbartDatum': r['TerminVereinbartDatum'],
-            'ErinnerungUeberschritten': _erinnerung_ueberschritten(
-                r['NaechsteFaelligkeit'],
-                r['ErinnerungTageVor'],
-                r['IntervallAnzahl'],
-            ),
+            'FaelligkeitStufe': r['FaelligkeitStufe'],
+            'ErinnerungUeberschritten': bool(r['ErinnerungFaellig']),
         })
     for lst in out.values():
         lst.sort(key=lambda x: (x['NaechsteFaelligkeit'] is None, x['NaechsteFaelligkeit'] or ''))
@@ -1251,18 +1289,23 @@ def list_durchfuehrungen_fuer_plan(conn, plan_id):
 
 def list_durchfuehrungen_fuer_wartung(conn, wartung_id):
     """Alle protokollierten Durchführungen dieser Wartung (über alle Pläne)."""
-    return conn.execute('''
+    datei_join = _DATEI_ANZAHL_JOIN.format(einschraenkung='''
+              AND BereichID IN (
+                SELECT d2.ID FROM Wartungsdurchfuehrung d2
+                JOIN Wartungsplan p2 ON d2.WartungsplanID = p2.ID
+                WHERE p2.WartungID = ?
+              )''')
+    return conn.execute(f'''
         SELECT d.ID, d.DurchgefuehrtAm, d.Bemerkung, d.ErstelltAm,
                p.ID AS PlanID, p.IntervallAnzahl, p.IntervallEinheit,
                m.Vorname || ' ' || m.Nachname AS ProtokolliertVon,
-               (SELECT COUNT(*) FROM Datei dt
-                WHERE dt.BereichTyp = 'Wartungsdurchfuehrung' AND dt.BereichID = d.ID) AS DateiAnzahl
+               COALESCE(dz.DateiAnzahl, 0) AS DateiAnzahl
         FROM Wartungsdurchfuehrung d
         JOIN Wartungsplan p ON d.WartungsplanID = p.ID
-        LEFT JOIN Mitarbeiter m ON d.ProtokolliertVonID = m.ID
+        LEFT JOIN Mitarbeiter m ON d.ProtokolliertVonID = m.ID{datei_join}
         WHERE p.WartungID = ?
         ORDER BY d.DurchgefuehrtAm DESC, d.ID DESC
-    ''', (wartung_id,)).fetchall()
+    ''', (wartung_id, wartung_id)).fetchall()
 
 
 def get_durchfuehrung_detail(conn, durchfuehrung_id):
@@ -1466,14 +1509,7 @@ def buche_ein_ersatzteil_wartungsdurchfuehrung(
 
 # --- Fremdfirma ---
 def list_fremdfirmen(conn, nur_aktiv=True):
-    q = '''
-        SELECT f.ID, f.Firmenname, f.Adresse, f.Taetigkeitsbereich, f.Aktiv
-        FROM Fremdfirma f
-    '''
-    if nur_aktiv:
-        q += ' WHERE f.Aktiv = 1'
-    q += ' ORDER BY f.Firmenname'
-    return conn.execute(q).fetchall()
+    return get_stammdaten('fremdfirmen', conn, nur_aktiv=nur_aktiv)
 
 
 def create_fremdfirma(conn, firmenname, adresse, taetigkeitsbereich):
@@ -0,0 +1,91 @@
+"""
+Micro-Benchmark fuer die Passwort-Pruefung beim Login (utils/passwort_hash.py).
+
+Misst Logins/s fuer dieselbe Zahl von Pruefungen
+- direkt im Thread (wie bisher im gthread-Worker, ``--threads`` parallel, GIL-gebunden) und
+- ueber den Prozess-Pool (``--prozesse`` Kindprozesse),
+und rechnet zusaetzlich auf Logins/s pro Kern um. Daneben laeuft ein Zaehler-Thread, der
+zeigt, wie viel Rechenzeit ein anderer Request im selben Worker waehrend des Bursts bekommt.
+
+Aufruf (Projektroot):
+    python scripts/benchmark_passwort_hash.py
+    python scripts/benchmark_passwort_hash.py --methode pbkdf2:sha256:600000 --anzahl 200 --prozesse 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+_SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+_PROJECT_ROOT = os.path.dirname(_SCRIPT_DIR)
+if _PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, _PROJECT_ROOT)
+
+from werkzeug.security import generate_password_hash  # noqa: E402
+
+from utils import passwort_hash  # noqa: E402
+
+
+def _nebenlast_messen(stopp, ergebnis):
+    """Zaehlt Schleifendurchlaeufe, solange der Burst laeuft (Stellvertreter fuer andere Requests)."""
+    n = 0
+    while not stopp.is_set():
+        n += 1
+    ergebnis.append(n)
+
+
+def _burst(anzahl, threads, hash_wert, passwort):
+    stopp = threading.Event()
+    nebenlast = []
+    zaehler = threading.Thread(target=_nebenlast_messen, args=(stopp, nebenlast))
+    zaehler.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as ex:
+        ergebnisse = list(ex.map(lambda _: passwort_hash.passwort_pruefen(hash_wert, passwort), range(anzahl)))
+    dauer = time.perf_counter() - start
+    stopp.set()
+    zaehler.join()
+    assert all(ergebnisse)
+    return dauer, nebenlast[0] / dauer
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--methode', default='scrypt', help='Werkzeug-Hash-Methode (Default: scrypt)')
+    parser.add_argument('--anzahl', type=int, default=100, help='Logins je Messung (Default: 100)')
+    parser.add_argument('--threads', type=int, default=4, help='Parallele Request-Threads (Default: 4)')
+    parser.add_argument('--prozesse', type=int, default=os.cpu_count() or 2,
+                        help='Prozesse im Pool (Default: Anzahl Kerne)')
+    args = parser.parse_args()
+
+    passwort = 'Schichtwechsel-2026!'
+    hash_wert = generate_password_hash(passwort, args.methode)
+    kerne = os.cpu_count() or 1
+    print(f'Methode {hash_wert.split("$", 1)[0]}, {args.anzahl} Logins, {args.threads} Threads, {kerne} Kerne')
+
+    zeilen = []
+    passwort_hash._STANDARD_KONFIG['PASSWORT_HASH_PROZESSE'] = 0
+    dauer, neben = _burst(args.anzahl, args.threads, hash_wert, passwort)
+    zeilen.append(('im Thread (GIL)', 1, dauer, neben))
+
+    passwort_hash._STANDARD_KONFIG['PASSWORT_HASH_PROZESSE'] = args.prozesse
+    passwort_hash._STANDARD_KONFIG['PASSWORT_HASH_WARTESCHLANGE'] = max(args.threads, args.prozesse)
+    passwort_hash.passwort_pool_vorwaermen()
+    passwort_hash._get_pool()[0].submit(int).result()
+    dauer, neben = _burst(args.anzahl, max(args.threads, args.prozesse), hash_wert, passwort)
+    zeilen.append((f'Prozess-Pool ({args.prozesse})', min(args.prozesse, kerne), dauer, neben))
+
+    print(f'{"Variante":<22} {"Dauer s":>8} {"Logins/s":>9} {"/Kern":>7} {"Nebenlast/s":>12}')
+    for name, genutzte_kerne, dauer, neben in zeilen:
+        rate = args.anzahl / dauer
+        print(f'{name:<22} {dauer:>8.2f} {rate:>9.1f} {rate / genutzte_kerne:>7.1f} {neben:>12.0f}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,154 @@
+"""
+Render-Benchmark für die Hauptlistenseiten (Bytes pro Seite, Jinja-Renderzeit).
+
+Ruft die Seiten über den Flask-Test-Client mit der Session eines Mitarbeiters ab und misst je
+Seite die HTML-Größe (roh und gzip), die Zeit in ``render_template`` (Signale
+``before_render_template``/``template_rendered``) und die gesamte Antwortzeit (Median).
+
+Mit ``--vergleich <git-rev>`` wird zusätzlich mit ``templates/layout/base.html`` aus diesem
+Stand gerendert (z. B. vor dem Auslagern der Inline-Skripte/-Styles nach
+``static/js/bis_layout.js`` und ``static/css/bis_layout.css``), alles andere bleibt gleich.
+
+Aufruf (Projektroot, benutzt die konfigurierte Datenbank):
+    python scripts/benchmark_seiten_rendern.py
+    python scripts/benchmark_seiten_rendern.py --vergleich HEAD~1 --mitarbeiter 1 --wiederholungen 50
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+_SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+_PROJECT_ROOT = os.path.dirname(_SCRIPT_DIR)
+if _PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, _PROJECT_ROOT)
+
+os.environ.setdefault('BIS_RUN_STARTUP_TASKS', '0')
+
+from flask import before_render_template, template_rendered, url_for  # noqa: E402
+from jinja2 import ChoiceLoader, DictLoader  # noqa: E402
+
+from app import app  # noqa: E402
+
+SEITEN = (
+    'dashboard.dashboard',
+    'schichtbuch.themaliste',
+    'ersatzteile.ersatzteil_liste',
+    'ersatzteile.bestellung_liste',
+    'ersatzteile.lagerbuchungen_liste',
+    'wartungen.wartung_liste',
+)
+
+LAYOUT_TEMPLATE = 'layout/base.html'
+
+
+class _RenderZeit:
+    """Summiert die Zeit zwischen before_render_template und template_rendered."""
+
+    def __init__(self):
+        self.summe = 0.0
+        self._start = []
+
+    def vorher(self, sender, template, context, **extra):
+        self._start.append(time.perf_counter())
+
+    def nachher(self, sender, template, context, **extra):
+        if self._start:
+            self.summe += time.perf_counter() - self._start.pop()
+
+
+def _layout_aus_git(rev):
+    return subprocess.run(
+        ['git', 'show', f'{rev}:templates/{LAYOUT_TEMPLATE}'],
+        cwd=_PROJECT_ROOT, check=True, capture_output=True, text=True, encoding='utf-8',
+    ).stdout
+
+
+def _messen(client, url, wiederholungen):
+    zeit = _RenderZeit()
+    before_render_template.connect(zeit.vorher, app)
+    template_rendered.connect(zeit.nachher, app)
+    render, gesamt, html = [], [], b''
+    client.get(url)  # Aufwärmen: Template-Kompilierung und Caches nicht mitmessen
+    try:
+        for _ in range(wiederholungen):
+            zeit.summe = 0.0
+            start = time.perf_counter()
+            resp = client.get(url)
+            gesamt.append(time.perf_counter() - start)
+            render.append(zeit.summe)
+            html = resp.data
+            if resp.status_code != 200:
+                return resp.status_code, None
+    finally:
+        before_render_template.disconnect(zeit.vorher, app)
+        template_rendered.disconnect(zeit.nachher, app)
+    return 200, (len(html), len(gzip.compress(html)), statistics.median(render) * 1000,
+                 statistics.median(gesamt) * 1000)
+
+
+def _lauf(urls, mitarbeiter_id, wiederholungen):
+    client = app.test_client()
+    with client.session_transaction() as s:
+        s['user_id'] = mitarbeiter_id
+    ergebnisse = {}
+    for endpunkt, url in urls:
+        status, werte = _messen(client, url, wiederholungen)
+        if werte is None:
+            print(f'  {endpunkt}: HTTP {status}, übersprungen')
+            continue
+        ergebnisse[endpunkt] = werte
+    return ergebnisse
+
+
+def _ausgeben(titel, ergebnisse):
+    print(f'\n{titel}')
+    print(f'{"Seite":<36} {"Bytes":>8} {"gzip":>7} {"Render ms":>10} {"Gesamt ms":>10}')
+    for endpunkt, (roh, gz, render, gesamt) in ergebnisse.items():
+        print(f'{endpunkt:<36} {roh:>8} {gz:>7} {render:>10.2f} {gesamt:>10.2f}')
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mitarbeiter', type=int, default=1, help='Mitarbeiter-ID für die Session (Default: 1)')
+    parser.add_argument('--wiederholungen', type=int, default=20, help='Abrufe je Seite (Default: 20)')
+    parser.add_argument('--vergleich', metavar='REV', help='base.html aus diesem git-Stand zusätzlich messen')
+    args = parser.parse_args()
+
+    with app.test_request_context():
+        urls = [(e, url_for(e)) for e in SEITEN if e in app.view_functions]
+
+    jetzt = _lauf(urls, args.mitarbeiter, args.wiederholungen)
+    _ausgeben('Aktueller Stand', jetzt)
+    for name in ('js/bis_layout.js', 'css/bis_layout.css'):
+        pfad = os.path.join(app.static_folder, *name.split('/'))
+        if os.path.isfile(pfad):
+            with open(pfad, 'rb') as f:
+                inhalt = f.read()
+            print(f'  + {name}: {len(inhalt)} Bytes ({len(gzip.compress(inhalt))} gzip), einmalig, danach aus dem Cache')
+
+    if args.vergleich:
+        original = app.jinja_env.loader
+        app.jinja_env.loader = ChoiceLoader([DictLoader({LAYOUT_TEMPLATE: _layout_aus_git(args.vergleich)}), original])
+        app.jinja_env.cache.clear()
+        try:
+            vorher = _lauf(urls, args.mitarbeiter, args.wiederholungen)
+        finally:
+            app.jinja_env.loader = original
+            app.jinja_env.cache.clear()
+        _ausgeben(f'base.html aus {args.vergleich}', vorher)
+        print('\nDifferenz (aktuell - Vergleich)')
+        for endpunkt in (e for e in jetzt if e in vorher):
+            a, b = jetzt[endpunkt], vorher[endpunkt]
+            print(f'{endpunkt:<36} {a[0] - b[0]:>+8} {a[1] - b[1]:>+7} {a[2] - b[2]:>+10.2f} {a[3] - b[3]:>+10.2f}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -4,8 +4,7 @@ Datenmigration SQLite -> Postgres fuer BIS (einmaliger Umzug).
 Phase 5 der SA-Migration: Das Schema wird in beiden Welten ueber Alembic
 deklariert (``utils.db_schema``), deshalb reicht eine **datengetriebene**
 Kopie ohne DDL. Dieses Skript liest alle Tabellen aus einer Quell-Engine
-(Default: SQLite) und schreibt sie tabellenweise in eine Ziel-Engine
-(Default: Postgres).
+(Default: SQLite) und schreibt sie in eine Ziel-Engine (Default: Postgres).
 
 Ablauf auf dem Zielsystem:
 
@@ -13,10 +12,19 @@ Ablauf auf dem Zielsystem:
 2. Auf der Postgres-DB einmalig ``alembic upgrade head`` ausfuehren, damit das
    Schema identisch zu SQLite ist (gleiche Tabellennamen, Spaltennamen,
    Constraints, Indizes).
-3. Dieses Skript starten – es kopiert Zeilen tabellenweise in topologischer
-   Reihenfolge der Foreign Keys.
+3. Dieses Skript starten – es kopiert die Tabellen parallel, eine Tabelle
+   startet aber erst, wenn alle Tabellen, auf die ihre Foreign Keys zeigen,
+   fertig sind. Ist das Ziel Postgres, werden die Zeilen per
+   ``COPY ... FROM STDIN`` gestreamt (eine Transaktion je Tabelle), sonst
+   batchweise per INSERT.
 4. Sequenzen in Postgres auf ``MAX(id)+1`` setzen (erfolgt automatisch am
    Ende).
+5. Verifikation: Zeilenzahl und eine reihenfolgeunabhaengige Pruefsumme ueber
+   alle Spaltenwerte je Tabelle muessen in Quelle und Ziel uebereinstimmen.
+
+Fertig kopierte Tabellen werden in einer Checkpoint-Datei vermerkt. Bricht der
+Umzug ab (Netzwerk, Legacy-Daten, Strg+C), kopiert ein erneuter Start nur die
+noch offenen Tabellen; die Datei wird nach erfolgreicher Verifikation geloescht.
 
 Beispiel (PowerShell):
 
@@ -26,10 +34,14 @@ Beispiel (PowerShell):
 
 Parameter (Umgebungsvariablen):
 
-    SOURCE_URL     Quell-DB (SA-URL). Default: sqlite:///database_main.db
-    TARGET_URL     Ziel-DB (SA-URL). Pflicht, wenn != SOURCE_URL.
-    BATCH_SIZE     Zeilen pro INSERT-Batch (Default: 500).
-    TRUNCATE       "1" = Zieltabellen vor dem Kopieren leeren (Default: "0").
+    SOURCE_URL       Quell-DB (SA-URL). Default: sqlite:///database_main.db
+    TARGET_URL       Ziel-DB (SA-URL). Pflicht, wenn != SOURCE_URL.
+    BATCH_SIZE       Zeilen pro INSERT-Batch, nur ohne COPY (Default: 500).
+    PARALLEL         Anzahl gleichzeitig kopierter Tabellen (Default: 4).
+    TRUNCATE         "1" = offene Zieltabellen vor dem Kopieren leeren (Default: "0").
+    CHECKPOINT_FILE  Checkpoint-Datei (Default: migrate_sqlite_to_postgres.checkpoint.json).
+    RESUME           "0" = vorhandenen Checkpoint ignorieren und alles neu kopieren
+                     (Default: "1").
 
 Nicht abgedeckt (bewusst):
 
@@ -44,8 +56,14 @@ Alternative: ``pgloader sqlite:///pfad.db postgresql://...`` – siehe
 
 from __future__ import annotations
 
+import datetime as _dt
+import hashlib
+import json
 import os
 import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from typing import Iterable
 
 _SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -59,6 +77,7 @@ from sqlalchemy import (  # noqa: E402
     create_engine,
     delete,
     inspect,
+    make_url,
     select,
     text,
 )
@@ -67,6 +86,11 @@ from sqlalchemy.engine import Engine  # noqa: E402
 from utils.database import normalize_db_url  # noqa: E402
 from utils.db_schema import metadata as schema_metadata  # noqa: E402
 
+DEFAULT_CHECKPOINT_FILE = 'migrate_sqlite_to_postgres.checkpoint.json'
+# Fortschrittsausgabe alle n Zeilen (bei parallelem Kopieren sonst zu geschwaetzig)
+_FORTSCHRITT_ALLE = 50_000
+_PRUEFSUMME_MODULO = 1 << 64
+
 
 def _resolve_urls() -> tuple[str, str]:
     source = os.environ.get('SOURCE_URL') or 'sqlite:///database_main.db'
@@ -88,22 +112,169 @@ def _ordered_tables() -> list[Table]:
     return list(schema_metadata.sorted_tables)
 
 
+def _abhaengigkeiten(tables: Iterable[Table]) -> dict[str, set[str]]:
+    """Je Tabelle die Eltern-Tabellen, die vor ihr fertig kopiert sein muessen."""
+    namen = {t.name for t in tables}
+    return {
+        t.name: {
+            fk.referred_table.name
+            for fk in t.foreign_key_constraints
+            if fk.referred_table.name != t.name and fk.referred_table.name in namen
+        }
+        for t in tables
+    }
+
+
+# --------------------------------------------------------------------------
+# Pruefsumme
+# --------------------------------------------------------------------------
+
+def _wert_normalisieren(wert) -> str:
+    """Spaltenwert -> Text, der in SQLite und Postgres gleich aussieht."""
+    if wert is None:
+        return '\\N'
+    if isinstance(wert, bool):
+        return str(int(wert))
+    if isinstance(wert, _dt.datetime):
+        return wert.isoformat(sep=' ')
+    if isinstance(wert, _dt.date):
+        return wert.isoformat()
+    if isinstance(wert, float):
+        return repr(wert)
+    if isinstance(wert, (bytes, bytearray, memoryview)):
+        return bytes(wert).hex()
+    return str(wert)
+
+
+def _zeilen_hash(werte) -> int:
+    daten = '\x1f'.join(_wert_normalisieren(w) for w in werte).encode('utf-8')
+    return int.from_bytes(hashlib.sha256(daten).digest()[:8], 'big')
+
+
+class _Pruefsumme:
+    """Reihenfolgeunabhaengig (Summe der Zeilen-Hashes), kein ORDER BY noetig."""
+
+    def __init__(self):
+        self.zeilen = 0
+        self._summe = 0
+
+    def add(self, werte) -> None:
+        self.zeilen += 1
+        self._summe = (self._summe + _zeilen_hash(werte)) % _PRUEFSUMME_MODULO
+
+    @property
+    def wert(self) -> str:
+        return f'{self._summe:016x}'
+
+
+def _pruefsumme(engine: Engine, table: Table, columns: list[str]) -> tuple[int, str]:
+    """Liest die Tabelle einmal komplett und liefert (Zeilenzahl, Pruefsumme)."""
+    summe = _Pruefsumme()
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True).execute(
+            select(*[table.c[c] for c in columns])
+        )
+        for row in result:
+            summe.add(row)
+    return summe.zeilen, summe.wert
+
+
+# --------------------------------------------------------------------------
+# Checkpoint
+# --------------------------------------------------------------------------
+
+def _url_anzeige(url: str) -> str:
+    return make_url(url).render_as_string(hide_password=True)
+
+
+class _Checkpoint:
+    """Fertig kopierte Tabellen (JSON-Datei, atomar ersetzt, thread-sicher)."""
+
+    def __init__(self, pfad: str | None, source_url: str, target_url: str, resume: bool = True):
+        self.pfad = pfad
+        self._lock = threading.Lock()
+        self._kennung = {'quelle': _url_anzeige(source_url), 'ziel': _url_anzeige(target_url)}
+        self.tabellen: dict[str, dict] = {}
+        if pfad and resume and os.path.exists(pfad):
+            with open(pfad, encoding='utf-8') as f:
+                daten = json.load(f)
+            if {k: daten.get(k) for k in self._kennung} != self._kennung:
+                print(f'[FEHLER] Checkpoint {pfad} gehoert zu einer anderen Quelle/Ziel-Kombination.')
+                print('         Datei loeschen oder RESUME=0 setzen.')
+                sys.exit(2)
+            self.tabellen = daten.get('tabellen', {})
+
+    def fertig(self, name: str) -> bool:
+        return name in self.tabellen
+
+    def eintragen(self, name: str, zeilen: int, pruefsumme: str | None, sekunden: float) -> None:
+        with self._lock:
+            self.tabellen[name] = {
+                'zeilen': zeilen,
+                'pruefsumme': pruefsumme,
+                'sekunden': round(sekunden, 3),
+            }
+            if not self.pfad:
+                return
+            tmp = self.pfad + '.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump({**self._kennung, 'tabellen': self.tabellen}, f, indent=2, sort_keys=True)
+            os.replace(tmp, self.pfad)
+
+    def entfernen(self) -> None:
+        if self.pfad and os.path.exists(self.pfad):
+            os.remove(self.pfad)
+
+
+# --------------------------------------------------------------------------
+# Kopieren
+# --------------------------------------------------------------------------
+
+def _copy_rows_postgres(tgt_conn, table: Table, columns: list[str], rows, summe: _Pruefsumme, total: int) -> None:
+    """Streamt die Zeilen per ``COPY ... FROM STDIN`` (psycopg 3)."""
+    spalten = ', '.join(f'"{c}"' for c in columns)
+    cursor = tgt_conn.connection.dbapi_connection.cursor()
+    try:
+        with cursor.copy(f'COPY "{table.name}" ({spalten}) FROM STDIN') as copy:
+            for row in rows:
+                copy.write_row(row)
+                summe.add(row)
+                if summe.zeilen % _FORTSCHRITT_ALLE == 0:
+                    print(f'  {table.name}: {summe.zeilen}/{total} ...', flush=True)
+    finally:
+        cursor.close()
+
+
+def _copy_rows_batches(tgt_conn, table: Table, columns: list[str], rows, summe: _Pruefsumme, batch_size: int) -> None:
+    batch: list[dict] = []
+    for row in rows:
+        batch.append(dict(zip(columns, row)))
+        summe.add(row)
+        if len(batch) >= batch_size:
+            tgt_conn.execute(table.insert(), batch)
+            batch.clear()
+    if batch:
+        tgt_conn.execute(table.insert(), batch)
+
+
 def _copy_table(
     source: Engine,
     target: Engine,
     table: Table,
     *,
     batch_size: int,
-    truncate: bool,
     source_tables: set[str],
-) -> int:
-    """Kopiert eine einzelne Tabelle. Gibt die Anzahl kopierter Zeilen zurueck."""
+) -> tuple[int, str | None]:
+    """Kopiert eine einzelne Tabelle in einer Ziel-Transaktion.
+
+    Gibt (Anzahl kopierter Zeilen, Pruefsumme der Quellzeilen) zurueck.
+    """
     if table.name not in source_tables:
         # Tabelle existiert in der Quelle nicht (z. B. neu hinzugekommenes
         # Feature, das in der alten SQLite-DB noch nie migriert wurde). Fuer
         # den Umzug ist das harmlos, solange die Zieltabelle leer bleibt.
         print(f'  [SKIP] {table.name}: in der Quelle nicht vorhanden')
-        return 0
+        return 0, None
 
     columns = [c.name for c in table.columns]
 
@@ -114,30 +285,102 @@ def _copy_table(
 
     if total == 0:
         print(f'  [SKIP] {table.name}: leer in der Quelle')
-        return 0
-
-    with target.begin() as tgt_conn:
-        if truncate:
-            tgt_conn.execute(delete(table))
+        return 0, _Pruefsumme().wert
 
-    copied = 0
+    summe = _Pruefsumme()
     with source.connect() as src_conn:
-        result = src_conn.execution_options(stream_results=True).execute(select(table))
-        batch: list[dict] = []
+        result = src_conn.execution_options(stream_results=True).execute(
+            select(*[table.c[c] for c in columns])
+        )
         with target.begin() as tgt_conn:
-            for row in result.mappings():
-                batch.append({k: row[k] for k in columns})
-                if len(batch) >= batch_size:
-                    tgt_conn.execute(table.insert(), batch)
-                    copied += len(batch)
-                    batch.clear()
-                    print(f'  {table.name}: {copied}/{total} ...')
-            if batch:
-                tgt_conn.execute(table.insert(), batch)
-                copied += len(batch)
+            if target.dialect.name == 'postgresql':
+                _copy_rows_postgres(tgt_conn, table, columns, result, summe, total)
+            else:
+                _copy_rows_batches(tgt_conn, table, columns, result, summe, batch_size)
+
+    print(f'  [OK] {table.name}: {summe.zeilen} Zeilen', flush=True)
+    return summe.zeilen, summe.wert
+
+
+def _truncate_tables(target: Engine, tables: list[Table]) -> None:
+    """Leert die Tabellen in umgekehrter FK-Reihenfolge (Kinder vor Eltern)."""
+    with target.begin() as conn:
+        for table in reversed(tables):
+            conn.execute(delete(table))
+
 
-    print(f'  [OK] {table.name}: {copied} Zeilen')
-    return copied
+def _copy_all(
+    source: Engine,
+    target: Engine,
+    tables: list[Table],
+    *,
+    batch_size: int,
+    parallel: int,
+    source_tables: set[str],
+    checkpoint: _Checkpoint,
+) -> dict[str, dict]:
+    """Kopiert alle offenen Tabellen parallel in FK-Reihenfolge.
+
+    Eine Tabelle wird erst gestartet, wenn alle ihre Eltern-Tabellen fertig
+    sind. Jede fertige Tabelle landet sofort im Checkpoint. Schlaegt eine
+    Tabelle fehl, laufen die bereits gestarteten zu Ende, danach wird der
+    erste Fehler weitergereicht.
+    """
+    eltern = _abhaengigkeiten(tables)
+    nach_name = {t.name: t for t in tables}
+    offen = [t.name for t in tables if not checkpoint.fertig(t.name)]
+    fertig = {t.name for t in tables if checkpoint.fertig(t.name)}
+    if fertig:
+        print(f'[INFO] Checkpoint: {len(fertig)} Tabellen bereits kopiert, {len(offen)} offen.')
+
+    def _job(name: str):
+        start = time.perf_counter()
+        zeilen, pruefsumme = _copy_table(
+            source, target, nach_name[name],
+            batch_size=batch_size, source_tables=source_tables,
+        )
+        sekunden = time.perf_counter() - start
+        checkpoint.eintragen(name, zeilen, pruefsumme, sekunden)
+        return name
+
+    fehler: BaseException | None = None
+    laufend = {}
+    with ThreadPoolExecutor(max_workers=max(1, parallel), thread_name_prefix='migrate') as pool:
+        while offen or laufend:
+            if fehler is None:
+                for name in [n for n in offen if eltern[n] <= fertig]:
+                    if len(laufend) >= max(1, parallel):
+                        break
+                    offen.remove(name)
+                    laufend[pool.submit(_job, name)] = name
+            if not laufend:
+                break
+            erledigt, _ = wait(laufend, return_when=FIRST_COMPLETED)
+            for future in erledigt:
+                name = laufend.pop(future)
+                try:
+                    future.result()
+                    fertig.add(name)
+                except Exception as exc:
+                    print(f'  [FEHLER] {name}: {exc}', flush=True)
+                    if fehler is None:
+                        fehler = exc
+    if fehler is not None:
+        raise fehler
+    return checkpoint.tabellen
+
+
+def _print_throughput(statistik: dict[str, dict]) -> None:
+    """Durchsatz je Tabelle, langsamste zuerst."""
+    zeilen = [(n, s) for n, s in statistik.items() if s['zeilen']]
+    if not zeilen:
+        return
+    print()
+    print('[INFO] Durchsatz je Tabelle:')
+    print(f'  {"Tabelle":<36} {"Zeilen":>10} {"Sekunden":>9} {"Zeilen/s":>10}')
+    for name, s in sorted(zeilen, key=lambda x: x[1]['sekunden'], reverse=True):
+        rate = s['zeilen'] / s['sekunden'] if s['sekunden'] else float('inf')
+        print(f'  {name:<36} {s["zeilen"]:>10} {s["sekunden"]:>9.2f} {rate:>10.0f}')
 
 
 def _reset_postgres_sequences(target: Engine, tables: Iterable[Table]) -> None:
@@ -186,22 +429,38 @@ def _verify(
     target: Engine,
     tables: Iterable[Table],
     source_tables: set[str],
+    *,
+    erwartet: dict[str, dict] | None = None,
+    parallel: int = 1,
 ) -> list[str]:
-    """Vergleicht Zeilenzahlen zwischen Quelle und Ziel; liefert Abweichungen."""
-    mismatches: list[str] = []
-    with source.connect() as src, target.connect() as tgt:
-        for table in tables:
-            if table.name not in source_tables:
-                continue
-            try:
-                src_n = src.execute(select(text('COUNT(*)')).select_from(table)).scalar_one()
-                tgt_n = tgt.execute(select(text('COUNT(*)')).select_from(table)).scalar_one()
-            except Exception as exc:  # pragma: no cover - defensiv
-                mismatches.append(f'{table.name}: Zaehlfehler ({exc})')
-                continue
-            if src_n != tgt_n:
-                mismatches.append(f'{table.name}: Quelle={src_n}, Ziel={tgt_n}')
-    return mismatches
+    """Vergleicht Zeilenzahl und Pruefsumme je Tabelle; liefert Abweichungen.
+
+    ``tables`` sind die gegen das Ziel reflektierten Tabellen. Fuer die Quelle
+    wird die beim Kopieren berechnete Pruefsumme aus ``erwartet`` (Checkpoint)
+    verwendet, sonst die Quelltabelle erneut gelesen.
+    """
+    erwartet = erwartet or {}
+
+    def _pruefen(table: Table) -> str | None:
+        columns = [c.name for c in schema_metadata.tables[table.name].columns]
+        try:
+            bekannt = erwartet.get(table.name) or {}
+            if bekannt.get('pruefsumme'):
+                src = (bekannt['zeilen'], bekannt['pruefsumme'])
+            else:
+                src = _pruefsumme(source, schema_metadata.tables[table.name], columns)
+            tgt = _pruefsumme(target, table, columns)
+        except Exception as exc:  # pragma: no cover - defensiv
+            return f'{table.name}: Pruefsummenfehler ({exc})'
+        if src[0] != tgt[0]:
+            return f'{table.name}: Quelle={src[0]}, Ziel={tgt[0]} Zeilen'
+        if src[1] != tgt[1]:
+            return f'{table.name}: Pruefsumme Quelle={src[1]}, Ziel={tgt[1]}'
+        return None
+
+    relevante = [t for t in tables if t.name in source_tables]
+    with ThreadPoolExecutor(max_workers=max(1, parallel), thread_name_prefix='verify') as pool:
+        return [m for m in pool.map(_pruefen, relevante) if m]
 
 
 def _ensure_target_schema_present(target: Engine) -> None:
@@ -221,18 +480,22 @@ def _ensure_target_schema_present(target: Engine) -> None:
 def main() -> None:
     source_url, target_url = _resolve_urls()
     batch_size = int(os.environ.get('BATCH_SIZE', '500') or '500')
+    parallel = max(1, int(os.environ.get('PARALLEL', '4') or '4'))
     truncate = (os.environ.get('TRUNCATE', '0').lower() in ('1', 'true', 'yes'))
+    resume = (os.environ.get('RESUME', '1').lower() in ('1', 'true', 'yes'))
+    checkpoint_file = os.environ.get('CHECKPOINT_FILE') or DEFAULT_CHECKPOINT_FILE
 
     print('=' * 70)
     print('  BIS - Datenmigration (SQLite -> Postgres)')
     print('=' * 70)
-    print(f'  Quelle: {source_url}')
-    print(f'  Ziel:   {target_url}')
-    print(f'  Batch:  {batch_size}  Truncate: {truncate}')
+    print(f'  Quelle: {_url_anzeige(source_url)}')
+    print(f'  Ziel:   {_url_anzeige(target_url)}')
+    print(f'  Batch:  {batch_size}  Parallel: {parallel}  Truncate: {truncate}')
+    print(f'  Checkpoint: {checkpoint_file} (Resume: {resume})')
     print()
 
-    source = create_engine(source_url, future=True)
-    target = create_engine(target_url, future=True, pool_pre_ping=True)
+    source = create_engine(source_url, future=True, pool_size=parallel + 1)
+    target = create_engine(target_url, future=True, pool_pre_ping=True, pool_size=parallel + 1)
 
     try:
         _ensure_target_schema_present(target)
@@ -241,22 +504,34 @@ def main() -> None:
         source_tables = set(src_inspector.get_table_names())
 
         tables = _ordered_tables()
-        print(f'[INFO] Kopiere {len(tables)} Tabellen in topologischer Reihenfolge ...')
-        total_rows = 0
-        for table in tables:
-            total_rows += _copy_table(
-                source, target, table,
-                batch_size=batch_size, truncate=truncate,
-                source_tables=source_tables,
+        checkpoint = _Checkpoint(checkpoint_file, source_url, target_url, resume=resume)
+        if truncate:
+            _truncate_tables(target, [t for t in tables if not checkpoint.fertig(t.name)])
+
+        print(f'[INFO] Kopiere {len(tables)} Tabellen in FK-Reihenfolge ({parallel} parallel) ...')
+        gesamt_start = time.perf_counter()
+        try:
+            statistik = _copy_all(
+                source, target, tables,
+                batch_size=batch_size, parallel=parallel,
+                source_tables=source_tables, checkpoint=checkpoint,
             )
+        except Exception:
+            print()
+            print(f'[FEHLER] Umzug abgebrochen. Fertige Tabellen stehen in {checkpoint_file};')
+            print('         ein erneuter Start kopiert nur die offenen Tabellen.')
+            sys.exit(5)
+        gesamt_sekunden = time.perf_counter() - gesamt_start
+        total_rows = sum(s['zeilen'] for s in statistik.values())
+        _print_throughput(statistik)
 
         _reset_postgres_sequences(target, tables)
 
         print()
-        print('[INFO] Verifikation (Zeilenzahlen) ...')
-        # Reflektierte Tabellen verwenden, damit ``select(COUNT(*)).select_from``
-        # auch gegen das tatsaechliche Zielschema zaehlt (und beim Vergleich mit
-        # der Quelle keine fehlenden Tabellen mitgezaehlt werden).
+        print('[INFO] Verifikation (Zeilenzahlen und Pruefsummen) ...')
+        # Reflektierte Tabellen verwenden, damit gegen das tatsaechliche
+        # Zielschema gelesen wird (und beim Vergleich mit der Quelle keine
+        # fehlenden Tabellen mitgezaehlt werden).
         present = [t for t in tables if t.name in source_tables]
         reflected = MetaData()
         reflected.reflect(bind=target, only=[t.name for t in present])
@@ -264,16 +539,20 @@ def main() -> None:
             source, target,
             [reflected.tables[t.name] for t in present],
             source_tables,
+            erwartet=statistik,
+            parallel=parallel,
         )
         if mismatches:
-            print('[WARN] Zeilenzahlen weichen ab:')
+            print('[WARN] Quelle und Ziel weichen ab:')
             for m in mismatches:
                 print(f'  - {m}')
             sys.exit(4)
 
+        checkpoint.entfernen()
         print()
         print('=' * 70)
-        print(f'  [ERFOLG] {total_rows} Zeilen uebertragen, Zeilenzahlen ident.')
+        print(f'  [ERFOLG] {total_rows} Zeilen uebertragen in {gesamt_sekunden:.1f} s, '
+              f'Pruefsummen ident.')
         print('=' * 70)
     finally:
         source.dispose()
@@ -0,0 +1,68 @@
+/*
+ * BIS – asynchrone Berichte (modules/berichte).
+ *
+ * `BIS.berichtJob({typ, id} | {typ: 'bestellungen_monat', monat}, {signal, onFortschritt})`
+ * legt einen Bericht-Job an, fragt den Status ab und liefert die fetch-Response des fertigen
+ * Downloads (Blob + Content-Disposition wie beim direkten Export). Bricht der Aufrufer ab
+ * (signal), läuft der Job serverseitig weiter und der Nutzer erhält eine Benachrichtigung.
+ */
+(function () {
+  'use strict';
+
+  var skript = document.currentScript;
+  var JOBS_URL = (skript && skript.dataset.jobsUrl) || '/berichte/jobs';
+
+  function warte(ms, signal) {
+    return new Promise(function (resolve, reject) {
+      var t = window.setTimeout(resolve, ms);
+      if (signal) {
+        signal.addEventListener('abort', function () {
+          window.clearTimeout(t);
+          reject(new DOMException('Abgebrochen', 'AbortError'));
+        }, { once: true });
+      }
+    });
+  }
+
+  async function berichtJob(auftrag, opts) {
+    opts = opts || {};
+    var signal = opts.signal;
+    var antwort = await fetch(JOBS_URL, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json', 'X-Requested-With': 'XMLHttpRequest' },
+      body: JSON.stringify(auftrag),
+      signal: signal
+    });
+    var daten = await antwort.json().catch(function () { return {}; });
+    if (!antwort.ok || !daten.success) {
+      throw new Error(daten.message || ('HTTP error! status: ' + antwort.status));
+    }
+
+    var intervall = 700;
+    for (;;) {
+      await warte(intervall, signal);
+      intervall = Math.min(intervall * 1.3, 3000);
+      var statusAntwort = await fetch(daten.status_url, {
+        headers: { 'X-Requested-With': 'XMLHttpRequest' },
+        signal: signal
+      });
+      var status = await statusAntwort.json().catch(function () { return {}; });
+      if (!statusAntwort.ok || !status.success) {
+        throw new Error(status.message || ('HTTP error! status: ' + statusAntwort.status));
+      }
+      var job = status.job;
+      if (typeof opts.onFortschritt === 'function') opts.onFortschritt(job);
+      if (job.status === 'fertig') {
+        var download = await fetch(job.download_url, { signal: signal, redirect: 'error' });
+        if (!download.ok) throw new Error('HTTP error! status: ' + download.status);
+        return download;
+      }
+      if (job.status === 'fehler') {
+        throw new Error(job.fehlermeldung || 'Bericht konnte nicht erstellt werden.');
+      }
+    }
+  }
+
+  window.BIS = window.BIS || {};
+  window.BIS.berichtJob = berichtJob;
+})();
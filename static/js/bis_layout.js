@@ -0,0 +1,659 @@
+/*
+ * BIS – Layout-Skripte aus templates/layout/base.html (für alle Seiten gleich, daher gecacht).
+ *
+ * Seitenabhängige Werte kommen als data-Attribute am <script>-Tag:
+ * data-benachrichtigungen-url, data-gelesen-url (ID 0 als Platzhalter), data-stream-url,
+ * data-suche-url und data-angemeldet ("1" = Benachrichtigungen laden).
+ *
+ * Bewusst ohne umschließende Funktion: loadBenachrichtigungen, markAsRead usw. werden aus
+ * onclick-Attributen und Seiten-Skripten aufgerufen und müssen global bleiben.
+ */
+const bisLayout = document.currentScript.dataset;
+
+// Automatisches Schließen von Erfolgs- und Info-Flash-Meldungen
+document.addEventListener('DOMContentLoaded', function() {
+  const successAndInfoAlerts = document.querySelectorAll('.alert-success, .alert-info');
+  successAndInfoAlerts.forEach(function(alert) {
+    // Nach 5 Sekunden automatisch schließen
+    setTimeout(function() {
+      const bsAlert = new bootstrap.Alert(alert);
+      bsAlert.close();
+    }, 5000);
+  });
+});
+
+// Native Kalender bzw. Datum/Uhrzeit-Popup: nach bestätigter Auswahl per Maus/Touch
+// Fokus entfernen, damit das Overlay in Chromium/Edge/Firefox sicher schließt.
+// WICHTIG: Bei reiner Tastatureingabe nicht blurren – sonst springt der Fokus weg,
+// während der Nutzer noch Ziffern (z. B. Jahr) tippt, weil Chromium schon bei
+// Zwischenzuständen (z. B. "0002") ein change-Event feuert.
+(function () {
+  var dateTypes = { date: 1, 'datetime-local': 1, month: 1, week: 1, time: 1 };
+  // Merkt sich je Feld, ob die letzte Interaktion von der Tastatur kam.
+  var keyboardFields = new WeakSet();
+
+  document.addEventListener(
+    'keydown',
+    function (e) {
+      var el = e.target;
+      if (!el || !dateTypes[el.type]) return;
+      // Tab/Enter/Escape schließen das Popup ohnehin – hier nicht als Tastatureingabe merken.
+      if (e.key === 'Tab' || e.key === 'Enter' || e.key === 'Escape') return;
+      keyboardFields.add(el);
+    },
+    true,
+  );
+
+  document.addEventListener(
+    'blur',
+    function (e) {
+      var el = e.target;
+      if (!el || !dateTypes[el.type]) return;
+      keyboardFields.delete(el);
+    },
+    true,
+  );
+
+  document.addEventListener(
+    'change',
+    function (e) {
+      var el = e.target;
+      if (!el || !dateTypes[el.type]) return;
+      if (keyboardFields.has(el)) return;
+      requestAnimationFrame(function () {
+        el.blur();
+      });
+    },
+    true,
+  );
+})();
+
+// Mobile Menü Toggle (nur wenn Elemente vorhanden sind)
+const menuToggle = document.getElementById('menuToggle');
+const sidebar = document.getElementById('sidebar');
+const overlay = document.getElementById('sidebarOverlay');
+const mainContent = document.querySelector('.main-content.with-sidebar');
+
+if (menuToggle && sidebar) {
+  // Funktion zum Prüfen, ob mobile Ansicht aktiv ist
+  function isMobileView() {
+    return window.innerWidth <= 786 || window.innerHeight <= 600;
+  }
+
+  // Persistenter Sidebar-Zustand (nur Desktop)
+  const SIDEBAR_STORAGE_KEY = 'bisSidebarCollapsed';
+
+  function isSidebarCollapsedStored() {
+    try {
+      return localStorage.getItem(SIDEBAR_STORAGE_KEY) === '1';
+    } catch (e) {
+      return false;
+    }
+  }
+
+  function setSidebarCollapsedStored(collapsed) {
+    try {
+      if (collapsed) {
+        localStorage.setItem(SIDEBAR_STORAGE_KEY, '1');
+      } else {
+        localStorage.removeItem(SIDEBAR_STORAGE_KEY);
+      }
+    } catch (e) { /* ignorieren */ }
+  }
+
+  function syncHtmlAttr(collapsed) {
+    if (collapsed) {
+      document.documentElement.setAttribute('data-bis-sidebar', 'collapsed');
+    } else {
+      document.documentElement.removeAttribute('data-bis-sidebar');
+    }
+  }
+
+  // --- Desktop-Hilfsfunktionen für drei Zustände: fix offen, fix collapsed, temporär als Overlay ---
+
+  function pinSidebarOpen() {
+    // Sidebar fix offen, Overlay zu, Persistenz aus
+    sidebar.classList.remove('collapsed');
+    sidebar.classList.remove('open');
+    if (mainContent) {
+      mainContent.classList.remove('sidebar-collapsed');
+    }
+    if (overlay) {
+      overlay.classList.remove('show');
+    }
+    setSidebarCollapsedStored(false);
+    syncHtmlAttr(false);
+  }
+
+  function pinSidebarCollapsed() {
+    // Sidebar fix eingeklappt, Overlay zu, Persistenz an
+    sidebar.classList.add('collapsed');
+    sidebar.classList.remove('open');
+    if (mainContent) {
+      mainContent.classList.add('sidebar-collapsed');
+    }
+    if (overlay) {
+      overlay.classList.remove('show');
+    }
+    setSidebarCollapsedStored(true);
+    syncHtmlAttr(true);
+  }
+
+  function openDesktopOverlay() {
+    // Persistenz bleibt "collapsed", Sidebar wird temporär als Overlay sichtbar
+    sidebar.classList.add('open');
+    if (overlay) {
+      overlay.classList.add('show');
+    }
+  }
+
+  function closeDesktopOverlay() {
+    sidebar.classList.remove('open');
+    if (overlay) {
+      overlay.classList.remove('show');
+    }
+  }
+
+  function singleClickAction() {
+    if (isMobileView()) {
+      // Mobile: open-Klasse togglen + Overlay anzeigen
+      const isOpen = sidebar.classList.toggle('open');
+      if (overlay) {
+        overlay.classList.toggle('show', isOpen);
+      }
+      return;
+    }
+
+    // Desktop:
+    const isCollapsed = sidebar.classList.contains('collapsed');
+    const isOverlayOpen = sidebar.classList.contains('open');
+
+    if (!isCollapsed) {
+      // Fix offen → einklappen + persistieren
+      pinSidebarCollapsed();
+    } else if (isOverlayOpen) {
+      // Overlay offen → Overlay schließen, bleibt persistiert "collapsed"
+      closeDesktopOverlay();
+    } else {
+      // Eingeklappt → temporär als Overlay öffnen
+      openDesktopOverlay();
+    }
+  }
+
+  function doubleClickAction() {
+    if (isMobileView()) {
+      // Auf Mobile keine Sonderbedeutung – wirkt wie zwei Klicks (Open/Close)
+      return;
+    }
+    // Desktop-Doppelklick: Sidebar wieder fix offen
+    pinSidebarOpen();
+  }
+
+  // Single-/Doubleclick-Erkennung via Verzögerung (nur auf Desktop nötig)
+  const SIDEBAR_CLICK_DELAY = 250;
+  let sidebarClickTimer = null;
+
+  function handleMenuToggleClick() {
+    if (isMobileView()) {
+      // Mobile: sofort handeln, kein Doppelklick-Konzept
+      singleClickAction();
+      return;
+    }
+    if (sidebarClickTimer !== null) {
+      clearTimeout(sidebarClickTimer);
+      sidebarClickTimer = null;
+      doubleClickAction();
+    } else {
+      sidebarClickTimer = setTimeout(() => {
+        sidebarClickTimer = null;
+        singleClickAction();
+      }, SIDEBAR_CLICK_DELAY);
+    }
+  }
+
+  menuToggle.addEventListener('click', handleMenuToggleClick);
+
+  if (overlay) {
+    overlay.addEventListener('click', () => {
+      // Schließt Sidebar auf Mobile UND Desktop-Overlay-Modus.
+      // Auf Desktop bleibt die persistierte "collapsed"-Klasse erhalten.
+      sidebar.classList.remove('open');
+      overlay.classList.remove('show');
+    });
+  }
+
+  // Menü schließen bei Klick auf einen Link
+  // (Mobile: kompletter Close; Desktop: nur Overlay-Modus schließen, "collapsed" bleibt)
+  function setupSidebarLinkClose() {
+    const sidebarLinks = sidebar.querySelectorAll('a');
+    sidebarLinks.forEach(link => {
+      link.addEventListener('click', () => {
+        sidebar.classList.remove('open');
+        if (overlay) {
+          overlay.classList.remove('show');
+        }
+      });
+    });
+  }
+
+  // Initial setup
+  setupSidebarLinkClose();
+
+  // Bei Größenänderung neu prüfen
+  window.addEventListener('resize', () => {
+    if (isMobileView()) {
+      // Bei Mobile: collapsed-Klasse entfernen, open-Klasse bleibt falls gesetzt
+      sidebar.classList.remove('collapsed');
+      if (mainContent) {
+        mainContent.classList.remove('sidebar-collapsed');
+      }
+    } else {
+      // Bei Desktop: open-Klasse entfernen, Overlay ausblenden
+      sidebar.classList.remove('open');
+      if (overlay) {
+        overlay.classList.remove('show');
+      }
+      // Gespeicherten Desktop-Zustand wiederherstellen
+      const collapsed = isSidebarCollapsedStored();
+      sidebar.classList.toggle('collapsed', collapsed);
+      if (mainContent) {
+        mainContent.classList.toggle('sidebar-collapsed', collapsed);
+      }
+      syncHtmlAttr(collapsed);
+    }
+  });
+
+  // Initial: Auf Desktop gespeicherten Zustand anwenden, mobil ignorieren
+  if (!isMobileView()) {
+    const collapsed = isSidebarCollapsedStored();
+    sidebar.classList.toggle('collapsed', collapsed);
+    if (mainContent) {
+      mainContent.classList.toggle('sidebar-collapsed', collapsed);
+    }
+    syncHtmlAttr(collapsed);
+  } else {
+    // Auf Mobile: HTML-Attribut entfernen (nur Desktop-Optik), Storage bleibt erhalten
+    document.documentElement.removeAttribute('data-bis-sidebar');
+  }
+
+  // Nach dem ersten Paint Übergangs-Sperre wieder lösen,
+  // damit Klick-Animationen (Sidebar ein-/ausklappen) sauber laufen.
+  requestAnimationFrame(() => {
+    requestAnimationFrame(() => {
+      document.documentElement.classList.remove('bis-no-transition');
+    });
+  });
+}
+
+// Service Worker registrieren
+if ('serviceWorker' in navigator) {
+  window.addEventListener('load', () => {
+    navigator.serviceWorker.register('/service-worker.js', { scope: '/' })
+      .then(registration => {
+        console.log('Service Worker registriert:', registration.scope);
+      })
+      .catch(error => {
+        console.log('Service Worker Registrierung fehlgeschlagen:', error);
+      });
+  });
+}
+
+// Benachrichtigungen laden und anzeigen (304 = unverändert seit dem letzten ETag)
+let benachrichtigungenEtag = null;
+function loadBenachrichtigungen() {
+  const headers = { 'X-Requested-With': 'XMLHttpRequest' };
+  if (benachrichtigungenEtag) {
+    headers['If-None-Match'] = benachrichtigungenEtag;
+  }
+  fetch(bisLayout.benachrichtigungenUrl, {
+    headers: headers,
+    cache: 'no-store'
+  })
+  .then(response => {
+    if (response.status === 304) {
+      return null;
+    }
+    benachrichtigungenEtag = response.headers.get('ETag');
+    return response.json();
+  })
+  .then(data => {
+    if (data && data.success) {
+      const badge = document.getElementById('notificationBadge');
+      const mobileBadge = document.getElementById('mobileNotificationBadge');
+      if (badge) {
+        if (data.anzahl_ungelesen > 0) {
+          badge.textContent = data.anzahl_ungelesen > 99 ? '99+' : data.anzahl_ungelesen;
+          badge.style.display = 'inline-block';
+        } else {
+          badge.style.display = 'none';
+        }
+      }
+      if (mobileBadge) {
+        if (data.anzahl_ungelesen > 0) {
+          mobileBadge.textContent = data.anzahl_ungelesen > 99 ? '99+' : data.anzahl_ungelesen;
+          mobileBadge.style.display = 'inline-block';
+        } else {
+          mobileBadge.style.display = 'none';
+        }
+      }
+
+      // Neue Benachrichtigungen als Toast anzeigen
+      if (data.benachrichtigungen && data.benachrichtigungen.length > 0) {
+        // Nur die neuesten 3 anzeigen (um Spam zu vermeiden)
+        const neue = data.benachrichtigungen.slice(0, 3);
+        neue.forEach(notif => {
+          showNotificationToast(notif);
+        });
+      }
+    }
+  })
+  .catch(error => {
+    console.error('Fehler beim Laden der Benachrichtigungen:', error);
+  });
+}
+window.loadBenachrichtigungen = loadBenachrichtigungen;
+
+// Toast-Benachrichtigung anzeigen
+function showNotificationToast(notif) {
+  // Prüfen ob diese Benachrichtigung bereits angezeigt wurde
+  const storageKey = `notif_shown_${notif.ID}`;
+  if (localStorage.getItem(storageKey)) {
+    return; // Bereits angezeigt
+  }
+
+  // Toast-Container erstellen falls nicht vorhanden
+  let toastContainer = document.getElementById('toastContainer');
+  if (!toastContainer) {
+    toastContainer = document.createElement('div');
+    toastContainer.id = 'toastContainer';
+    toastContainer.className = 'toast-container position-fixed top-0 end-0 p-3';
+    toastContainer.style.zIndex = '9999';
+    document.body.appendChild(toastContainer);
+  }
+
+  // Toast erstellen
+  const toastId = 'toast-' + Date.now();
+  const ansehenBtn = notif.ziel_url
+    ? `<a href="${notif.ziel_url}" class="btn btn-sm btn-light me-2" onclick="markAsRead(${notif.ID})">Ansehen</a>`
+    : '';
+  const toastHtml = `
+    <div id="${toastId}" class="toast align-items-center text-white bg-primary border-0" role="alert" aria-live="assertive" aria-atomic="true">
+      <div class="d-flex">
+        <div class="toast-body">
+          <strong>${notif.Titel}</strong><br>
+          <small>${notif.Nachricht}</small>
+          <div class="mt-2">
+            ${ansehenBtn}
+            <button type="button" class="btn btn-sm btn-outline-light" onclick="markAsRead(${notif.ID}); document.getElementById('${toastId}').remove();">
+              Schließen
+            </button>
+          </div>
+        </div>
+        <button type="button" class="btn-close btn-close-white me-2 m-auto" data-bs-dismiss="toast" aria-label="Close" onclick="markAsRead(${notif.ID})"></button>
+      </div>
+    </div>
+  `;
+
+  toastContainer.insertAdjacentHTML('beforeend', toastHtml);
+  const toastElement = document.getElementById(toastId);
+  const toast = new bootstrap.Toast(toastElement, { delay: 10000 });
+  toast.show();
+
+  // Als angezeigt markieren
+  localStorage.setItem(storageKey, 'true');
+
+  // Toast nach dem Ausblenden entfernen
+  toastElement.addEventListener('hidden.bs.toast', () => {
+    toastElement.remove();
+  });
+}
+
+// Benachrichtigung als gelesen markieren
+function markAsRead(benachrichtigungId) {
+  fetch(bisLayout.gelesenUrl.replace('/0', `/${benachrichtigungId}`), {
+    method: 'POST',
+    headers: {
+      'X-Requested-With': 'XMLHttpRequest'
+
+    }
+  })
+  .then(response => response.json())
+  .then(data => {
+    if (data.success) {
+      // Badge aktualisieren
+      loadBenachrichtigungen();
+    }
+  })
+  .catch(error => {
+    console.error('Fehler beim Markieren als gelesen:', error);
+  });
+}
+
+// Benachrichtigungen beim Laden der Seite abrufen
+if (bisLayout.angemeldet === '1') {
+  // Sofort beim Laden ausführen (auch wenn DOM bereits geladen ist)
+  if (document.readyState === 'loading') {
+    document.addEventListener('DOMContentLoaded', function() {
+      loadBenachrichtigungen();
+    });
+  } else {
+    // DOM ist bereits geladen
+    loadBenachrichtigungen();
+  }
+
+  // Live per SSE; ohne Stream (kein EventSource, Limit erreicht, Verbindung weg) alle 30 Sekunden nachfragen
+  let benachrichtigungenPoll = null;
+  function benachrichtigungenPollen() {
+    if (!benachrichtigungenPoll) {
+      benachrichtigungenPoll = setInterval(loadBenachrichtigungen, 30000);
+    }
+  }
+  if (window.EventSource) {
+    const benachrichtigungenStream = new EventSource(bisLayout.streamUrl);
+    benachrichtigungenStream.addEventListener('geaendert', loadBenachrichtigungen);
+    benachrichtigungenStream.addEventListener('open', function() {
+      if (benachrichtigungenPoll) {
+        clearInterval(benachrichtigungenPoll);
+        benachrichtigungenPoll = null;
+        // Während der Unterbrechung verpasste Änderungen nachholen
+        loadBenachrichtigungen();
+      }
+    });
+    benachrichtigungenStream.addEventListener('error', benachrichtigungenPollen);
+  } else {
+    benachrichtigungenPollen();
+  }
+
+  // Bei Seitenwechsel auch aktualisieren (für Single-Page-App-Verhalten)
+  // Event-Listener für alle Navigation-Links
+  document.addEventListener('click', function(e) {
+    const link = e.target.closest('a');
+    if (link && link.href && !link.href.startsWith('#')) {
+      // Kurz warten, dann Benachrichtigungen neu laden
+      setTimeout(loadBenachrichtigungen, 500);
+    }
+  });
+
+  // Auch beim Zurück-Button im Browser
+  window.addEventListener('popstate', function() {
+    setTimeout(loadBenachrichtigungen, 500);
+  });
+}
+
+// Globale Suche
+(function() {
+  const searchInput = document.getElementById('globalSearchInput');
+  const searchDropdown = document.getElementById('searchDropdown');
+  let searchTimeout = null;
+  let selectedIndex = -1;
+  let currentResults = [];
+
+  if (!searchInput || !searchDropdown) return;
+
+  // Debounced Suche
+  function performSearch(query) {
+    if (query.length < 1) {
+      searchDropdown.style.display = 'none';
+      currentResults = [];
+      return;
+    }
+
+    clearTimeout(searchTimeout);
+    searchTimeout = setTimeout(() => {
+      fetch(`${bisLayout.sucheUrl}?q=${encodeURIComponent(query)}&format=json`, {
+        headers: {
+          'X-Requested-With': 'XMLHttpRequest'
+        }
+      })
+      .then(response => response.json())
+      .then(data => {
+        if (data.success) {
+          currentResults = data.results;
+          renderDropdown(data.results, query);
+        } else {
+          searchDropdown.innerHTML = '<div class="search-dropdown-empty">Fehler bei der Suche</div>';
+          searchDropdown.style.display = 'block';
+        }
+      })
+      .catch(error => {
+        console.error('Fehler bei der Suche:', error);
+        searchDropdown.style.display = 'none';
+      });
+    }, 300);
+  }
+
+  // Dropdown rendern
+  function renderDropdown(results, query) {
+    const totalResults = (results.themen?.length || 0) + 
+                        (results.ersatzteile?.length || 0) + 
+                        (results.bestellungen?.length || 0) + 
+                        (results.angebotsanfragen?.length || 0);
+
+    if (totalResults === 0) {
+      searchDropdown.innerHTML = '<div class="search-dropdown-empty">Keine Ergebnisse gefunden</div>';
+      searchDropdown.style.display = 'block';
+      return;
+    }
+
+    let html = '';
+    let itemIndex = 0;
+
+    function renderSection(titel, items) {
+      if (!items || !items.length) return '';
+      let s = '<div class="search-dropdown-section">';
+      s += '<div class="search-dropdown-section-title">' + escapeHtml(titel) + ' (' + items.length + ')</div>';
+      items.slice(0, 5).forEach(item => {
+        s += `<div class="search-dropdown-item" data-index="${itemIndex}" data-url="${escapeHtml(item.url)}">`;
+        s += `<div class="search-dropdown-item-title">${escapeHtml(item.title)}</div>`;
+        if (item.preview) {
+          const preview = item.preview.length > 60 ? item.preview.substring(0, 60) + '...' : item.preview;
+          s += `<div class="search-dropdown-item-preview">${escapeHtml(preview)}</div>`;
+        }
+        s += '</div>';
+        itemIndex++;
+      });
+      s += '</div>';
+      return s;
+    }
+
+    html += renderSection('Themen', results.themen);
+    html += renderSection('Ersatzteile', results.ersatzteile);
+    html += renderSection('Bestellungen', results.bestellungen);
+    html += renderSection('Angebotsanfragen', results.angebotsanfragen);
+
+    const hasMore = (results.themen?.length > 5) ||
+                   (results.ersatzteile?.length > 5) ||
+                   (results.bestellungen?.length > 5) ||
+                   (results.angebotsanfragen?.length > 5);
+    if (hasMore) {
+      const searchUrl = bisLayout.sucheUrl + '?q=' + encodeURIComponent(query);
+      html += '<div class="search-dropdown-section">';
+      html += `<div class="search-dropdown-item" style="text-align: center; font-weight: 600;" data-url="${escapeHtml(searchUrl)}">`;
+      html += 'Alle Ergebnisse anzeigen →';
+      html += '</div>';
+      html += '</div>';
+    }
+
+    searchDropdown.innerHTML = html;
+    searchDropdown.style.display = 'block';
+    selectedIndex = -1;
+
+    // Event Listener für Items
+    searchDropdown.querySelectorAll('.search-dropdown-item').forEach(item => {
+      item.addEventListener('click', function() {
+        const url = this.getAttribute('data-url');
+        if (url) {
+          window.location.href = url;
+        }
+      });
+    });
+  }
+
+  // HTML Escaping
+  function escapeHtml(text) {
+    const div = document.createElement('div');
+    div.textContent = text;
+    return div.innerHTML;
+  }
+
+  // Event Listener
+  searchInput.addEventListener('input', function() {
+    performSearch(this.value);
+  });
+
+  searchInput.addEventListener('keydown', function(e) {
+    const items = searchDropdown.querySelectorAll('.search-dropdown-item[data-url]');
+
+    if (e.key === 'ArrowDown') {
+      e.preventDefault();
+      selectedIndex = Math.min(selectedIndex + 1, items.length - 1);
+      updateSelection(items);
+    } else if (e.key === 'ArrowUp') {
+      e.preventDefault();
+      selectedIndex = Math.max(selectedIndex - 1, -1);
+      updateSelection(items);
+    } else if (e.key === 'Enter') {
+      e.preventDefault();
+      if (selectedIndex >= 0 && items[selectedIndex]) {
+        const url = items[selectedIndex].getAttribute('data-url');
+        if (url) {
+          window.location.href = url;
+        }
+      } else if (this.value.trim()) {
+        // Zu Ergebnisseite navigieren
+        window.location.href = `${bisLayout.sucheUrl}?q=${encodeURIComponent(this.value.trim())}`;
+      }
+    } else if (e.key === 'Escape') {
+      searchDropdown.style.display = 'none';
+      this.blur();
+    }
+  });
+
+  function updateSelection(items) {
+    items.forEach((item, index) => {
+      if (index === selectedIndex) {
+        item.classList.add('active');
+        item.scrollIntoView({ block: 'nearest', behavior: 'smooth' });
+      } else {
+        item.classList.remove('active');
+      }
+    });
+  }
+
+  // Dropdown schließen bei Klick außerhalb
+  document.addEventListener('click', function(e) {
+    if (!searchInput.contains(e.target) && !searchDropdown.contains(e.target)) {
+      searchDropdown.style.display = 'none';
+    }
+  });
+
+  // Dropdown schließen bei Fokus-Verlust (aber nicht bei Klick auf Item)
+  searchInput.addEventListener('blur', function() {
+    // Kurze Verzögerung, damit Click-Events auf Items funktionieren
+    setTimeout(() => {
+      if (!searchDropdown.matches(':hover')) {
+        searchDropdown.style.display = 'none';
+      }
+    }, 200);
+  });
+})();
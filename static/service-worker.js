@@ -1,17 +1,27 @@
-// Service Worker für BIS PWA (v3: fetch-Handler cacht nur noch /static/)
-const CACHE_NAME = 'bis-cache-v3-static';
+// Service Worker für BIS PWA (v4: gehashte Assets unter /static/dist/ cache-first)
+const CACHE_NAME = 'bis-cache-v4-static';
 const urlsToCache = [
   '/',
-  '/static/style.css',
-  '/static/script.js',
-  '/static/manifest.json',
-  '/static/vendor/bootstrap/bootstrap.min.css',
-  '/static/vendor/bootstrap/bootstrap.bundle.min.js',
-  '/static/vendor/bootstrap-icons/bootstrap-icons.css',
-  '/static/vendor/bootstrap-icons/fonts/bootstrap-icons.woff2',
-  '/static/vendor/ibm-plex-sans/ibm-plex-sans.css'
+  '/static/manifest.json'
 ];
 
+// /static/dist/<pfad>.<hash>.<endung>: Inhalt ändert sich nie unter derselben URL
+const HASH_ASSET = /^\/static\/dist\/.+\.[0-9a-f]{10}\.[a-z0-9]+$/;
+
+function ohneHash(pathname) {
+  return pathname.replace(/\.[0-9a-f]{10}(\.[a-z0-9]+)$/, '$1');
+}
+
+// Gehashtes Asset cachen und ältere Stände derselben Datei entfernen
+function hashAssetCachen(request, response) {
+  const pfad = ohneHash(new URL(request.url).pathname);
+  return caches.open(CACHE_NAME).then(cache => cache.keys().then(keys => Promise.all(
+    keys
+      .filter(k => k.url !== request.url && ohneHash(new URL(k.url).pathname) === pfad)
+      .map(k => cache.delete(k))
+  )).then(() => cache.put(request, response)));
+}
+
 // Installation
 self.addEventListener('install', event => {
   self.skipWaiting();
@@ -46,8 +56,22 @@ self.addEventListener('activate', event => {
   );
 });
 
-// Netz zuerst; cache.put nur für /static/ (vormals: jede HTML-Seite cachen → viele fehlerhafte put())
+// Gehashte Assets: Cache zuerst, Netz nur beim ersten Abruf
 self.addEventListener('fetch', event => {
+  const url = new URL(event.request.url);
+  if (event.request.method === 'GET' && url.origin === self.location.origin && HASH_ASSET.test(url.pathname)) {
+    event.respondWith(
+      caches.match(event.request).then(cached => cached || fetch(event.request).then(response => {
+        if (response.status === 200) {
+          hashAssetCachen(event.request, response.clone()).catch(function () { /* z. B. Quota */ });
+        }
+        return response;
+      }))
+    );
+    return;
+  }
+
+  // Sonst Netz zuerst; cache.put nur für /static/ (vormals: jede HTML-Seite cachen → viele fehlerhafte put())
   event.respondWith(
     fetch(event.request)
       .then(response => {
@@ -57,16 +81,13 @@ self.addEventListener('fetch', event => {
           response.type !== 'opaque' &&
           response.type !== 'opaqueredirect'
         ) {
-          try {
-            const url = new URL(event.request.url);
-            if (url.origin === self.location.origin && url.pathname.startsWith('/static/')) {
-              const responseClone = response.clone();
-              caches
-                .open(CACHE_NAME)
-                .then((cache) => cache.put(event.request, responseClone))
-                .catch(function () { /* z. B. Quota */ });
-            }
-          } catch (e) { /* ungültige URL */ }
+          if (url.origin === self.location.origin && url.pathname.startsWith('/static/')) {
+            const responseClone = response.clone();
+            caches
+              .open(CACHE_NAME)
+              .then((cache) => cache.put(event.request, responseClone))
+              .catch(function () { /* z. B. Quota */ });
+          }
         }
         return response;
       })
@@ -8,6 +8,8 @@ Phase 4 der SA-Migration:
 - ``connection``: DBAPI-kompatible Verbindung aus der Engine, die sich wie die
   ``get_db_connection()``-Fassade verhaelt (``sqlite3.Row`` als ``row_factory``).
 - ``client``: unveraenderter Flask-Test-Client fuer Routen-Tests.
+- ``sql_recorder``: Verbindungs-Attrappe fuer Query-Plan-Tests, die das ausgefuehrte SQL
+  mitschreibt und per ``EXPLAIN QUERY PLAN`` auf ``connection`` auswertet.
 """
 
 from __future__ import annotations
@@ -19,8 +21,20 @@ from sqlalchemy import create_engine, event
 from sqlalchemy.pool import StaticPool
 
 from app import app
+from utils.stammdaten_cache import stammdaten_cache_leeren
 from utils.db_schema import metadata
 
+# Test-Apps starten keine Hintergrund-Threads (MQTT/Redis-Leser, Fälligkeits-Job, Bericht-Worker)
+app.config['TESTING'] = True
+
+
+@pytest.fixture(autouse=True)
+def _stammdaten_cache_leeren():
+    """Jeder Test startet mit leerem Stammdaten-Cache (eigene In-Memory-DB je Test)."""
+    stammdaten_cache_leeren()
+    yield
+    stammdaten_cache_leeren()
+
 
 @pytest.fixture
 def client():
@@ -80,3 +94,36 @@ def connection(engine):
         except Exception:
             pass
         conn.close()
+
+
+class SqlRecorder:
+    """Leitet ``execute``/``commit`` an die Verbindung weiter und merkt sich SQL + Parameter."""
+
+    def __init__(self, conn):
+        self._conn = conn
+        self.statements = []
+
+    def execute(self, sql, params=()):
+        self.statements.append((sql, tuple(params)))
+        return self._conn.execute(sql, params)
+
+    def commit(self):
+        self._conn.commit()
+
+    def abfrage(self, marker):
+        """Erste ausgefuehrte Abfrage, deren SQL ``marker`` enthaelt: (sql, params)."""
+        for sql, params in self.statements:
+            if marker in sql:
+                return sql, params
+        raise AssertionError(f'Keine Abfrage mit {marker!r} ausgefuehrt')
+
+    def plan(self, marker):
+        """``EXPLAIN QUERY PLAN`` (Spalte ``detail``) der ersten Abfrage mit ``marker``."""
+        sql, params = self.abfrage(marker)
+        rows = self._conn.execute('EXPLAIN QUERY PLAN ' + sql, params).fetchall()
+        return [r['detail'] for r in rows]
+
+
+@pytest.fixture
+def sql_recorder(connection):
+    return SqlRecorder(connection)
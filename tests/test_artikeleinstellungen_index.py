@@ -0,0 +1,98 @@
+"""Tests fuer den Ordner-Index der Artikeleinstellungen (utils/artikeleinstellungen_index.py)."""
+
+import os
+
+import pytest
+from flask import Flask
+
+from utils import artikeleinstellungen_index as index_modul
+from utils.artikeleinstellungen_index import (
+    artikel_aktualisieren,
+    artikeleinstellungen_struktur,
+    index_neu_aufbauen,
+)
+
+ALT = 1_600_000_000
+
+
+def _anlegen(pfad, *dateien):
+    pfad.mkdir(parents=True, exist_ok=True)
+    for name in dateien:
+        (pfad / name).write_bytes(b'x')
+
+
+def _alt_machen(*pfade):
+    """mtime weit in die Vergangenheit setzen (sonst gilt der Ordner als gerade geaendert)."""
+    for pfad in pfade:
+        os.utime(pfad, (ALT, ALT))
+
+
+@pytest.fixture
+def ordner(tmp_path):
+    wurzel = tmp_path / 'Produktion' / 'Etikettierung' / 'Artikeleinstellungen'
+    _anlegen(wurzel / 'Linie 1' / '10-Kaese', 'foto.png', 'bizerba.jpg', 'notiz.txt')
+    _anlegen(wurzel / 'Linie 1' / '2-Wurst', 'a.jpg')
+    _anlegen(wurzel / 'Linie 1' / 'Ohne Nummer')
+    _alt_machen(wurzel, wurzel / 'Linie 1', *(wurzel / 'Linie 1').iterdir())
+    return wurzel
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    app.config['UPLOAD_BASE_FOLDER'] = str(tmp_path)
+    app.config['ARTIKELEINSTELLUNGEN_INDEX_DATEI'] = str(tmp_path / 'Cache' / 'index.json')
+    app.config['ARTIKELEINSTELLUNGEN_INDEX_PRUEFEN_SEKUNDEN'] = 0
+    return app
+
+
+def test_struktur_sortiert_und_gefiltert(app, ordner):
+    with app.app_context():
+        struktur = artikeleinstellungen_struktur()
+    assert list(struktur['Linie 1']) == ['2-Wurst', '10-Kaese', 'Ohne Nummer']
+    assert struktur['Linie 1']['10-Kaese'] == ['bizerba.jpg', 'foto.png']
+    assert os.path.isfile(app.config['ARTIKELEINSTELLUNGEN_INDEX_DATEI'])
+
+
+def test_unveraenderte_ordner_werden_nicht_gelistet(app, ordner, monkeypatch):
+    with app.app_context():
+        artikeleinstellungen_struktur()
+        gelistet = []
+        original = os.scandir
+        monkeypatch.setattr(index_modul.os, 'scandir', lambda p: gelistet.append(p) or original(p))
+
+        artikeleinstellungen_struktur()
+        assert gelistet == []
+
+        # Neue Datei aendert nur die mtime ihres Artikel-Ordners
+        _anlegen(ordner / 'Linie 1' / '2-Wurst', 'b.png')
+        struktur = artikeleinstellungen_struktur()
+    assert gelistet == [str(ordner / 'Linie 1' / '2-Wurst')]
+    assert struktur['Linie 1']['2-Wurst'] == ['a.jpg', 'b.png']
+
+
+def test_pruefintervall_und_upload(app, ordner):
+    app.config['ARTIKELEINSTELLUNGEN_INDEX_PRUEFEN_SEKUNDEN'] = 3600
+    with app.app_context():
+        artikeleinstellungen_struktur()
+        _anlegen(ordner / 'Linie 2' / '1-Neu', 'bizerba.jpg')
+        # Innerhalb des Intervalls wird die Freigabe nicht angefasst
+        assert 'Linie 2' not in artikeleinstellungen_struktur()
+
+        artikel_aktualisieren('Linie 2', '1-Neu')
+        assert artikeleinstellungen_struktur()['Linie 2'] == {'1-Neu': ['bizerba.jpg']}
+
+
+def test_neuaufbau_und_anderer_prozess(app, ordner, monkeypatch):
+    with app.app_context():
+        artikeleinstellungen_struktur()
+        (ordner / 'Linie 1' / '2-Wurst' / 'a.jpg').unlink()
+        _alt_machen(ordner / 'Linie 1' / '2-Wurst')
+        # mtime wieder wie vorher: nur der Neuaufbau sieht die Aenderung
+        assert artikeleinstellungen_struktur()['Linie 1']['2-Wurst'] == ['a.jpg']
+        assert index_neu_aufbauen()['Linie 1']['2-Wurst'] == []
+
+        # Ein frischer Prozess liest den gespeicherten Index
+        monkeypatch.setattr(index_modul, '_geladen', None)
+        app.config['ARTIKELEINSTELLUNGEN_INDEX_PRUEFEN_SEKUNDEN'] = 3600
+        assert artikeleinstellungen_struktur()['Linie 1']['2-Wurst'] == []
@@ -0,0 +1,112 @@
+"""Tests fuer den Verlauf der Beleuchtungs-Schaltzustaende (modules/technik/beleuchtung_verlauf.py)."""
+
+import os
+import time
+
+import pytest
+from flask import Flask
+
+from modules.technik import beleuchtung_verlauf as verlauf
+from modules.technik.beleuchtung_verlauf import (
+    ZUSTAND_AUS,
+    ZUSTAND_EIN,
+    einschaltdauer,
+    eintraege_schreiben,
+    zeitverlauf,
+)
+
+# Mitternacht UTC, weit genug zurueck fuer abgeschlossene Tage
+TAG = (int(time.time()) // 86400 - 10) * 86400
+STUNDE = 3600
+
+
+@pytest.fixture
+def ordner(tmp_path, monkeypatch):
+    monkeypatch.setattr(verlauf, '_letzter_zustand', {})
+    verlauf.cache_leeren()
+    app = Flask(__name__)
+    app.config.update(TECHNIK_VERLAUF_FOLDER=str(tmp_path), TECHNIK_VERLAUF_TAGE=0)
+    with app.app_context():
+        yield str(tmp_path)
+    verlauf.cache_leeren()
+
+
+def _schreiben(ordner, *wechsel):
+    return eintraege_schreiben([(ordner, ts, lampe, zustand) for ts, lampe, zustand in wechsel])
+
+
+def test_nur_wechsel_werden_geschrieben(ordner):
+    geschrieben = _schreiben(
+        ordner,
+        (TAG + STUNDE, 45329, ZUSTAND_EIN),
+        (TAG + STUNDE + 5, 45329, ZUSTAND_EIN),
+        (TAG + 2 * STUNDE, 45329, ZUSTAND_AUS),
+        (TAG + 86400 + STUNDE, 45329, ZUSTAND_EIN),
+    )
+    assert geschrieben == 3
+    assert sorted(os.listdir(ordner)) == [f'{verlauf._utc_tag(TAG)}.bin', f'{verlauf._utc_tag(TAG + 86400)}.bin']
+    assert os.path.getsize(os.path.join(ordner, f'{verlauf._utc_tag(TAG)}.bin')) == 18
+
+
+def test_einschaltdauer_ueber_tagesgrenzen(ordner):
+    _schreiben(
+        ordner,
+        (TAG + 22 * STUNDE, 1, ZUSTAND_EIN),
+        (TAG + 26 * STUNDE, 1, ZUSTAND_AUS),
+        (TAG + 23 * STUNDE, 2, ZUSTAND_EIN),
+        (TAG + 23 * STUNDE + 1800, 2, verlauf.ZUSTAND_UNBEKANNT),
+    )
+    assert einschaltdauer(TAG, TAG + 3 * 86400) == {'1': 4 * STUNDE, '2': 1800}
+    # Zustand vor Beginn wird aus dem Vortag uebernommen
+    assert einschaltdauer(TAG + 86400, TAG + 86400 + STUNDE, lampen=['1']) == {'1': STUNDE}
+
+
+def test_zeitverlauf_und_nachgeschriebene_saetze(ordner):
+    _schreiben(ordner, (TAG + 6 * STUNDE, 7, ZUSTAND_EIN), (TAG + 9 * STUNDE, 7, ZUSTAND_AUS))
+    ergebnis = zeitverlauf(TAG, TAG + 86400, punkte=4)
+    assert ergebnis['schritt'] == 6 * STUNDE
+    assert ergebnis['lampen'] == {'7': [0.0, 0.5, 0.0, 0.0]}
+
+    # Angehaengte Saetze derselben Tagesdatei werden nachgelesen
+    _schreiben(ordner, (TAG + 18 * STUNDE, 7, ZUSTAND_EIN))
+    assert zeitverlauf(TAG, TAG + 86400, punkte=4)['lampen']['7'] == [0.0, 0.5, 0.0, 1.0]
+
+    jetzt = int(time.time())
+    zukunft = zeitverlauf(jetzt - 60, jetzt + 2 * 86400, punkte=2)['lampen']['7']
+    assert zukunft[0] == 1.0 and zukunft[1] is None
+
+
+def test_ungueltiger_zeitraum(ordner):
+    with pytest.raises(ValueError):
+        einschaltdauer(TAG, TAG)
+
+
+def test_zeitraum_auf_aufbewahrten_verlauf_begrenzt(ordner, monkeypatch):
+    from flask import current_app
+
+    current_app.config['TECHNIK_VERLAUF_TAGE'] = 30
+    _schreiben(ordner, (TAG + STUNDE, 1, ZUSTAND_EIN), (TAG + 2 * STUNDE, 1, ZUSTAND_AUS))
+    gelesen = []
+    laden = verlauf._tag_laden
+    monkeypatch.setattr(verlauf, '_tag_laden', lambda o, tag: gelesen.append(tag) or laden(o, tag))
+
+    assert einschaltdauer(0, TAG + 86400) == {'1': STUNDE}
+    assert len(gelesen) <= 30 + verlauf.RUECKBLICK_TAGE + 2
+    assert zeitverlauf(0, TAG + 86400, punkte=1)['von'] >= TAG - 30 * 86400
+    with pytest.raises(ValueError):
+        einschaltdauer(0, TAG - 40 * 86400)
+    with pytest.raises(ValueError):
+        einschaltdauer(int(time.time()) + 86400, int(time.time()) + 2 * 86400)
+
+
+@pytest.mark.parametrize('von', ['99999999999999999999', '1' * 400, '9999-12-31T23:59:59+14:00', 'gestern'])
+def test_route_ungueltiger_zeitpunkt_400(von):
+    from app import app
+
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = 1
+        sess['user_menue_sichtbarkeit'] = {'technik_uebersichten': True}
+    antwort = client.get('/technik/beleuchtung/verlauf', query_string={'von': von})
+    assert antwort.status_code == 400
+    assert client.get('/technik/beleuchtung/verlauf', query_string={'von': '0'}).status_code == 200
@@ -0,0 +1,127 @@
+"""Tests fuer die Live-Aktualisierung der Benachrichtigungs-Glocke (utils/benachrichtigungen_live.py)."""
+
+import pytest
+from flask import Flask
+
+from utils import beleuchtung_redis, benachrichtigungen_live
+from utils.benachrichtigungen import erstelle_benachrichtigung_fuer_bericht_job
+from utils.benachrichtigungen_live import (
+    abbestellen,
+    abonnieren,
+    benachrichtigung_geaendert,
+    ungelesen_stand,
+    verteilen_redis_nachricht,
+    vorgemerkte_senden,
+)
+
+
+class _FakeRedis:
+    def __init__(self):
+        self.gesendet = []
+
+    def publish(self, kanal, nachricht):
+        self.gesendet.append((kanal, nachricht))
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setattr(beleuchtung_redis, 'get_redis_connection_for_technik', lambda **_: None)
+    app = Flask(__name__)
+    app.config['BENACHRICHTIGUNGEN_SSE_MAX_STREAMS'] = 2
+    return app
+
+
+@pytest.fixture
+def stream(app):
+    with app.app_context():
+        q = abonnieren(7)
+    yield q
+    abbestellen(7, q)
+
+
+def test_meldung_erst_nach_dem_request(app, stream):
+    @app.route('/lesen')
+    def _lesen():
+        benachrichtigung_geaendert(7)
+        # Noch nicht gemeldet: die Route hat ihre Transaktion evtl. noch offen
+        assert stream.empty()
+        return 'ok'
+
+    assert app.test_client().get('/lesen').status_code == 200
+    assert stream.get_nowait() is True
+
+
+def test_ausserhalb_request_nach_vorgemerkte_senden(app, stream):
+    with app.app_context():
+        benachrichtigung_geaendert(8)
+        benachrichtigung_geaendert(7)
+        assert stream.empty()
+        vorgemerkte_senden()
+    assert stream.get_nowait() is True
+    # Mehrere Meldungen fallen zusammen
+    verteilen_redis_nachricht({'mitarbeiter_ids': [7]})
+    verteilen_redis_nachricht({'mitarbeiter_ids': [7]})
+    assert stream.qsize() == 1
+
+
+def test_mit_redis_nur_publish(app, stream, monkeypatch):
+    redis = _FakeRedis()
+    monkeypatch.setattr(beleuchtung_redis, 'get_redis_connection_for_technik', lambda **_: redis)
+    with app.app_context():
+        benachrichtigung_geaendert(7)
+        vorgemerkte_senden()
+    assert redis.gesendet == [(benachrichtigungen_live.REDIS_CHANNEL_BENACHRICHTIGUNGEN, '{"mitarbeiter_ids": [7]}')]
+    # Zugestellt wird erst ueber den Pub/Sub-Listener
+    assert stream.empty()
+
+
+def test_stream_limit_je_prozess(app, stream):
+    with app.app_context():
+        zweiter = abonnieren(9)
+        assert zweiter is not None
+        assert abonnieren(10) is None
+        abbestellen(9, zweiter)
+        assert benachrichtigungen_live.anzahl_abonnenten() == 1
+
+
+def test_stand_aendert_sich_mit_ungelesenen(app, connection):
+    connection.execute(
+        "INSERT INTO Mitarbeiter (ID, Personalnummer, Nachname, Passwort) VALUES (1, 'P1', 'Test', 'x')"
+    )
+    connection.execute(
+        "INSERT INTO BerichtJob (ID, MitarbeiterID, Typ, Status, Dateiname) VALUES (3, 1, 'thema', 'fertig', 'a.pdf')"
+    )
+    leer = ungelesen_stand(connection, 1)
+    with app.app_context():
+        erstelle_benachrichtigung_fuer_bericht_job(3, connection)
+        vorgemerkte_senden()
+    neu = ungelesen_stand(connection, 1)
+    assert neu != leer
+    assert ungelesen_stand(connection, 1) == neu
+
+    connection.execute('UPDATE Benachrichtigung SET Gelesen = 1 WHERE MitarbeiterID = 1')
+    assert ungelesen_stand(connection, 1) == leer
+
+
+def test_beleuchtungs_streams_zaehlen_gegen_das_limit(monkeypatch):
+    from app import app as bis_app
+    from modules.technik.sse_broadcast import register_subscriber, unregister_subscriber
+
+    monkeypatch.setitem(bis_app.config, 'BENACHRICHTIGUNGEN_SSE_MAX_STREAMS', 2)
+    client = bis_app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = 7
+        sess['user_menue_sichtbarkeit'] = {'dashboard': True}
+
+    wanddisplays = [register_subscriber(), register_subscriber()]
+    try:
+        antwort = client.get('/dashboard/api/benachrichtigungen/stream')
+        assert antwort.status_code == 204
+        assert benachrichtigungen_live.anzahl_abonnenten() == 0
+    finally:
+        for a in wanddisplays:
+            unregister_subscriber(a)
+    with bis_app.app_context():
+        q = abonnieren(7)
+    assert q is not None
+    abbestellen(7, q)
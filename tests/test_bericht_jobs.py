@@ -0,0 +1,153 @@
+"""Tests fuer asynchrone Bericht-Jobs (utils/reports/bericht_jobs.py, modules/berichte)."""
+
+import json
+import os
+import zipfile
+from contextlib import contextmanager
+
+import pytest
+from flask import Flask
+
+from utils.reports import bericht_jobs
+from utils.reports.bericht_jobs import (
+    arbeite_naechsten_job_ab,
+    job_anlegen,
+    job_laden,
+    job_ordner,
+    jobs_aufraeumen,
+)
+
+
+@pytest.fixture
+def app(tmp_path, connection, monkeypatch):
+    app = Flask(__name__)
+    app.config.update(UPLOAD_BASE_FOLDER=str(tmp_path), REPORT_JOB_FOLDER=str(tmp_path / 'Jobs'))
+
+    @contextmanager
+    def _conn():
+        yield connection
+
+    monkeypatch.setattr(bericht_jobs, 'get_db_connection', _conn)
+    monkeypatch.setattr(bericht_jobs, '_letzte_wartung', float('inf'))
+    connection.execute(
+        "INSERT INTO Mitarbeiter (ID, Personalnummer, Nachname, Passwort) VALUES (7, '7', 'Muster', 'x')"
+    )
+    return app
+
+
+@pytest.fixture
+def erzeugt(monkeypatch):
+    """Ersetzt die Report-Generatoren; protokolliert die erzeugten IDs."""
+    aufrufe = []
+
+    def _pdf(prefix):
+        def _gen(objekt_id, conn, force_docx=False):
+            aufrufe.append(objekt_id)
+            if objekt_id == 99:
+                raise ValueError('PDF kann nur für freigegebene oder bestellte Bestellungen generiert werden.')
+            return (b'%PDF-1.4 ' + str(objekt_id).encode(), f'{prefix}_{objekt_id}.pdf', 'application/pdf', True)
+        return _gen
+
+    import utils.reports as reports
+    monkeypatch.setattr(reports, 'generate_bestellung_pdf', _pdf('Bestellung'))
+    monkeypatch.setattr(reports, 'generate_thema_pdf', _pdf('Thema'))
+    return aufrufe
+
+
+def _benachrichtigungen(connection):
+    return connection.execute("SELECT * FROM Benachrichtigung WHERE Modul = 'berichte'").fetchall()
+
+
+def test_einzelbericht_wird_im_hintergrund_erzeugt(app, connection, erzeugt):
+    with app.app_context():
+        job_id = job_anlegen(connection, 7, 'bestellung', {'id': 3})
+        assert job_laden(connection, job_id, 8) is None
+        assert arbeite_naechsten_job_ab() is True
+        assert arbeite_naechsten_job_ab() is False
+
+        job = job_laden(connection, job_id, 7)
+        assert (job['Status'], job['Dateiname'], job['Mimetype']) == ('fertig', 'Bestellung_3.pdf', 'application/pdf')
+        with open(os.path.join(job_ordner(job_id), 'Bestellung_3.pdf'), 'rb') as f:
+            assert f.read() == b'%PDF-1.4 3'
+    assert erzeugt == [3]
+    # Client hat gerade noch abgefragt -> keine Benachrichtigung
+    assert _benachrichtigungen(connection) == []
+
+
+def test_verlassene_seite_und_fehler(app, connection, erzeugt):
+    with app.app_context():
+        job_id = job_anlegen(connection, 7, 'thema', {'id': 5})
+        connection.execute("UPDATE BerichtJob SET LetzteAbfrageAm = '2000-01-01 00:00:00' WHERE ID = ?", (job_id,))
+        fehler_id = job_anlegen(connection, 7, 'bestellung', {'id': 99})
+        arbeite_naechsten_job_ab()
+        arbeite_naechsten_job_ab()
+
+        hinweise = _benachrichtigungen(connection)
+        assert len(hinweise) == 1 and json.loads(hinweise[0]['Zusatzdaten']) == {'bericht_job_id': job_id}
+
+        fehler = job_laden(connection, fehler_id, 7)
+        assert fehler['Status'] == 'fehler'
+        assert 'freigegebene' in fehler['Fehlermeldung']
+
+
+def test_monatsexport_als_zip_mit_fortschritt(app, connection, erzeugt):
+    with app.app_context():
+        job_id = job_anlegen(connection, 7, 'bestellungen_monat', {'monat': '2026-09', 'ids': [1, 99, 2]}, gesamt=3)
+        arbeite_naechsten_job_ab()
+        job = job_laden(connection, job_id, 7)
+        assert (job['Status'], job['Fortschritt'], job['Gesamt']) == ('fertig', 3, 3)
+        assert job['Dateiname'] == 'Bestellungen_2026-09.zip'
+        with zipfile.ZipFile(os.path.join(job_ordner(job_id), job['Dateiname'])) as zf:
+            assert sorted(zf.namelist()) == ['Bestellung_1.pdf', 'Bestellung_2.pdf', 'Fehler.txt']
+            assert b'Bestellung 99' in zf.read('Fehler.txt')
+    # Sammelexporte werden immer gemeldet
+    assert len(_benachrichtigungen(connection)) == 1
+
+
+def test_job_wird_nur_einmal_beansprucht(app, connection):
+    with app.app_context():
+        job_anlegen(connection, 7, 'bestellung', {'id': 1})
+        assert bericht_jobs._naechsten_job_beanspruchen(connection) is not None
+        assert bericht_jobs._naechsten_job_beanspruchen(connection) is None
+
+
+def test_worker_erst_nach_dem_request_wecken(app, connection, monkeypatch):
+    geweckt = []
+    monkeypatch.setattr(bericht_jobs, 'worker_wecken', lambda: geweckt.append(True))
+
+    @app.route('/anlegen')
+    def _anlegen():
+        job_anlegen(connection, 7, 'bestellung', {'id': 1})
+        job_anlegen(connection, 7, 'bestellung', {'id': 2})
+        # Die Route hat ihre Transaktion noch offen
+        assert geweckt == []
+        return 'ok'
+
+    assert app.test_client().get('/anlegen').status_code == 200
+    assert geweckt == [True]
+
+
+def test_aufraeumen(app, connection):
+    with app.app_context():
+        alt = job_anlegen(connection, 7, 'bestellung', {'id': 1})
+        haengt = job_anlegen(connection, 7, 'bestellung', {'id': 2})
+        connection.execute(
+            "UPDATE BerichtJob SET Status = 'fertig', ErstelltAm = '2000-01-01 00:00:00' WHERE ID = ?", (alt,)
+        )
+        connection.execute(
+            "UPDATE BerichtJob SET Status = 'laeuft', GestartetAm = '2000-01-01 00:00:00' WHERE ID = ?", (haengt,)
+        )
+        os.makedirs(job_ordner(alt))
+        assert jobs_aufraeumen(connection) == 1
+        assert not os.path.exists(job_ordner(alt))
+        assert job_laden(connection, alt, 7) is None
+        assert job_laden(connection, haengt, 7)['Status'] == 'fehler'
+
+
+def test_kein_worker_in_test_apps(app, monkeypatch):
+    gestartet = []
+    monkeypatch.setattr(bericht_jobs.threading, 'Thread', lambda **kw: gestartet.append(kw))
+    monkeypatch.setattr(bericht_jobs, '_flask_app', app)
+    app.config['TESTING'] = True
+    bericht_jobs.start_bericht_worker()
+    assert gestartet == [] and not bericht_jobs._threads_gestartet
@@ -0,0 +1,63 @@
+"""Tests fuer die seitenweise Bestellliste (modules/ersatzteile/services/bestellung_services.py)."""
+
+from datetime import date, timedelta
+
+import pytest
+
+from modules.ersatzteile.services import cursor_parsen, get_bestellung_liste_seite
+
+
+@pytest.fixture
+def bestellungen(connection):
+    connection.execute("INSERT INTO Lieferant (ID, Name) VALUES (1, 'Lieferant A')")
+    connection.execute("INSERT INTO Mitarbeiter (ID, Personalnummer, Vorname, Nachname, Passwort) VALUES (1, '1', 'Max', 'Muster', 'x')")
+    connection.execute("INSERT INTO Abteilung (ID, Bezeichnung) VALUES (1, 'Technik'), (2, 'Lager')")
+    alt = (date.today() - timedelta(days=30)).isoformat()
+    for i in range(1, 8):
+        # Je zwei Bestellungen teilen sich denselben Zeitstempel (Cursor braucht die ID)
+        connection.execute(
+            'INSERT INTO Bestellung (ID, LieferantID, ErstelltVonID, Status, ErstelltAm, Lieferdatum) VALUES (?, 1, 1, ?, ?, ?)',
+            (i, 'Erledigt' if i == 7 else 'Bestellt', f'2026-10-0{(i + 1) // 2} 08:00:00', alt if i == 3 else None),
+        )
+        connection.execute(
+            'INSERT INTO BestellungSichtbarkeit (BestellungID, AbteilungID) VALUES (?, ?)', (i, 1 if i % 2 else 2)
+        )
+        for menge in range(i):
+            connection.execute(
+                'INSERT INTO BestellungPosition (BestellungID, Menge, Preis) VALUES (?, ?, 2.5)', (i, menge + 1)
+            )
+    return connection
+
+
+def _alle_seiten(conn, **kwargs):
+    ids, nach = [], None
+    while True:
+        seite, positionen, cursor = get_bestellung_liste_seite(conn, [], True, limit=2, nach=nach, **kwargs)
+        ids.extend(b['ID'] for b in seite)
+        if cursor is None:
+            return ids
+        nach = cursor_parsen(cursor)
+
+
+def test_keyset_seiten_lueckenlos_und_ohne_doppelte(bestellungen):
+    assert _alle_seiten(bestellungen) == [6, 5, 4, 3, 2, 1]
+    assert _alle_seiten(bestellungen, status_filter_list=['Erledigt']) == [7]
+
+
+def test_summen_und_lieferdatum_aus_sql(bestellungen):
+    seite, positionen, cursor = get_bestellung_liste_seite(bestellungen, [], True, limit=4)
+    assert cursor == '2026-10-02 08:00:00|3'
+    zeile = {b['ID']: b for b in seite}
+    assert (zeile[4]['PositionenAnzahl'], zeile[4]['Gesamtbetrag']) == (4, 25.0)
+    assert zeile[3]['LieferdatumKritisch'] == 1 and zeile[4]['LieferdatumKritisch'] == 0
+    # Positionen nur für die geladene Seite
+    assert sorted(positionen) == [3, 4, 5, 6]
+    assert len(positionen[6]) == 6
+
+
+def test_sichtbarkeit_und_ungueltiger_cursor(bestellungen):
+    seite, _, _ = get_bestellung_liste_seite(bestellungen, [2], False)
+    assert [b['ID'] for b in seite] == [6, 4, 2]
+    assert get_bestellung_liste_seite(bestellungen, [], False)[0] == []
+    assert cursor_parsen('kaputt') is None
+    assert cursor_parsen('2026-10-01 08:00:00|x') is None
@@ -0,0 +1,100 @@
+"""Tests fuer die WebP-Derivate hochgeladener Fotos (utils/bild_derivate.py)."""
+
+import os
+
+import pytest
+from flask import Flask
+from PIL import Image
+
+from utils import bild_derivate
+from utils.bild_derivate import bild_derivat_antwort, hole_derivat, neue_datei_version
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    app.config.update(
+        UPLOAD_BASE_FOLDER=str(tmp_path / 'Daten'),
+        BILD_DERIVATE_FOLDER=str(tmp_path / 'Cache'),
+        BILD_DERIVATE_MAX_AGE=3600,
+    )
+    os.makedirs(app.config['UPLOAD_BASE_FOLDER'])
+    return app
+
+
+def _foto(app, name='foto.jpg', groesse=(2000, 1000), farbe='red'):
+    pfad = os.path.join(app.config['UPLOAD_BASE_FOLDER'], name)
+    Image.new('RGB', groesse, farbe).save(pfad)
+    return pfad
+
+
+def test_thumb_wird_als_webp_verkleinert_und_wiederverwendet(app, monkeypatch):
+    with app.app_context():
+        original = _foto(app)
+        pfad = hole_derivat(original, 'thumb')
+        assert pfad.startswith(app.config['BILD_DERIVATE_FOLDER'])
+        with Image.open(pfad) as img:
+            assert img.format == 'WEBP'
+            assert img.size == (320, 160)
+
+        aufrufe = []
+        monkeypatch.setattr(bild_derivate, '_skalieren', lambda *a: aufrufe.append(a))
+        assert hole_derivat(original, 'thumb') == pfad
+        assert aufrufe == []
+
+
+def test_ersetztes_original_erzeugt_neues_derivat(app):
+    with app.app_context():
+        original = _foto(app, farbe='red')
+        pfad = hole_derivat(original, 'thumb')
+        _foto(app, groesse=(400, 800), farbe='blue')
+        neu = os.stat(original).st_mtime_ns + 5_000_000_000
+        os.utime(original, ns=(neu, neu))
+        assert hole_derivat(original, 'thumb') == pfad
+        with Image.open(pfad) as img:
+            assert img.size == (160, 320)
+
+
+def test_gerundete_mtime_auf_der_freigabe_gilt_als_aktuell(app, monkeypatch):
+    with app.app_context():
+        original = _foto(app)
+        pfad = hole_derivat(original, 'thumb')
+        # SMB/NFS: gesetzte mtime landet auf ganze Sekunden gerundet
+        gerundet = os.stat(original).st_mtime_ns // 1_000_000_000 * 1_000_000_000
+        os.utime(pfad, ns=(gerundet, gerundet))
+        aufrufe = []
+        monkeypatch.setattr(bild_derivate, '_skalieren', lambda *a: aufrufe.append(a))
+        assert hole_derivat(original, 'thumb') == pfad
+        assert aufrufe == []
+
+
+def test_kein_derivat_fuer_unbekannte_groesse_oder_nicht_bilder(app):
+    with app.app_context():
+        original = _foto(app)
+        assert hole_derivat(original, 'riesig') is None
+        pdf = os.path.join(app.config['UPLOAD_BASE_FOLDER'], 'bericht.pdf')
+        with open(pdf, 'wb') as f:
+            f.write(b'%PDF-1.4')
+        assert hole_derivat(pdf, 'thumb') is None
+        kaputt = os.path.join(app.config['UPLOAD_BASE_FOLDER'], 'kaputt.jpg')
+        with open(kaputt, 'wb') as f:
+            f.write(b'kein bild')
+        assert hole_derivat(kaputt, 'thumb') is None
+
+
+def test_antwort_cache_header(app):
+    original = _foto(app)
+    with app.test_request_context('/?groesse=thumb'):
+        assert bild_derivat_antwort(original, None) is None
+        resp = bild_derivat_antwort(original, 'thumb')
+        assert resp.mimetype == 'image/webp'
+        assert resp.cache_control.private and not resp.cache_control.public
+        assert resp.cache_control.max_age == 3600
+        assert resp.headers.get('ETag')
+
+    version = neue_datei_version()
+    assert version
+    with app.test_request_context(f'/?groesse=thumb&v={version}'):
+        resp = bild_derivat_antwort(original, 'thumb')
+        assert resp.cache_control.max_age == 31536000
+        assert resp.cache_control.immutable
@@ -0,0 +1,110 @@
+"""Tests fuer Conditional GET / Range bei Anhang-Downloads (utils/datei_auslieferung.py)."""
+
+import hashlib
+import os
+from contextlib import contextmanager
+
+import pytest
+from flask import Flask
+
+from modules.ersatzteile.services.datei_services import speichere_datei
+from utils import datei_auslieferung
+from utils.datei_auslieferung import nicht_geaendert_antwort, sende_anhang
+
+INHALT = b'%PDF-1.4\n' + b'x' * 5000
+HASH = hashlib.sha256(INHALT).hexdigest()
+PFAD = 'Bestellwesen/Rechnungen/1/rechnung.pdf'
+
+
+@pytest.fixture
+def app(tmp_path, connection, monkeypatch):
+    app = Flask(__name__)
+    app.config.update(UPLOAD_BASE_FOLDER=str(tmp_path), ANHANG_CACHE_MAX_AGE=600)
+    full = tmp_path / PFAD
+    full.parent.mkdir(parents=True)
+    full.write_bytes(INHALT)
+
+    @contextmanager
+    def _conn():
+        yield connection
+
+    monkeypatch.setattr(datei_auslieferung, 'get_db_connection', _conn)
+    return app
+
+
+def _datei_eintrag(connection, inhaltshash=None):
+    connection.execute(
+        "INSERT INTO Datei (BereichTyp, BereichID, Dateiname, Dateipfad, Inhaltshash) "
+        "VALUES ('Rechnung', 1, 'rechnung.pdf', ?, ?)",
+        (PFAD, inhaltshash),
+    )
+
+
+def _full(app):
+    return os.path.join(app.config['UPLOAD_BASE_FOLDER'], PFAD)
+
+
+def _etag(app):
+    st = os.stat(_full(app))
+    return f'{HASH}-{st.st_size:x}-{st.st_mtime_ns:x}'
+
+
+def test_upload_speichert_inhaltshash(app, connection):
+    with app.app_context():
+        datei_id = speichere_datei('Rechnung', 1, 'rechnung.pdf', PFAD, '', 'PDF', None, connection)
+    row = connection.execute('SELECT Inhaltshash FROM Datei WHERE ID = ?', (datei_id,)).fetchone()
+    assert row['Inhaltshash'] == HASH
+
+
+def test_download_traegt_fehlenden_hash_nach_und_cached_privat(app, connection):
+    _datei_eintrag(connection)
+    with app.test_request_context('/'):
+        resp = sende_anhang(_full(app), PFAD, mimetype='application/pdf')
+    assert resp.status_code == 200
+    assert resp.get_etag() == (_etag(app), False)
+    assert resp.cache_control.private and resp.cache_control.max_age == 600
+    assert connection.execute('SELECT Inhaltshash FROM Datei').fetchone()['Inhaltshash'] == HASH
+
+
+def test_download_ohne_datei_eintrag_wird_revalidiert(app):
+    with app.test_request_context('/'):
+        resp = sende_anhang(_full(app))
+    assert resp.get_etag()[0]
+    assert resp.cache_control.max_age == 0
+
+
+def test_range_anfrage_liefert_teilinhalt(app, connection):
+    _datei_eintrag(connection, HASH)
+    with app.test_request_context('/', headers={'Range': 'bytes=0-8'}):
+        resp = sende_anhang(_full(app), PFAD)
+        resp.direct_passthrough = False
+        assert resp.status_code == 206
+        assert resp.get_data() == INHALT[:9]
+
+
+def test_fruehes_304_nur_bei_passendem_hash(app, connection):
+    _datei_eintrag(connection, HASH)
+    with app.test_request_context('/'):
+        assert nicht_geaendert_antwort(PFAD) is None
+    with app.test_request_context('/', headers={'If-None-Match': '"veraltet"'}):
+        assert nicht_geaendert_antwort(PFAD) is None
+    with app.test_request_context('/?groesse=thumb', headers={'If-None-Match': f'"{_etag(app)}"'}):
+        assert nicht_geaendert_antwort(PFAD) is None
+    with app.test_request_context('/', headers={'If-None-Match': f'"{_etag(app)}"'}):
+        resp = nicht_geaendert_antwort(PFAD)
+        assert resp.status_code == 304
+        assert resp.get_etag() == (_etag(app), False)
+
+
+def test_ersetzte_datei_bekommt_neues_etag_trotz_altem_hash(app, connection):
+    _datei_eintrag(connection, HASH)
+    with app.test_request_context('/'):
+        alt = sende_anhang(_full(app), PFAD).get_etag()[0]
+
+    # Auf der Freigabe ersetzt, Inhaltshash in der DB unveraendert
+    with open(_full(app), 'wb') as f:
+        f.write(INHALT + b'neu')
+    with app.test_request_context('/', headers={'If-None-Match': f'"{alt}"'}):
+        assert nicht_geaendert_antwort(PFAD) is None
+        resp = sende_anhang(_full(app), PFAD)
+        assert resp.status_code == 200 and resp.get_etag()[0] != alt
@@ -0,0 +1,192 @@
+"""Tests fuer den Sammeldruck von Ersatzteil-Etiketten und die zwischengespeicherte Druckaufloesung."""
+
+from contextlib import contextmanager
+
+import pytest
+
+from modules.ersatzteile.routes import lagerbuchung_routes
+from modules.ersatzteile.services import ETIKETT_BATCH_MAX_POSITIONEN, drucke_ersatzteil_etiketten_batch
+from utils.etikett_druck import (
+    FUNKTION_ERSATZTEIL_ETIKETT,
+    ZplVorlage,
+    build_print_resolution,
+    zpl_produktion_etikett,
+    zpl_vorlage,
+)
+from utils.stammdaten_cache import stammdaten_invalidieren
+
+VORLAGE = '^XA{etikettenformat}^FO10,10^FD{artikelnummer} {artikel_beschreibung_1}^FS^PQ1^XZ'
+
+
+def _stammdaten(connection, drucker_agent=True):
+    connection.execute(
+        "INSERT INTO print_agents (id, name, token_hash) VALUES (1, 'agent', 'x')"
+    )
+    connection.execute(
+        'INSERT INTO zebra_printers (id, name, ip_address, agent_id) VALUES (1, ?, ?, ?)',
+        ('Lager', '10.0.0.5', 1 if drucker_agent else None),
+    )
+    connection.execute(
+        "INSERT INTO label_formats (id, name, width_mm, height_mm, zpl_header) VALUES (1, '30x30', 30, 30, '^PW240')"
+    )
+    connection.execute(
+        'INSERT INTO Etikett (id, bezeichnung, etikettformat_id, druckbefehle) VALUES (1, ?, 1, ?)',
+        ('Ersatzteil', VORLAGE),
+    )
+    connection.execute(
+        "INSERT INTO etikett_druck_konfig (funktion_code, etikett_id, drucker_id) VALUES ('ersatzteil_etikett', 1, 1)"
+    )
+    for ersatzteil_id, bezeichnung in ((11, 'Lager 6204'), (12, 'Keilriemen'), (13, 'Geloescht')):
+        connection.execute(
+            'INSERT INTO Ersatzteil (ID, Bestellnummer, Bezeichnung, Gelöscht) VALUES (?, ?, ?, ?)',
+            (ersatzteil_id, f'B-{ersatzteil_id}', bezeichnung, 1 if ersatzteil_id == 13 else 0),
+        )
+    connection.commit()
+
+
+def test_vorlage_entspricht_str_format():
+    druckbefehle = '^XA{etikettenformat}^FD{produktion_produkt:>6}^FS{{roh}}^FD{produktion_stueck!r}^FS^PQ1^XZ'
+    etikett = {'druckbefehle': druckbefehle, 'zpl_header': '^PW400^PQ2'}
+    zpl = zpl_produktion_etikett(etikett, 'Brot', '01.01.2026', '5', 3)
+    erwartet = druckbefehle.format(
+        etikettenformat='^PW400^PQ2', produktion_produkt='Brot', produktion_stueck='5'
+    ).replace('^PQ2', '^PQ3').replace('^PQ1', '^PQ3')
+    assert zpl == erwartet
+
+    vorlage = ZplVorlage(druckbefehle, '^PW400')
+    assert zpl_produktion_etikett(etikett, 'Brot', '', '5', 3, vorlage=vorlage).startswith('^XA^PW400^FD  Brot')
+
+
+def test_ein_auftrag_fuer_alle_positionen(connection):
+    _stammdaten(connection)
+    ergebnis = drucke_ersatzteil_etiketten_batch(
+        [(11, 2), (12, 1), (13, 1), (99, 1)], connection, wait_seconds=0
+    )
+    assert ergebnis['ok'] and ergebnis['in_warteschlange']
+    assert ergebnis['gedruckt'] == 2 and ergebnis['etiketten'] == 3
+    assert [i for i, _meldung in ergebnis['fehler']] == [13, 99]
+
+    jobs = connection.execute('SELECT id, zpl FROM print_jobs').fetchall()
+    assert len(jobs) == 1 and ergebnis['job_id'] == jobs[0]['id']
+    zpl = jobs[0]['zpl']
+    assert zpl.count('^XA') == 2
+    assert '^FD11 Lager 6204^FS^PQ2^XZ' in zpl
+    assert '^FD12 Keilriemen^FS^PQ1^XZ' in zpl
+
+
+def test_zugriff_und_druckerfehler(connection, monkeypatch):
+    _stammdaten(connection, drucker_agent=False)
+    gesendet = []
+    monkeypatch.setattr(
+        'utils.zebra_client.send_zpl_to_printer', lambda ip, zpl: gesendet.append((ip, zpl))
+    )
+    ergebnis = drucke_ersatzteil_etiketten_batch(
+        [(11, 1), (12, 1)], connection, zugriff_pruefen=lambda ersatzteil_id: ersatzteil_id != 12
+    )
+    assert ergebnis['ok'] and not ergebnis['in_warteschlange']
+    assert ergebnis['fehler'] == [(12, 'Keine Berechtigung')]
+    assert len(gesendet) == 1 and gesendet[0][0] == '10.0.0.5'
+
+    def _offline(ip, zpl):
+        raise OSError('Zeitüberschreitung')
+
+    monkeypatch.setattr('utils.zebra_client.send_zpl_to_printer', _offline)
+    ergebnis = drucke_ersatzteil_etiketten_batch([(11, 1), (12, 1)], connection)
+    assert not ergebnis['ok'] and ergebnis['gedruckt'] == 0
+    assert [i for i, _meldung in ergebnis['fehler']] == [11, 12]
+
+
+def test_aufloesung_aus_cache_bis_zur_invalidierung(connection):
+    _stammdaten(connection)
+    connection.execute("INSERT INTO Abteilung (ID, Bezeichnung) VALUES (5, 'Technik')")
+    connection.execute(
+        "INSERT INTO Mitarbeiter (ID, Personalnummer, Nachname, Passwort, PrimaerAbteilungID) VALUES (1, 'P1', 'Test', 'x', 5)"
+    )
+    connection.commit()
+    res = build_print_resolution(connection, FUNKTION_ERSATZTEIL_ETIKETT, 1)
+    assert res['ok'] and res['drucker_id'] == 1
+    vorlage = zpl_vorlage(res['etikett'])
+
+    # Aenderungen ohne Admin-Route (keine Invalidierung) sieht der Cache nicht: keine Abfragen je Etikett
+    connection.execute("UPDATE Etikett SET druckbefehle = '^XA^FDneu^FS^XZ'")
+    connection.execute('DELETE FROM etikett_druck_konfig')
+    connection.commit()
+    res = build_print_resolution(connection, FUNKTION_ERSATZTEIL_ETIKETT, 1)
+    assert res['ok'] and zpl_vorlage(res['etikett']) is vorlage
+
+    # zebra_*_save invalidiert per @stammdaten_aendern
+    stammdaten_invalidieren('Etikett', 'etikett_druck_konfig')
+    assert not build_print_resolution(connection, FUNKTION_ERSATZTEIL_ETIKETT, 1)['ok']
+    assert zpl_vorlage({'druckbefehle': '^XA^FDneu^FS^XZ', 'zpl_header': '^PW240'}) is not vorlage
+
+
+@pytest.fixture
+def druck_client(connection, monkeypatch):
+    """Test-Client fuer /ersatzteile/lageretiketten/druck_artikel auf der Test-DB (ohne Zugriff auf 12)."""
+    from app import app
+
+    @contextmanager
+    def _fake_conn():
+        yield connection
+
+    monkeypatch.setitem(app.config, 'WTF_CSRF_ENABLED', False)
+    monkeypatch.setattr(lagerbuchung_routes, 'get_db_connection', _fake_conn)
+    monkeypatch.setattr(
+        lagerbuchung_routes, 'hat_ersatzteil_zugriff', lambda mitarbeiter_id, ersatzteil_id, conn: ersatzteil_id != 12
+    )
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = 1
+        sess['user_menue_sichtbarkeit'] = {'ersatzteile_etiketten': True}
+    return client
+
+
+def _druck_artikel(client, **body):
+    return client.post('/ersatzteile/lageretiketten/druck_artikel', json=body)
+
+
+def test_route_prueft_eingaben_vor_dem_druck(druck_client, connection):
+    _stammdaten(connection)
+    assert _druck_artikel(druck_client, artikel_ids='').status_code == 400
+    antwort = _druck_artikel(druck_client, artikel_ids='11, x12')
+    assert antwort.status_code == 400 and '"x12"' in antwort.get_json()['message']
+
+    zu_viele = ','.join(str(i) for i in range(ETIKETT_BATCH_MAX_POSITIONEN + 1))
+    antwort = _druck_artikel(druck_client, artikel_ids=zu_viele)
+    assert antwort.status_code == 400
+    assert str(ETIKETT_BATCH_MAX_POSITIONEN) in antwort.get_json()['message']
+    assert connection.execute('SELECT COUNT(*) FROM print_jobs').fetchone()[0] == 0
+
+
+def test_route_ein_auftrag_und_fehler_je_artikel(druck_client, connection):
+    _stammdaten(connection)
+    antwort = _druck_artikel(druck_client, artikel_ids='11#12\n13')
+    daten = antwort.get_json()
+    assert antwort.status_code == 200 and daten['success']
+    assert daten['in_warteschlange'] == 1 and daten['fehlgeschlagen'] == 2
+    assert 'ID 12: Keine Berechtigung' in daten['message']
+    assert connection.execute('SELECT COUNT(*) FROM print_jobs').fetchone()[0] == 1
+
+
+def test_route_druckerwahl(druck_client, connection):
+    _stammdaten(connection)
+    connection.execute('UPDATE etikett_druck_konfig SET drucker_id = NULL')
+    connection.commit()
+    daten = _druck_artikel(druck_client, artikel_ids='11').get_json()
+    assert daten['needs_printer_choice'] and [p['id'] for p in daten['printers']] == [1]
+    assert connection.execute('SELECT COUNT(*) FROM print_jobs').fetchone()[0] == 0
+
+    daten = _druck_artikel(druck_client, artikel_ids='11', printer_id='1').get_json()
+    assert daten['success'] and daten['in_warteschlange'] == 1
+
+
+def test_route_drucker_offline_alle_fehlgeschlagen(druck_client, connection, monkeypatch):
+    _stammdaten(connection, drucker_agent=False)
+
+    def _offline(ip, zpl):
+        raise OSError('Zeitüberschreitung')
+
+    monkeypatch.setattr('utils.zebra_client.send_zpl_to_printer', _offline)
+    daten = _druck_artikel(druck_client, artikel_ids='11,13').get_json()
+    assert not daten['success']
+    assert daten['erfolgreich'] == 0 and daten['fehlgeschlagen'] == 2
@@ -1,7 +1,9 @@
 """Tests für utils.file_handling (benötigt Flask-App-Kontext für Config)."""
 
+import os
+
 from app import app
-from utils.file_handling import validate_file_extension
+from utils.file_handling import get_ordner_dateien, invalidiere_ordner_cache, validate_file_extension
 
 
 def test_validate_file_extension_pdf_and_exe():
@@ -16,3 +18,46 @@ def test_validate_file_extension_explicit_allowlist():
     with app.app_context():
         assert validate_file_extension("a.txt", {"txt", "md"}) is True
         assert validate_file_extension("a.exe", {"txt"}) is False
+
+
+def _alte_mtime(pfad, sekunden=3600):
+    st = os.stat(pfad)
+    os.utime(pfad, ns=(st.st_atime_ns, st.st_mtime_ns - sekunden * 1_000_000_000))
+    return os.stat(pfad).st_mtime_ns
+
+
+def test_get_ordner_dateien_listet_nur_dateien(tmp_path):
+    (tmp_path / "a.pdf").write_bytes(b"12345")
+    (tmp_path / "unterordner").mkdir()
+    dateien = get_ordner_dateien(str(tmp_path))
+    assert [(d.name, d.size) for d in dateien] == [("a.pdf", 5)]
+    assert get_ordner_dateien(str(tmp_path / "fehlt")) == []
+
+
+def test_get_ordner_dateien_cache_validiert_ueber_ordner_mtime(tmp_path):
+    ordner = str(tmp_path)
+    (tmp_path / "a.pdf").write_bytes(b"x")
+    mtime = _alte_mtime(ordner)
+    assert len(get_ordner_dateien(ordner)) == 1
+
+    # Neue Datei, Ordner-mtime künstlich unverändert -> Cache-Treffer (kein erneutes Auflisten)
+    (tmp_path / "b.pdf").write_bytes(b"y")
+    os.utime(ordner, ns=(mtime, mtime))
+    assert len(get_ordner_dateien(ordner)) == 1
+
+    # Geänderte Ordner-mtime oder explizite Invalidierung -> neu gelesen
+    invalidiere_ordner_cache(ordner)
+    assert sorted(d.name for d in get_ordner_dateien(ordner)) == ["a.pdf", "b.pdf"]
+    (tmp_path / "a.pdf").unlink()
+    _alte_mtime(ordner, sekunden=60)
+    assert [d.name for d in get_ordner_dateien(ordner)] == ["b.pdf"]
+
+
+def test_get_ordner_dateien_frisch_geaenderter_ordner_wird_nicht_gecacht(tmp_path):
+    ordner = str(tmp_path)
+    (tmp_path / "a.pdf").write_bytes(b"x")
+    assert len(get_ordner_dateien(ordner)) == 1
+    mtime = os.stat(ordner).st_mtime_ns
+    (tmp_path / "b.pdf").write_bytes(b"y")
+    os.utime(ordner, ns=(mtime, mtime))
+    assert len(get_ordner_dateien(ordner)) == 2
@@ -0,0 +1,119 @@
+"""Tests fuer scripts/migrate_sqlite_to_postgres.py (paralleles Kopieren, Checkpoint, Pruefsummen).
+
+Quelle und Ziel sind hier zwei SQLite-Dateien; der COPY-Pfad fuer Postgres wird dabei
+durch den INSERT-Batch-Pfad ersetzt, Scheduler, Checkpoint und Verifikation sind identisch.
+"""
+
+import importlib.util
+import json
+import os
+
+import pytest
+from sqlalchemy import MetaData, create_engine, text
+
+from utils.db_schema import metadata
+
+_SKRIPT = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'scripts', 'migrate_sqlite_to_postgres.py')
+_spec = importlib.util.spec_from_file_location('migrate_sqlite_to_postgres', _SKRIPT)
+migrate = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(migrate)
+
+
+@pytest.fixture
+def dbs(tmp_path):
+    source_url = f'sqlite:///{tmp_path / "quelle.db"}'
+    target_url = f'sqlite:///{tmp_path / "ziel.db"}'
+    source = create_engine(source_url, pool_size=5)
+    target = create_engine(target_url, pool_size=5)
+    metadata.create_all(source)
+    metadata.create_all(target)
+    with source.begin() as conn:
+        conn.execute(text("INSERT INTO Abteilung (ID, Bezeichnung) VALUES (1, 'Technik'), (2, 'Lager')"))
+        conn.execute(text(
+            "INSERT INTO Mitarbeiter (ID, Personalnummer, Nachname, Passwort, PrimaerAbteilungID) "
+            "VALUES (1, 'P1', 'Muster', 'x', 1), (2, 'P2', 'Beispiel', 'y', 2)"
+        ))
+        for i in range(1, 26):
+            conn.execute(text(
+                "INSERT INTO Benachrichtigung (MitarbeiterID, ThemaID, Typ, Titel, Nachricht, ErstelltAm) "
+                "VALUES (:m, 0, 'info', :t, 'x', :d)"
+            ), {'m': 1 + i % 2, 't': f'Titel {i}', 'd': f'2026-10-{i:02d} 08:00:00'})
+    yield source, target, source_url, target_url
+    source.dispose()
+    target.dispose()
+
+
+def _tabellen_im_ziel(target):
+    tables = migrate._ordered_tables()
+    reflected = MetaData()
+    reflected.reflect(bind=target, only=[t.name for t in tables])
+    return [reflected.tables[t.name] for t in tables]
+
+
+def _kopieren(source, target, checkpoint, parallel=4):
+    return migrate._copy_all(
+        source, target, migrate._ordered_tables(),
+        batch_size=10, parallel=parallel,
+        source_tables={t.name for t in migrate._ordered_tables()}, checkpoint=checkpoint,
+    )
+
+
+def test_kopie_mit_checkpoint_und_pruefsummen(dbs, tmp_path):
+    source, target, source_url, target_url = dbs
+    pfad = str(tmp_path / 'checkpoint.json')
+    statistik = _kopieren(source, target, migrate._Checkpoint(pfad, source_url, target_url))
+
+    assert statistik['Benachrichtigung']['zeilen'] == 25
+    gespeichert = json.load(open(pfad, encoding='utf-8'))
+    assert gespeichert['tabellen']['Mitarbeiter']['zeilen'] == 2
+    with target.connect() as conn:
+        assert conn.execute(text('SELECT COUNT(*) FROM Benachrichtigung')).scalar_one() == 25
+
+    tabellen = _tabellen_im_ziel(target)
+    namen = {t.name for t in tabellen}
+    assert migrate._verify(source, target, tabellen, namen, erwartet=statistik, parallel=4) == []
+    # Gleiche Zeilenzahl, anderer Inhalt -> Pruefsumme weicht ab
+    with target.begin() as conn:
+        conn.execute(text("UPDATE Benachrichtigung SET Titel = 'geaendert' WHERE ID = 3"))
+    (abweichung,) = migrate._verify(source, target, tabellen, namen, erwartet=statistik)
+    assert abweichung.startswith('Benachrichtigung: Pruefsumme')
+
+
+def test_fortsetzen_nach_abbruch(dbs, tmp_path, monkeypatch):
+    source, target, source_url, target_url = dbs
+    pfad = str(tmp_path / 'checkpoint.json')
+    original = migrate._copy_table
+
+    def _bricht_ab(source, target, table, **kwargs):
+        if table.name == 'Mitarbeiter':
+            raise RuntimeError('Verbindung verloren')
+        return original(source, target, table, **kwargs)
+
+    monkeypatch.setattr(migrate, '_copy_table', _bricht_ab)
+    with pytest.raises(RuntimeError):
+        _kopieren(source, target, migrate._Checkpoint(pfad, source_url, target_url))
+    fertig = json.load(open(pfad, encoding='utf-8'))['tabellen']
+    # Eltern sind kopiert, abhaengige Tabellen wurden nicht gestartet
+    assert 'Abteilung' in fertig
+    assert 'Mitarbeiter' not in fertig and 'Benachrichtigung' not in fertig
+
+    kopiert = []
+
+    def _zaehlt(source, target, table, **kwargs):
+        kopiert.append(table.name)
+        return original(source, target, table, **kwargs)
+
+    monkeypatch.setattr(migrate, '_copy_table', _zaehlt)
+    statistik = _kopieren(source, target, migrate._Checkpoint(pfad, source_url, target_url))
+    assert 'Abteilung' not in kopiert and 'Mitarbeiter' in kopiert
+    tabellen = _tabellen_im_ziel(target)
+    assert migrate._verify(source, target, tabellen, {t.name for t in tabellen}, erwartet=statistik) == []
+
+
+def test_checkpoint_fremder_datenbanken_wird_abgelehnt(dbs, tmp_path):
+    _, _, source_url, target_url = dbs
+    pfad = str(tmp_path / 'checkpoint.json')
+    migrate._Checkpoint(pfad, source_url, target_url).eintragen('Abteilung', 2, 'x', 0.1)
+    with pytest.raises(SystemExit):
+        migrate._Checkpoint(pfad, source_url, 'sqlite:///anderes.db')
+    assert migrate._Checkpoint(pfad, source_url, 'sqlite:///anderes.db', resume=False).tabellen == {}
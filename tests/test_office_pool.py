@@ -0,0 +1,245 @@
+"""Tests fuer den LibreOffice-Pool (utils/reports/office_pool.py) im CLI-Modus.
+
+Statt LibreOffice wird ein kleines Skript mit derselben Kommandozeile aufgerufen, das die
+PDF-Datei anlegt und die Argumente protokolliert.
+"""
+
+import os
+import sys
+import threading
+
+import pytest
+
+from utils.reports.office_pool import OfficePool
+
+_FAKE_SOFFICE = '''#!{python}
+import os, sys, time
+args = sys.argv[1:]
+with open({log!r}, 'a') as f:
+    f.write(' '.join(args) + '\\n')
+time.sleep(float(os.environ.get('FAKE_SOFFICE_SLEEP', '0')))
+outdir = args[args.index('--outdir') + 1]
+name = os.path.splitext(os.path.basename(args[-1]))[0] + '.pdf'
+with open(os.path.join(outdir, name), 'wb') as f:
+    f.write(b'%PDF-1.4 fake')
+'''
+
+
+@pytest.fixture
+def soffice(tmp_path):
+    if sys.platform == 'win32':
+        pytest.skip('Shebang-Skript nur unter POSIX')
+    log = tmp_path / 'aufrufe.log'
+    pfad = tmp_path / 'soffice'
+    pfad.write_text(_FAKE_SOFFICE.format(python=sys.executable, log=str(log)))
+    pfad.chmod(0o755)
+    return str(pfad), log
+
+
+def _docx(tmp_path, name):
+    pfad = tmp_path / f'{name}.docx'
+    pfad.write_bytes(b'docx')
+    return str(pfad), str(tmp_path / f'{name}_out.pdf')
+
+
+def test_konvertiert_mit_eigenem_profil_pro_slot(tmp_path, soffice):
+    binary, log = soffice
+    pool = OfficePool(binary, groesse=1, profil_basis=str(tmp_path / 'profile'), uno_aktiv=False)
+    docx, pdf = _docx(tmp_path, 'bestellung')
+    assert pool.konvertieren(docx, pdf) is True
+    assert open(pdf, 'rb').read().startswith(b'%PDF')
+    aufruf = log.read_text()
+    assert f'-env:UserInstallation=file://{tmp_path.resolve()}/profile/p{os.getpid()}-s0' in aufruf
+    m = pool.metriken()
+    assert (m['modus'], m['konvertiert'], m['fehler'], m['aktiv'], m['frei']) == ('cli', 1, 0, 0, 1)
+    pool.beenden()
+    assert not os.path.exists(tmp_path / 'profile' / f'p{os.getpid()}-s0')
+
+
+def test_parallelitaet_begrenzt_und_wartezeit_gemessen(tmp_path, soffice, monkeypatch):
+    binary, log = soffice
+    monkeypatch.setenv('FAKE_SOFFICE_SLEEP', '0.3')
+    pool = OfficePool(binary, groesse=1, profil_basis=str(tmp_path / 'profile'), uno_aktiv=False)
+    ergebnisse = []
+
+    def _lauf(name):
+        ergebnisse.append(pool.konvertieren(*_docx(tmp_path, name)))
+
+    threads = [threading.Thread(target=_lauf, args=(n,)) for n in ('a', 'b')]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert ergebnisse == [True, True]
+    m = pool.metriken()
+    assert m['konvertiert'] == 2
+    assert m['wartezeit_max_ms'] >= 200
+
+
+def test_kein_freier_slot_wird_abgelehnt(tmp_path, soffice):
+    binary, _ = soffice
+    pool = OfficePool(binary, groesse=1, wartezeit=0.05, profil_basis=str(tmp_path / 'p'), uno_aktiv=False)
+    belegt = pool._frei.get()
+    try:
+        assert pool.konvertieren(*_docx(tmp_path, 'x')) is False
+    finally:
+        pool._frei.put(belegt)
+    assert pool.metriken()['abgelehnt'] == 1
+
+
+def test_slot_wird_nach_max_dokumenten_recycelt(tmp_path, soffice):
+    binary, _ = soffice
+    pool = OfficePool(binary, groesse=1, max_dokumente=2, profil_basis=str(tmp_path / 'p'), uno_aktiv=False)
+    for name in ('a', 'b', 'c'):
+        assert pool.konvertieren(*_docx(tmp_path, name))
+    assert pool.metriken()['recycelt'] == 1
+
+
+class _FakeProzess:
+    def __init__(self, pid):
+        self.pid = pid
+        self.code = None
+
+    def poll(self):
+        return self.code
+
+    def terminate(self):
+        self.code = 0
+
+    kill = terminate
+
+    def wait(self, timeout=None):
+        return self.code
+
+
+class _FakeUno:
+    """Ersetzt ``uno`` samt Resolver und Desktop; ein Desktop je gestartetem soffice."""
+
+    class NoConnectException(Exception):
+        pass
+
+    class PropertyValue:
+        Name = Value = None
+
+    def __init__(self):
+        self.prozesse = []
+        self.desktops = []
+        self.fehler_beim_laden = 0
+        self.verbindungsversuche = 0
+
+    @staticmethod
+    def systemPathToFileUrl(pfad):
+        return 'file://' + pfad
+
+    def popen(self, args, **kwargs):
+        self.prozesse.append(_FakeProzess(1000 + len(self.prozesse)))
+        return self.prozesse[-1]
+
+    def getComponentContext(self):
+        uno = self
+
+        class _Resolver:
+            def resolve(self, url):
+                uno.verbindungsversuche += 1
+                # Erster Versuch je Start: soffice lauscht noch nicht
+                if uno.verbindungsversuche % 2:
+                    raise _FakeUno.NoConnectException()
+                return _kontext(uno._neuer_desktop())
+
+        return _kontext(_Resolver())
+
+    def _neuer_desktop(self):
+        uno = self
+
+        class _Dokument:
+            def __init__(self, quelle):
+                self.quelle = quelle
+
+            def storeToURL(self, url, props):
+                assert props[0].Name == 'FilterName' and props[0].Value == 'writer_pdf_Export'
+                with open(url[len('file://'):], 'wb') as f:
+                    f.write(b'%PDF-1.4 uno ' + self.quelle.encode())
+
+            def close(self, erzwingen):
+                pass
+
+        class _Desktop:
+            beendet = False
+            defekt = False
+
+            def getComponents(self):
+                if self.defekt:
+                    raise RuntimeError('Bruecke weg')
+                return ()
+
+            def loadComponentFromURL(self, url, ziel, flags, props):
+                if uno.fehler_beim_laden:
+                    uno.fehler_beim_laden -= 1
+                    raise RuntimeError('Laden fehlgeschlagen')
+                return _Dokument(os.path.basename(url))
+
+            def terminate(self):
+                self.beendet = True
+
+        self.desktops.append(_Desktop())
+        return self.desktops[-1]
+
+
+def _kontext(instanz):
+    class _ServiceManager:
+        def createInstanceWithContext(self, name, ctx):
+            return instanz
+
+    class _Kontext:
+        ServiceManager = _ServiceManager()
+
+    return _Kontext()
+
+
+@pytest.fixture
+def fake_uno(monkeypatch):
+    from utils.reports import office_pool
+
+    uno = _FakeUno()
+    monkeypatch.setattr(office_pool, 'uno', uno, raising=False)
+    monkeypatch.setattr(office_pool, 'PropertyValue', _FakeUno.PropertyValue, raising=False)
+    monkeypatch.setattr(office_pool, 'NoConnectException', _FakeUno.NoConnectException, raising=False)
+    monkeypatch.setattr(office_pool.subprocess, 'Popen', uno.popen)
+    monkeypatch.setattr(office_pool.time, 'sleep', lambda s: None)
+    return uno
+
+
+def test_uno_slot_bleibt_warm_und_wird_recycelt(tmp_path, fake_uno):
+    pool = OfficePool('soffice', groesse=1, max_dokumente=2, profil_basis=str(tmp_path / 'p'), uno_aktiv=True)
+    for name in ('a', 'b'):
+        docx, pdf = _docx(tmp_path, name)
+        assert pool.konvertieren(docx, pdf) is True
+        assert open(pdf, 'rb').read() == f'%PDF-1.4 uno {name}.docx'.encode()
+    # Zwei Dokumente in einem soffice, danach beendet (Recycling)
+    assert len(fake_uno.prozesse) == 1 and fake_uno.prozesse[0].poll() == 0
+    assert fake_uno.desktops[0].beendet
+
+    assert pool.konvertieren(*_docx(tmp_path, 'c')) is True
+    assert len(fake_uno.prozesse) == 2
+    m = pool.metriken()
+    assert (m['modus'], m['konvertiert'], m['recycelt'], m['neustarts'], m['laufend']) == ('uno', 3, 1, 0, 1)
+    pool.beenden()
+    assert pool.metriken()['laufend'] == 0
+
+
+def test_uno_neustart_bei_defekter_bruecke_und_fehler(tmp_path, fake_uno):
+    pool = OfficePool('soffice', groesse=1, profil_basis=str(tmp_path / 'p'), uno_aktiv=True)
+    pool.vorwaermen()
+    assert len(fake_uno.prozesse) == 1
+
+    # Health-Check schlaegt fehl: vor der Konvertierung neu starten
+    fake_uno.desktops[0].defekt = True
+    assert pool.konvertieren(*_docx(tmp_path, 'a')) is True
+    assert len(fake_uno.prozesse) == 2 and fake_uno.prozesse[0].poll() == 0
+
+    # Laden scheitert einmal: Slot neu starten, zweiter Versuch gelingt
+    fake_uno.fehler_beim_laden = 1
+    assert pool.konvertieren(*_docx(tmp_path, 'b')) is True
+    assert len(fake_uno.prozesse) == 3
+    assert pool.metriken()['neustarts'] == 1
+    pool.beenden()
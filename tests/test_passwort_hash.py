@@ -0,0 +1,131 @@
+"""Tests fuer das Passwort-Hashing im Prozess-Pool (utils/passwort_hash.py)."""
+
+import threading
+from concurrent.futures import Future
+
+import pytest
+from flask import Flask
+from werkzeug.security import generate_password_hash
+
+from modules.auth.routes import _passwort_neu_hashen
+from utils import passwort_hash
+from utils.passwort_hash import (
+    PasswortHashUeberlastet,
+    passwort_hash_erzeugen,
+    passwort_neu_hashen_noetig,
+    passwort_pruefen,
+)
+
+# Schnelle Parameter, damit die Tests nicht von scrypt dominiert werden
+_METHODE = 'pbkdf2:sha256:1000'
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config.update(
+        PASSWORT_HASH_METHODE=_METHODE,
+        PASSWORT_HASH_PROZESSE=0,
+        PASSWORT_HASH_WARTEZEIT_SEKUNDEN=5,
+    )
+    with app.app_context():
+        yield app
+
+
+def test_hash_und_pruefung_ohne_pool(app):
+    h = passwort_hash_erzeugen('geheim')
+    assert h.startswith(_METHODE + '$')
+    assert passwort_pruefen(h, 'geheim') is True
+    assert passwort_pruefen(h, 'falsch') is False
+    assert passwort_pruefen(None, 'geheim') is False
+
+
+def test_neu_hashen_bei_geaenderten_parametern(app):
+    assert passwort_neu_hashen_noetig(generate_password_hash('x', _METHODE)) is False
+    assert passwort_neu_hashen_noetig(generate_password_hash('x', 'pbkdf2:sha256:500')) is True
+    app.config['PASSWORT_HASH_METHODE'] = 'scrypt'
+    # Werkzeug-Standardparameter werden beim Vergleich ergaenzt
+    assert passwort_neu_hashen_noetig(generate_password_hash('x', 'scrypt:32768:8:1')) is False
+    assert passwort_neu_hashen_noetig(generate_password_hash('x', _METHODE)) is True
+
+
+def test_pruefung_im_prozess_pool(app):
+    app.config['PASSWORT_HASH_PROZESSE'] = 1
+    try:
+        h = passwort_hash_erzeugen('schicht')
+        assert passwort_pruefen(h, 'schicht') is True
+        assert passwort_pruefen(h, 'nacht') is False
+    finally:
+        pool, _ = passwort_hash._get_pool()
+        passwort_hash._verwerfen(pool)
+
+
+def test_ueberlastung_bei_voller_warteschlange(app, monkeypatch):
+    app.config.update(PASSWORT_HASH_PROZESSE=1, PASSWORT_HASH_WARTESCHLANGE=1, PASSWORT_HASH_WARTEZEIT_SEKUNDEN=0)
+    pool, plaetze = passwort_hash._get_pool()
+    try:
+        assert plaetze.acquire(blocking=False)
+        with pytest.raises(PasswortHashUeberlastet):
+            passwort_pruefen(generate_password_hash('x', _METHODE), 'x')
+        plaetze.release()
+    finally:
+        passwort_hash._verwerfen(pool)
+
+
+def test_login_rehash_ersetzt_hash(app, connection):
+    alt = generate_password_hash('geheim', 'pbkdf2:sha256:500')
+    connection.execute(
+        "INSERT INTO Mitarbeiter (ID, Personalnummer, Nachname, Passwort) VALUES (1, 'P1', 'Test', ?)", (alt,)
+    )
+    _passwort_neu_hashen(connection, 1, 'geheim')
+    neu = connection.execute('SELECT Passwort FROM Mitarbeiter WHERE ID = 1').fetchone()['Passwort']
+    assert neu.startswith(_METHODE + '$')
+    assert passwort_pruefen(neu, 'geheim') is True
+
+
+class _HaengenderPool:
+    """Executor, dessen Auftraege erst auf ``fertig()`` abgeschlossen werden."""
+
+    def __init__(self):
+        self.futures = []
+
+    def submit(self, funktion, *args):
+        f = Future()
+        f.set_running_or_notify_cancel()
+        self.futures.append((f, funktion, args))
+        return f
+
+    def fertig(self):
+        for f, funktion, args in self.futures:
+            f.set_result(funktion(*args))
+
+
+def test_platz_bleibt_belegt_bis_auftrag_fertig(app, monkeypatch):
+    app.config.update(PASSWORT_HASH_PROZESSE=1, PASSWORT_HASH_WARTESCHLANGE=1, PASSWORT_HASH_WARTEZEIT_SEKUNDEN=0.05)
+    plaetze = threading.BoundedSemaphore(1)
+    pool = _HaengenderPool()
+    monkeypatch.setattr(passwort_hash, '_get_pool', lambda: (pool, plaetze))
+    h = generate_password_hash('x', _METHODE)
+
+    with pytest.raises(PasswortHashUeberlastet, match='dauert zu lange'):
+        passwort_pruefen(h, 'x')
+    # Der Kindprozess rechnet noch: kein neuer Auftrag, bis er fertig ist
+    with pytest.raises(PasswortHashUeberlastet, match='gleichzeitige'):
+        passwort_pruefen(h, 'x')
+    pool.fertig()
+    assert plaetze.acquire(blocking=False)
+    plaetze.release()
+
+
+def test_defekter_pool_wird_ohne_fork_neu_angelegt(app):
+    app.config['PASSWORT_HASH_PROZESSE'] = 1
+    pool, _ = passwort_hash._get_pool()
+    try:
+        assert pool._mp_context.get_start_method() in ('forkserver', 'spawn')
+        pool.shutdown(wait=True)
+        # Heruntergefahrener Pool: Auftrag direkt rechnen, danach gibt es einen neuen Pool
+        assert passwort_pruefen(generate_password_hash('x', _METHODE), 'x') is True
+        neu, _ = passwort_hash._get_pool()
+        assert neu is not pool
+    finally:
+        passwort_hash._verwerfen(passwort_hash._get_pool()[0])
@@ -0,0 +1,120 @@
+"""Tests fuer den inhaltsadressierten PDF-Cache der Berichte (utils/reports/report_cache.py)."""
+
+import os
+
+import pytest
+from flask import Flask
+
+from utils.reports import bestellung_report
+from utils.reports.report_cache import hole_report, report_schluessel, speichere_report
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    app.config.update(UPLOAD_BASE_FOLDER=str(tmp_path), REPORT_CACHE_FOLDER=str(tmp_path / 'Berichte'))
+    return app
+
+
+@pytest.fixture
+def vorlage(tmp_path):
+    pfad = tmp_path / 'vorlage.docx'
+    pfad.write_bytes(b'vorlage-v1')
+    return str(pfad)
+
+
+def test_schluessel_haengt_an_vorlage_und_daten(vorlage):
+    basis = report_schluessel('bestellung', vorlage, {'ID': 1, 'Status': 'Freigegeben'}, [{'Menge': 2}])
+    assert basis == report_schluessel('bestellung', vorlage, {'Status': 'Freigegeben', 'ID': 1}, [{'Menge': 2}])
+    assert basis != report_schluessel('bestellung', vorlage, {'ID': 1, 'Status': 'Freigegeben'}, [{'Menge': 3}])
+    assert basis != report_schluessel('angebotsanfrage', vorlage, {'ID': 1, 'Status': 'Freigegeben'}, [{'Menge': 2}])
+
+    with open(vorlage, 'wb') as f:
+        f.write(b'vorlage-v2-laenger')
+    assert basis != report_schluessel('bestellung', vorlage, {'ID': 1, 'Status': 'Freigegeben'}, [{'Menge': 2}])
+
+
+def test_treffer_und_lru_verdraengung(app, tmp_path):
+    app.config['REPORT_CACHE_MAX_MB'] = 1
+    mb = b'%PDF' + b'x' * (400 * 1024)
+    with app.app_context():
+        assert hole_report('a' * 64) is None
+        for i, schluessel in enumerate(('a' * 64, 'b' * 64)):
+            speichere_report(schluessel, mb)
+            pfad = tmp_path / 'Berichte' / schluessel[:2] / f'{schluessel}.pdf'
+            os.utime(pfad, (1000 + i, 1000 + i))
+        assert hole_report('a' * 64) == mb  # a zuletzt genutzt, b ist jetzt der älteste Eintrag
+        speichere_report('c' * 64, mb)
+        assert hole_report('b' * 64) is None
+        assert hole_report('a' * 64) == mb
+        assert hole_report('c' * 64) == mb
+
+
+def test_cache_abschaltbar(app):
+    app.config['REPORT_CACHE_MAX_MB'] = 0
+    with app.app_context():
+        speichere_report('d' * 64, b'%PDF')
+        assert hole_report('d' * 64) is None
+
+
+def test_bestellung_pdf_wird_nur_bei_geaenderten_daten_neu_konvertiert(connection, tmp_path, monkeypatch):
+    from app import app as bis_app
+
+    konvertierungen = []
+
+    def _konvertieren(docx_path, pdf_path):
+        konvertierungen.append(docx_path)
+        with open(pdf_path, 'wb') as f:
+            f.write(b'%PDF-1.4 ' + str(len(konvertierungen)).encode())
+        return True
+
+    monkeypatch.setattr(bestellung_report, 'DOCX2PDF_AVAILABLE', True)
+    monkeypatch.setattr(bestellung_report, 'convert_docx_to_pdf', _konvertieren)
+    monkeypatch.setattr(bestellung_report, 'get_firmendaten', lambda: None)
+    monkeypatch.setitem(bis_app.config, 'REPORT_CACHE_FOLDER', str(tmp_path / 'Berichte'))
+    monkeypatch.setitem(bis_app.config, 'REPORT_CACHE_MAX_MB', 10)
+
+    connection.execute("INSERT INTO Lieferant (ID, Name) VALUES (1, 'Lieferant A')")
+    connection.execute("INSERT INTO Mitarbeiter (ID, Personalnummer, Vorname, Nachname, Passwort) VALUES (1, '1', 'Max', 'Muster', 'x')")
+    connection.execute(
+        "INSERT INTO Bestellung (ID, LieferantID, ErstelltVonID, Status, ErstelltAm) "
+        "VALUES (1, 1, 1, 'Freigegeben', '2026-10-01 08:00:00')"
+    )
+    connection.execute("INSERT INTO BestellungPosition (BestellungID, Menge, Bezeichnung, Preis) VALUES (1, 2, 'Lager', 10.0)")
+
+    with bis_app.app_context():
+        erstes = bestellung_report.generate_bestellung_pdf(1, connection)
+        zweites = bestellung_report.generate_bestellung_pdf(1, connection)
+        assert erstes[0] == zweites[0] and zweites[3] is True
+        assert len(konvertierungen) == 1
+
+        connection.execute("UPDATE BestellungPosition SET Menge = 3 WHERE BestellungID = 1")
+        drittes = bestellung_report.generate_bestellung_pdf(1, connection)
+        assert len(konvertierungen) == 2
+        assert drittes[0] != erstes[0]
+
+        docx = bestellung_report.generate_bestellung_pdf(1, connection, force_docx=True)
+        assert docx[3] is False and len(konvertierungen) == 2
+
+
+def test_ordner_nur_bei_bedarf_durchlaufen(app, monkeypatch):
+    from utils.reports import report_cache
+
+    app.config['REPORT_CACHE_MAX_MB'] = 1
+    durchlaeufe = []
+    walk = os.walk
+    monkeypatch.setattr(report_cache.os, 'walk', lambda ordner: durchlaeufe.append(ordner) or walk(ordner))
+    kb = b'%PDF' + b'x' * (200 * 1024)
+    with app.app_context():
+        for schluessel in ('a', 'b', 'c', 'd'):
+            speichere_report(schluessel * 64, kb)
+        # Erster Eintrag zaehlt den Ordner einmal durch, danach wird nur mitgezaehlt
+        assert len(durchlaeufe) == 1
+        speichere_report('e' * 64, kb)
+        speichere_report('f' * 64, kb)
+        assert len(durchlaeufe) == 2
+        assert hole_report('f' * 64) == kb
+
+        monkeypatch.setattr(report_cache, '_DURCHLAUF_SPAETESTENS_SEKUNDEN', 0)
+        speichere_report('f' * 64, kb)
+        assert len(durchlaeufe) == 3
@@ -0,0 +1,114 @@
+"""Tests fuer serverseitige Sessions (utils/server_session.py)."""
+
+import time
+from contextlib import contextmanager
+
+import pytest
+from flask import Flask, session
+
+from utils import server_session
+from utils.server_session import ServerSessionInterface, _DbSpeicher
+
+
+class _ZaehlSpeicher(_DbSpeicher):
+    def __init__(self):
+        self.schreibzugriffe = []
+
+    def speichern(self, sid, payload, ttl):
+        self.schreibzugriffe.append('speichern')
+        super().speichern(sid, payload, ttl)
+
+    def verlaengern(self, sid, ttl):
+        self.schreibzugriffe.append('verlaengern')
+        super().verlaengern(sid, ttl)
+
+
+@pytest.fixture
+def speicher(connection, monkeypatch):
+    @contextmanager
+    def _conn():
+        yield connection
+
+    monkeypatch.setattr(server_session, 'get_db_connection', _conn)
+    monkeypatch.setattr(server_session, '_tabelle_bereit', True)
+    return _ZaehlSpeicher()
+
+
+@pytest.fixture
+def app(speicher):
+    app = Flask(__name__)
+    app.secret_key = 'test'
+    app.session_interface = ServerSessionInterface(speicher, verlaengern_nach=300)
+
+    @app.route('/login/<int:user_id>')
+    def login(user_id):
+        session.permanent = True
+        session['user_id'] = user_id
+        session['bis_nav_history'] = [{'path': f'/seite/{i}', 'title': 'x' * 500} for i in range(20)]
+        return 'ok'
+
+    @app.route('/lesen')
+    def lesen():
+        return str(len(session.get('bis_nav_history', [])))
+
+    @app.route('/gleich')
+    def gleich():
+        session['user_id'] = session.get('user_id')
+        return 'ok'
+
+    @app.route('/logout')
+    def logout():
+        session.clear()
+        return 'ok'
+
+    return app
+
+
+def _cookie(response):
+    return [h for h in response.headers.getlist('Set-Cookie') if h.startswith('session=')]
+
+
+def test_cookie_enthaelt_nur_die_id(app, connection):
+    client = app.test_client()
+    antwort = client.get('/login/1')
+    (cookie,) = _cookie(antwort)
+    assert len(cookie.split(';')[0]) < 120
+
+    assert client.get('/lesen').get_data(as_text=True) == '20'
+    row = connection.execute('SELECT session_id, payload FROM ServerSession').fetchone()
+    assert 'bis_nav_history' in row['payload']
+    assert row['session_id'] not in cookie
+
+
+def test_unveraenderte_session_wird_nicht_geschrieben(app, speicher, connection):
+    client = app.test_client()
+    client.get('/login/1')
+    assert speicher.schreibzugriffe == ['speichern']
+
+    for pfad in ('/lesen', '/gleich', '/lesen'):
+        assert _cookie(client.get(pfad)) == []
+    assert speicher.schreibzugriffe == ['speichern']
+
+    # Ablauf rückt näher -> nur verlängern, Cookie (permanent) neu setzen
+    connection.execute('UPDATE ServerSession SET expires_at = ?', (int(time.time()) + 60,))
+    assert len(_cookie(client.get('/lesen'))) == 1
+    assert speicher.schreibzugriffe == ['speichern', 'verlaengern']
+
+
+def test_benutzerwechsel_neue_id_und_logout_loescht(app, connection):
+    client = app.test_client()
+    erstes = _cookie(client.get('/login/1'))[0]
+    zweites = _cookie(client.get('/login/2'))[0]
+    assert erstes != zweites
+    assert connection.execute('SELECT COUNT(*) AS c FROM ServerSession').fetchone()['c'] == 1
+
+    client.get('/logout')
+    assert connection.execute('SELECT COUNT(*) AS c FROM ServerSession').fetchone()['c'] == 0
+    assert client.get('/lesen').get_data(as_text=True) == '0'
+
+
+def test_gefaelschtes_cookie_ergibt_leere_session(app):
+    client = app.test_client()
+    client.get('/login/1')
+    client.set_cookie('session', 'fremde-id.signatur')
+    assert client.get('/lesen').get_data(as_text=True) == '0'
@@ -0,0 +1,98 @@
+"""Tests fuer den SSE-Fan-out der Beleuchtung (modules/technik/sse_broadcast.py)."""
+
+import threading
+import time
+
+from modules.technik import sse_broadcast
+from modules.technik.sse_broadcast import (
+    PUFFER_GROESSE,
+    RESYNC,
+    broadcast_dict,
+    kennzahlen,
+    naechste_meldungen,
+    register_subscriber,
+    unregister_subscriber,
+)
+
+
+def test_meldungen_mit_sequenz_ab_registrierung():
+    broadcast_dict({'lamp_id': '1', 'state': {'on': True}})
+    a = register_subscriber()
+    try:
+        assert naechste_meldungen(a, timeout=0.01) == []
+        s1 = broadcast_dict({'lamp_id': '2', 'state': {'on': False}})
+        s2 = broadcast_dict({'lamp_id': '3', 'state': {'on': True}})
+        meldungen = naechste_meldungen(a, timeout=0.01)
+        assert [seq for seq, _line in meldungen] == [s1, s2]
+        assert '"lamp_id": "2"' in meldungen[0][1]
+    finally:
+        unregister_subscriber(a)
+
+
+def test_nachzuegler_bekommt_resync():
+    vorher = kennzahlen()
+    langsam = register_subscriber()
+    schnell = register_subscriber()
+    try:
+        for i in range(PUFFER_GROESSE // 2 + 1):
+            broadcast_dict({'lamp_id': str(i)})
+        assert kennzahlen()['nachzuegler'] - vorher['nachzuegler'] == 2
+        assert len(naechste_meldungen(schnell, timeout=0.01)) == PUFFER_GROESSE // 2 + 1
+
+        for i in range(PUFFER_GROESSE - 1):
+            broadcast_dict({'lamp_id': str(i)})
+        uebersprungen = PUFFER_GROESSE // 2 + 1 + PUFFER_GROESSE - 1 - PUFFER_GROESSE
+        assert naechste_meldungen(langsam, timeout=0.01) == RESYNC
+        assert langsam.verpasst == uebersprungen
+        # Danach wieder lueckenlos ab dem aktuellen Stand
+        seq = broadcast_dict({'lamp_id': 'x'})
+        assert naechste_meldungen(langsam, timeout=0.01) == [(seq, '{"lamp_id": "x"}')]
+        # Der schnelle Client lag nie einen ganzen Puffer zurueck
+        assert len(naechste_meldungen(schnell, timeout=0.01)) == PUFFER_GROESSE
+
+        nachher = kennzahlen()
+        assert nachher['resyncs'] - vorher['resyncs'] == 1
+        assert nachher['verpasst'] - vorher['verpasst'] == uebersprungen
+    finally:
+        unregister_subscriber(langsam)
+        unregister_subscriber(schnell)
+
+
+def test_last_500_abonnenten():
+    anzahl, meldungen = 500, 200
+    start = threading.Barrier(anzahl + 1)
+    empfangen = {}
+
+    def abonnent(nr):
+        a = register_subscriber()
+        erste = a.position
+        seqs = []
+        start.wait()
+        try:
+            while len(seqs) < meldungen:
+                neu = naechste_meldungen(a, timeout=5)
+                if neu == RESYNC or not neu:
+                    break
+                seqs.extend(seq for seq, _line in neu)
+        finally:
+            unregister_subscriber(a)
+        empfangen[nr] = (erste, seqs)
+
+    threads = [threading.Thread(target=abonnent, args=(nr,)) for nr in range(anzahl)]
+    for t in threads:
+        t.start()
+    start.wait()
+    beginn = time.perf_counter()
+    for i in range(meldungen):
+        broadcast_dict({'lamp_id': str(i), 'state': {'on': bool(i % 2)}})
+    verteilt = time.perf_counter() - beginn
+    for t in threads:
+        t.join(timeout=30)
+
+    assert len(empfangen) == anzahl
+    for erste, seqs in empfangen.values():
+        # Jeder Abonnent sieht jede Meldung genau einmal, in Reihenfolge (Puffer reicht fuer alle)
+        assert seqs == list(range(erste, erste + meldungen))
+    # Verteilen haengt nicht von der Zahl der Abonnenten ab (kein put je Queue)
+    assert verteilt < 5
+    assert sse_broadcast.count_subscribers() == 0
@@ -0,0 +1,126 @@
+"""Tests fuer utils/stammdaten_cache.py (versionierter Stammdaten-Cache je Prozess)."""
+
+import pytest
+
+from utils import stammdaten_cache
+from utils.stammdaten_cache import (
+    REDIS_HASH_STAMMDATEN,
+    get_stammdaten,
+    stammdaten_aendern,
+    stammdaten_invalidieren,
+)
+
+
+class _ZaehlendeVerbindung:
+    """Leitet ``execute`` weiter und zaehlt die Abfragen."""
+
+    def __init__(self, conn):
+        self._conn = conn
+        self.abfragen = 0
+
+    def execute(self, sql, params=()):
+        self.abfragen += 1
+        return self._conn.execute(sql, params)
+
+
+class _FakeRedis:
+    """Gemeinsamer Redis-Hash mehrerer Worker (nur hgetall/hincrby)."""
+
+    def __init__(self):
+        self.hashes = {}
+
+    def hgetall(self, name):
+        return {k: str(v) for k, v in self.hashes.get(name, {}).items()}
+
+    def hincrby(self, name, feld, n):
+        h = self.hashes.setdefault(name, {})
+        h[feld] = h.get(feld, 0) + n
+        return h[feld]
+
+    def pipeline(self):
+        return _FakePipeline(self)
+
+
+class _FakePipeline:
+    def __init__(self, redis):
+        self._redis = redis
+        self._befehle = []
+
+    def hincrby(self, name, feld, n):
+        self._befehle.append((name, feld, n))
+
+    def execute(self):
+        return [self._redis.hincrby(*b) for b in self._befehle]
+
+
+@pytest.fixture
+def conn(connection):
+    connection.execute("INSERT INTO Bereich (ID, Bezeichnung, Aktiv) VALUES (1, 'Halle', 1)")
+    connection.execute("INSERT INTO Gewerke (ID, Bezeichnung, BereichID, Aktiv) VALUES (1, 'Elektro', 1, 1)")
+    connection.commit()
+    return _ZaehlendeVerbindung(connection)
+
+
+def test_treffer_ohne_abfrage_und_kopien(conn):
+    erste = get_stammdaten('bereiche', conn)
+    assert [b['Bezeichnung'] for b in erste] == ['Halle']
+    abfragen = conn.abfragen
+
+    erste[0]['Bezeichnung'] = 'veraendert'
+    zweite = get_stammdaten('bereiche', conn)
+    assert conn.abfragen == abfragen
+    assert zweite[0]['Bezeichnung'] == 'Halle'
+
+
+def test_invalidierung_laedt_abhaengige_abfragen_neu(conn):
+    assert get_stammdaten('gewerke', conn)[0]['Bereich'] == 'Halle'
+    conn.execute("UPDATE Bereich SET Bezeichnung = 'Werk 2' WHERE ID = 1")
+
+    # Ohne Invalidierung bleibt der Eintrag gueltig
+    assert get_stammdaten('gewerke', conn)[0]['Bereich'] == 'Halle'
+    stammdaten_invalidieren('Bereich')
+    assert get_stammdaten('gewerke', conn)[0]['Bereich'] == 'Werk 2'
+
+
+def test_dekorator_invalidiert_auch_bei_fehler(conn):
+    get_stammdaten('bereiche', conn)
+
+    @stammdaten_aendern('Bereich')
+    def _route():
+        conn.execute("INSERT INTO Bereich (ID, Bezeichnung, Aktiv) VALUES (2, 'Lager', 1)")
+        raise RuntimeError('Fehler nach dem Schreiben')
+
+    with pytest.raises(RuntimeError):
+        _route()
+    assert [b['Bezeichnung'] for b in get_stammdaten('bereiche', conn)] == ['Halle', 'Lager']
+
+
+def test_eintrag_verfaellt_nach_max_alter(conn, monkeypatch):
+    get_stammdaten('bereiche', conn)
+    abfragen = conn.abfragen
+    monkeypatch.setattr(stammdaten_cache, 'STAMMDATEN_CACHE_SEKUNDEN', 0)
+    get_stammdaten('bereiche', conn)
+    assert conn.abfragen > abfragen
+
+
+def test_nur_aktiv_filtert_kopien(conn):
+    conn.execute("INSERT INTO Bereich (ID, Bezeichnung, Aktiv) VALUES (2, 'Alt', 0)")
+    assert [b['Bezeichnung'] for b in get_stammdaten('bereiche', conn)] == ['Alt', 'Halle']
+    assert [b['Bezeichnung'] for b in get_stammdaten('bereiche', conn, nur_aktiv=True)] == ['Halle']
+
+
+def test_invalidierung_anderer_worker_ueber_redis(conn, monkeypatch):
+    redis = _FakeRedis()
+    monkeypatch.setattr(stammdaten_cache, '_redis', redis)
+    monkeypatch.setattr(stammdaten_cache, '_redis_naechster_abgleich', 0.0)
+    monkeypatch.setattr(stammdaten_cache, 'STAMMDATEN_REDIS_ABGLEICH_SEKUNDEN', 0)
+
+    assert get_stammdaten('gewerke', conn)[0]['Bezeichnung'] == 'Elektro'
+    conn.execute("UPDATE Gewerke SET Bezeichnung = 'Mechanik' WHERE ID = 1")
+    # Ein anderer Worker aendert Gewerke und zaehlt nur die Version in Redis hoch
+    redis.hincrby(REDIS_HASH_STAMMDATEN, 'Gewerke', 1)
+    assert get_stammdaten('gewerke', conn)[0]['Bezeichnung'] == 'Mechanik'
+
+    # Eigene Invalidierung landet ebenfalls in Redis
+    stammdaten_invalidieren('Bereich')
+    assert redis.hashes[REDIS_HASH_STAMMDATEN]['Bereich'] == 1
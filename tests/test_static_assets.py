@@ -0,0 +1,86 @@
+"""Tests fuer gehashte, vorkomprimierte statische Assets (utils/static_assets.py)."""
+
+import gzip
+import os
+
+import pytest
+from flask import Flask, url_for
+
+from utils.static_assets import assets_bauen, init_static_assets
+
+CSS = b'@font-face { src: url("./fonts/icons.woff2?abc123") format("woff2"), url(data:font/woff;base64,AA==); }\n'
+JS = b'console.log("bis");\n' * 50
+
+
+@pytest.fixture
+def static_ordner(tmp_path):
+    (tmp_path / 'vendor' / 'icons' / 'fonts').mkdir(parents=True)
+    (tmp_path / 'vendor' / 'icons' / 'icons.css').write_bytes(CSS)
+    (tmp_path / 'vendor' / 'icons' / 'fonts' / 'icons.woff2').write_bytes(b'wOF2-daten')
+    (tmp_path / 'script.js').write_bytes(JS)
+    (tmp_path / 'service-worker.js').write_bytes(b'// fester Name')
+    return tmp_path
+
+
+@pytest.fixture
+def app(static_ordner):
+    app = Flask(__name__, static_folder=str(static_ordner), static_url_path='/static')
+    init_static_assets(app)
+    return app
+
+
+def test_manifest_und_css_verweise(static_ordner):
+    manifest = assets_bauen(str(static_ordner))
+    assert 'service-worker.js' not in manifest
+    assert manifest['script.js'].startswith('dist/script.') and manifest['script.js'].endswith('.js')
+
+    schrift = manifest['vendor/icons/fonts/icons.woff2']
+    css = (static_ordner / manifest['vendor/icons/icons.css']).read_text()
+    assert f'url("./{os.path.relpath(schrift, "dist/vendor/icons")}")' not in css
+    assert f'url("{os.path.relpath(schrift, "dist/vendor/icons")}")' in css
+    assert 'url(data:font/woff;base64,AA==)' in css
+
+    gz = static_ordner / (manifest['script.js'] + '.gz')
+    assert gzip.decompress(gz.read_bytes()) == JS
+    assert not (static_ordner / (schrift + '.gz')).exists()
+
+
+def test_neuer_inhalt_neuer_name_alter_bleibt(static_ordner):
+    alt = assets_bauen(str(static_ordner))['script.js']
+    assert assets_bauen(str(static_ordner))['script.js'] == alt
+
+    (static_ordner / 'script.js').write_bytes(b'console.log("neu");')
+    neu = assets_bauen(str(static_ordner))['script.js']
+    assert neu != alt
+    assert (static_ordner / alt).exists()
+
+
+def test_url_for_und_auslieferung(app):
+    with app.test_request_context():
+        url = url_for('static', filename='script.js')
+        assert url.startswith('/static/dist/script.')
+        assert url_for('static', filename='service-worker.js') == '/static/service-worker.js'
+
+    client = app.test_client()
+    resp = client.get(url, headers={'Accept-Encoding': 'gzip, deflate'})
+    assert resp.status_code == 200
+    assert resp.headers['Content-Encoding'] == 'gzip'
+    assert resp.mimetype == 'text/javascript'
+    assert 'immutable' in resp.headers['Cache-Control'] and 'max-age=31536000' in resp.headers['Cache-Control']
+    assert gzip.decompress(resp.data) == JS
+
+    resp = client.get(url, headers={'Accept-Encoding': 'identity'})
+    assert 'Content-Encoding' not in resp.headers
+    assert resp.data == JS
+
+    resp = client.get('/static/service-worker.js')
+    assert resp.status_code == 200 and 'immutable' not in resp.headers.get('Cache-Control', '')
+
+
+def test_abschaltbar(static_ordner):
+    app = Flask(__name__, static_folder=str(static_ordner), static_url_path='/static')
+    app.config['STATIC_ASSETS_FINGERPRINT'] = False
+    init_static_assets(app)
+    with app.test_request_context():
+        assert url_for('static', filename='script.js') == '/static/script.js'
+    assert not (static_ordner / 'dist').exists()
@@ -0,0 +1,161 @@
+"""Tests fuer MQTT-Leitung mit Fencing-Token und Redis-Stream-Lesen (modules/technik/mqtt_runtime.py)."""
+
+import itertools
+import json
+import os
+
+import pytest
+
+from modules.technik import mqtt_runtime
+from modules.technik.mqtt_runtime import (
+    LEADER_REDIS_KEY,
+    ensure_mqtt_leader,
+    mqtt_client_id,
+    stream_weiterlesen,
+    zustand_schreiben,
+)
+from modules.technik.sse_broadcast import (
+    RESYNC,
+    kennzahlen,
+    naechste_meldungen,
+    register_subscriber,
+    unregister_subscriber,
+)
+from utils.beleuchtung_redis import REDIS_HASH_BELEUCHTUNG, REDIS_STREAM_BELEUCHTUNG
+
+
+class _FakeRedis:
+    """Gemeinsamer Redis mehrerer Prozesse; ``eval`` fuehrt die Lua-Skripte als Python aus."""
+
+    def __init__(self):
+        self.werte = {}
+        self.hashes = {}
+        self.streams = {}
+        self._ids = itertools.count(1)
+
+    def get(self, key):
+        return self.werte.get(key)
+
+    def set(self, key, wert, nx=False, ex=None):
+        if nx and key in self.werte:
+            return None
+        self.werte[key] = str(wert)
+        return True
+
+    def incr(self, key):
+        self.werte[key] = str(int(self.werte.get(key, 0)) + 1)
+        return int(self.werte[key])
+
+    def eval(self, skript, anzahl_keys, *args):
+        keys, argv = [str(a) for a in args[:anzahl_keys]], [str(a) for a in args[anzahl_keys:]]
+        wert = self.werte.get(keys[0])
+        if skript == mqtt_runtime._LUA_VERLAENGERN:
+            return 1 if wert == argv[0] else 0
+        if skript == mqtt_runtime._LUA_FREIGEBEN:
+            return 1 if wert == argv[0] and self.werte.pop(keys[0]) else 0
+        if skript == mqtt_runtime._LUA_SCHREIBEN:
+            if wert is None or not wert.startswith(argv[0] + ':'):
+                return 0
+            self.hashes.setdefault(keys[1], {})[argv[1]] = argv[2]
+            return self.xadd(keys[2], {'event': argv[2]}, maxlen=int(argv[3]))
+        raise AssertionError('unbekanntes Skript')
+
+    def xadd(self, name, felder, maxlen=None):
+        eid = f'{next(self._ids)}-0'
+        eintraege = self.streams.setdefault(name, [])
+        eintraege.append((eid, dict(felder)))
+        if maxlen is not None:
+            del eintraege[:-maxlen]
+        return eid
+
+    @staticmethod
+    def _nr(eid):
+        return int(eid.split('-')[0])
+
+    def xrange(self, name, min='-', max='+', count=None):
+        treffer = [
+            e for e in self.streams.get(name, [])
+            if (min == '-' or self._nr(e[0]) >= self._nr(min)) and (max == '+' or self._nr(e[0]) <= self._nr(max))
+        ]
+        return treffer[:count] if count else treffer
+
+    def xrevrange(self, name, count=None):
+        return list(reversed(self.streams.get(name, [])))[:count]
+
+    def xread(self, streams, count=None, block=None):
+        antwort = []
+        for name, ab in streams.items():
+            neu = [e for e in self.streams.get(name, []) if self._nr(e[0]) > self._nr(ab)][:count]
+            if neu:
+                antwort.append((name, neu))
+        return antwort
+
+
+@pytest.fixture
+def redis():
+    return _FakeRedis()
+
+
+def test_fencing_token_steigt_bei_uebernahme(redis):
+    assert ensure_mqtt_leader(redis, 'a:1') == 1
+    assert ensure_mqtt_leader(redis, 'a:1') == 1
+    assert ensure_mqtt_leader(redis, 'b:2') is None
+
+    # Lock abgelaufen (z. B. Leader a haengt laenger als die TTL): b uebernimmt mit neuem Token
+    del redis.werte[LEADER_REDIS_KEY]
+    assert ensure_mqtt_leader(redis, 'b:2') == 2
+    assert ensure_mqtt_leader(redis, 'a:1') is None
+
+
+def test_abgeloester_leader_kann_nicht_schreiben(redis):
+    token_a = ensure_mqtt_leader(redis, 'a:1')
+    assert zustand_schreiben(redis, token_a, '45329', {'lamp_id': '45329', 'state': {'on': True}})
+
+    del redis.werte[LEADER_REDIS_KEY]
+    token_b = ensure_mqtt_leader(redis, 'b:2')
+    assert zustand_schreiben(redis, token_a, '45329', {'lamp_id': '45329', 'state': {'on': False}}) is None
+    assert zustand_schreiben(redis, token_b, '45330', {'lamp_id': '45330', 'state': {'on': True}})
+
+    assert json.loads(redis.hashes[REDIS_HASH_BELEUCHTUNG]['45329'])['state'] == {'on': True}
+    assert len(redis.streams[REDIS_STREAM_BELEUCHTUNG]) == 2
+
+
+def test_stream_ab_letzter_id_und_resync_bei_luecke(redis, monkeypatch):
+    token = ensure_mqtt_leader(redis, 'a:1')
+    zustand_schreiben(redis, token, '1', {'lamp_id': '1'})
+    abonnent = register_subscriber()
+    try:
+        letzte = stream_weiterlesen(redis, None)
+        assert letzte == redis.streams[REDIS_STREAM_BELEUCHTUNG][-1][0]
+
+        # Waehrend der Worker nicht liest (Verbindung weg), kommen Meldungen dazu: werden nachgeholt
+        zustand_schreiben(redis, token, '2', {'lamp_id': '2'})
+        zustand_schreiben(redis, token, '3', {'lamp_id': '3'})
+        letzte = stream_weiterlesen(redis, letzte, block_ms=None)
+        assert [json.loads(line)['lamp_id'] for _seq, line in naechste_meldungen(abonnent, 0.01)] == ['2', '3']
+
+        # Stream inzwischen ueber die letzte ID hinaus gekuerzt: Clients laden den ganzen Stand,
+        # die noch vorhandenen (alten) Eintraege werden nicht erneut verteilt
+        monkeypatch.setattr(mqtt_runtime, 'REDIS_STREAM_MAXLEN', 3)
+        for lampe in ('4', '5', '6', '7', '8'):
+            zustand_schreiben(redis, token, lampe, {'lamp_id': lampe})
+        seq_vorher = kennzahlen()['sequenz']
+        letzte = stream_weiterlesen(redis, letzte, block_ms=None)
+        assert letzte == redis.streams[REDIS_STREAM_BELEUCHTUNG][-1][0]
+        assert kennzahlen()['sequenz'] == seq_vorher
+        assert naechste_meldungen(abonnent, 0.01) == RESYNC
+        assert naechste_meldungen(abonnent, 0.01) == []
+
+        # Danach normal ab dem Ende weiter
+        zustand_schreiben(redis, token, '9', {'lamp_id': '9'})
+        letzte = stream_weiterlesen(redis, letzte, block_ms=None)
+        assert [json.loads(line)['lamp_id'] for _seq, line in naechste_meldungen(abonnent, 0.01)] == ['9']
+    finally:
+        unregister_subscriber(abonnent)
+
+
+def test_persistente_session_nur_mit_konfigurierter_client_id():
+    assert mqtt_client_id({'MqttClientId': ' bis-werk1 '}) == ('bis-werk1', True)
+    cid, persistent = mqtt_client_id({'MqttClientId': ''})
+    assert not persistent
+    assert cid.startswith('bis-technik-') and cid.endswith(f'-{os.getpid()}')
@@ -0,0 +1,132 @@
+"""Tests fuer die zwischengespeicherten Technik-Layouts (modules/technik/layout_cache.py)."""
+
+import gzip
+import inspect
+import os
+
+import pytest
+
+from app import app
+from modules.technik import layout_cache, routes as technik_routes
+from modules.technik.layout_cache import diagramme, svg_minimieren, svg_varianten
+
+SVG = b"""<?xml version="1.0"?>
+<!-- Export aus Inkscape -->
+<svg xmlns="http://www.w3.org/2000/svg">
+    <style>
+        .an { fill: yellow; }
+    </style>
+    <g id="halle">
+        <text><tspan>Halle</tspan>
+              <tspan>1</tspan></text>
+    </g>
+</svg>
+"""
+
+
+@pytest.fixture(autouse=True)
+def _leeren():
+    layout_cache.cache_leeren()
+    yield
+    layout_cache.cache_leeren()
+
+
+def test_minimieren():
+    klein = svg_minimieren(SVG)
+    assert b'Inkscape' not in klein and b'<?xml version="1.0"?> <svg' in klein
+    assert b'<tspan>Halle</tspan> <tspan>1</tspan>' in klein
+    assert b'<style>\n        .an { fill: yellow; }\n    </style>' in klein
+    erhalten = b'<svg xml:space="preserve">\n  <text> a </text>\n</svg>'
+    assert svg_minimieren(erhalten) == erhalten
+
+
+def test_diagramme_neu_nur_bei_geaendertem_ordner(tmp_path):
+    aufrufe = []
+
+    def bauen():
+        aufrufe.append(1)
+        return sorted(os.listdir(tmp_path))
+
+    assert diagramme(str(tmp_path), bauen) == []
+    assert diagramme(str(tmp_path), bauen) == []
+    assert len(aufrufe) == 1
+
+    (tmp_path / 'halle.svg').write_bytes(SVG)
+    os.utime(tmp_path, ns=(0, os.stat(tmp_path).st_mtime_ns + 1_000_000_000))
+    assert diagramme(str(tmp_path), bauen) == ['halle.svg']
+    assert len(aufrufe) == 2
+
+
+def test_varianten_und_dateiaenderung(tmp_path):
+    pfad = tmp_path / 'halle.svg'
+    pfad.write_bytes(SVG)
+    v = svg_varianten(str(pfad))
+    assert gzip.decompress(v.gzip) == v.roh == svg_minimieren(SVG)
+    assert svg_varianten(str(pfad)) is v
+
+    pfad.write_bytes(SVG.replace(b'Halle', b'Lager'))
+    neu = svg_varianten(str(pfad))
+    assert neu is not v and neu.etag != v.etag
+
+
+def test_route_komprimiert_mit_etag(tmp_path, monkeypatch):
+    pfad = tmp_path / 'halle.svg'
+    pfad.write_bytes(SVG)
+    monkeypatch.setattr(technik_routes, '_diagram_by_id', lambda diagram_id, diagramme: {'id': diagram_id})
+    monkeypatch.setattr(technik_routes, '_resolve_technik_layout_file', lambda d: str(pfad))
+    ansicht = inspect.unwrap(technik_routes.technik_layout_svg)
+    etag = svg_varianten(str(pfad)).etag
+
+    with app.test_request_context(headers={'Accept-Encoding': 'gzip'}):
+        resp = ansicht('halle')
+        assert resp.headers['Content-Encoding'] == 'gzip'
+        assert resp.get_etag() == (f'{etag}-gz', False)
+        assert gzip.decompress(resp.get_data()) == svg_minimieren(SVG)
+        assert 'Accept-Encoding' in resp.vary
+
+    with app.test_request_context(headers={'Accept-Encoding': 'gzip', 'If-None-Match': f'"{etag}-gz"'}):
+        assert ansicht('halle').status_code == 304
+
+    with app.test_request_context(headers={'If-None-Match': f'"{etag}-gz"'}):
+        resp = ansicht('halle')
+        assert resp.status_code == 200 and 'Content-Encoding' not in resp.headers
+
+
+def test_brotli_im_hintergrund(tmp_path, monkeypatch):
+    class _Brotli:
+        @staticmethod
+        def compress(daten, quality):
+            return b'br:' + daten
+
+    auftraege = []
+    monkeypatch.setattr(layout_cache, 'brotli', _Brotli)
+    monkeypatch.setattr(layout_cache, '_im_hintergrund', lambda ziel, *args: auftraege.append((ziel, args)))
+    pfad = tmp_path / 'halle.svg'
+    pfad.write_bytes(SVG)
+
+    # Der Request wartet nicht auf Brotli, es geht zunaechst gzip raus
+    v = svg_varianten(str(pfad))
+    assert v.br is None and len(auftraege) == 1
+    svg_varianten(str(pfad))
+    assert len(auftraege) == 1
+
+    ziel, args = auftraege.pop()
+    ziel(*args)
+    fertig = svg_varianten(str(pfad))
+    assert fertig.br == b'br:' + v.roh and fertig.etag == v.etag
+
+
+def test_speicher_nach_bytes_begrenzt(tmp_path, monkeypatch):
+    pfade = []
+    for nr in range(3):
+        pfad = tmp_path / f'halle{nr}.svg'
+        pfad.write_bytes(SVG.replace(b'Halle', b'Halle' * 50 + str(nr).encode()))
+        pfade.append(str(pfad))
+    groesse = svg_varianten(pfade[0]).groesse
+    layout_cache.cache_leeren()
+    monkeypatch.setattr(layout_cache, 'MAX_GESAMT_BYTES', 2 * groesse + 10)
+
+    for pfad in pfade:
+        svg_varianten(pfad)
+    assert list(layout_cache._varianten) == pfade[1:]
+    assert layout_cache._gesamt_bytes == sum(v.groesse for v in layout_cache._varianten.values())
@@ -0,0 +1,92 @@
+"""Tests fuer den Wartungs-Faelligkeits-Job (vorberechnete Stufen + Erinnerungen)."""
+
+from datetime import date
+
+import pytest
+
+from modules.wartungen.faelligkeit_job import _beanspruche_erinnerung, aktualisiere_faelligkeiten
+from modules.wartungen.services import berechne_faelligkeit_status
+from utils.benachrichtigungen import erstelle_benachrichtigung_fuer_wartung_erinnerung
+
+HEUTE = date(2026, 5, 15)
+
+
+@pytest.fixture
+def conn(connection):
+    """Eine Wartung (Abteilung 1, erstellt von MA 1) mit vier Plaenen."""
+    connection.execute("INSERT INTO Abteilung (ID, Bezeichnung, Aktiv) VALUES (1, 'Technik', 1)")
+    connection.executemany(
+        "INSERT INTO Mitarbeiter (ID, Personalnummer, Nachname, Passwort, PrimaerAbteilungID, Aktiv) "
+        "VALUES (?, ?, 'Test', 'x', ?, ?)",
+        [(1, 'P1', 1, 1), (2, 'P2', 1, 1), (3, 'P3', 1, 0)],
+    )
+    connection.execute(
+        "INSERT INTO Wartung (ID, GewerkID, Bezeichnung, ErstelltVonID) VALUES (10, 1, 'Kompressor', 1)"
+    )
+    connection.execute("INSERT INTO WartungAbteilungZugriff (WartungID, AbteilungID) VALUES (10, 1)")
+    connection.executemany(
+        "INSERT INTO Wartungsplan (ID, WartungID, IntervallEinheit, IntervallAnzahl, "
+        "NaechsteFaelligkeit, ErinnerungTageVor) VALUES (?, 10, 'Monat', ?, ?, ?)",
+        [
+            (1, 1, '2026-06-30', None),   # weit in der Zukunft
+            (2, 1, '2026-05-20', 7),      # innerhalb 7 Tage, Erinnerung erreicht
+            (3, 1, '2026-05-12', None),   # leicht ueberfaellig
+            (4, 1, '2026-04-01', 3),      # stark ueberfaellig
+        ],
+    )
+    connection.commit()
+    return connection
+
+
+def test_berechne_faelligkeit_status_stufen():
+    assert berechne_faelligkeit_status(None, 5, 1, heute=HEUTE) == (0, 0)
+    assert berechne_faelligkeit_status('2026-05-20', 7, 1, heute=HEUTE) == (1, 1)
+    assert berechne_faelligkeit_status('2026-05-20', 2, 1, heute=HEUTE) == (1, 0)
+    assert berechne_faelligkeit_status('2026-05-15', None, 1, heute=HEUTE) == (2, 0)
+    assert berechne_faelligkeit_status('2026-05-01', 0, 0, heute=HEUTE) == (3, 0)
+
+
+def test_aktualisiere_faelligkeiten_schreibt_stufen(conn):
+    assert aktualisiere_faelligkeiten(conn, heute=HEUTE) == 4
+    rows = conn.execute(
+        'SELECT ID, FaelligkeitStufe, ErinnerungFaellig, FaelligkeitBerechnetAm FROM Wartungsplan ORDER BY ID'
+    ).fetchall()
+    assert [(r['ID'], r['FaelligkeitStufe'], r['ErinnerungFaellig']) for r in rows] == [
+        (1, 0, 0), (2, 1, 1), (3, 2, 0), (4, 3, 1),
+    ]
+    assert all(str(r['FaelligkeitBerechnetAm'])[:10] == '2026-05-15' for r in rows)
+
+
+def test_aktualisiere_faelligkeiten_nur_geaenderte_zeilen(conn):
+    aktualisiere_faelligkeiten(conn, heute=HEUTE)
+    assert aktualisiere_faelligkeiten(conn, heute=HEUTE) == 0
+    conn.execute("UPDATE Wartungsplan SET NaechsteFaelligkeit = '2026-05-16' WHERE ID = 1")
+    assert aktualisiere_faelligkeiten(conn, heute=HEUTE) == 1
+
+
+def test_erinnerung_wird_pro_termin_nur_einmal_beansprucht(conn):
+    aktualisiere_faelligkeiten(conn, heute=HEUTE)
+    assert _beanspruche_erinnerung(conn, 2) is True
+    assert _beanspruche_erinnerung(conn, 2) is False
+    # Plan ohne erreichtes Erinnerungsfenster
+    assert _beanspruche_erinnerung(conn, 1) is False
+    # Neuer Fälligkeitstermin (z. B. nach Durchführung) -> erneut beanspruchbar
+    conn.execute("UPDATE Wartungsplan SET NaechsteFaelligkeit = '2026-05-18' WHERE ID = 2")
+    aktualisiere_faelligkeiten(conn, heute=HEUTE)
+    assert _beanspruche_erinnerung(conn, 2) is True
+
+
+def test_erinnerung_nur_an_aktive_empfaenger_mit_einstellung(conn):
+    conn.executemany(
+        "INSERT INTO BenachrichtigungEinstellung (MitarbeiterID, Modul, Aktion, AbteilungID, Aktiv) "
+        "VALUES (?, 'wartungen', 'wartung_erinnerung', ?, 1)",
+        [(1, None), (3, None)],
+    )
+    assert erstelle_benachrichtigung_fuer_wartung_erinnerung(2, conn) == 1
+    rows = conn.execute(
+        "SELECT MitarbeiterID, Modul, Aktion, Zusatzdaten FROM Benachrichtigung"
+    ).fetchall()
+    assert [(r['MitarbeiterID'], r['Modul'], r['Aktion']) for r in rows] == [
+        (1, 'wartungen', 'wartung_erinnerung'),
+    ]
+    assert '"plan_id": 2' in rows[0]['Zusatzdaten']
@@ -0,0 +1,76 @@
+"""Query-Plan-Regressionstests fuer die Wartungs-Listen.
+
+Die Listen sollen ohne korrelierte Unterabfragen pro Ergebniszeile auskommen und die
+Aggregate (letzte Durchfuehrung, Anzahl Dateien) ueber abdeckende Indizes lesen.
+Geprueft wird mit der ``sql_recorder``-Fixture (``tests/conftest.py``).
+"""
+
+import pytest
+
+from modules.wartungen import services
+
+
+@pytest.fixture
+def conn(connection):
+    connection.execute("INSERT INTO Abteilung (ID, Bezeichnung, Aktiv) VALUES (1, 'Technik', 1)")
+    connection.execute(
+        "INSERT INTO Mitarbeiter (ID, Personalnummer, Nachname, Passwort, PrimaerAbteilungID) "
+        "VALUES (1, 'P1', 'Test', 'x', 1)"
+    )
+    connection.execute("INSERT INTO Bereich (ID, Bezeichnung) VALUES (1, 'Halle')")
+    connection.execute("INSERT INTO Gewerke (ID, Bezeichnung, BereichID) VALUES (1, 'Elektro', 1)")
+    connection.execute(
+        "INSERT INTO Wartung (ID, GewerkID, Bezeichnung, ErstelltVonID) VALUES (1, 1, 'Anlage', 1)"
+    )
+    connection.execute("INSERT INTO WartungAbteilungZugriff (WartungID, AbteilungID) VALUES (1, 1)")
+    connection.executemany(
+        "INSERT INTO Wartungsplan (ID, WartungID, IntervallEinheit, IntervallAnzahl) VALUES (?, 1, 'Monat', 1)",
+        [(1,), (2,)],
+    )
+    connection.executemany(
+        "INSERT INTO Wartungsdurchfuehrung (ID, WartungsplanID, DurchgefuehrtAm, ProtokolliertVonID) "
+        "VALUES (?, ?, ?, 1)",
+        [(1, 1, '2026-01-10 08:00:00'), (2, 1, '2026-03-10 08:00:00'), (3, 2, '2026-02-01 08:00:00')],
+    )
+    connection.executemany(
+        "INSERT INTO Datei (BereichTyp, BereichID, Dateiname, Dateipfad) VALUES ('Wartungsdurchfuehrung', ?, ?, ?)",
+        [(1, 'a.pdf', 'x/a.pdf'), (1, 'b.pdf', 'x/b.pdf'), (3, 'c.pdf', 'x/c.pdf')],
+    )
+    connection.commit()
+    return connection
+
+
+@pytest.mark.parametrize('is_admin', [True, False])
+def test_list_plaene_sichtbar_letzte_durchfuehrung_ueber_index(conn, sql_recorder, is_admin):
+    rows = services.list_plaene_sichtbar(sql_recorder, 1, is_admin)
+    assert {r['ID']: r['LetzteDurchfuehrung'] for r in rows} == {
+        1: '2026-03-10 08:00:00',
+        2: '2026-02-01 08:00:00',
+    }
+    plan = sql_recorder.plan('FROM Wartungsplan p')
+    assert not any('CORRELATED' in d for d in plan), plan
+    assert any('COVERING INDEX idx_wartungsdurchfuehrung_plan_datum' in d for d in plan), plan
+    if not is_admin:
+        assert any('COVERING INDEX idx_wartung_abteilung_abteilung_wartung' in d for d in plan), plan
+
+
+@pytest.mark.parametrize('is_admin', [True, False])
+def test_list_durchfuehrungen_chronologisch_datei_anzahl_ueber_index(conn, sql_recorder, is_admin):
+    rows = services.list_durchfuehrungen_chronologisch_sichtbar(sql_recorder, 1, is_admin)
+    assert {r['ID']: r['DateiAnzahl'] for r in rows} == {1: 2, 2: 0, 3: 1}
+    plan = sql_recorder.plan('FROM Wartungsdurchfuehrung d')
+    assert not any('CORRELATED' in d for d in plan), plan
+    # Gezaehlt wird nur fuer die IDs der Seite, nicht ueber alle Dateien des Bereichstyps
+    assert any('COVERING INDEX idx_datei_bereich (BereichTyp=? AND BereichID=?)' in d for d in plan), plan
+
+    seite = services.list_durchfuehrungen_chronologisch_sichtbar(conn, 1, is_admin, limit=2, sort_by='datum')
+    assert [(r['ID'], r['DateiAnzahl']) for r in seite] == [(2, 0), (3, 1)]
+
+
+def test_list_durchfuehrungen_fuer_wartung_datei_anzahl_ueber_index(conn, sql_recorder):
+    rows = services.list_durchfuehrungen_fuer_wartung(sql_recorder, 1)
+    assert [(r['ID'], r['DateiAnzahl']) for r in rows] == [(2, 0), (3, 1), (1, 2)]
+    plan = sql_recorder.plan('FROM Wartungsdurchfuehrung d')
+    assert not any('CORRELATED' in d for d in plan), plan
+    assert any('COVERING INDEX idx_datei_bereich' in d for d in plan), plan
+
@@ -0,0 +1,181 @@
+"""Query-Plan-Regressionstests fuer die Workload-Indizes (Migration 0009).
+
+Die haeufigsten Abfragen (Benachrichtigungs-Badge, Versand-Warteschlange, Druckauftraege,
+Schichtbuch-Bemerkungen, Lagerbuchungen) sollen ueber die zusammengesetzten bzw. partiellen
+Indizes laufen und ohne temporaeren Sortierbaum auskommen (``sql_recorder``-Fixture aus
+``tests/conftest.py``).
+
+Mit ``BIS_TEST_POSTGRES_URL`` werden dieselben Abfragen zusaetzlich gegen PostgreSQL
+(``EXPLAIN (FORMAT JSON)`` in einem temporaeren Schema) geprueft.
+"""
+
+import json
+import os
+import uuid
+
+import pytest
+
+from modules.ersatzteile.services import ersatzteil_services
+from modules.schichtbuch import services as schichtbuch_services
+from utils import benachrichtigungen, zebra_client
+
+
+@pytest.fixture
+def conn(connection):
+    connection.execute("INSERT INTO Abteilung (ID, Bezeichnung, Aktiv) VALUES (1, 'Technik', 1)")
+    connection.execute(
+        "INSERT INTO Mitarbeiter (ID, Personalnummer, Nachname, Passwort, PrimaerAbteilungID) "
+        "VALUES (1, 'P1', 'Test', 'x', 1)"
+    )
+    connection.execute("INSERT INTO Bereich (ID, Bezeichnung) VALUES (1, 'Halle')")
+    connection.execute("INSERT INTO Gewerke (ID, Bezeichnung, BereichID) VALUES (1, 'Elektro', 1)")
+    connection.execute("INSERT INTO Status (ID, Bezeichnung) VALUES (1, 'Offen')")
+    connection.execute(
+        "INSERT INTO SchichtbuchThema (ID, GewerkID, StatusID, ErstellerAbteilungID) VALUES (1, 1, 1, 1)"
+    )
+    connection.execute("INSERT INTO SchichtbuchThemaSichtbarkeit (ThemaID, AbteilungID) VALUES (1, 1)")
+    connection.executemany(
+        "INSERT INTO SchichtbuchBemerkungen (ThemaID, MitarbeiterID, Datum, Bemerkung, Gelöscht) "
+        "VALUES (1, 1, ?, ?, ?)",
+        [('2026-10-01 08:00:00', 'alt', 0), ('2026-10-02 08:00:00', 'neu', 0), ('2026-10-03 08:00:00', 'weg', 1)],
+    )
+    connection.executemany(
+        "INSERT INTO Benachrichtigung (MitarbeiterID, ThemaID, Typ, Titel, Nachricht, Gelesen, ErstelltAm) "
+        "VALUES (1, 0, 'info', ?, 'x', ?, ?)",
+        [('a', 0, '2026-10-01 08:00:00'), ('b', 0, '2026-10-02 08:00:00'), ('c', 1, '2026-10-03 08:00:00')],
+    )
+    connection.execute("INSERT INTO Ersatzteil (ID, Bestellnummer, Bezeichnung) VALUES (1, 'E-1', 'Lager')")
+    connection.executemany(
+        "INSERT INTO Lagerbuchung (ErsatzteilID, Typ, Menge, VerwendetVonID, Buchungsdatum) "
+        "VALUES (1, 'Eingang', ?, 1, ?)",
+        [(1, '2026-10-01 08:00:00'), (2, '2026-10-02 08:00:00')],
+    )
+    connection.commit()
+    return connection
+
+
+def test_ungelesene_benachrichtigungen_ueber_zusammengesetzten_index(conn, sql_recorder):
+    rows = benachrichtigungen.fetch_ungelesen_benachrichtigungen_rows(sql_recorder, 1)
+    assert [r['Titel'] for r in rows] == ['b', 'a']
+    assert benachrichtigungen.count_ungelesen_benachrichtigungen(sql_recorder, 1) == 2
+
+    plan = sql_recorder.plan('FROM Benachrichtigung B')
+    assert any('idx_benachrichtigung_mitarbeiter_gelesen_erstellt' in d for d in plan), plan
+    assert not any('TEMP B-TREE' in d for d in plan), plan
+    plan = sql_recorder.plan('COUNT(*) AS cnt')
+    assert any('COVERING INDEX idx_benachrichtigung_mitarbeiter_gelesen_erstellt' in d for d in plan), plan
+
+
+def test_versand_warteschlange_ueber_partiellen_index(conn, sql_recorder):
+    assert benachrichtigungen.versende_alle_benachrichtigungen(sql_recorder) == {'erfolg': 0, 'fehler': 0}
+    plan = sql_recorder.plan('FROM BenachrichtigungVersand BV')
+    assert any('idx_benachrichtigung_versand_offen' in d for d in plan), plan
+    assert not any('TEMP B-TREE' in d for d in plan), plan
+
+
+def test_druckauftrag_lease_ueber_indizes(conn, sql_recorder):
+    conn.execute("INSERT INTO zebra_printers (id, name, ip_address) VALUES (1, 'Z1', '10.0.0.1')")
+    conn.execute("INSERT INTO print_agents (id, name, token_hash) VALUES (1, 'A1', 'h')")
+    conn.executemany(
+        "INSERT INTO print_jobs (id, agent_id, drucker_id, zpl, status) VALUES (?, 1, 1, '^XA^XZ', 'pending')",
+        [(1,), (2,)],
+    )
+    conn.commit()
+    job = zebra_client.lease_next_job(sql_recorder, 1)
+    assert job['id'] == 1
+
+    plan = sql_recorder.plan('SELECT id FROM print_jobs')
+    assert any('COVERING INDEX idx_print_jobs_agent_status_id' in d for d in plan), plan
+    assert not any('TEMP B-TREE' in d for d in plan), plan
+    plan = sql_recorder.plan("SET status = 'pending', lease_until = NULL")
+    assert any('idx_print_jobs_leased' in d for d in plan), plan
+
+
+def test_thema_bemerkungen_ueber_zusammengesetzten_index(conn, sql_recorder):
+    daten = schichtbuch_services.get_thema_detail_data(1, 1, sql_recorder, is_admin=True)
+    assert [b['Bemerkung'] for b in daten['bemerkungen']] == ['neu', 'alt']
+
+    plan = sql_recorder.plan('FROM SchichtbuchBemerkungen b')
+    assert any('idx_bemerkung_thema_geloescht_datum' in d for d in plan), plan
+    assert not any('TEMP B-TREE FOR ORDER BY' in d for d in plan), plan
+
+
+def test_lagerbuchungen_ueber_zusammengesetzten_index(conn, sql_recorder, tmp_path):
+    daten = ersatzteil_services.get_ersatzteil_detail_data(1, 1, sql_recorder, str(tmp_path))
+    assert [b['Menge'] for b in daten['lagerbuchungen']] == [2, 1]
+
+    plan = sql_recorder.plan('FROM Lagerbuchung l')
+    assert any('idx_lagerbuchung_ersatzteil_datum' in d for d in plan), plan
+    assert not any('TEMP B-TREE FOR ORDER BY' in d for d in plan), plan
+
+
+_POSTGRES_URL = os.environ.get('BIS_TEST_POSTGRES_URL')
+
+_POSTGRES_ABFRAGEN = [
+    (
+        'idx_benachrichtigung_mitarbeiter_gelesen_erstellt',
+        'SELECT "ID" FROM "Benachrichtigung" WHERE "MitarbeiterID" = %s AND "Gelesen" = 0 '
+        'ORDER BY "ErstelltAm" DESC LIMIT 20',
+        (1,),
+    ),
+    (
+        'idx_benachrichtigung_versand_offen',
+        'SELECT "BenachrichtigungID" FROM "BenachrichtigungVersand" WHERE "Status" = \'pending\' '
+        'ORDER BY "ID" LIMIT 100',
+        (),
+    ),
+    (
+        'idx_print_jobs_agent_status_id',
+        "SELECT id FROM print_jobs WHERE agent_id = %s AND status = 'pending' ORDER BY id LIMIT 1",
+        (1,),
+    ),
+    (
+        'idx_print_jobs_leased',
+        "SELECT id FROM print_jobs WHERE status = 'leased' AND lease_until IS NOT NULL AND lease_until < %s",
+        ('2026-10-19 00:00:00',),
+    ),
+    (
+        'idx_bemerkung_thema_geloescht_datum',
+        'SELECT "ID" FROM "SchichtbuchBemerkungen" WHERE "ThemaID" = %s AND "Gelöscht" = 0 '
+        'ORDER BY "Datum" DESC',
+        (1,),
+    ),
+    (
+        'idx_lagerbuchung_ersatzteil_datum',
+        'SELECT "ID" FROM "Lagerbuchung" WHERE "ErsatzteilID" = %s ORDER BY "Buchungsdatum" DESC LIMIT 50',
+        (1,),
+    ),
+]
+
+
+def _plan_indexnamen(knoten):
+    namen = set()
+    if knoten.get('Index Name'):
+        namen.add(knoten['Index Name'])
+    for kind in knoten.get('Plans', []):
+        namen |= _plan_indexnamen(kind)
+    return namen
+
+
+@pytest.mark.skipif(not _POSTGRES_URL, reason='BIS_TEST_POSTGRES_URL nicht gesetzt')
+def test_postgres_abfragen_nutzen_workload_indizes():
+    sa = pytest.importorskip('sqlalchemy')
+    from utils.db_schema import metadata
+
+    schema = f'bis_plan_{uuid.uuid4().hex[:8]}'
+    engine = sa.create_engine(_POSTGRES_URL)
+    try:
+        with engine.begin() as pg:
+            pg.exec_driver_sql(f'CREATE SCHEMA {schema}')
+            pg.exec_driver_sql(f'SET search_path TO {schema}')
+            metadata.create_all(pg)
+            pg.exec_driver_sql('SET enable_seqscan = off')
+            for index_name, sql, params in _POSTGRES_ABFRAGEN:
+                (plan,) = pg.exec_driver_sql('EXPLAIN (FORMAT JSON) ' + sql, params).fetchone()
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                assert index_name in _plan_indexnamen(plan[0]['Plan']), (index_name, plan)
+    finally:
+        with engine.begin() as pg:
+            pg.exec_driver_sql(f'DROP SCHEMA IF EXISTS {schema} CASCADE')
+        engine.dispose()
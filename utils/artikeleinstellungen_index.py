@@ -0,0 +1,251 @@
+"""
+Index der Artikeleinstellungen (Linien -> Artikel -> Fotos) für die Etikettierungsseite.
+
+Der Ordner ``Produktion/Etikettierung/Artikeleinstellungen`` liegt meist auf einer
+NAS-Freigabe; ihn bei jedem Seitenaufruf komplett zu listen dauert bei Hunderten Artikeln
+Sekunden. Der Index liegt daher als JSON unter ``ARTIKELEINSTELLUNGEN_INDEX_DATEI``
+(von allen Workern gemeinsam genutzt) und zusätzlich im Speicher jedes Prozesses.
+
+Aktualisiert wird inkrementell über die mtime der Ordner: Ein Verzeichnis ändert seine mtime,
+wenn darin Einträge angelegt, gelöscht oder umbenannt werden. Nur Ordner mit geänderter mtime
+werden neu gelistet, und geprüft wird höchstens alle ``ARTIKELEINSTELLUNGEN_INDEX_PRUEFEN_SEKUNDEN``.
+Der Foto-Upload trägt seinen Artikel sofort ein (``artikel_aktualisieren``); komplett neu
+aufbauen: ``flask artikeleinstellungen-index``.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+log = logging.getLogger('bis.produktion')
+
+INDEX_VERSION = 1
+BILD_ENDUNGEN = {'.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp'}
+# Ordner, die kurz vor dem Scan geändert wurden, beim nächsten Mal erneut listen (grobe mtime-Auflösung, z. B. SMB)
+_MTIME_UNSICHER_SEKUNDEN = 2.0
+
+_STANDARD_KONFIG = {
+    'ARTIKELEINSTELLUNGEN_INDEX_PRUEFEN_SEKUNDEN': 60,
+}
+
+_lock = threading.Lock()
+# Im Speicher: (Indexdatei, deren mtime beim Laden/Schreiben, Index)
+_geladen: tuple[str, float, dict] | None = None
+
+
+def _konfig(key):
+    from flask import current_app, has_app_context
+    if has_app_context() and current_app.config.get(key) is not None:
+        return current_app.config.get(key)
+    return _STANDARD_KONFIG[key]
+
+
+def artikeleinstellungen_ordner() -> str:
+    from flask import current_app
+    base_folder = current_app.config.get('UPLOAD_BASE_FOLDER')
+    return os.path.join(base_folder, 'Produktion', 'Etikettierung', 'Artikeleinstellungen')
+
+
+def _index_datei() -> str:
+    from flask import current_app
+    datei = current_app.config.get('ARTIKELEINSTELLUNGEN_INDEX_DATEI')
+    if datei:
+        return datei
+    return os.path.join(current_app.config.get('UPLOAD_BASE_FOLDER'), 'Cache', 'artikeleinstellungen_index.json')
+
+
+def sortiernummer(artikel_name):
+    """Extrahiert die Sortiernummer aus dem Artikelnamen (z.B. '01-Artikel' -> 1)"""
+    match = re.match(r'^(\d+)-', artikel_name)
+    if match:
+        return int(match.group(1))
+    return 9999  # Artikel ohne Sortiernummer ans Ende
+
+
+def foto_sortierschluessel(filename):
+    """bizerba.* zuerst, dann alphabetisch."""
+    filename_lower = filename.lower()
+    if filename_lower.startswith('bizerba'):
+        return (0, filename_lower)
+    return (1, filename_lower)
+
+
+def _mtime_merken(mtime, scan_zeit):
+    return None if scan_zeit - mtime < _MTIME_UNSICHER_SEKUNDEN else mtime
+
+
+def _unterordner(pfad) -> tuple[float, list[str]]:
+    """(mtime, Namen der Unterordner); ``scandir`` spart das isdir je Eintrag."""
+    mtime = os.stat(pfad).st_mtime
+    with os.scandir(pfad) as eintraege:
+        return mtime, [e.name for e in eintraege if e.is_dir()]
+
+
+def _artikel_scannen(artikel_pfad, scan_zeit) -> dict:
+    try:
+        mtime = os.stat(artikel_pfad).st_mtime
+        with os.scandir(artikel_pfad) as eintraege:
+            fotos = [e.name for e in eintraege
+                     if e.is_file() and os.path.splitext(e.name.lower())[1] in BILD_ENDUNGEN]
+    except OSError as e:
+        # Fehler beim Lesen eines Artikel-Ordners ignorieren
+        log.warning('Artikeleinstellungen: Artikel-Ordner %s nicht lesbar: %s', artikel_pfad, e)
+        return {'mtime': None, 'fotos': []}
+    fotos.sort(key=foto_sortierschluessel)
+    return {'mtime': _mtime_merken(mtime, scan_zeit), 'fotos': fotos}
+
+
+def _aktualisieren(ordner, alt: dict | None) -> dict:
+    """Index gegen den Ordner abgleichen; unveränderte Ordner (gleiche mtime) werden nicht gelistet."""
+    scan_zeit = time.time()
+    alt_linien = (alt or {}).get('linien', {})
+    neu = {'version': INDEX_VERSION, 'ordner': ordner, 'geprueft': scan_zeit, 'linien': {}}
+    if not os.path.isdir(ordner):
+        return neu
+
+    wurzel_mtime = os.stat(ordner).st_mtime
+    if alt and alt.get('mtime') is not None and alt['mtime'] == wurzel_mtime:
+        linien = list(alt_linien)
+    else:
+        wurzel_mtime, linien = _unterordner(ordner)
+    neu['mtime'] = _mtime_merken(wurzel_mtime, scan_zeit)
+    for linie in linien:
+        linie_pfad = os.path.join(ordner, linie)
+        linie_alt = alt_linien.get(linie) or {}
+        try:
+            mtime = os.stat(linie_pfad).st_mtime
+            if linie_alt.get('mtime') is not None and linie_alt['mtime'] == mtime:
+                artikel_namen = list(linie_alt.get('artikel', {}))
+            else:
+                mtime, artikel_namen = _unterordner(linie_pfad)
+        except OSError as e:
+            log.warning('Artikeleinstellungen: Linien-Ordner %s nicht lesbar: %s', linie_pfad, e)
+            continue
+        artikel_alt = linie_alt.get('artikel', {})
+        artikel_neu = {}
+        for artikel in artikel_namen:
+            artikel_pfad = os.path.join(linie_pfad, artikel)
+            vorher = artikel_alt.get(artikel)
+            if vorher and vorher.get('mtime') is not None:
+                try:
+                    if os.stat(artikel_pfad).st_mtime == vorher['mtime']:
+                        artikel_neu[artikel] = vorher
+                        continue
+                except OSError:
+                    pass
+            artikel_neu[artikel] = _artikel_scannen(artikel_pfad, scan_zeit)
+        neu['linien'][linie] = {'mtime': _mtime_merken(mtime, scan_zeit), 'artikel': artikel_neu}
+    return neu
+
+
+def _lesen(datei) -> tuple[float, dict] | None:
+    try:
+        mtime = os.stat(datei).st_mtime
+        with open(datei, encoding='utf-8') as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(index, dict) or index.get('version') != INDEX_VERSION:
+        return None
+    return mtime, index
+
+
+def _schreiben(datei, index) -> float | None:
+    try:
+        os.makedirs(os.path.dirname(datei), exist_ok=True)
+        tmp = f'{datei}.{os.getpid()}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(index, f, ensure_ascii=False)
+        os.replace(tmp, datei)
+        return os.stat(datei).st_mtime
+    except OSError as e:
+        # Ohne beschreibbaren Cache-Ordner bleibt der Index nur im Speicher dieses Prozesses
+        log.warning('Artikeleinstellungen: Index %s nicht schreibbar: %s', datei, e)
+        return None
+
+
+def _aktueller_index(datei, ordner) -> dict | None:
+    """Index aus dem Speicher bzw. aus der Datei, wenn ein anderer Prozess ihn neuer geschrieben hat."""
+    global _geladen
+    index = None
+    if _geladen is not None and _geladen[0] == datei:
+        index = _geladen[2]
+        try:
+            aktuell = os.stat(datei).st_mtime == _geladen[1]
+        except OSError:
+            aktuell = True
+        if not aktuell:
+            gelesen = _lesen(datei)
+            if gelesen is not None:
+                _geladen = (datei, gelesen[0], gelesen[1])
+                index = gelesen[1]
+    else:
+        gelesen = _lesen(datei)
+        if gelesen is not None:
+            _geladen = (datei, gelesen[0], gelesen[1])
+            index = gelesen[1]
+    return index if index is not None and index.get('ordner') == ordner else None
+
+
+def _merken(datei, index) -> None:
+    global _geladen
+    mtime = _schreiben(datei, index)
+    _geladen = (datei, mtime if mtime is not None else -1.0, index)
+
+
+def _struktur(index) -> dict:
+    struktur = {}
+    for linie in sorted(index.get('linien', {})):
+        artikel = index['linien'][linie].get('artikel', {})
+        struktur[linie] = {a: list(artikel[a]['fotos']) for a in sorted(artikel, key=sortiernummer)}
+    return struktur
+
+
+def artikeleinstellungen_struktur() -> dict:
+    """{linie: {artikel: [fotos]}} mit sortierten Einträgen (Linien alphabetisch, Artikel nach Sortiernummer)."""
+    ordner = artikeleinstellungen_ordner()
+    datei = _index_datei()
+    intervall = float(_konfig('ARTIKELEINSTELLUNGEN_INDEX_PRUEFEN_SEKUNDEN'))
+    with _lock:
+        index = _aktueller_index(datei, ordner)
+        if index is None or time.time() - index.get('geprueft', 0) >= intervall:
+            try:
+                index = _aktualisieren(ordner, index)
+            except OSError as e:
+                log.warning('Artikeleinstellungen: Ordner %s nicht lesbar: %s', ordner, e)
+                return {}
+            _merken(datei, index)
+        return _struktur(index)
+
+
+def artikel_aktualisieren(linie, artikel) -> None:
+    """Einen Artikel sofort neu einlesen (nach dem Foto-Upload), ohne auf das Prüfintervall zu warten."""
+    ordner = artikeleinstellungen_ordner()
+    datei = _index_datei()
+    with _lock:
+        index = _aktueller_index(datei, ordner)
+        if index is None:
+            # Noch kein Index: wird beim nächsten Seitenaufruf vollständig aufgebaut
+            return
+        scan_zeit = time.time()
+        eintrag = index['linien'].setdefault(linie, {'mtime': None, 'artikel': {}})
+        eintrag['artikel'][artikel] = _artikel_scannen(os.path.join(ordner, linie, artikel), scan_zeit)
+        # Linie/Wurzel beim nächsten Prüfen erneut listen (der Ordner kann neu angelegt worden sein)
+        eintrag['mtime'] = None
+        index['mtime'] = None
+        _merken(datei, index)
+
+
+def index_neu_aufbauen() -> dict:
+    """Index ohne Rückgriff auf gespeicherte mtimes komplett neu aufbauen; gibt die Struktur zurück."""
+    ordner = artikeleinstellungen_ordner()
+    datei = _index_datei()
+    with _lock:
+        index = _aktualisieren(ordner, None)
+        _merken(datei, index)
+        return _struktur(index)
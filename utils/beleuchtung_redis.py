@@ -19,8 +19,10 @@ def running_in_docker() -> bool:
 # Hash: Feld = lamp_id, Wert = JSON (kanonisierter Status)
 REDIS_HASH_BELEUCHTUNG = 'bis:beleuchtung:state'
 
-# Pub/Sub: Nachricht = JSON {"lamp_id": "...", "state": {...}}
-REDIS_CHANNEL_BELEUCHTUNG = 'bis:beleuchtung:events'
+# Stream: Feld "event" = JSON {"lamp_id": "...", "state": {...}}; Web-Worker lesen ab ihrer letzten ID
+# (nach Verbindungsabbruch oder Leader-Wechsel ohne Lücke), gekürzt auf ca. REDIS_STREAM_MAXLEN Einträge
+REDIS_STREAM_BELEUCHTUNG = 'bis:beleuchtung:stream'
+REDIS_STREAM_MAXLEN = 10000
 
 
 def resolve_redis_url(app_config: dict | None, db_redis_url: str | None) -> str | None:
@@ -8,6 +8,7 @@ import logging
 from datetime import datetime
 from utils import get_db_connection
 from utils.abteilungen import get_sichtbare_abteilungen_fuer_mitarbeiter
+from utils.benachrichtigungen_live import benachrichtigung_geaendert
 
 # Logger für Benachrichtigungen
 logger = logging.getLogger(__name__)
@@ -254,6 +255,7 @@ def erstelle_benachrichtigung_mit_filter(modul, aktion, mitarbeiter_id, titel, n
             zusatzdaten_json
         ))
         benachrichtigung_id = cursor.lastrowid
+        benachrichtigung_geaendert(mitarbeiter_id)
         logger.info(f"Benachrichtigung erstellt: ID={benachrichtigung_id}, MitarbeiterID={mitarbeiter_id}, Modul={modul}, Aktion={aktion}, Titel={titel[:50]}")
     except Exception as e:
         logger.error(f"Fehler beim Erstellen der Benachrichtigung: MitarbeiterID={mitarbeiter_id}, Modul={modul}, Aktion={aktion}, Fehler={str(e)}", exc_info=True)
@@ -668,6 +670,26 @@ def erstelle_benachrichtigung_fuer_bestellung(bestellung_id, aktion, conn=None):
     logger.info(f"Benachrichtigungen für Bestellung erstellt: {erstellt_count} erstellt, {uebersprungen_count} übersprungen (BestellungID={bestellung_id})")
 
 
+def loesche_benachrichtigungen_fuer_bestellung(bestellung_id, conn):
+    """
+    Löscht alle Benachrichtigungen (gelesen oder nicht) zu einer Bestellung.
+    
+    Zusatzdaten enthalten sowohl "bestellung_id":123 als auch "bestellung_id": 123.
+    """
+    muster = (f'%"bestellung_id":{bestellung_id}%', f'%"bestellung_id": {bestellung_id}%')
+    empfaenger = conn.execute('''
+        SELECT DISTINCT MitarbeiterID FROM Benachrichtigung
+        WHERE Modul = 'bestellwesen'
+        AND (Zusatzdaten LIKE ? OR Zusatzdaten LIKE ?)
+    ''', muster).fetchall()
+    conn.execute('''
+        DELETE FROM Benachrichtigung
+        WHERE Modul = 'bestellwesen'
+        AND (Zusatzdaten LIKE ? OR Zusatzdaten LIKE ?)
+    ''', muster)
+    benachrichtigung_geaendert(*(r['MitarbeiterID'] for r in empfaenger))
+
+
 def erstelle_benachrichtigung_fuer_wareneingang(bestellung_id, conn=None):
     """
     Erstellt Benachrichtigungen für Wareneingang.
@@ -739,6 +761,134 @@ def erstelle_benachrichtigung_fuer_wareneingang(bestellung_id, conn=None):
     logger.info(f"Benachrichtigungen für Wareneingang erstellt: {erstellt_count} erstellt, {uebersprungen_count} übersprungen (BestellungID={bestellung_id})")
 
 
+def erstelle_benachrichtigung_fuer_wartung_erinnerung(plan_id, conn=None):
+    """
+    Erstellt Erinnerungen für einen Wartungsplan, dessen Erinnerungsfenster erreicht ist.
+    
+    Empfänger: aktive Mitarbeiter der Abteilungen aus WartungAbteilungZugriff (primär oder
+    MitarbeiterAbteilung) sowie der Ersteller der Wartung.
+    
+    Args:
+        plan_id: ID des Wartungsplans
+        conn: Datenbankverbindung (optional)
+    
+    Returns:
+        Anzahl erstellter Benachrichtigungen
+    """
+    if conn is None:
+        with get_db_connection() as conn:
+            return erstelle_benachrichtigung_fuer_wartung_erinnerung(plan_id, conn)
+    
+    plan = conn.execute('''
+        SELECT 
+            P.ID,
+            P.NaechsteFaelligkeit,
+            W.ID AS WartungID,
+            W.Bezeichnung AS WartungBez,
+            W.ErstelltVonID
+        FROM Wartungsplan P
+        JOIN Wartung W ON P.WartungID = W.ID
+        WHERE P.ID = ?
+    ''', (plan_id,)).fetchone()
+    
+    if not plan:
+        return 0
+    
+    faellig = str(plan['NaechsteFaelligkeit'] or '')[:10]
+    titel = f"Wartung fällig: {plan['WartungBez']}"
+    nachricht = f"Die Wartung „{plan['WartungBez']}“ ist am {faellig} fällig."
+    
+    abteilungen = [
+        r['AbteilungID'] for r in conn.execute(
+            'SELECT AbteilungID FROM WartungAbteilungZugriff WHERE WartungID = ?', (plan['WartungID'],)
+        ).fetchall()
+    ]
+    mitarbeiter_ids = []
+    if abteilungen:
+        ph = ','.join(['?'] * len(abteilungen))
+        mitarbeiter_ids = [
+            r['ID'] for r in conn.execute(f'''
+                SELECT DISTINCT M.ID
+                FROM Mitarbeiter M
+                WHERE M.Aktiv = 1
+                AND (
+                    M.PrimaerAbteilungID IN ({ph})
+                    OR EXISTS (
+                        SELECT 1 FROM MitarbeiterAbteilung MA
+                        WHERE MA.MitarbeiterID = M.ID
+                        AND MA.AbteilungID IN ({ph})
+                    )
+                )
+            ''', abteilungen + abteilungen).fetchall()
+        ]
+    if plan['ErstelltVonID'] is not None and plan['ErstelltVonID'] not in mitarbeiter_ids:
+        mitarbeiter_ids.append(plan['ErstelltVonID'])
+    
+    logger.debug(f"Gefundene Mitarbeiter für Wartungserinnerung Plan {plan_id}: {len(mitarbeiter_ids)}")
+    
+    erstellt_count = 0
+    uebersprungen_count = 0
+    
+    for mid in mitarbeiter_ids:
+        benachrichtigung_id = erstelle_benachrichtigung_mit_filter(
+            modul='wartungen',
+            aktion='wartung_erinnerung',
+            mitarbeiter_id=mid,
+            titel=titel,
+            nachricht=nachricht,
+            zusatzdaten={'wartung_id': plan['WartungID'], 'plan_id': plan_id, 'faellig': faellig},
+            conn=conn,
+            einstellung_abteilung_ids=abteilung_ids_empfaenger_in_sichtbarkeit(mid, abteilungen, conn),
+        )
+        if benachrichtigung_id:
+            erstellt_count += 1
+        else:
+            uebersprungen_count += 1
+    
+    logger.info(f"Benachrichtigungen für Wartungserinnerung erstellt: {erstellt_count} erstellt, {uebersprungen_count} übersprungen (WartungsplanID={plan_id})")
+    return erstellt_count
+
+
+def erstelle_benachrichtigung_fuer_bericht_job(job_id, conn=None):
+    """
+    Meldet dem Auftraggeber einen fertigen Bericht-Job (utils/reports/bericht_jobs.py).
+    
+    Der Export wurde ausdrücklich angefordert, daher ohne Einstellungsfilter und nur als
+    App-Benachrichtigung; der Link führt direkt zum Download.
+    
+    Args:
+        job_id: ID des BerichtJob
+        conn: Datenbankverbindung (optional)
+    
+    Returns:
+        ID der erstellten Benachrichtigung oder None
+    """
+    if conn is None:
+        with get_db_connection() as conn:
+            return erstelle_benachrichtigung_fuer_bericht_job(job_id, conn)
+    
+    job = conn.execute(
+        'SELECT ID, MitarbeiterID, Typ, Dateiname FROM BerichtJob WHERE ID = ?', (job_id,)
+    ).fetchone()
+    if not job or not job['Dateiname']:
+        return None
+    
+    cursor = conn.execute('''
+        INSERT INTO Benachrichtigung (
+            MitarbeiterID, ThemaID, Typ, Titel, Nachricht, Modul, Aktion, Zusatzdaten
+        )
+        VALUES (?, 0, 'bericht_fertig', ?, ?, 'berichte', 'bericht_fertig', ?)
+    ''', (
+        job['MitarbeiterID'],
+        'Bericht fertig',
+        f"{job['Dateiname']} steht zum Download bereit.",
+        json.dumps({'bericht_job_id': job['ID']}),
+    ))
+    benachrichtigung_geaendert(job['MitarbeiterID'])
+    logger.info(f"Benachrichtigung für Bericht-Job erstellt: JobID={job_id}, MitarbeiterID={job['MitarbeiterID']}")
+    return cursor.lastrowid
+
+
 # ========== Versand-Funktionen ==========
 
 def versende_benachrichtigung(benachrichtigung_id, kanal_typ, conn=None):
@@ -862,6 +1012,17 @@ def ziel_url_fuer_benachrichtigung(b_dict):
         aid = zusatz.get('angebotsanfrage_id')
         if aid:
             return url_for('ersatzteile.angebotsanfrage_detail', angebotsanfrage_id=aid)
+    if modul == 'wartungen':
+        wid = zusatz.get('wartung_id')
+        if wid:
+            pid = zusatz.get('plan_id')
+            if pid:
+                return url_for('wartungen.wartung_detail', wartung_id=wid, plan_id=pid)
+            return url_for('wartungen.wartung_detail', wartung_id=wid)
+    if modul == 'berichte':
+        jid = zusatz.get('bericht_job_id')
+        if jid:
+            return url_for('berichte.job_download', job_id=jid)
     return None
 
 
@@ -0,0 +1,166 @@
+"""
+Live-Aktualisierung der Benachrichtigungs-Glocke (SSE statt 30-s-Polling).
+
+Schreibende Stellen melden geänderte Empfänger mit ``benachrichtigung_geaendert(mitarbeiter_id)``.
+Gesendet wird erst nach dem Commit: im Request nach dem Erzeugen der Antwort
+(``after_this_request``), in Hintergrund-Jobs mit ``vorgemerkte_senden()`` nach dem
+``get_db_connection``-Block. Die Meldung geht über den Redis-Kanal
+``REDIS_CHANNEL_BENACHRICHTIGUNGEN`` an alle Worker (Listener: ``modules.technik.mqtt_runtime``),
+ohne Redis nur an die Streams dieses Prozesses.
+
+Jeder SSE-Stream belegt einen gthread-Thread; je Prozess sind höchstens
+``BENACHRICHTIGUNGEN_SSE_MAX_STREAMS`` gleichzeitig offen (Standard: Gunicorn-Threads bis auf 4
+für normale Requests). Mitgezählt werden die Beleuchtungs-Streams (``modules.technik.sse_broadcast``)
+im selben Thread-Pool: Wanddisplays haben keinen Polling-Ersatz und werden nicht abgewiesen,
+verdrängen aber Glocken-Streams. Nur Clients über dem Limit pollen weiter,
+``ungelesen_stand`` liefert dafür einen billigen ETag ohne die Join-Abfrage der Glocke.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import queue
+import threading
+import time
+
+from redis.exceptions import RedisError
+
+log = logging.getLogger('bis.benachrichtigungen')
+
+REDIS_CHANNEL_BENACHRICHTIGUNGEN = 'bis:benachrichtigungen:events'
+
+_STANDARD_KONFIG = {
+    'BENACHRICHTIGUNGEN_SSE_MAX_STREAMS': 12,
+    'BENACHRICHTIGUNGEN_SSE_MAX_SEKUNDEN': 300,
+}
+
+_sub_lock = threading.Lock()
+_abonnenten: dict[int, list[queue.Queue]] = {}
+_vorgemerkt = threading.local()
+# Nach einem Redis-Fehler eine Weile nur lokal verteilen, statt jeden Request warten zu lassen
+_REDIS_PAUSE_NACH_FEHLER = 30.0
+_redis_pause_bis = 0.0
+
+
+def _konfig(key):
+    from flask import current_app, has_app_context
+    if has_app_context() and current_app.config.get(key) is not None:
+        return current_app.config.get(key)
+    return _STANDARD_KONFIG[key]
+
+
+def abonnieren(mitarbeiter_id) -> queue.Queue | None:
+    """Warteschlange für einen SSE-Stream; None, wenn das Limit dieses Prozesses erreicht ist.
+
+    Das Limit gilt für alle SSE-Streams des Prozesses, also Glocke und Beleuchtung zusammen.
+    """
+    from modules.technik.sse_broadcast import count_subscribers
+
+    limit = int(_konfig('BENACHRICHTIGUNGEN_SSE_MAX_STREAMS'))
+    # maxsize=1: Meldungen fallen zusammen, der Client lädt ohnehin den aktuellen Stand
+    q: queue.Queue = queue.Queue(maxsize=1)
+    with _sub_lock:
+        if sum(len(qs) for qs in _abonnenten.values()) + count_subscribers() >= limit:
+            return None
+        _abonnenten.setdefault(int(mitarbeiter_id), []).append(q)
+    return q
+
+
+def abbestellen(mitarbeiter_id, q: queue.Queue) -> None:
+    with _sub_lock:
+        qs = _abonnenten.get(int(mitarbeiter_id), [])
+        if q in qs:
+            qs.remove(q)
+        if not qs:
+            _abonnenten.pop(int(mitarbeiter_id), None)
+
+
+def anzahl_abonnenten() -> int:
+    with _sub_lock:
+        return sum(len(qs) for qs in _abonnenten.values())
+
+
+def verteilen(mitarbeiter_ids) -> int:
+    """Streams dieses Prozesses für die Mitarbeiter wecken; gibt die Anzahl geweckter Streams zurück."""
+    with _sub_lock:
+        qs = [q for mid in mitarbeiter_ids for q in _abonnenten.get(int(mid), [])]
+    for q in qs:
+        try:
+            q.put_nowait(True)
+        except queue.Full:
+            pass
+    return len(qs)
+
+
+def verteilen_redis_nachricht(o: dict) -> None:
+    """Vom Redis-Pub/Sub-Listener aufgerufen (``{'mitarbeiter_ids': [...]}``)."""
+    ids = o.get('mitarbeiter_ids') or []
+    try:
+        verteilen([int(mid) for mid in ids])
+    except (TypeError, ValueError):
+        log.warning('Benachrichtigungen Pub/Sub: ungültige Nachricht %r', o)
+
+
+def _senden(mitarbeiter_ids) -> None:
+    from utils.beleuchtung_redis import get_redis_connection_for_technik
+
+    global _redis_pause_bis
+    ids = sorted(int(mid) for mid in mitarbeiter_ids if mid is not None)
+    if not ids:
+        return
+    if time.monotonic() >= _redis_pause_bis:
+        try:
+            r = get_redis_connection_for_technik(connect_timeout=0.5)
+            if r is not None:
+                # Der Listener jedes Workers (auch dieses) verteilt an seine Streams
+                r.publish(REDIS_CHANNEL_BENACHRICHTIGUNGEN, json.dumps({'mitarbeiter_ids': ids}))
+                return
+        except (RedisError, OSError) as e:
+            log.debug('Benachrichtigungen: Redis-Publish fehlgeschlagen (%s), nur lokal', e)
+            _redis_pause_bis = time.monotonic() + _REDIS_PAUSE_NACH_FEHLER
+        except Exception as e:
+            # z. B. MQTT-/Redis-Konfiguration nicht lesbar
+            log.debug('Benachrichtigungen: Redis nicht verfügbar (%s), nur lokal', e)
+    verteilen(ids)
+
+
+def benachrichtigung_geaendert(*mitarbeiter_ids) -> None:
+    """Empfänger vormerken, deren Benachrichtigungen eingefügt, gelesen oder gelöscht wurden."""
+    from flask import after_this_request, g, has_request_context
+
+    if has_request_context():
+        offen = g.get('_benachrichtigung_geaendert')
+        if offen is None:
+            offen = g._benachrichtigung_geaendert = set()
+
+            @after_this_request
+            def _nach_request(response):
+                vorgemerkte = set(g.pop('_benachrichtigung_geaendert', None) or ())
+                if vorgemerkte:
+                    _senden(vorgemerkte)
+                return response
+        offen.update(mitarbeiter_ids)
+        return
+    offen = getattr(_vorgemerkt, 'ids', None)
+    if offen is None:
+        offen = _vorgemerkt.ids = set()
+    offen.update(mitarbeiter_ids)
+
+
+def vorgemerkte_senden() -> None:
+    """Außerhalb eines Requests vorgemerkte Empfänger melden (nach dem Commit aufrufen)."""
+    offen = getattr(_vorgemerkt, 'ids', None)
+    _vorgemerkt.ids = None
+    if offen:
+        _senden(offen)
+
+
+def ungelesen_stand(conn, mitarbeiter_id) -> str:
+    """ETag der ungelesenen Benachrichtigungen (Anzahl und IDs, nur über den Index)."""
+    row = conn.execute('''
+        SELECT COUNT(*) AS Anzahl, COALESCE(MAX(ID), 0) AS MaxID, COALESCE(SUM(ID), 0) AS SummeID
+        FROM Benachrichtigung
+        WHERE MitarbeiterID = ? AND Gelesen = 0
+    ''', (mitarbeiter_id,)).fetchone()
+    return f"{mitarbeiter_id}-{row['Anzahl']}-{row['MaxID']}-{row['SummeID']}"
@@ -0,0 +1,150 @@
+"""
+Verkleinerte Bild-Derivate (WebP) für hochgeladene Fotos.
+
+Listen- und Detailansichten laden statt der Originale (oft mehrere MB Handyfoto) eine
+vorab bzw. beim ersten Abruf erzeugte WebP-Variante in fester Größe. Die Derivate liegen
+getrennt von den Anhängen unter ``BILD_DERIVATE_FOLDER`` (Ordnerlisten/Dateizähler bleiben
+unberührt) und tragen die mtime des Originals – ersetzte Originale werden so erkannt und
+neu skaliert. Verglichen wird auf ``MTIME_TOLERANZ_NS`` genau, da SMB/NFS-Freigaben die
+mtime beim Setzen runden.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from flask import current_app, request, send_file
+from PIL import Image, ImageOps
+
+log = logging.getLogger('bis.bilder')
+
+# Name -> maximale Kantenlänge in Pixeln (Seitenverhältnis bleibt erhalten)
+DERIVAT_GROESSEN = {
+    'thumb': 320,
+    'mittel': 1280,
+}
+
+BILD_ENDUNGEN = {'.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp'}
+
+_WEBP_QUALITAET = 80
+
+# SMB/NFS speichern mtimes teils nur auf 1-2 s genau (FAT-Backends: 2 s)
+MTIME_TOLERANZ_NS = 2_000_000_000
+
+
+def ist_bild(pfad: str) -> bool:
+    """True, wenn die Dateiendung auf ein skalierbares Bild hindeutet."""
+    return os.path.splitext(pfad)[1].lower() in BILD_ENDUNGEN
+
+
+def _cache_root(cache_root: str | None) -> str:
+    if cache_root:
+        return cache_root
+    return current_app.config['BILD_DERIVATE_FOLDER']
+
+
+def derivat_pfad(original_pfad: str, groesse: str, cache_root: str | None = None) -> str:
+    """Ablageort des Derivats; Schlüssel ist der normalisierte absolute Originalpfad."""
+    schluessel = hashlib.sha1(
+        os.path.normcase(os.path.abspath(original_pfad)).encode('utf-8')
+    ).hexdigest()
+    return os.path.join(_cache_root(cache_root), groesse, schluessel[:2], f'{schluessel}.webp')
+
+
+def _skalieren(original_pfad: str, kante: int, ziel_pfad: str) -> None:
+    with Image.open(original_pfad) as img:
+        # JPEG direkt in reduzierter Auflösung dekodieren (deutlich schneller bei Handyfotos)
+        img.draft('RGB', (kante, kante))
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail((kante, kante), Image.LANCZOS)
+        if img.mode not in ('RGB', 'RGBA'):
+            img = img.convert('RGBA' if 'A' in img.getbands() or 'transparency' in img.info else 'RGB')
+        ziel_ordner = os.path.dirname(ziel_pfad)
+        os.makedirs(ziel_ordner, exist_ok=True)
+        fd, tmp_pfad = tempfile.mkstemp(dir=ziel_ordner, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                img.save(f, 'WEBP', quality=_WEBP_QUALITAET, method=4)
+            os.replace(tmp_pfad, ziel_pfad)
+        except Exception:
+            try:
+                os.remove(tmp_pfad)
+            except OSError:
+                pass
+            raise
+
+
+def hole_derivat(original_pfad: str, groesse: str, cache_root: str | None = None) -> str | None:
+    """Pfad zum aktuellen Derivat (bei Bedarf erzeugt) oder None, wenn keins möglich ist
+    (unbekannte Größe, kein Bild, Original fehlt oder ist nicht lesbar)."""
+    kante = DERIVAT_GROESSEN.get(groesse or '')
+    if not kante or not ist_bild(original_pfad):
+        return None
+    try:
+        original_mtime = os.stat(original_pfad).st_mtime_ns
+    except OSError:
+        return None
+    ziel = derivat_pfad(original_pfad, groesse, cache_root)
+    try:
+        if abs(os.stat(ziel).st_mtime_ns - original_mtime) < MTIME_TOLERANZ_NS:
+            return ziel
+    except OSError:
+        pass
+    try:
+        _skalieren(original_pfad, kante, ziel)
+        os.utime(ziel, ns=(original_mtime, original_mtime))
+    except Exception as e:
+        log.warning('Bild-Derivat %s für %s nicht erzeugt: %s', groesse, original_pfad, e)
+        return None
+    return ziel
+
+
+def bild_derivat_antwort(original_pfad: str, groesse: str | None):
+    """Response mit dem Derivat für ``?groesse=…`` oder None (Aufrufer liefert dann das Original).
+
+    Nur nach erfolgter Berechtigungsprüfung aufrufen. Die Antwort ist privat cachebar;
+    ETag/Last-Modified folgen dem Original, da das Derivat dessen mtime übernimmt.
+    Trägt die URL eine Version (``v``, siehe :func:`neue_datei_version`), wird sie ein Jahr als
+    unveränderlich gecacht – ein ersetztes Original bekommt dann eine neue URL.
+    """
+    if not groesse:
+        return None
+    pfad = hole_derivat(original_pfad, groesse)
+    if pfad is None:
+        return None
+    versioniert = bool(request.args.get('v'))
+    max_age = 31536000 if versioniert else int(current_app.config.get('BILD_DERIVATE_MAX_AGE', 604800))
+    response = send_file(pfad, mimetype='image/webp', conditional=True, max_age=max_age)
+    response.cache_control.public = False
+    response.cache_control.private = True
+    if versioniert:
+        response.cache_control.immutable = True
+    return response
+
+
+def neue_datei_version() -> str:
+    """Kurzer Versionsschlüssel für ``?v=…``, beim Speichern einer Datei mit in der DB abgelegt.
+    Für Dateien, die unter gleichem Namen ersetzt werden (z. B. ``Ersatzteil.ArtikelfotoVersion``);
+    Listen brauchen so kein ``stat`` je Zeile auf der Freigabe."""
+    return format(time.time_ns() // 1_000_000, 'x')
+
+
+def derivate_im_hintergrund_erzeugen(original_pfad: str) -> None:
+    """Erzeugt alle Größen nach einem Upload in einem Daemon-Thread, damit der erste
+    Listenaufruf nicht auf das Skalieren warten muss. Fehler werden nur geloggt."""
+    if not ist_bild(original_pfad):
+        return
+    cache_root = current_app.config.get('BILD_DERIVATE_FOLDER')
+    if not cache_root:
+        return
+
+    def _lauf():
+        for groesse in DERIVAT_GROESSEN:
+            hole_derivat(original_pfad, groesse, cache_root)
+
+    threading.Thread(target=_lauf, name='bis-bild-derivate', daemon=True).start()
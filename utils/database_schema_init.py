@@ -179,9 +179,8 @@ def init_database_schema(db_path, verbose=False):
                 FOREIGN KEY (TaetigkeitID) REFERENCES Taetigkeit(ID)
             )
         ''', [
-            'CREATE INDEX idx_bemerkung_thema ON SchichtbuchBemerkungen(ThemaID)',
-            'CREATE INDEX idx_bemerkung_mitarbeiter ON SchichtbuchBemerkungen(MitarbeiterID)',
-            'CREATE INDEX idx_bemerkung_geloescht ON SchichtbuchBemerkungen(Gelöscht)'
+            'CREATE INDEX idx_bemerkung_thema_geloescht_datum ON SchichtbuchBemerkungen(ThemaID, Gelöscht, Datum)',
+            'CREATE INDEX idx_bemerkung_mitarbeiter ON SchichtbuchBemerkungen(MitarbeiterID)'
         ])
         
         # ========== 10. SchichtbuchThemaSichtbarkeit ==========
@@ -317,9 +316,8 @@ def init_database_schema(db_path, verbose=False):
                 FOREIGN KEY (AbteilungID) REFERENCES Abteilung(ID)
             )
         ''', [
-            'CREATE INDEX idx_benachrichtigung_mitarbeiter ON Benachrichtigung(MitarbeiterID)',
+            'CREATE INDEX idx_benachrichtigung_mitarbeiter_gelesen_erstellt ON Benachrichtigung(MitarbeiterID, Gelesen, ErstelltAm)',
             'CREATE INDEX idx_benachrichtigung_thema ON Benachrichtigung(ThemaID)',
-            'CREATE INDEX idx_benachrichtigung_gelesen ON Benachrichtigung(Gelesen)',
             'CREATE INDEX idx_benachrichtigung_erstellt ON Benachrichtigung(ErstelltAm)',
             'CREATE INDEX idx_benachrichtigung_modul ON Benachrichtigung(Modul)',
             'CREATE INDEX idx_benachrichtigung_aktion ON Benachrichtigung(Aktion)',
@@ -397,7 +395,7 @@ def init_database_schema(db_path, verbose=False):
         ''', [
             'CREATE INDEX idx_benachrichtigung_versand_benachrichtigung ON BenachrichtigungVersand(BenachrichtigungID)',
             'CREATE INDEX idx_benachrichtigung_versand_kanal ON BenachrichtigungVersand(KanalTyp)',
-            'CREATE INDEX idx_benachrichtigung_versand_status ON BenachrichtigungVersand(Status)',
+            "CREATE INDEX idx_benachrichtigung_versand_offen ON BenachrichtigungVersand(ID) WHERE Status = 'pending'",
             'CREATE INDEX idx_benachrichtigung_versand_versand_am ON BenachrichtigungVersand(VersandAm)'
         ])
         
@@ -585,6 +583,7 @@ def init_database_schema(db_path, verbose=False):
                 ArtikelnummerHersteller TEXT,
                 Link TEXT,
                 ArtikelfotoPfad TEXT,
+                ArtikelfotoVersion TEXT,
                 Aktiv INTEGER NOT NULL DEFAULT 1,
                 Gelöscht INTEGER NOT NULL DEFAULT 0,
                 ErstelltAm DATETIME DEFAULT CURRENT_TIMESTAMP,
@@ -620,6 +619,7 @@ def init_database_schema(db_path, verbose=False):
             create_column_if_not_exists(conn, 'Ersatzteil', 'Link', 'ALTER TABLE Ersatzteil ADD COLUMN Link TEXT NULL')
             create_column_if_not_exists(conn, 'Ersatzteil', 'Preisstand', 'ALTER TABLE Ersatzteil ADD COLUMN Preisstand DATETIME NULL')
             create_column_if_not_exists(conn, 'Ersatzteil', 'ArtikelfotoPfad', 'ALTER TABLE Ersatzteil ADD COLUMN ArtikelfotoPfad TEXT NULL')
+            create_column_if_not_exists(conn, 'Ersatzteil', 'ArtikelfotoVersion', 'ALTER TABLE Ersatzteil ADD COLUMN ArtikelfotoVersion TEXT NULL')
             # Prüfe auf fehlende Indexes
             create_index_if_not_exists(conn, 'idx_ersatzteil_lagerort', 'CREATE INDEX idx_ersatzteil_lagerort ON Ersatzteil(LagerortID)')
             create_index_if_not_exists(conn, 'idx_ersatzteil_lagerplatz', 'CREATE INDEX idx_ersatzteil_lagerplatz ON Ersatzteil(LagerplatzID)')
@@ -680,7 +680,7 @@ def init_database_schema(db_path, verbose=False):
                 FOREIGN KEY (VerwendetVonID) REFERENCES Mitarbeiter(ID)
             )
         ''', [
-            'CREATE INDEX idx_lagerbuchung_ersatzteil ON Lagerbuchung(ErsatzteilID)',
+            'CREATE INDEX idx_lagerbuchung_ersatzteil_datum ON Lagerbuchung(ErsatzteilID, Buchungsdatum)',
             'CREATE INDEX idx_lagerbuchung_thema ON Lagerbuchung(ThemaID)',
             'CREATE INDEX idx_lagerbuchung_kostenstelle ON Lagerbuchung(KostenstelleID)',
             'CREATE INDEX idx_lagerbuchung_verwendet_von ON Lagerbuchung(VerwendetVonID)',
@@ -753,8 +753,15 @@ def init_database_schema(db_path, verbose=False):
             )
         ''', [
             'CREATE INDEX idx_wartung_abteilung_wartung ON WartungAbteilungZugriff(WartungID)',
-            'CREATE INDEX idx_wartung_abteilung_abteilung ON WartungAbteilungZugriff(AbteilungID)'
+            'CREATE INDEX idx_wartung_abteilung_abteilung_wartung ON WartungAbteilungZugriff(AbteilungID, WartungID)'
         ])
+        if table_exists(conn, 'WartungAbteilungZugriff'):
+            # Einspaltiger Index durch zusammengesetzten (abdeckenden) Index ersetzt
+            conn.execute('DROP INDEX IF EXISTS idx_wartung_abteilung_abteilung')
+            create_index_if_not_exists(
+                conn, 'idx_wartung_abteilung_abteilung_wartung',
+                'CREATE INDEX idx_wartung_abteilung_abteilung_wartung ON WartungAbteilungZugriff(AbteilungID, WartungID)',
+            )
         
         created_fremdfirma = create_table_if_not_exists(conn, 'Fremdfirma', '''
             CREATE TABLE Fremdfirma (
@@ -846,6 +853,27 @@ def init_database_schema(db_path, verbose=False):
                 conn, 'Wartungsplan', 'TerminVereinbartDatum',
                 'ALTER TABLE Wartungsplan ADD COLUMN TerminVereinbartDatum DATE',
             )
+        if table_exists(conn, 'Wartungsplan'):
+            create_column_if_not_exists(
+                conn, 'Wartungsplan', 'FaelligkeitStufe',
+                'ALTER TABLE Wartungsplan ADD COLUMN FaelligkeitStufe INTEGER NOT NULL DEFAULT 0',
+            )
+            create_column_if_not_exists(
+                conn, 'Wartungsplan', 'ErinnerungFaellig',
+                'ALTER TABLE Wartungsplan ADD COLUMN ErinnerungFaellig INTEGER NOT NULL DEFAULT 0',
+            )
+            create_column_if_not_exists(
+                conn, 'Wartungsplan', 'FaelligkeitBerechnetAm',
+                'ALTER TABLE Wartungsplan ADD COLUMN FaelligkeitBerechnetAm DATE',
+            )
+            create_column_if_not_exists(
+                conn, 'Wartungsplan', 'ErinnerungGesendetFuer',
+                'ALTER TABLE Wartungsplan ADD COLUMN ErinnerungGesendetFuer DATE',
+            )
+            create_index_if_not_exists(
+                conn, 'idx_wartungsplan_aktiv_stufe',
+                'CREATE INDEX idx_wartungsplan_aktiv_stufe ON Wartungsplan(Aktiv, FaelligkeitStufe)',
+            )
         
         create_table_if_not_exists(conn, 'Wartungsdurchfuehrung', '''
             CREATE TABLE Wartungsdurchfuehrung (
@@ -859,10 +887,16 @@ def init_database_schema(db_path, verbose=False):
                 FOREIGN KEY (ProtokolliertVonID) REFERENCES Mitarbeiter(ID)
             )
         ''', [
-            'CREATE INDEX idx_wartungsdurchfuehrung_plan ON Wartungsdurchfuehrung(WartungsplanID)',
+            'CREATE INDEX idx_wartungsdurchfuehrung_plan_datum ON Wartungsdurchfuehrung(WartungsplanID, DurchgefuehrtAm)',
             'CREATE INDEX idx_wartungsdurchfuehrung_datum ON Wartungsdurchfuehrung(DurchgefuehrtAm)'
         ])
         if table_exists(conn, 'Wartungsdurchfuehrung'):
+            # Einspaltiger Index durch zusammengesetzten (abdeckenden) Index ersetzt
+            conn.execute('DROP INDEX IF EXISTS idx_wartungsdurchfuehrung_plan')
+            create_index_if_not_exists(
+                conn, 'idx_wartungsdurchfuehrung_plan_datum',
+                'CREATE INDEX idx_wartungsdurchfuehrung_plan_datum ON Wartungsdurchfuehrung(WartungsplanID, DurchgefuehrtAm)',
+            )
             if create_column_if_not_exists(
                 conn, 'Wartungsdurchfuehrung', 'AngebotsanfrageID',
                 'ALTER TABLE Wartungsdurchfuehrung ADD COLUMN AngebotsanfrageID INTEGER NULL',
@@ -932,6 +966,11 @@ def init_database_schema(db_path, verbose=False):
             'CREATE INDEX idx_datei_typ ON Datei(Typ)',
             'CREATE INDEX idx_datei_erstellt_von ON Datei(ErstelltVonID)'
         ])
+        # Migration: Inhaltshash (ETag für Downloads) + Lookup per Dateipfad
+        create_column_if_not_exists(conn, 'Datei', 'Inhaltshash', 'ALTER TABLE Datei ADD COLUMN Inhaltshash TEXT')
+        create_index_if_not_exists(
+            conn, 'idx_datei_dateipfad', 'CREATE INDEX idx_datei_dateipfad ON Datei(Dateipfad)',
+        )
         
         # Migration: Beschreibung zu ErsatzteilBild hinzufügen
         create_column_if_not_exists(conn, 'ErsatzteilBild', 'Beschreibung', 'ALTER TABLE ErsatzteilBild ADD COLUMN Beschreibung TEXT')
@@ -1437,7 +1476,8 @@ def init_database_schema(db_path, verbose=False):
                 FOREIGN KEY (drucker_id) REFERENCES zebra_printers(id)
             )
         ''', [
-            'CREATE INDEX idx_print_jobs_agent_status ON print_jobs(agent_id, status)',
+            'CREATE INDEX idx_print_jobs_agent_status_id ON print_jobs(agent_id, status, id)',
+            "CREATE INDEX idx_print_jobs_leased ON print_jobs(lease_until) WHERE status = 'leased'",
             'CREATE INDEX idx_print_jobs_created ON print_jobs(created_at)'
         ])
 
@@ -1726,6 +1766,57 @@ def init_database_schema(db_path, verbose=False):
                 "VALUES (0, 1883, 'IPS/BM/Beleuchtung')"
             )
 
+        # ========== 37. BerichtJob (asynchrone PDF-/ZIP-Erzeugung) ==========
+        create_table_if_not_exists(conn, 'BerichtJob', '''
+            CREATE TABLE BerichtJob (
+                ID INTEGER PRIMARY KEY AUTOINCREMENT,
+                MitarbeiterID INTEGER NOT NULL,
+                Typ TEXT NOT NULL,
+                Parameter TEXT,
+                Status TEXT NOT NULL DEFAULT 'wartend',
+                Fortschritt INTEGER NOT NULL DEFAULT 0,
+                Gesamt INTEGER NOT NULL DEFAULT 1,
+                Dateiname TEXT,
+                Mimetype TEXT,
+                Fehlermeldung TEXT,
+                ErstelltAm TEXT,
+                GestartetAm TEXT,
+                FertigAm TEXT,
+                LetzteAbfrageAm TEXT,
+                FOREIGN KEY (MitarbeiterID) REFERENCES Mitarbeiter(ID) ON DELETE CASCADE
+            )
+        ''', [
+            'CREATE INDEX idx_bericht_job_status ON BerichtJob(Status, ID)',
+            'CREATE INDEX idx_bericht_job_mitarbeiter ON BerichtJob(MitarbeiterID)'
+        ])
+
+        # ========== 38. Workload-Indizes (zusammengesetzt/partiell, ersetzen Einzelindizes) ==========
+        workload_indizes = [
+            ('Benachrichtigung', 'idx_benachrichtigung_mitarbeiter_gelesen_erstellt',
+             'CREATE INDEX idx_benachrichtigung_mitarbeiter_gelesen_erstellt ON Benachrichtigung(MitarbeiterID, Gelesen, ErstelltAm)',
+             ['idx_benachrichtigung_mitarbeiter', 'idx_benachrichtigung_gelesen']),
+            ('SchichtbuchBemerkungen', 'idx_bemerkung_thema_geloescht_datum',
+             'CREATE INDEX idx_bemerkung_thema_geloescht_datum ON SchichtbuchBemerkungen(ThemaID, Gelöscht, Datum)',
+             ['idx_bemerkung_thema', 'idx_bemerkung_geloescht']),
+            ('BenachrichtigungVersand', 'idx_benachrichtigung_versand_offen',
+             "CREATE INDEX idx_benachrichtigung_versand_offen ON BenachrichtigungVersand(ID) WHERE Status = 'pending'",
+             ['idx_benachrichtigung_versand_status']),
+            ('print_jobs', 'idx_print_jobs_agent_status_id',
+             'CREATE INDEX idx_print_jobs_agent_status_id ON print_jobs(agent_id, status, id)',
+             ['idx_print_jobs_agent_status']),
+            ('print_jobs', 'idx_print_jobs_leased',
+             "CREATE INDEX idx_print_jobs_leased ON print_jobs(lease_until) WHERE status = 'leased'",
+             []),
+            ('Lagerbuchung', 'idx_lagerbuchung_ersatzteil_datum',
+             'CREATE INDEX idx_lagerbuchung_ersatzteil_datum ON Lagerbuchung(ErsatzteilID, Buchungsdatum)',
+             ['idx_lagerbuchung_ersatzteil']),
+        ]
+        for tabelle, index_name, index_sql, ersetzt in workload_indizes:
+            if table_exists(conn, tabelle):
+                create_index_if_not_exists(conn, index_name, index_sql)
+                for alt in ersetzt:
+                    conn.execute(f'DROP INDEX IF EXISTS {alt}')
+
         conn.commit()
 
     except Exception as e:
@@ -0,0 +1,124 @@
+"""
+Auslieferung hochgeladener Anhänge mit Conditional GET.
+
+ETag ist der beim Upload gespeicherte SHA-256 des Inhalts (``Datei.Inhaltshash``; ältere
+Einträge werden beim ersten Download nachgetragen), ergänzt um Größe und mtime der Datei:
+Wird die Datei auf der Freigabe ersetzt, ohne dass der Hash in der DB mitkommt, ändert sich
+das ETag trotzdem. Werkzeug beantwortet damit If-None-Match/If-Modified-Since mit 304 und
+``Range``-Anfragen mit 206.
+
+Kennt der Client das aktuelle ETag bereits (If-None-Match), antwortet
+:func:`nicht_geaendert_antwort` schon vor der Berechtigungsprüfung mit 304: Der Client
+besitzt den Inhalt bereits, die Antwort enthält keine Daten. Login- und Menü-Prüfung der
+Route greifen trotzdem, da sie als Decorator vorher laufen.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+
+from flask import current_app, request, send_file
+
+from utils.database import get_db_connection
+
+_BLOCKGROESSE = 1024 * 1024
+
+
+def berechne_inhaltshash(pfad: str) -> str:
+    """SHA-256 (hex) des Dateiinhalts, blockweise gelesen."""
+    h = hashlib.sha256()
+    with open(pfad, 'rb') as f:
+        for block in iter(lambda: f.read(_BLOCKGROESSE), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def inhaltshash_fuer_upload(relativer_pfad: str) -> str | None:
+    """Hash einer gerade gespeicherten Datei unter UPLOAD_BASE_FOLDER (None bei Fehler)."""
+    try:
+        pfad = os.path.join(current_app.config['UPLOAD_BASE_FOLDER'], relativer_pfad.replace('/', os.sep))
+        return berechne_inhaltshash(pfad)
+    except (OSError, RuntimeError, KeyError):
+        return None
+
+
+def _cache_header(response, max_age=None):
+    if max_age is None:
+        max_age = int(current_app.config.get('ANHANG_CACHE_MAX_AGE', 86400))
+    response.cache_control.no_cache = None
+    response.cache_control.public = False
+    response.cache_control.private = True
+    response.cache_control.max_age = max_age
+    return response
+
+
+def _anhang_etag(inhaltshash: str, full_path: str) -> str | None:
+    """Inhaltshash plus Größe und mtime der Datei (None, wenn sie fehlt)."""
+    try:
+        st = os.stat(full_path)
+    except OSError:
+        return None
+    return f'{inhaltshash}-{st.st_size:x}-{st.st_mtime_ns:x}'
+
+
+def nicht_geaendert_antwort(dateipfad: str):
+    """Frühes 304 vor Berechtigungs-/DB-Prüfungen der Route, sonst None.
+
+    Nur ein indizierter Lookup per Dateipfad und ein ``stat``; ohne If-None-Match gar keine
+    DB-Abfrage. Für Derivat-Anfragen (``?groesse=``) nicht zuständig – die haben eigene ETags.
+    """
+    if not request.if_none_match or request.args.get('groesse'):
+        return None
+    with get_db_connection() as conn:
+        row = conn.execute(
+            'SELECT Inhaltshash FROM Datei WHERE Dateipfad = ? AND Inhaltshash IS NOT NULL',
+            (dateipfad,),
+        ).fetchone()
+    if not row:
+        return None
+    full_path = os.path.join(current_app.config['UPLOAD_BASE_FOLDER'], dateipfad.replace('/', os.sep))
+    etag = _anhang_etag(row['Inhaltshash'], full_path)
+    if etag is None or not request.if_none_match.contains(etag):
+        return None
+    response = current_app.response_class(status=304)
+    response.set_etag(etag)
+    return _cache_header(response)
+
+
+def _etag_fuer_anhang(dateipfad: str | None, full_path: str) -> str | None:
+    """ETag aus gespeichertem Inhaltshash (fehlt er bei einem Datei-Eintrag, wird er nachgetragen)."""
+    if not dateipfad:
+        return None
+    with get_db_connection() as conn:
+        row = conn.execute(
+            'SELECT ID, Inhaltshash FROM Datei WHERE Dateipfad = ?', (dateipfad,)
+        ).fetchone()
+        if not row:
+            return None
+        inhaltshash = row['Inhaltshash']
+        if not inhaltshash:
+            inhaltshash = berechne_inhaltshash(full_path)
+            conn.execute('UPDATE Datei SET Inhaltshash = ? WHERE ID = ?', (inhaltshash, row['ID']))
+    return _anhang_etag(inhaltshash, full_path)
+
+
+def sende_anhang(full_path: str, dateipfad: str | None = None, mimetype: str | None = None,
+                 as_attachment: bool = False, max_age: int | None = None):
+    """Anhang (bereits berechtigt und per ``resolve_under_base`` aufgelöst) ausliefern.
+
+    ``dateipfad`` ist der relative Pfad wie in ``Datei.Dateipfad``. Ohne Datei-Eintrag
+    (z. B. Artikelfoto, das unter gleichem Namen ersetzt wird) wird das ETag aus mtime/Größe
+    gebildet und bei jedem Aufruf revalidiert. ``max_age`` überschreibt ANHANG_CACHE_MAX_AGE.
+    """
+    etag = _etag_fuer_anhang(dateipfad, full_path)
+    if etag is None and max_age is None:
+        max_age = 0
+    response = send_file(
+        full_path,
+        mimetype=mimetype,
+        as_attachment=as_attachment,
+        conditional=True,
+        etag=etag or True,
+    )
+    return _cache_header(response, max_age)
@@ -181,9 +181,8 @@ SchichtbuchBemerkungen = Table(
     Column('TaetigkeitID', Integer, ForeignKey('Taetigkeit.ID')),
     Column('Bemerkung', Text),
     Column('Gel\u00f6scht', Integer, nullable=False, server_default=text('0')),
-    Index('idx_bemerkung_thema', 'ThemaID'),
+    Index('idx_bemerkung_thema_geloescht_datum', 'ThemaID', 'Gel\u00f6scht', 'Datum'),
     Index('idx_bemerkung_mitarbeiter', 'MitarbeiterID'),
-    Index('idx_bemerkung_geloescht', 'Gel\u00f6scht'),
 )
 
 SchichtbuchThemaSichtbarkeit = Table(
@@ -273,9 +272,8 @@ Benachrichtigung = Table(
     Column('Aktion', Text),
     Column('AbteilungID', Integer, ForeignKey('Abteilung.ID')),
     Column('Zusatzdaten', Text),
-    Index('idx_benachrichtigung_mitarbeiter', 'MitarbeiterID'),
+    Index('idx_benachrichtigung_mitarbeiter_gelesen_erstellt', 'MitarbeiterID', 'Gelesen', 'ErstelltAm'),
     Index('idx_benachrichtigung_thema', 'ThemaID'),
-    Index('idx_benachrichtigung_gelesen', 'Gelesen'),
     Index('idx_benachrichtigung_erstellt', 'ErstelltAm'),
     Index('idx_benachrichtigung_modul', 'Modul'),
     Index('idx_benachrichtigung_aktion', 'Aktion'),
@@ -320,7 +318,11 @@ BenachrichtigungVersand = Table(
     Column('Fehlermeldung', Text),
     Index('idx_benachrichtigung_versand_benachrichtigung', 'BenachrichtigungID'),
     Index('idx_benachrichtigung_versand_kanal', 'KanalTyp'),
-    Index('idx_benachrichtigung_versand_status', 'Status'),
+    # Partiell: nur offene Eintraege (Versand-Warteschlange), erledigte wachsen nicht mit
+    Index(
+        'idx_benachrichtigung_versand_offen', 'ID',
+        sqlite_where=text("Status = 'pending'"), postgresql_where=text("\"Status\" = 'pending'"),
+    ),
     Index('idx_benachrichtigung_versand_versand_am', 'VersandAm'),
 )
 
@@ -415,6 +417,7 @@ Ersatzteil = Table(
     Column('Link', Text),
     Column('Preisstand', DateTime),
     Column('ArtikelfotoPfad', Text),
+    Column('ArtikelfotoVersion', Text),
     Column('Aktiv', Integer, nullable=False, server_default=text('1')),
     Column('Gel\u00f6scht', Integer, nullable=False, server_default=text('0')),
     _ts_now('ErstelltAm'),
@@ -472,7 +475,7 @@ Lagerbuchung = Table(
     Column('Preis', Float),
     Column('Waehrung', Text),
     _ts_now('ErstelltAm'),
-    Index('idx_lagerbuchung_ersatzteil', 'ErsatzteilID'),
+    Index('idx_lagerbuchung_ersatzteil_datum', 'ErsatzteilID', 'Buchungsdatum'),
     Index('idx_lagerbuchung_thema', 'ThemaID'),
     Index('idx_lagerbuchung_kostenstelle', 'KostenstelleID'),
     Index('idx_lagerbuchung_verwendet_von', 'VerwendetVonID'),
@@ -519,7 +522,8 @@ WartungAbteilungZugriff = Table(
     Column('AbteilungID', Integer, ForeignKey('Abteilung.ID', ondelete='CASCADE'), nullable=False),
     UniqueConstraint('WartungID', 'AbteilungID'),
     Index('idx_wartung_abteilung_wartung', 'WartungID'),
-    Index('idx_wartung_abteilung_abteilung', 'AbteilungID'),
+    # (AbteilungID, WartungID) deckt den Sichtbarkeitsfilter AbteilungID IN (...) ohne Tabellenzugriff ab.
+    Index('idx_wartung_abteilung_abteilung_wartung', 'AbteilungID', 'WartungID'),
 )
 
 Fremdfirma = Table(
@@ -545,8 +549,14 @@ Wartungsplan = Table(
     Column('TerminVereinbartDatum', Date),
     Column('Aktiv', Integer, nullable=False, server_default=text('1')),
     _ts_now('ErstelltAm'),
+    # Vom Faelligkeits-Job vorberechnet (siehe modules.wartungen.faelligkeit_job).
+    Column('FaelligkeitStufe', Integer, nullable=False, server_default=text('0')),
+    Column('ErinnerungFaellig', Integer, nullable=False, server_default=text('0')),
+    Column('FaelligkeitBerechnetAm', Date),
+    Column('ErinnerungGesendetFuer', Date),
     Index('idx_wartungsplan_wartung', 'WartungID'),
     Index('idx_wartungsplan_aktiv', 'Aktiv'),
+    Index('idx_wartungsplan_aktiv_stufe', 'Aktiv', 'FaelligkeitStufe'),
 )
 
 Wartungsdurchfuehrung = Table(
@@ -560,7 +570,8 @@ Wartungsdurchfuehrung = Table(
     Column('AngebotsKostenBetrag', Float),
     Column('AngebotsKostenWaehrung', Text),
     _ts_now('ErstelltAm'),
-    Index('idx_wartungsdurchfuehrung_plan', 'WartungsplanID'),
+    # Deckt MAX(DurchgefuehrtAm) pro Plan und die Sortierung der Plan-Historie ab.
+    Index('idx_wartungsdurchfuehrung_plan_datum', 'WartungsplanID', 'DurchgefuehrtAm'),
     Index('idx_wartungsdurchfuehrung_datum', 'DurchgefuehrtAm'),
     Index('idx_wartungsdurchfuehrung_angebot', 'AngebotsanfrageID'),
 )
@@ -602,9 +613,12 @@ Datei = Table(
     Column('Typ', Text),
     _ts_now('ErstelltAm'),
     Column('ErstelltVonID', Integer, ForeignKey('Mitarbeiter.ID')),
+    # SHA-256 des Inhalts (beim Upload gesetzt), dient als ETag beim Download
+    Column('Inhaltshash', Text),
     Index('idx_datei_bereich', 'BereichTyp', 'BereichID'),
     Index('idx_datei_typ', 'Typ'),
     Index('idx_datei_erstellt_von', 'ErstelltVonID'),
+    Index('idx_datei_dateipfad', 'Dateipfad'),
 )
 
 LoginLog = Table(
@@ -821,7 +835,12 @@ print_jobs = Table(
     Column('created_by_mitarbeiter_id', Integer),
     Column('created_at', Text, server_default=text("(datetime('now'))")),
     Column('completed_at', Text),
-    Index('idx_print_jobs_agent_status', 'agent_id', 'status'),
+    Index('idx_print_jobs_agent_status_id', 'agent_id', 'status', 'id'),
+    # Partiell: Lease-Recovery bei jedem Agent-Poll liest nur vergebene Auftraege
+    Index(
+        'idx_print_jobs_leased', 'lease_until',
+        sqlite_where=text("status = 'leased'"), postgresql_where=text("status = 'leased'"),
+    ),
     Index('idx_print_jobs_created', 'created_at'),
 )
 
@@ -920,6 +939,17 @@ WebAuthnState = Table(
 )
 
 
+# Serverseitige Session-Daten (utils/server_session.py, SESSION_BACKEND=db).
+# session_id ist der SHA-256 der Cookie-ID; payload ist Flasks Tagged-JSON.
+ServerSession = Table(
+    'ServerSession', metadata,
+    Column('session_id', Text, primary_key=True),
+    Column('payload', Text, nullable=False),
+    Column('updated_at', Integer, nullable=False),
+    Column('expires_at', Integer, nullable=False),
+    Index('IX_ServerSession_expires', 'expires_at'),
+)
+
 # ---------------------------------------------------------------------------
 # MQTT / Echtzeit Technik
 # ---------------------------------------------------------------------------
@@ -943,5 +973,30 @@ MqttKonfiguration = Table(
 )
 
 
+# ---------------------------------------------------------------------------
+# Berichte (asynchrone PDF-/ZIP-Erzeugung, utils/reports/bericht_jobs.py)
+# ---------------------------------------------------------------------------
+
+BerichtJob = Table(
+    'BerichtJob', metadata,
+    _pk(),
+    Column('MitarbeiterID', Integer, ForeignKey('Mitarbeiter.ID', ondelete='CASCADE'), nullable=False),
+    Column('Typ', Text, nullable=False),
+    Column('Parameter', Text),
+    Column('Status', Text, nullable=False, server_default=text("'wartend'")),
+    Column('Fortschritt', Integer, nullable=False, server_default=text('0')),
+    Column('Gesamt', Integer, nullable=False, server_default=text('1')),
+    Column('Dateiname', Text),
+    Column('Mimetype', Text),
+    Column('Fehlermeldung', Text),
+    Column('ErstelltAm', Text),
+    Column('GestartetAm', Text),
+    Column('FertigAm', Text),
+    Column('LetzteAbfrageAm', Text),
+    Index('idx_bericht_job_status', 'Status', 'ID'),
+    Index('idx_bericht_job_mitarbeiter', 'MitarbeiterID'),
+)
+
+
 # Liste aller Kern-Tabellennamen, die vom App-Start-Healthcheck erwartet werden.
 CORE_TABLE_NAMES = tuple(t.name for t in metadata.sorted_tables)
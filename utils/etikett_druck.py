@@ -1,10 +1,27 @@
 # -*- coding: utf-8 -*-
 """
 Zentrale Aufloesung von Etiketten-Druckkonfiguration (Abteilung, Prioritaet, optionaler Drucker).
+
+Konfigurationen, Etiketten und Drucker kommen aus dem Stammdaten-Cache (utils/stammdaten_cache.py;
+die Admin-Routen ``zebra_*_save`` invalidieren per ``@stammdaten_aendern``). Darauf aufbauend
+werden je Prozess zwischengespeichert: die zerlegten ZPL-Vorlagen, die Abteilungen je Mitarbeiter
+und die gewaehlte Konfiguration je (Funktion, Abteilungsmenge). Serien-Drucke kosten so je
+Etikett keine Datenbankabfrage.
 """
 from __future__ import annotations
 
 import re
+import string
+import threading
+import time
+from functools import lru_cache
+
+from utils.stammdaten_cache import (
+    STAMMDATEN_CACHE_SEKUNDEN,
+    abgeleiteten_cache_registrieren,
+    get_stammdaten,
+    stammdaten_version,
+)
 
 FUNKTION_ERSATZTEIL_ETIKETT = 'ersatzteil_etikett'
 FUNKTION_LAGERBEHAELTER_ETIKETT = 'lagerbehaelter_etikett'
@@ -28,6 +45,103 @@ def etikett_format_substitution(zpl_header_db):
     return {'etikettenformat': h}
 
 
+_PQ_BEFEHL = re.compile(r'\^PQ(\d+)')
+# Tabellen, von denen die zwischengespeicherten Aufloesungen abhaengen
+_KONFIG_TABELLEN = ('etikett_druck_konfig', 'etikett_druck_konfig_abteilung', 'Etikett')
+_MITARBEITER_TABELLEN = ('MitarbeiterAbteilung',)
+
+_cache_lock = threading.Lock()
+# mitarbeiter_id -> (Version, Zeitpunkt, (abteilung_ids, primaer_id))
+_abteilungen_cache: dict = {}
+# (funktion_code, abteilung_ids, primaer_id) -> (Version, Zeitpunkt, Konfig-Dict | None)
+_konfig_cache: dict = {}
+abgeleiteten_cache_registrieren(_abteilungen_cache)
+abgeleiteten_cache_registrieren(_konfig_cache)
+
+
+class _Kopien:
+    """Stelle der Kopienzahl hinter ``^PQ`` in einer ZplVorlage (mit dem Wert aus dem Template)."""
+
+    __slots__ = ('original',)
+
+    def __init__(self, original):
+        self.original = original
+
+
+class ZplVorlage:
+    """
+    Einmal zerlegtes ``druckbefehle``-Template (str.format-Syntax).
+
+    ``{etikettenformat}`` wird beim Zerlegen eingesetzt, ``^PQn`` wird zur Kopienzahl-Stelle.
+    ``render`` setzt danach je Etikett nur noch die Werte ein. Instanzen sind unveraenderlich
+    und werden ueber ``zpl_vorlage`` prozessweit wiederverwendet.
+    """
+
+    def __init__(self, druckbefehle, zpl_header=None):
+        self._formatter = string.Formatter()
+        fest = etikett_format_substitution(zpl_header)
+        teile = []
+        literal = []
+        for text, feld, spec, conversion in self._formatter.parse(druckbefehle or ''):
+            literal.append(text)
+            if feld is None:
+                continue
+            if feld in fest and not spec and not conversion:
+                literal.append(fest[feld])
+                continue
+            teile.extend(self._literal_teile(''.join(literal)))
+            literal = []
+            teile.append((feld, conversion, spec or ''))
+        teile.extend(self._literal_teile(''.join(literal)))
+        self._teile = teile
+        self._fest = fest
+
+    @staticmethod
+    def _literal_teile(text):
+        teile = []
+        pos = 0
+        for m in _PQ_BEFEHL.finditer(text):
+            teile.append(text[pos:m.start()] + '^PQ')
+            teile.append(_Kopien(m.group(1)))
+            pos = m.end()
+        teile.append(text[pos:])
+        return [t for t in teile if t != '']
+
+    def render(self, werte, anzahl_kopien=None):
+        """ZPL mit ``werte``; ``anzahl_kopien`` ersetzt die Zahl hinter ``^PQ`` (None = wie im Template)."""
+        f = self._formatter
+        werte = {**self._fest, **werte}
+        teile = []
+        for teil in self._teile:
+            if isinstance(teil, _Kopien):
+                teile.append(teil.original if anzahl_kopien is None else str(anzahl_kopien))
+            elif isinstance(teil, str):
+                teile.append(teil)
+            else:
+                feld, conversion, spec = teil
+                wert, _ = f.get_field(feld, (), werte)
+                wert = f.convert_field(wert, conversion)
+                if '{' in spec:
+                    spec = f.vformat(spec, (), werte)
+                teile.append(f.format_field(wert, spec))
+        return ''.join(teile)
+
+
+@lru_cache(maxsize=128)
+def _vorlage_kompilieren(druckbefehle, zpl_header):
+    return ZplVorlage(druckbefehle, zpl_header)
+
+
+def zpl_vorlage(etikett_row):
+    """
+    Zerlegte Vorlage einer Etikett-Zeile (``druckbefehle``, ``zpl_header``) aus dem Prozess-Cache.
+
+    Schluessel ist der Inhalt beider Spalten: ein im Admin geaendertes Etikett oder Format
+    ergibt nach der Stammdaten-Invalidierung automatisch eine neue Vorlage.
+    """
+    return _vorlage_kompilieren(etikett_row['druckbefehle'] or '', etikett_row['zpl_header'])
+
+
 def zpl_produktion_etikett(
     etikett_row,
     produkt,
@@ -36,24 +150,27 @@ def zpl_produktion_etikett(
     anzahl_kopien,
     artikelnummer='',
     zu_verwenden_am_text='',
+    vorlage=None,
 ):
     """
     ZPL aus Etikett-Zeile; ``druckbefehle`` nutzt str.format mit:
     ``produktion_artikelnummer``, ``produktion_produkt``, ``produktion_datum``,
     ``produktion_zu_verwenden_am``, ``produktion_stueck``, ``etikettenformat``.
-    Anzahl gedruckter Etiketten wie bei Ersatzteil über ``^PQ`` (Regex-Ersetzung).
+    Anzahl gedruckter Etiketten wie bei Ersatzteil über ``^PQ``.
+    ``vorlage``: bereits zerlegte ZplVorlage, sonst aus dem Cache (``zpl_vorlage``).
     """
-    zpl_template = etikett_row['druckbefehle']
-    zpl = zpl_template.format(
-        produktion_artikelnummer=artikelnummer,
-        produktion_produkt=produkt,
-        produktion_datum=datum_text,
-        produktion_zu_verwenden_am=zu_verwenden_am_text,
-        produktion_stueck=stueck_text,
-        **etikett_format_substitution(etikett_row['zpl_header']),
+    if vorlage is None:
+        vorlage = zpl_vorlage(etikett_row)
+    return vorlage.render(
+        {
+            'produktion_artikelnummer': artikelnummer,
+            'produktion_produkt': produkt,
+            'produktion_datum': datum_text,
+            'produktion_zu_verwenden_am': zu_verwenden_am_text,
+            'produktion_stueck': stueck_text,
+        },
+        anzahl_kopien,
     )
-    zpl = re.sub(r'\^PQ(\d+)', f'^PQ{anzahl_kopien}', zpl)
-    return zpl
 
 
 def get_mitarbeiter_abteilung_ids(conn, mitarbeiter_id):
@@ -88,30 +205,52 @@ def get_abteilung_ids_for_konfig(conn, konfig_id):
     return {int(r['abteilung_id']) for r in rows}
 
 
-def resolve_konfig_row(conn, funktion_code, mitarbeiter_id):
-    """
-    Waehlt eine aktive Zeile aus etikett_druck_konfig.
-    Abteilungszeilen: nur wenn Schnitt mit Mitarbeiter-Abteilungen.
-    Keine Abteilungszeilen: Fallback fuer alle Abteilungen.
-    Bei mehreren Treffern: hoehere prioritaet, dann Treffer mit Primaerabteilung.
-    """
-    configs = conn.execute(
-        '''
-        SELECT k.id, k.etikett_id, k.drucker_id, k.prioritaet
-        FROM etikett_druck_konfig k
-        WHERE k.funktion_code = ? AND k.aktiv = 1
-        ''',
-        (funktion_code,),
-    ).fetchall()
-    if not configs:
-        return None
+def _cache_max_alter():
+    from flask import current_app, has_app_context
+    if has_app_context():
+        return current_app.config.get('STAMMDATEN_CACHE_SEKUNDEN', STAMMDATEN_CACHE_SEKUNDEN)
+    return STAMMDATEN_CACHE_SEKUNDEN
+
+
+def _aus_cache(cache, schluessel, version):
+    with _cache_lock:
+        eintrag = cache.get(schluessel)
+    if eintrag and eintrag[0] == version and time.monotonic() - eintrag[1] < _cache_max_alter():
+        return True, eintrag[2]
+    return False, None
+
+
+def _in_cache(cache, schluessel, version, wert):
+    with _cache_lock:
+        # Nur speichern, wenn waehrend des Ladens niemand invalidiert hat
+        if version == _cache_version(cache):
+            cache[schluessel] = (version, time.monotonic(), wert)
+
+
+def _cache_version(cache):
+    tabellen = _MITARBEITER_TABELLEN if cache is _abteilungen_cache else _KONFIG_TABELLEN
+    return stammdaten_version(*tabellen)
+
+
+def mitarbeiter_abteilung_ids(conn, mitarbeiter_id):
+    """``get_mitarbeiter_abteilung_ids`` mit Prozess-Cache (invalidiert ueber ``MitarbeiterAbteilung``)."""
+    if not mitarbeiter_id:
+        return set(), None
+    version = _cache_version(_abteilungen_cache)
+    gefunden, wert = _aus_cache(_abteilungen_cache, mitarbeiter_id, version)
+    if not gefunden:
+        ids, primary = get_mitarbeiter_abteilung_ids(conn, mitarbeiter_id)
+        wert = (frozenset(ids), primary)
+        _in_cache(_abteilungen_cache, mitarbeiter_id, version, wert)
+    return set(wert[0]), wert[1]
+
 
-    user_depts, primary = get_mitarbeiter_abteilung_ids(conn, mitarbeiter_id)
+def _konfig_waehlen(configs, user_depts, primary):
     specific_candidates = []
     fallback_candidates = []
 
     for c in configs:
-        dept_ids = get_abteilung_ids_for_konfig(conn, c['id'])
+        dept_ids = set(c['abteilung_ids'])
         if dept_ids:
             inter = user_depts & dept_ids
             if not inter:
@@ -130,16 +269,39 @@ def resolve_konfig_row(conn, funktion_code, mitarbeiter_id):
     return None
 
 
+def resolve_konfig_row(conn, funktion_code, mitarbeiter_id):
+    """
+    Waehlt eine aktive Zeile aus etikett_druck_konfig.
+    Abteilungszeilen: nur wenn Schnitt mit Mitarbeiter-Abteilungen.
+    Keine Abteilungszeilen: Fallback fuer alle Abteilungen.
+    Bei mehreren Treffern: hoehere prioritaet, dann Treffer mit Primaerabteilung.
+
+    Ergebnis je (Funktion, Abteilungsmenge, Primaerabteilung) zwischengespeichert; Dict mit
+    ``id``, ``etikett_id``, ``drucker_id``, ``prioritaet`` oder None.
+    """
+    user_depts, primary = mitarbeiter_abteilung_ids(conn, mitarbeiter_id)
+    schluessel = (funktion_code, frozenset(user_depts), primary)
+    version = _cache_version(_konfig_cache)
+    gefunden, konfig = _aus_cache(_konfig_cache, schluessel, version)
+    if gefunden:
+        return konfig
+
+    configs = [
+        k for k in get_stammdaten('etikett_druck_konfigen', conn)
+        if k['funktion_code'] == funktion_code and k['aktiv']
+    ]
+    konfig = _konfig_waehlen(configs, user_depts, primary)
+    _in_cache(_konfig_cache, schluessel, version, konfig)
+    return konfig
+
+
 def load_etikett_mit_format(conn, etikett_id):
-    return conn.execute(
-        '''
-        SELECT e.id, e.bezeichnung, e.druckbefehle, e.etikettformat_id, lf.zpl_header
-        FROM Etikett e
-        JOIN label_formats lf ON e.etikettformat_id = lf.id
-        WHERE e.id = ?
-        ''',
-        (etikett_id,),
-    ).fetchone()
+    """Etikett mit ``zpl_header`` seines Formats (Stammdaten-Cache); None ohne Etikett oder Format."""
+    for e in get_stammdaten('etiketten', conn):
+        if e['id'] == etikett_id:
+            # zpl_header ist NOT NULL: None heisst, das Format fehlt (frueher INNER JOIN)
+            return e if e['zpl_header'] is not None else None
+    return None
 
 
 def resolve_printer_ip(conn, drucker_id):
@@ -169,16 +331,7 @@ def get_active_printers_list(conn):
     Enthaelt zusaetzlich agent_id und agent_name (NULL bei Direkt-Druck) und einen
     vorbereiteten ``modus_label``-Suffix (z. B. ``Direkt`` / ``Agent: standort-a``).
     """
-    return conn.execute(
-        '''
-        SELECT p.id, p.name, p.ip_address, p.ort, p.agent_id,
-               a.name AS agent_name
-        FROM zebra_printers p
-        LEFT JOIN print_agents a ON p.agent_id = a.id
-        WHERE p.active = 1
-        ORDER BY COALESCE(p.ort, ''), p.name
-        '''
-    ).fetchall()
+    return get_stammdaten('zebra_printers', conn, nur_aktiv=True)
 
 
 def _printer_to_dict(p):
@@ -209,7 +362,7 @@ def build_print_resolution(conn, funktion_code, mitarbeiter_id, drucker_id_overr
       error_message: str | None
       needs_printer_choice: bool
       printers: list[dict] (fuer Modal; inkl. agent_id, agent_name, modus_label)
-      etikett: Row | None (mit zpl_header, druckbefehle)
+      etikett: dict | None (mit zpl_header, druckbefehle; aus dem Stammdaten-Cache)
       printer_ip: str | None
       drucker_id: int | None
       agent_id: int | None  (None = Direkt-Druck vom Server)
@@ -243,11 +396,10 @@ def build_print_resolution(conn, funktion_code, mitarbeiter_id, drucker_id_overr
     eff_drucker = drucker_id_override if drucker_id_override is not None else k['drucker_id']
 
     if eff_drucker is not None:
-        row = conn.execute(
-            '''SELECT id, ip_address, agent_id
-               FROM zebra_printers WHERE id = ? AND active = 1''',
-            (eff_drucker,),
-        ).fetchone()
+        row = next(
+            (p for p in get_active_printers_list(conn) if p['id'] == eff_drucker),
+            None,
+        )
         if not row:
             return {
                 'ok': False,
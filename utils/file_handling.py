@@ -4,6 +4,9 @@ Hilfsfunktionen für Datei-Uploads, Validierung und Dateiverwaltung
 """
 
 import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
 from werkzeug.utils import secure_filename
 from flask import current_app
 
@@ -54,6 +57,78 @@ def create_upload_folder(folder_path):
         return False
 
 
+# ========== Ordner-Listing-Cache ==========
+# Upload-Ordner liegen teils auf einem Netzlaufwerk; jedes listdir/isfile/getsize ist dort ein
+# Roundtrip. Der Cache hält pro Ordner die Dateiliste und prüft pro Zugriff nur die mtime des
+# Ordners (ein stat). Anlegen/Löschen/Umbenennen ändert die Ordner-mtime – auch für andere
+# Worker-Prozesse; eigene Schreibzugriffe (save_uploaded_file, move_file_safe) invalidieren
+# zusätzlich explizit, weil Überschreiben an Ort und Stelle die Ordner-mtime nicht ändert.
+
+OrdnerDatei = namedtuple('OrdnerDatei', ['name', 'size', 'mtime'])
+
+_ORDNER_CACHE_MAX = 2048
+# Ordner mit mtime jünger als das hier nicht cachen: grobe mtime-Auflösung (SMB/FAT) könnte
+# sonst zwei Änderungen innerhalb derselben Zeitscheibe nicht unterscheiden.
+_ORDNER_MTIME_KARENZ_NS = 2_000_000_000
+_ordner_cache = OrderedDict()
+_ordner_cache_lock = threading.Lock()
+
+
+def _ordner_cache_key(folder_path):
+    return os.path.normcase(os.path.abspath(folder_path))
+
+
+def invalidiere_ordner_cache(folder_path):
+    """Verwirft den gecachten Inhalt eines Ordners (nach Schreib-/Löschzugriff)."""
+    if not folder_path:
+        return
+    with _ordner_cache_lock:
+        _ordner_cache.pop(_ordner_cache_key(folder_path), None)
+
+
+def get_ordner_dateien(folder_path):
+    """
+    Dateien (ohne Unterordner) eines Ordners, gecacht und über die Ordner-mtime validiert.
+
+    Args:
+        folder_path: Pfad zum Ordner
+
+    Returns:
+        Liste von OrdnerDatei(name, size, mtime); leere Liste, wenn der Ordner fehlt.
+        Lesefehler beim Auflisten werden wie bei os.listdir weitergereicht.
+    """
+    key = _ordner_cache_key(folder_path)
+    try:
+        ordner_mtime = os.stat(folder_path).st_mtime_ns
+    except OSError:
+        invalidiere_ordner_cache(folder_path)
+        return []
+    with _ordner_cache_lock:
+        eintrag = _ordner_cache.get(key)
+        if eintrag is not None and eintrag[0] == ordner_mtime:
+            _ordner_cache.move_to_end(key)
+            return list(eintrag[1])
+
+    dateien = []
+    with os.scandir(folder_path) as it:
+        for entry in it:
+            try:
+                if entry.is_file():
+                    st = entry.stat()
+                    dateien.append(OrdnerDatei(entry.name, st.st_size, st.st_mtime))
+            except OSError:
+                continue
+    dateien = tuple(dateien)
+
+    if time.time_ns() - ordner_mtime > _ORDNER_MTIME_KARENZ_NS:
+        with _ordner_cache_lock:
+            _ordner_cache[key] = (ordner_mtime, dateien)
+            _ordner_cache.move_to_end(key)
+            while len(_ordner_cache) > _ORDNER_CACHE_MAX:
+                _ordner_cache.popitem(last=False)
+    return list(dateien)
+
+
 def get_file_list(folder_path, include_size=True):
     """
     Liest eine Liste von Dateien aus einem Ordner
@@ -65,25 +140,19 @@ def get_file_list(folder_path, include_size=True):
     Returns:
         Liste von Dictionaries mit Dateiinformationen
     """
-    if not os.path.exists(folder_path):
-        return []
-    
     dateien = []
     try:
-        for filename in os.listdir(folder_path):
-            filepath = os.path.join(folder_path, filename)
-            if os.path.isfile(filepath):
-                file_info = {
-                    'name': filename,
-                }
-                
-                if include_size:
-                    from utils.helpers import format_file_size
-                    file_size = os.path.getsize(filepath)
-                    file_info['size'] = format_file_size(file_size)
-                    file_info['size_bytes'] = file_size
-                
-                dateien.append(file_info)
+        for datei in get_ordner_dateien(folder_path):
+            file_info = {
+                'name': datei.name,
+            }
+            
+            if include_size:
+                from utils.helpers import format_file_size
+                file_info['size'] = format_file_size(datei.size)
+                file_info['size_bytes'] = datei.size
+            
+            dateien.append(file_info)
     except Exception as e:
         print(f"Fehler beim Lesen des Ordners {folder_path}: {e}")
         return []
@@ -189,6 +258,7 @@ def save_uploaded_file(file, target_folder, allowed_extensions=None, create_uniq
     
     try:
         file.save(filepath)
+        invalidiere_ordner_cache(target_folder)
         return True, safe_filename, None
     except Exception as e:
         return False, None, f"Fehler beim Speichern: {str(e)}"
@@ -283,6 +353,8 @@ def move_file_safe(source_path, target_path, create_unique_name=True, allowed_ba
     
     try:
         shutil.move(source_path, target_path)
+        invalidiere_ordner_cache(os.path.dirname(source_path))
+        invalidiere_ordner_cache(target_dir)
         return True, final_filename, None
     except Exception as e:
         import traceback
@@ -316,6 +388,7 @@ def loesche_import_kopie_nach_upload(original_filename, import_folder, aktiviert
     if os.path.isfile(full_abs):
         try:
             os.remove(full_abs)
+            invalidiere_ordner_cache(import_abs)
         except OSError:
             pass
 
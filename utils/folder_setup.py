@@ -20,6 +20,10 @@ def create_all_upload_folders(app):
         app.config.get('WARTUNG_UPLOAD_FOLDER'),
         app.config.get('ANGEBOTE_UPLOAD_FOLDER'),
         app.config.get('IMPORT_FOLDER'),
+        app.config.get('BILD_DERIVATE_FOLDER'),
+        app.config.get('REPORT_CACHE_FOLDER'),
+        app.config.get('REPORT_JOB_FOLDER'),
+        app.config.get('TECHNIK_LAYOUTS_FOLDER'),
         app.config.get('UPLOAD_BASE_FOLDER'),
     ]
     
@@ -0,0 +1,170 @@
+"""
+Passwort-Hashing (Werkzeug) in einem begrenzten Prozess-Pool.
+
+scrypt/pbkdf2 sind bewusst rechenintensiv. Im gthread-Worker halten sie den GIL, sodass bei
+vielen gleichzeitigen Anmeldungen (Schichtwechsel) alle anderen Requests des Workers warten.
+``passwort_pruefen`` und ``passwort_hash_erzeugen`` rechnen deshalb in einem
+``ProcessPoolExecutor`` je Worker-Prozess (``PASSWORT_HASH_PROZESSE``, nach fork neu angelegt;
+Kindprozesse per ``forkserver``, also auch aus dem multithreaded Worker sicher neu startbar).
+Höchstens ``PASSWORT_HASH_WARTESCHLANGE`` Aufträge sind gleichzeitig unterwegs, ein Platz wird
+erst mit dem Ende des Auftrags frei (auch wenn der Request schon aufgegeben hat); wer länger als ``PASSWORT_HASH_WARTEZEIT_SEKUNDEN`` auf einen Platz wartet, bekommt
+``PasswortHashUeberlastet``. ``PASSWORT_HASH_PROZESSE=0`` rechnet direkt im Request-Thread.
+
+Neue Hashes nutzen ``PASSWORT_HASH_METHODE`` (Werkzeug-Methodenstring, z. B.
+``scrypt:32768:8:1`` oder ``pbkdf2:sha256:1000000``). Gespeicherte Hashes mit anderen Parametern
+erkennt ``passwort_neu_hashen_noetig``; der Login ersetzt sie nach erfolgreicher Prüfung.
+"""
+
+from __future__ import annotations
+
+import atexit
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+log = logging.getLogger('bis.auth')
+
+_STANDARD_KONFIG = {
+    'PASSWORT_HASH_METHODE': 'scrypt',
+    'PASSWORT_HASH_PROZESSE': 2,
+    'PASSWORT_HASH_WARTESCHLANGE': 32,
+    'PASSWORT_HASH_WARTEZEIT_SEKUNDEN': 10,
+}
+
+
+# Flask-App-Referenz für die Konfiguration außerhalb eines App-Kontexts (post_fork).
+_flask_app = None
+
+
+class PasswortHashUeberlastet(RuntimeError):
+    """Zu viele gleichzeitige Hash-Aufträge; Anmeldung später erneut versuchen."""
+
+
+def set_flask_app(app) -> None:
+    """Von app.py einmalig setzen, damit die Einstellungen auch ohne App-Kontext greifen."""
+    global _flask_app
+    _flask_app = app
+
+
+def _konfig(key):
+    try:
+        from flask import current_app, has_app_context
+        app = current_app if has_app_context() else _flask_app
+    except ImportError:
+        app = _flask_app
+    if app is not None and app.config.get(key) is not None:
+        return app.config.get(key)
+    return _STANDARD_KONFIG[key]
+
+
+_pool = None
+_pool_pid = None
+_plaetze = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    """Pool und Platz-Semaphore dieses Prozesses (nach fork neu); None = ohne Pool rechnen."""
+    global _pool, _pool_pid, _plaetze
+    prozesse = int(_konfig('PASSWORT_HASH_PROZESSE'))
+    if prozesse <= 0:
+        return None, None
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ProcessPoolExecutor(max_workers=prozesse, mp_context=_mp_context())
+            _plaetze = threading.BoundedSemaphore(max(1, int(_konfig('PASSWORT_HASH_WARTESCHLANGE'))))
+            _pool_pid = os.getpid()
+        return _pool, _plaetze
+
+
+def _mp_context():
+    # Kein fork: Der Pool wird nach einem BrokenProcessPool aus dem laufenden gthread-Worker neu
+    # angelegt, ein fork dort kann gehaltene Locks anderer Threads mitnehmen. forkserver lädt das
+    # Hauptmodul nur einmal im Server-Prozess, spawn (Windows/macOS) je Kindprozess.
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('forkserver')
+    return multiprocessing.get_context('spawn')
+
+
+@atexit.register
+def _beenden():
+    with _pool_lock:
+        pool = _pool if _pool_pid == os.getpid() else None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _verwerfen(pool):
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _ausfuehren(funktion, *args):
+    pool, plaetze = _get_pool()
+    if pool is None:
+        return funktion(*args)
+    wartezeit = float(_konfig('PASSWORT_HASH_WARTEZEIT_SEKUNDEN'))
+    if not plaetze.acquire(timeout=wartezeit):
+        raise PasswortHashUeberlastet('Zu viele gleichzeitige Passwort-Prüfungen')
+    try:
+        future = pool.submit(funktion, *args)
+    except (BrokenProcessPool, RuntimeError):
+        # Pool defekt oder heruntergefahren: diesen Auftrag direkt rechnen, der nächste legt ihn neu an
+        plaetze.release()
+        log.warning('Passwort-Hash-Pool defekt, wird neu gestartet')
+        _verwerfen(pool)
+        return funktion(*args)
+    # Platz erst freigeben, wenn der Kindprozess fertig ist, nicht schon beim Timeout des Requests
+    future.add_done_callback(lambda _f: plaetze.release())
+    try:
+        return future.result(timeout=wartezeit)
+    except FutureTimeoutError as exc:
+        raise PasswortHashUeberlastet('Passwort-Prüfung dauert zu lange') from exc
+    except BrokenProcessPool:
+        # Kindprozess abgestürzt/beendet: Pool neu anlegen, diesen Auftrag direkt rechnen
+        log.warning('Passwort-Hash-Pool defekt, wird neu gestartet')
+        _verwerfen(pool)
+        return funktion(*args)
+
+
+def passwort_hash_erzeugen(passwort: str) -> str:
+    """Hash für ``passwort`` mit den konfigurierten Parametern (``PASSWORT_HASH_METHODE``)."""
+    return _ausfuehren(generate_password_hash, passwort, _konfig('PASSWORT_HASH_METHODE'))
+
+
+def passwort_pruefen(passwort_hash: str | None, passwort: str) -> bool:
+    """True, wenn ``passwort`` zum gespeicherten Hash passt."""
+    if not passwort_hash:
+        return False
+    return _ausfuehren(check_password_hash, passwort_hash, passwort)
+
+
+@lru_cache(maxsize=8)
+def _methoden_praefix(methode: str) -> str:
+    # Werkzeug ergänzt Standardparameter (``scrypt`` -> ``scrypt:32768:8:1``)
+    return generate_password_hash('', methode).split('$', 1)[0]
+
+
+def passwort_neu_hashen_noetig(passwort_hash: str | None) -> bool:
+    """True, wenn der Hash mit anderen als den konfigurierten Parametern erzeugt wurde."""
+    if not passwort_hash or '$' not in passwort_hash:
+        return False
+    return passwort_hash.split('$', 1)[0] != _methoden_praefix(_konfig('PASSWORT_HASH_METHODE'))
+
+
+def passwort_pool_vorwaermen() -> None:
+    """Kindprozesse im Voraus starten (Gunicorn post_fork), damit der erste Login nicht wartet."""
+    pool, _ = _get_pool()
+    if pool is None:
+        return
+    for _ in range(int(_konfig('PASSWORT_HASH_PROZESSE'))):
+        pool.submit(check_password_hash, 'pbkdf2:sha256:1$x$x', '')
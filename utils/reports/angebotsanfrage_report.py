@@ -12,6 +12,7 @@ from docxtpl import DocxTemplate
 from utils.firmendaten import get_firmendaten
 from utils.helpers import safe_get
 from .pdf_export import convert_docx_to_pdf
+from .report_cache import hole_report, report_schluessel, speichere_report
 
 try:
     from docx2pdf import convert
@@ -75,6 +76,15 @@ def generate_angebotsanfrage_pdf(angebotsanfrage_id, conn, force_docx=False):
     if not os.path.exists(template_path):
         raise FileNotFoundError('Angebotsvorlage nicht gefunden.')
     
+    # Bereits konvertiertes PDF mit identischen Eingangsdaten wiederverwenden
+    cache_schluessel = None
+    if DOCX2PDF_AVAILABLE and not force_docx:
+        cache_schluessel = report_schluessel('angebotsanfrage', template_path, anfrage, positionen, firmendaten)
+        pdf_content = hole_report(cache_schluessel)
+        if pdf_content is not None:
+            filename = f"Angebotsanfrage_{angebotsanfrage_id}_{datetime.now().strftime('%Y%m%d')}.pdf"
+            return (pdf_content, filename, 'application/pdf', True)
+    
     # Template laden
     doc = DocxTemplate(template_path)
     
@@ -222,6 +232,7 @@ def generate_angebotsanfrage_pdf(angebotsanfrage_id, conn, force_docx=False):
                 # Temporäre Dateien löschen
                 os.unlink(tmp_docx_path)
                 os.unlink(tmp_pdf_path)
+                speichere_report(cache_schluessel, pdf_content)
                 
                 filename = f"Angebotsanfrage_{angebotsanfrage_id}_{datetime.now().strftime('%Y%m%d')}.pdf"
                 return (pdf_content, filename, 'application/pdf', True)
@@ -0,0 +1,291 @@
+"""
+Bericht-Jobs - PDF-Exporte und ZIP-Sammelexporte außerhalb des Requests
+
+Ein Job ist eine Zeile in ``BerichtJob`` (Status ``wartend``). Hintergrund-Threads in jedem
+Worker-Prozess beanspruchen wartende Jobs per bedingtem UPDATE (``laeuft``), erzeugen das
+Dokument mit denselben Funktionen wie der direkte Export und legen das Ergebnis unter
+``REPORT_JOB_FOLDER/<ID>/<Dateiname>`` ab (``fertig`` bzw. ``fehler``). Dadurch belegt die
+LibreOffice-Konvertierung keinen Gunicorn-Thread mehr, und Sammelexporte (z. B. alle
+Bestellungen eines Monats als ZIP) laufen ohne Request-Timeout.
+
+Der Client fragt den Status per Polling ab. Bei Sammelexporten – oder wenn seit
+BENACHRICHTIGUNG_NACH_SEKUNDEN keine Abfrage mehr kam (Seite verlassen) – erhält der
+Auftraggeber eine Benachrichtigung mit Download-Link. Jobs samt Datei werden nach
+REPORT_JOB_AUFBEWAHRUNG_STUNDEN gelöscht.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import zipfile
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from utils.database import get_db_connection
+
+log = logging.getLogger('bis.berichte')
+
+JOB_TYPEN = ('bestellung', 'angebotsanfrage', 'thema', 'bestellungen_monat')
+SAMMEL_TYPEN = frozenset({'bestellungen_monat'})
+BENACHRICHTIGUNG_NACH_SEKUNDEN = 15
+_WARTUNG_INTERVALL_SEKUNDEN = 300
+
+# Flask-App-Referenz für DB-Zugriff aus den Hintergrund-Threads (siehe set_flask_app).
+_flask_app = None
+_stop_event = threading.Event()
+_neuer_job = threading.Event()
+_threads_gestartet = False
+_thread_lock = threading.Lock()
+_letzte_wartung = 0.0
+
+
+def set_flask_app(app) -> None:
+    """Von app.py einmalig setzen, damit die Hintergrund-Threads die DB nutzen dürfen."""
+    global _flask_app
+    _flask_app = app
+
+
+def _zeitstempel(vor_sekunden: float = 0) -> str:
+    return (datetime.now() - timedelta(seconds=vor_sekunden)).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def job_ordner(job_id) -> str:
+    basis = current_app.config.get('REPORT_JOB_FOLDER') or os.path.join(
+        current_app.config['UPLOAD_BASE_FOLDER'], 'Cache', 'Berichtjobs')
+    return os.path.join(basis, str(int(job_id)))
+
+
+def job_anlegen(conn, mitarbeiter_id, typ, parameter, gesamt=1) -> int:
+    """Neuen Job einreihen; der Aufrufer hat die Berechtigung bereits geprüft.
+
+    Den Worker weckt im Request erst die fertige Antwort (siehe ``_nach_commit_wecken``).
+    """
+    if typ not in JOB_TYPEN:
+        raise ValueError(f'Unbekannter Berichtstyp: {typ}')
+    jetzt = _zeitstempel()
+    cur = conn.execute('''
+        INSERT INTO BerichtJob (MitarbeiterID, Typ, Parameter, Status, Gesamt, ErstelltAm, LetzteAbfrageAm)
+        VALUES (?, ?, ?, 'wartend', ?, ?, ?)
+    ''', (mitarbeiter_id, typ, json.dumps(parameter), max(int(gesamt), 1), jetzt, jetzt))
+    _nach_commit_wecken()
+    return cur.lastrowid
+
+
+def _nach_commit_wecken() -> None:
+    """Worker dieses Prozesses erst nach dem Commit wecken (sonst sieht er die Zeile noch nicht).
+
+    Im Request nach dem Erzeugen der Antwort (``after_this_request``, der ``get_db_connection``-Block
+    der Route ist dann abgeschlossen); außerhalb eines Requests ruft der Aufrufer nach seinem
+    Block ``worker_wecken()`` auf, sonst greift das Polling.
+    """
+    from flask import after_this_request, g, has_request_context
+
+    if not has_request_context() or g.get('_bericht_worker_wecken'):
+        return
+    g._bericht_worker_wecken = True
+
+    @after_this_request
+    def _nach_request(response):
+        worker_wecken()
+        return response
+
+
+def worker_wecken() -> None:
+    _neuer_job.set()
+
+
+def job_laden(conn, job_id, mitarbeiter_id):
+    """Job des Mitarbeiters oder None (fremde Jobs sind nicht sichtbar)."""
+    return conn.execute(
+        'SELECT * FROM BerichtJob WHERE ID = ? AND MitarbeiterID = ?', (job_id, mitarbeiter_id)
+    ).fetchone()
+
+
+def abfrage_vermerken(conn, job_id) -> None:
+    conn.execute('UPDATE BerichtJob SET LetzteAbfrageAm = ? WHERE ID = ?', (_zeitstempel(), job_id))
+
+
+def job_status_dict(job) -> dict:
+    return {
+        'id': job['ID'],
+        'typ': job['Typ'],
+        'status': job['Status'],
+        'fortschritt': job['Fortschritt'],
+        'gesamt': job['Gesamt'],
+        'dateiname': job['Dateiname'],
+        'fehlermeldung': job['Fehlermeldung'],
+    }
+
+
+def _naechsten_job_beanspruchen(conn):
+    """Ältesten wartenden Job auf ``laeuft`` setzen; None, wenn keiner (mehr) frei ist."""
+    kandidaten = conn.execute(
+        "SELECT ID FROM BerichtJob WHERE Status = 'wartend' ORDER BY ID LIMIT 5"
+    ).fetchall()
+    for row in kandidaten:
+        cur = conn.execute(
+            "UPDATE BerichtJob SET Status = 'laeuft', GestartetAm = ? WHERE ID = ? AND Status = 'wartend'",
+            (_zeitstempel(), row['ID']),
+        )
+        if cur.rowcount == 1:
+            return conn.execute('SELECT * FROM BerichtJob WHERE ID = ?', (row['ID'],)).fetchone()
+    return None
+
+
+def _einzelbericht(typ, objekt_id, conn):
+    from . import generate_angebotsanfrage_pdf, generate_bestellung_pdf, generate_thema_pdf
+
+    if typ == 'bestellung':
+        return generate_bestellung_pdf(objekt_id, conn)
+    if typ == 'angebotsanfrage':
+        return generate_angebotsanfrage_pdf(objekt_id, conn)
+    return generate_thema_pdf(objekt_id, conn)
+
+
+def _sammel_zip(job, parameter, ordner):
+    """Alle Bestellungen aus ``parameter['ids']`` nacheinander erzeugen und in ein ZIP schreiben.
+    Einzelne Fehler brechen den Export nicht ab, sondern landen in ``Fehler.txt``."""
+    from . import generate_bestellung_pdf
+
+    dateiname = f"Bestellungen_{parameter.get('monat', job['ID'])}.zip"
+    ziel = os.path.join(ordner, dateiname)
+    fehler = []
+    with zipfile.ZipFile(ziel + '.tmp', 'w', zipfile.ZIP_DEFLATED) as zf:
+        for nr, bestellung_id in enumerate(parameter.get('ids') or [], 1):
+            try:
+                with get_db_connection() as conn:
+                    content, filename, _, _ = generate_bestellung_pdf(bestellung_id, conn)
+                zf.writestr(filename, content)
+            except Exception as e:
+                fehler.append(f'Bestellung {bestellung_id}: {e}')
+            with get_db_connection() as conn:
+                conn.execute('UPDATE BerichtJob SET Fortschritt = ? WHERE ID = ?', (nr, job['ID']))
+        if fehler:
+            zf.writestr('Fehler.txt', '\n'.join(fehler))
+    os.replace(ziel + '.tmp', ziel)
+    return dateiname, 'application/zip'
+
+
+def job_ausfuehren(job) -> None:
+    """Beanspruchten Job erzeugen und Status/Ergebnis speichern."""
+    parameter = json.loads(job['Parameter'] or '{}')
+    ordner = job_ordner(job['ID'])
+    try:
+        os.makedirs(ordner, exist_ok=True)
+        if job['Typ'] in SAMMEL_TYPEN:
+            dateiname, mimetype = _sammel_zip(job, parameter, ordner)
+        else:
+            with get_db_connection() as conn:
+                content, dateiname, mimetype, _ = _einzelbericht(job['Typ'], parameter['id'], conn)
+            with open(os.path.join(ordner, dateiname), 'wb') as f:
+                f.write(content)
+    except Exception as e:
+        log.warning('Bericht-Job %s (%s) fehlgeschlagen: %s', job['ID'], job['Typ'], e)
+        with get_db_connection() as conn:
+            conn.execute(
+                "UPDATE BerichtJob SET Status = 'fehler', Fehlermeldung = ?, FertigAm = ? WHERE ID = ?",
+                (str(e)[:500] or type(e).__name__, _zeitstempel(), job['ID']),
+            )
+        return
+
+    with get_db_connection() as conn:
+        conn.execute('''
+            UPDATE BerichtJob
+            SET Status = 'fertig', Fortschritt = Gesamt, Dateiname = ?, Mimetype = ?, FertigAm = ?
+            WHERE ID = ?
+        ''', (dateiname, mimetype, _zeitstempel(), job['ID']))
+        row = conn.execute('SELECT LetzteAbfrageAm FROM BerichtJob WHERE ID = ?', (job['ID'],)).fetchone()
+        client_weg = not row or (row['LetzteAbfrageAm'] or '') < _zeitstempel(BENACHRICHTIGUNG_NACH_SEKUNDEN)
+        if job['Typ'] in SAMMEL_TYPEN or client_weg:
+            from utils.benachrichtigungen import erstelle_benachrichtigung_fuer_bericht_job
+            try:
+                erstelle_benachrichtigung_fuer_bericht_job(job['ID'], conn)
+            except Exception as e:
+                log.warning('Benachrichtigung für Bericht-Job %s fehlgeschlagen: %s', job['ID'], e)
+    # Glocke des Auftraggebers erst nach dem Commit aktualisieren
+    from utils.benachrichtigungen_live import vorgemerkte_senden
+    vorgemerkte_senden()
+
+
+def jobs_aufraeumen(conn) -> int:
+    """Hängengebliebene Jobs (Worker beendet) als Fehler markieren und abgelaufene Jobs samt
+    Datei löschen. Gibt die Anzahl gelöschter Jobs zurück."""
+    timeout = int(current_app.config.get('REPORT_JOB_TIMEOUT_SEKUNDEN', 1800))
+    conn.execute('''
+        UPDATE BerichtJob SET Status = 'fehler', Fehlermeldung = 'Abgebrochen (Zeitüberschreitung)', FertigAm = ?
+        WHERE Status = 'laeuft' AND GestartetAm < ?
+    ''', (_zeitstempel(), _zeitstempel(timeout)))
+    stunden = float(current_app.config.get('REPORT_JOB_AUFBEWAHRUNG_STUNDEN', 24))
+    abgelaufen = [r['ID'] for r in conn.execute(
+        "SELECT ID FROM BerichtJob WHERE Status IN ('fertig', 'fehler') AND ErstelltAm < ?",
+        (_zeitstempel(stunden * 3600),),
+    ).fetchall()]
+    for job_id in abgelaufen:
+        shutil.rmtree(job_ordner(job_id), ignore_errors=True)
+        conn.execute('DELETE FROM BerichtJob WHERE ID = ?', (job_id,))
+    return len(abgelaufen)
+
+
+def arbeite_naechsten_job_ab() -> bool:
+    """Einen wartenden Job beanspruchen und ausführen. True, wenn es einen gab."""
+    global _letzte_wartung
+    # Mehrere Worker-Threads (und Request-Threads) teilen den Zeitstempel: nur einer räumt auf
+    with _thread_lock:
+        faellig = time.monotonic() - _letzte_wartung > _WARTUNG_INTERVALL_SEKUNDEN
+        if faellig:
+            _letzte_wartung = time.monotonic()
+    if faellig:
+        with get_db_connection() as conn:
+            jobs_aufraeumen(conn)
+    with get_db_connection() as conn:
+        job = _naechsten_job_beanspruchen(conn)
+    if job is None:
+        return False
+    job_ausfuehren(job)
+    return True
+
+
+def _worker_run():
+    while not _stop_event.is_set():
+        app = _flask_app
+        gearbeitet = False
+        # Vor dem Suchen zurücksetzen: ein Wecken währenddessen geht so nicht verloren
+        _neuer_job.clear()
+        if app is not None:
+            try:
+                with app.app_context():
+                    gearbeitet = arbeite_naechsten_job_ab()
+            except Exception as e:
+                log.warning('Bericht-Worker: %s', e)
+        if not gearbeitet:
+            # Jobs aus diesem Prozess wecken sofort, Jobs anderer Worker per Polling
+            _neuer_job.wait(2)
+
+
+def start_bericht_worker() -> None:
+    global _threads_gestartet
+    app = _flask_app
+    if app is None or not app.config.get('REPORT_JOB_AKTIV', True) or app.config.get('TESTING'):
+        return
+    with _thread_lock:
+        if _threads_gestartet:
+            return
+        _threads_gestartet = True
+        _stop_event.clear()
+    anzahl = max(int(app.config.get('REPORT_JOB_WORKER', 1)), 1)
+    for nr in range(anzahl):
+        threading.Thread(target=_worker_run, name=f'bis-bericht-worker-{nr}', daemon=True).start()
+    log.info('Bericht-Worker gestartet: %d Thread(s) (PID %s)', anzahl, os.getpid())
+
+
+def stop_bericht_worker() -> None:
+    global _threads_gestartet
+    _stop_event.set()
+    _neuer_job.set()
+    _threads_gestartet = False
@@ -14,6 +14,7 @@ from docx.shared import Mm
 from utils.firmendaten import get_firmendaten
 from utils.helpers import safe_get
 from .pdf_export import convert_docx_to_pdf
+from .report_cache import hole_report, report_schluessel, speichere_report
 
 try:
     from docx2pdf import convert
@@ -82,6 +83,15 @@ def generate_bestellung_pdf(bestellung_id, conn, force_docx=False):
     if not os.path.exists(template_path):
         raise FileNotFoundError('Bestellungsvorlage nicht gefunden.')
     
+    # Bereits konvertiertes PDF mit identischen Eingangsdaten wiederverwenden
+    cache_schluessel = None
+    if DOCX2PDF_AVAILABLE and not force_docx:
+        cache_schluessel = report_schluessel('bestellung', template_path, bestellung, positionen, firmendaten)
+        pdf_content = hole_report(cache_schluessel)
+        if pdf_content is not None:
+            filename = f"Bestellung_{bestellung_id}_{datetime.now().strftime('%Y%m%d')}.pdf"
+            return (pdf_content, filename, 'application/pdf', True)
+    
     # Template laden
     doc = DocxTemplate(template_path)
     
@@ -307,6 +317,7 @@ def generate_bestellung_pdf(bestellung_id, conn, force_docx=False):
                 # Temporäre Dateien löschen
                 os.unlink(tmp_docx_path)
                 os.unlink(tmp_pdf_path)
+                speichere_report(cache_schluessel, pdf_content)
                 
                 filename = f"Bestellung_{bestellung_id}_{datetime.now().strftime('%Y%m%d')}.pdf"
                 return (pdf_content, filename, 'application/pdf', True)
@@ -0,0 +1,423 @@
+"""
+Pool warmer LibreOffice-Instanzen für die DOCX->PDF-Konvertierung.
+
+Jeder Slot hat ein eigenes Benutzerprofil (kein Warten auf die Profil-Sperre, wenn zwei
+Exporte gleichzeitig laufen). Die Zahl der Slots begrenzt die parallelen Konvertierungen
+pro Prozess; weitere Anfragen warten in der Queue (mit Zeitlimit).
+
+Betriebsarten:
+- UNO verfügbar (``import uno``, z. B. Paket python3-uno; im Docker-Image verlinkt, siehe
+  docker/bis.Dockerfile): pro Slot läuft ein dauerhafter
+  ``soffice --headless --accept=socket…``; Dokumente werden per UNO geladen und als PDF
+  gespeichert (kein Prozessstart pro Dokument). Health-Check vor jeder Konvertierung,
+  Neustart bei Fehler/Timeout, Recycling nach ``LIBREOFFICE_POOL_MAX_DOKUMENTE``.
+- Sonst: ``soffice --convert-to pdf`` pro Dokument, aber mit dem warmen Profil des Slots
+  (Profil wird nur einmal pro Prozess angelegt).
+"""
+
+from __future__ import annotations
+
+import atexit
+import glob
+import logging
+import os
+import queue
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+
+log = logging.getLogger('bis.reports')
+
+try:
+    import uno
+    from com.sun.star.beans import PropertyValue
+    from com.sun.star.connection import NoConnectException
+    UNO_AVAILABLE = True
+except ImportError:
+    UNO_AVAILABLE = False
+
+# Flask-App-Referenz für die Konfiguration außerhalb eines App-Kontexts (siehe set_flask_app).
+_flask_app = None
+
+_STANDARD_KONFIG = {
+    'LIBREOFFICE_POOL_GROESSE': 2,
+    'LIBREOFFICE_POOL_MAX_DOKUMENTE': 100,
+    'LIBREOFFICE_TIMEOUT_SEKUNDEN': 30,
+    'LIBREOFFICE_POOL_WARTEZEIT_SEKUNDEN': 60,
+    'LIBREOFFICE_PROFIL_ORDNER': None,
+}
+
+
+def set_flask_app(app) -> None:
+    """Von app.py einmalig setzen, damit Pool-Einstellungen auch ohne App-Kontext greifen."""
+    global _flask_app
+    _flask_app = app
+
+
+@lru_cache(maxsize=1)
+def finde_soffice() -> str | None:
+    """Pfad zum LibreOffice-Binary (einmal pro Prozess ermittelt)."""
+    if sys.platform == 'win32':
+        for pfad in (
+            r'C:\Program Files\LibreOffice\program\soffice.exe',
+            r'C:\Program Files (x86)\LibreOffice\program\soffice.exe',
+        ):
+            if os.path.exists(pfad):
+                return pfad
+        return None
+    gefunden = shutil.which('libreoffice') or shutil.which('soffice')
+    if gefunden:
+        return gefunden
+    kandidaten = [
+        '/usr/bin/libreoffice',
+        '/usr/bin/soffice',
+        '/usr/local/bin/libreoffice',
+        '/usr/local/bin/soffice',
+        '/snap/bin/libreoffice',
+    ] + sorted(glob.glob('/opt/libreoffice*/program/soffice'))
+    for pfad in kandidaten:
+        if os.path.exists(pfad) and os.access(pfad, os.X_OK):
+            return pfad
+    return None
+
+
+def _freier_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _prop(name, value):
+    p = PropertyValue()
+    p.Name = name
+    p.Value = value
+    return p
+
+
+class _Instanz:
+    """Ein Slot: eigenes Profil, bei UNO zusätzlich ein dauerhaft laufender soffice-Prozess."""
+
+    def __init__(self, nummer: int, binary: str, profil_basis: str):
+        self.nummer = nummer
+        self.binary = binary
+        self.profil_dir = os.path.join(profil_basis, f'p{os.getpid()}-s{nummer}')
+        self.prozess = None
+        self.desktop = None
+        self.dokumente = 0
+        self.abgebrochen = False
+
+    def _profil_arg(self) -> str:
+        return '-env:UserInstallation=' + Path(self.profil_dir).resolve().as_uri()
+
+    def gesund(self) -> bool:
+        if self.prozess is None or self.prozess.poll() is not None or self.desktop is None:
+            return False
+        try:
+            self.desktop.getComponents()
+            return True
+        except Exception:
+            return False
+
+    def starten(self, timeout: float) -> None:
+        os.makedirs(self.profil_dir, exist_ok=True)
+        port = _freier_port()
+        url = f'socket,host=127.0.0.1,port={port};urp;StarOffice.ComponentContext'
+        self.prozess = subprocess.Popen(
+            [
+                self.binary, '--headless', '--invisible', '--nologo', '--norestore',
+                '--nodefault', '--nolockcheck', self._profil_arg(), f'--accept={url}',
+            ],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        lokal = uno.getComponentContext()
+        resolver = lokal.ServiceManager.createInstanceWithContext(
+            'com.sun.star.bridge.UnoUrlResolver', lokal
+        )
+        frist = time.monotonic() + timeout
+        while True:
+            try:
+                ctx = resolver.resolve(f'uno:{url}')
+                break
+            except NoConnectException:
+                if self.prozess.poll() is not None or time.monotonic() > frist:
+                    self.beenden()
+                    raise RuntimeError(f'LibreOffice-Slot {self.nummer} startet nicht')
+                time.sleep(0.2)
+        self.desktop = ctx.ServiceManager.createInstanceWithContext('com.sun.star.frame.Desktop', ctx)
+        self.dokumente = 0
+        log.info('LibreOffice-Slot %s gestartet (PID %s, Port %s)', self.nummer, self.prozess.pid, port)
+
+    def _abbrechen(self) -> None:
+        self.abgebrochen = True
+        if self.prozess is not None and self.prozess.poll() is None:
+            self.prozess.kill()
+
+    def beenden(self) -> None:
+        if self.desktop is not None:
+            try:
+                self.desktop.terminate()
+            except Exception:
+                pass
+        if self.prozess is not None and self.prozess.poll() is None:
+            try:
+                self.prozess.terminate()
+                self.prozess.wait(5)
+            except Exception:
+                self.prozess.kill()
+        self.prozess = None
+        self.desktop = None
+        self.dokumente = 0
+
+    def konvertieren_uno(self, docx_path: str, pdf_path: str, timeout: float) -> None:
+        if not self.gesund():
+            self.beenden()
+            self.starten(timeout)
+        self.abgebrochen = False
+        watchdog = threading.Timer(timeout, self._abbrechen)
+        watchdog.daemon = True
+        watchdog.start()
+        try:
+            doc = self.desktop.loadComponentFromURL(
+                uno.systemPathToFileUrl(os.path.abspath(docx_path)), '_blank', 0, (_prop('Hidden', True),)
+            )
+            try:
+                doc.storeToURL(
+                    uno.systemPathToFileUrl(os.path.abspath(pdf_path)),
+                    (_prop('FilterName', 'writer_pdf_Export'),),
+                )
+            finally:
+                doc.close(True)
+        finally:
+            watchdog.cancel()
+        self.dokumente += 1
+
+    def konvertieren_cli(self, docx_path: str, pdf_path: str, timeout: float) -> None:
+        os.makedirs(self.profil_dir, exist_ok=True)
+        output_dir = os.path.dirname(pdf_path)
+        subprocess.run(
+            [
+                self.binary, '--headless', '--nodefault', '--nolockcheck', '--invisible',
+                self._profil_arg(), '--convert-to', 'pdf', '--outdir', output_dir, docx_path,
+            ],
+            capture_output=True,
+            timeout=timeout,
+        )
+        erwartet = os.path.join(output_dir, os.path.splitext(os.path.basename(docx_path))[0] + '.pdf')
+        if os.path.exists(erwartet) and erwartet != pdf_path:
+            shutil.move(erwartet, pdf_path)
+        self.dokumente += 1
+
+
+class OfficePool:
+    """Begrenzte Anzahl LibreOffice-Slots pro Prozess, Warteschlange mit Zeitlimit und Metriken."""
+
+    def __init__(self, binary: str, groesse: int = 2, max_dokumente: int = 100, timeout: float = 30,
+                 wartezeit: float = 60, profil_basis: str | None = None, uno_aktiv: bool = UNO_AVAILABLE):
+        self.groesse = max(1, int(groesse))
+        self.max_dokumente = max(1, int(max_dokumente))
+        self.timeout = float(timeout)
+        self.wartezeit = float(wartezeit)
+        self.uno_aktiv = uno_aktiv
+        self.profil_basis = profil_basis or os.path.join(tempfile.gettempdir(), 'bis-libreoffice')
+        _verwaiste_profile_entfernen(self.profil_basis)
+        # LIFO: zuletzt benutzter (warmer) Slot zuerst
+        self._frei = queue.LifoQueue()
+        self._instanzen = [_Instanz(i, binary, self.profil_basis) for i in range(self.groesse)]
+        for inst in self._instanzen:
+            self._frei.put(inst)
+        self._lock = threading.Lock()
+        self._metriken = {
+            'wartend': 0,
+            'aktiv': 0,
+            'konvertiert': 0,
+            'fehler': 0,
+            'abgelehnt': 0,
+            'neustarts': 0,
+            'recycelt': 0,
+            'wartezeit_summe_ms': 0.0,
+            'wartezeit_max_ms': 0.0,
+            'dauer_summe_ms': 0.0,
+        }
+
+    def _zaehle(self, **werte) -> None:
+        with self._lock:
+            for key, wert in werte.items():
+                self._metriken[key] += wert
+
+    def konvertieren(self, docx_path: str, pdf_path: str) -> bool:
+        """DOCX -> PDF in einem freien Slot; False bei Fehler oder wenn kein Slot frei wird."""
+        self._zaehle(wartend=1)
+        start = time.monotonic()
+        try:
+            inst = self._frei.get(timeout=self.wartezeit)
+        except queue.Empty:
+            self._zaehle(abgelehnt=1)
+            log.warning('LibreOffice-Pool: kein Slot frei nach %.0f s', self.wartezeit)
+            return False
+        finally:
+            self._zaehle(wartend=-1)
+        gewartet_ms = (time.monotonic() - start) * 1000
+        with self._lock:
+            self._metriken['aktiv'] += 1
+            self._metriken['wartezeit_summe_ms'] += gewartet_ms
+            self._metriken['wartezeit_max_ms'] = max(self._metriken['wartezeit_max_ms'], gewartet_ms)
+        beginn = time.monotonic()
+        ok = False
+        try:
+            ok = self._konvertieren_mit(inst, docx_path, pdf_path)
+        finally:
+            if inst.dokumente >= self.max_dokumente:
+                inst.beenden()
+                self._zaehle(recycelt=1)
+            self._zaehle(
+                aktiv=-1,
+                konvertiert=1 if ok else 0,
+                fehler=0 if ok else 1,
+                dauer_summe_ms=(time.monotonic() - beginn) * 1000,
+            )
+            self._frei.put(inst)
+        return ok
+
+    def _konvertieren_mit(self, inst: _Instanz, docx_path: str, pdf_path: str) -> bool:
+        if not self.uno_aktiv:
+            try:
+                inst.konvertieren_cli(docx_path, pdf_path, self.timeout)
+            except Exception as e:
+                log.warning('LibreOffice-Konvertierung fehlgeschlagen: %s', e)
+                return False
+            return os.path.exists(pdf_path) and os.path.getsize(pdf_path) > 0
+        for versuch in (1, 2):
+            try:
+                inst.konvertieren_uno(docx_path, pdf_path, self.timeout)
+                return os.path.exists(pdf_path) and os.path.getsize(pdf_path) > 0
+            except Exception as e:
+                log.warning('LibreOffice-Slot %s: Konvertierung fehlgeschlagen (%s), Neustart', inst.nummer, e)
+                inst.beenden()
+                self._zaehle(neustarts=1)
+                # Nach Timeout nicht wiederholen – das Dokument würde erneut hängen
+                if inst.abgebrochen:
+                    return False
+        return False
+
+    def vorwaermen(self) -> None:
+        """Startet alle UNO-Slots vorab (erste Konvertierung ohne Startzeit)."""
+        if not self.uno_aktiv:
+            return
+        geholt = []
+        while True:
+            try:
+                geholt.append(self._frei.get_nowait())
+            except queue.Empty:
+                break
+        for inst in geholt:
+            try:
+                if not inst.gesund():
+                    inst.starten(self.timeout)
+            except Exception as e:
+                log.warning('LibreOffice-Slot %s: Vorwärmen fehlgeschlagen: %s', inst.nummer, e)
+            finally:
+                self._frei.put(inst)
+
+    def metriken(self) -> dict:
+        with self._lock:
+            werte = dict(self._metriken)
+        werte.update(
+            modus='uno' if self.uno_aktiv else 'cli',
+            groesse=self.groesse,
+            frei=self._frei.qsize(),
+            pid=os.getpid(),
+            laufend=sum(1 for inst in self._instanzen if inst.prozess is not None and inst.prozess.poll() is None),
+        )
+        return werte
+
+    def beenden(self) -> None:
+        for inst in self._instanzen:
+            inst.beenden()
+            shutil.rmtree(inst.profil_dir, ignore_errors=True)
+
+
+def _verwaiste_profile_entfernen(profil_basis: str) -> None:
+    """Profile beendeter Prozesse (p<pid>-s<n>) entfernen; nur POSIX (os.kill(pid, 0))."""
+    if sys.platform == 'win32' or not os.path.isdir(profil_basis):
+        return
+    for name in os.listdir(profil_basis):
+        if not name.startswith('p') or '-s' not in name:
+            continue
+        try:
+            pid = int(name[1:].split('-s', 1)[0])
+        except ValueError:
+            continue
+        if pid == os.getpid():
+            continue
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            shutil.rmtree(os.path.join(profil_basis, name), ignore_errors=True)
+        except OSError:
+            pass
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def _konfig(key):
+    try:
+        from flask import current_app, has_app_context
+        app = current_app if has_app_context() else _flask_app
+    except ImportError:
+        app = _flask_app
+    if app is not None and app.config.get(key) is not None:
+        return app.config.get(key)
+    return _STANDARD_KONFIG[key]
+
+
+def get_office_pool() -> OfficePool | None:
+    """Pool dieses Prozesses (nach fork neu angelegt); None, wenn LibreOffice fehlt."""
+    global _pool, _pool_pid
+    binary = finde_soffice()
+    if not binary:
+        return None
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = OfficePool(
+                binary,
+                groesse=_konfig('LIBREOFFICE_POOL_GROESSE'),
+                max_dokumente=_konfig('LIBREOFFICE_POOL_MAX_DOKUMENTE'),
+                timeout=_konfig('LIBREOFFICE_TIMEOUT_SEKUNDEN'),
+                wartezeit=_konfig('LIBREOFFICE_POOL_WARTEZEIT_SEKUNDEN'),
+                profil_basis=_konfig('LIBREOFFICE_PROFIL_ORDNER'),
+            )
+            _pool_pid = os.getpid()
+            atexit.register(_pool.beenden)
+            if not UNO_AVAILABLE:
+                log.warning(
+                    'LibreOffice-Pool ohne UNO (import uno fehlgeschlagen): soffice startet je Dokument neu. '
+                    'python3-uno für dieses Python installieren.'
+                )
+        return _pool
+
+
+def office_pool_vorwaermen() -> None:
+    """Im Hintergrund vorwärmen (Gunicorn post_fork / Dev-Server); ohne UNO ein No-op."""
+    if not UNO_AVAILABLE:
+        return
+    pool = get_office_pool()
+    if pool is not None:
+        threading.Thread(target=pool.vorwaermen, name='bis-office-vorwaermen', daemon=True).start()
+
+
+def office_pool_metriken() -> dict:
+    """Metriken des Pools dieses Prozesses (leer, solange noch nicht konvertiert wurde)."""
+    pool = _pool if _pool_pid == os.getpid() else None
+    if pool is None:
+        return {'modus': 'uno' if UNO_AVAILABLE else 'cli', 'pid': os.getpid(), 'soffice': finde_soffice()}
+    return pool.metriken()
@@ -0,0 +1,166 @@
+"""
+Report-Cache - fertig konvertierte PDFs inhaltsadressiert auf der Platte
+
+Der Schlüssel ist ein SHA-256 über die Berichtsart, den Inhalt der DOCX-Vorlage und alle
+Eingangsdaten (Kopfzeile, Positionen, Firmendaten, ggf. Bildliste). Ändert sich irgendein
+Eingang, ergibt sich ein neuer Schlüssel – eine explizite Invalidierung ist nicht nötig,
+veraltete Einträge fallen über die LRU-Verdrängung heraus.
+
+Die mtime einer Cache-Datei ist der Zeitpunkt der letzten Nutzung; überschreitet der Ordner
+REPORT_CACHE_MAX_MB, werden die am längsten nicht genutzten PDFs gelöscht (bis auf 90 % der
+Grenze). Den Ordner durchläuft das Aufräumen nur, wenn die mitgezählte Belegung die Grenze
+überschreitet oder der letzte Durchlauf länger als ``_DURCHLAUF_SPAETESTENS_SEKUNDEN`` her ist
+(Einträge anderer Prozesse); der Ordner liegt meist auf dem NAS. Er kann jederzeit geleert werden.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+from flask import current_app
+
+_vorlagen_hashes: dict = {}
+_aufraeumen_lock = threading.Lock()
+# Ordner -> (mitgezählte Belegung in Bytes, monotonic des letzten vollständigen Durchlaufs)
+_belegung: dict = {}
+_DURCHLAUF_SPAETESTENS_SEKUNDEN = 600
+
+
+def _cache_ordner():
+    try:
+        if int(current_app.config.get('REPORT_CACHE_MAX_MB', 200)) <= 0:
+            return None
+        return current_app.config.get('REPORT_CACHE_FOLDER') or os.path.join(
+            current_app.config['UPLOAD_BASE_FOLDER'], 'Cache', 'Berichte')
+    except (RuntimeError, KeyError):
+        return None
+
+
+def _vorlagen_hash(template_path):
+    """SHA-256 der Vorlage; neu berechnet nur, wenn sich mtime oder Größe ändern."""
+    st = os.stat(template_path)
+    merkmal = (st.st_mtime_ns, st.st_size)
+    eintrag = _vorlagen_hashes.get(template_path)
+    if eintrag and eintrag[0] == merkmal:
+        return eintrag[1]
+    with open(template_path, 'rb') as f:
+        wert = hashlib.sha256(f.read()).hexdigest()
+    _vorlagen_hashes[template_path] = (merkmal, wert)
+    return wert
+
+
+def _normalisieren(wert):
+    """DB-Zeilen (sqlite3.Row, Dict-Rows) und Listen davon in JSON-fähige Strukturen umwandeln."""
+    if wert is None or isinstance(wert, (str, int, float, bool)):
+        return wert
+    if isinstance(wert, (bytes, bytearray, memoryview)):
+        return hashlib.sha256(bytes(wert)).hexdigest()
+    if hasattr(wert, 'keys'):
+        return {str(k): _normalisieren(wert[k]) for k in wert.keys()}
+    if isinstance(wert, (list, tuple)):
+        return [_normalisieren(w) for w in wert]
+    return str(wert)
+
+
+def report_schluessel(art, template_path, *daten):
+    """Cache-Schlüssel für einen Bericht aus Vorlage und Eingangsdaten."""
+    h = hashlib.sha256()
+    h.update(art.encode('utf-8'))
+    h.update(_vorlagen_hash(template_path).encode('ascii'))
+    h.update(json.dumps(_normalisieren(list(daten)), sort_keys=True, default=str).encode('utf-8'))
+    return h.hexdigest()
+
+
+def _eintrag_pfad(ordner, schluessel):
+    return os.path.join(ordner, schluessel[:2], f'{schluessel}.pdf')
+
+
+def hole_report(schluessel):
+    """Gecachtes PDF (bytes) oder None; ein Treffer zählt als Nutzung für die LRU-Reihenfolge."""
+    ordner = _cache_ordner()
+    if not ordner or not schluessel:
+        return None
+    pfad = _eintrag_pfad(ordner, schluessel)
+    try:
+        with open(pfad, 'rb') as f:
+            inhalt = f.read()
+        os.utime(pfad)
+    except OSError:
+        return None
+    return inhalt or None
+
+
+def speichere_report(schluessel, inhalt):
+    """PDF atomar ablegen und den Ordner bei Bedarf auf REPORT_CACHE_MAX_MB verkleinern."""
+    ordner = _cache_ordner()
+    if not ordner or not schluessel or not inhalt:
+        return
+    pfad = _eintrag_pfad(ordner, schluessel)
+    try:
+        vorher = os.stat(pfad).st_size
+    except OSError:
+        vorher = 0
+    try:
+        os.makedirs(os.path.dirname(pfad), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(pfad), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(inhalt)
+            os.replace(tmp, pfad)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+    except OSError as e:
+        print(f"Report-Cache: Konnte {pfad} nicht schreiben: {e}")
+        return
+    _belegung_fortschreiben(ordner, int(current_app.config.get('REPORT_CACHE_MAX_MB', 200)) * 1024 * 1024,
+                            len(inhalt) - vorher)
+
+
+def _belegung_fortschreiben(ordner, max_bytes, zuwachs):
+    """Belegung mitzählen; den Ordner nur bei Überschreitung oder nach Ablauf der Frist durchlaufen."""
+    with _aufraeumen_lock:
+        eintrag = _belegung.get(ordner)
+        if eintrag is not None:
+            belegt = eintrag[0] + zuwachs
+            _belegung[ordner] = (belegt, eintrag[1])
+            if belegt <= max_bytes and time.monotonic() - eintrag[1] < _DURCHLAUF_SPAETESTENS_SEKUNDEN:
+                return
+    _aufraeumen(ordner, max_bytes)
+
+
+def _aufraeumen(ordner, max_bytes):
+    """Am längsten nicht genutzte Einträge löschen, bis der Ordner unter 90 % von max_bytes liegt."""
+    with _aufraeumen_lock:
+        eintraege = []
+        gesamt = 0
+        for wurzel, _, dateien in os.walk(ordner):
+            for name in dateien:
+                if not name.endswith('.pdf'):
+                    continue
+                pfad = os.path.join(wurzel, name)
+                try:
+                    st = os.stat(pfad)
+                except OSError:
+                    continue
+                eintraege.append((st.st_mtime, st.st_size, pfad))
+                gesamt += st.st_size
+        if gesamt > max_bytes:
+            # Etwas Luft lassen, sonst löst schon der nächste Eintrag wieder einen Durchlauf aus
+            ziel = max_bytes * 9 // 10
+            eintraege.sort()
+            for _, groesse, pfad in eintraege:
+                try:
+                    os.unlink(pfad)
+                    gesamt -= groesse
+                except OSError:
+                    pass
+                if gesamt <= ziel:
+                    break
+        _belegung[ordner] = (gesamt, time.monotonic())
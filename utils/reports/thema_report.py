@@ -13,6 +13,7 @@ from docx.shared import Mm, Pt
 from utils.firmendaten import get_firmendaten
 from utils.helpers import safe_get, format_schichtbuch_datum
 from .pdf_export import convert_docx_to_pdf
+from .report_cache import hole_report, report_schluessel, speichere_report
 
 try:
     from docx2pdf import convert
@@ -198,6 +199,29 @@ def generate_thema_pdf(thema_id, conn):
     if not os.path.exists(template_path):
         raise FileNotFoundError('Themenvorlage nicht gefunden.')
     
+    upload_ordner = current_app.config.get('SCHICHTBUCH_UPLOAD_FOLDER')
+    thema_bilder = _thema_bilddateien_sortiert(thema_id, upload_ordner)
+    
+    # Bereits konvertiertes PDF mit identischen Eingangsdaten wiederverwenden. Das Exportdatum
+    # geht nur tagesgenau ein; ein Treffer zeigt den Zeitpunkt der ersten Konvertierung.
+    cache_schluessel = None
+    if DOCX2PDF_AVAILABLE:
+        bild_merkmale = []
+        for name, pfad in thema_bilder:
+            try:
+                st = os.stat(pfad)
+                bild_merkmale.append((name, st.st_mtime_ns, st.st_size))
+            except OSError:
+                pass
+        cache_schluessel = report_schluessel(
+            'thema', template_path, thema, sichtbarkeiten, zusatz_gewerke, bemerkungen,
+            ersatzteile, firmendaten, bild_merkmale, datetime.now().strftime('%Y-%m-%d'),
+        )
+        pdf_content = hole_report(cache_schluessel)
+        if pdf_content is not None:
+            filename = f"Thema_{thema_id}_{datetime.now().strftime('%Y%m%d')}.pdf"
+            return (pdf_content, filename, 'application/pdf', True)
+    
     # Template laden
     doc = DocxTemplate(template_path)
     
@@ -354,9 +378,6 @@ def generate_thema_pdf(thema_id, conn):
     
     # Template rendern
     doc.render(context)
-
-    upload_ordner = current_app.config.get('SCHICHTBUCH_UPLOAD_FOLDER')
-    thema_bilder = _thema_bilddateien_sortiert(thema_id, upload_ordner)
     _fotos_an_dokument_anhaengen(doc, thema_bilder)
     
     # Als PDF konvertieren oder DOCX zurückgeben
@@ -385,6 +406,7 @@ def generate_thema_pdf(thema_id, conn):
                 # Temporäre Dateien löschen
                 os.unlink(tmp_docx_path)
                 os.unlink(tmp_pdf_path)
+                speichere_report(cache_schluessel, pdf_content)
                 
                 filename = f"Thema_{thema_id}_{datetime.now().strftime('%Y%m%d')}.pdf"
                 return (pdf_content, filename, 'application/pdf', True)
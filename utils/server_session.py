@@ -0,0 +1,283 @@
+"""
+Serverseitige Sessions
+
+Flask legt die Session standardmäßig komplett im signierten Cookie ab. In BIS stehen dort
+u. a. der Navigationsverlauf (``bis_nav_history``, bis zu 20 Einträge), die Menü-Sichtbarkeit
+und die Berechtigungen – mehrere KB, die der Browser bei jedem Request mitschickt und die der
+Server bei jeder Änderung neu setzt.
+
+Mit ``SESSION_BACKEND`` = ``db`` (Standard) oder ``redis`` enthält das Cookie nur noch eine
+signierte Zufalls-ID; die Daten liegen in der Tabelle ``ServerSession`` bzw. unter
+``bis:session:<hash>`` in Redis. Gespeichert wird nur, wenn sich der serialisierte Inhalt
+gegenüber dem geladenen Stand geändert hat; sonst wird die Ablaufzeit höchstens alle
+SESSION_VERLAENGERN_NACH_SEKUNDEN verlängert. Wechselt der angemeldete Benutzer, erhält die
+Session eine neue ID. ``SESSION_BACKEND=cookie`` behält das bisherige Verhalten bei.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import secrets
+import time
+
+from flask.sessions import SessionInterface, SessionMixin, session_json_serializer
+from itsdangerous import BadSignature, Signer
+from werkzeug.datastructures import CallbackDict
+
+from utils.database import get_db_connection
+
+log = logging.getLogger('bis.session')
+
+SESSION_BACKENDS = ('db', 'redis', 'cookie')
+_REDIS_PREFIX = 'bis:session:'
+_BEREINIGUNG_INTERVALL_SEKUNDEN = 600
+
+_tabelle_bereit = False
+_letzte_bereinigung = 0.0
+
+
+def _schluessel(sid: str) -> str:
+    """Im Speicher steht nur der Hash der ID (ein DB-Dump erlaubt keine Übernahme)."""
+    return hashlib.sha256(sid.encode('ascii')).hexdigest()
+
+
+class ServerSession(CallbackDict, SessionMixin):
+    """Session-Daten plus Stand beim Laden (für die Änderungserkennung)."""
+
+    def __init__(self, initial=None, sid=None, geladen=None, ablauf=0):
+        def on_update(self):
+            self.modified = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.geladen = geladen
+        self.ablauf = ablauf
+        self.benutzer_beim_laden = (initial or {}).get('user_id')
+        self.modified = False
+
+
+class _DbSpeicher:
+    """Tabelle ``ServerSession`` (utils.db_schema); wird bei Bedarf lazy angelegt."""
+
+    def _tabelle_sicherstellen(self) -> None:
+        global _tabelle_bereit
+        if _tabelle_bereit:
+            return
+        try:
+            from utils.database import get_engine
+            from utils.db_schema import ServerSession as _ServerSession
+
+            _ServerSession.create(get_engine(), checkfirst=True)
+            _tabelle_bereit = True
+        except Exception:
+            pass
+
+    def laden(self, sid):
+        self._tabelle_sicherstellen()
+        with get_db_connection() as conn:
+            row = conn.execute(
+                'SELECT payload, expires_at FROM ServerSession WHERE session_id = ?', (_schluessel(sid),)
+            ).fetchone()
+        if not row or row['expires_at'] < int(time.time()):
+            return None
+        return row['payload'], row['expires_at']
+
+    def speichern(self, sid, payload, ttl) -> None:
+        global _letzte_bereinigung
+        self._tabelle_sicherstellen()
+        jetzt = int(time.time())
+        with get_db_connection() as conn:
+            cur = conn.execute(
+                'UPDATE ServerSession SET payload = ?, updated_at = ?, expires_at = ? WHERE session_id = ?',
+                (payload, jetzt, jetzt + ttl, _schluessel(sid)),
+            )
+            if cur.rowcount == 0:
+                conn.execute(
+                    'INSERT INTO ServerSession (session_id, payload, updated_at, expires_at) VALUES (?, ?, ?, ?)',
+                    (_schluessel(sid), payload, jetzt, jetzt + ttl),
+                )
+            if time.monotonic() - _letzte_bereinigung > _BEREINIGUNG_INTERVALL_SEKUNDEN:
+                _letzte_bereinigung = time.monotonic()
+                conn.execute('DELETE FROM ServerSession WHERE expires_at < ?', (jetzt,))
+
+    def verlaengern(self, sid, ttl) -> None:
+        with get_db_connection() as conn:
+            conn.execute(
+                'UPDATE ServerSession SET expires_at = ? WHERE session_id = ?',
+                (int(time.time()) + ttl, _schluessel(sid)),
+            )
+
+    def loeschen(self, sid) -> None:
+        with get_db_connection() as conn:
+            conn.execute('DELETE FROM ServerSession WHERE session_id = ?', (_schluessel(sid),))
+
+
+class _RedisSpeicher:
+    """Ein String je Session mit Redis-TTL. Bei Redis-Ausfall gilt die Session als leer."""
+
+    def __init__(self, url, connect_timeout=0.25, timeout=1.0):
+        import redis
+
+        self._client = redis.from_url(
+            url, socket_connect_timeout=connect_timeout, socket_timeout=timeout
+        )
+
+    def laden(self, sid):
+        from redis.exceptions import RedisError
+
+        try:
+            pipe = self._client.pipeline()
+            pipe.get(_REDIS_PREFIX + _schluessel(sid))
+            pipe.ttl(_REDIS_PREFIX + _schluessel(sid))
+            payload, ttl = pipe.execute()
+        except RedisError as e:
+            log.warning('Session aus Redis nicht lesbar: %s', e)
+            return None
+        if payload is None:
+            return None
+        return payload.decode('utf-8'), int(time.time()) + max(int(ttl), 0)
+
+    def _schreiben(self, methode, *args, **kwargs) -> None:
+        from redis.exceptions import RedisError
+
+        try:
+            getattr(self._client, methode)(*args, **kwargs)
+        except RedisError as e:
+            log.warning('Session in Redis nicht gespeichert (%s): %s', methode, e)
+
+    def speichern(self, sid, payload, ttl) -> None:
+        self._schreiben('set', _REDIS_PREFIX + _schluessel(sid), payload.encode('utf-8'), ex=ttl)
+
+    def verlaengern(self, sid, ttl) -> None:
+        self._schreiben('expire', _REDIS_PREFIX + _schluessel(sid), ttl)
+
+    def loeschen(self, sid) -> None:
+        self._schreiben('delete', _REDIS_PREFIX + _schluessel(sid))
+
+
+class ServerSessionInterface(SessionInterface):
+    """Cookie = signierte Session-ID, Daten im Speicher (``_DbSpeicher`` / ``_RedisSpeicher``)."""
+
+    serializer = session_json_serializer
+    salt = 'bis-server-session'
+
+    def __init__(self, speicher, verlaengern_nach=300):
+        self.speicher = speicher
+        self.verlaengern_nach = max(int(verlaengern_nach), 0)
+
+    def _signer(self, app):
+        if not app.secret_key:
+            return None
+        return Signer(app.secret_key, salt=self.salt)
+
+    def open_session(self, app, request):
+        signer = self._signer(app)
+        if signer is None:
+            return None
+        # Statische Dateien brauchen keine Session (kein Speicherzugriff je Asset)
+        if app.static_url_path and request.path.startswith(app.static_url_path + '/'):
+            return None
+        wert = request.cookies.get(self.get_cookie_name(app))
+        if not wert:
+            return ServerSession()
+        try:
+            sid = signer.unsign(wert).decode('ascii')
+        except BadSignature:
+            return ServerSession()
+        gespeichert = self.speicher.laden(sid)
+        if gespeichert is None:
+            return ServerSession()
+        payload, ablauf = gespeichert
+        try:
+            daten = self.serializer.loads(payload)
+        except ValueError:
+            return ServerSession()
+        return ServerSession(daten, sid=sid, geladen=payload, ablauf=ablauf)
+
+    def save_session(self, app, session, response):
+        if not isinstance(session, ServerSession):
+            return
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        secure = self.get_cookie_secure(app)
+        samesite = self.get_cookie_samesite(app)
+        httponly = self.get_cookie_httponly(app)
+
+        if session.sid:
+            response.vary.add('Cookie')
+
+        if not session:
+            if session.sid:
+                self.speicher.loeschen(session.sid)
+                response.delete_cookie(
+                    name, domain=domain, path=path, secure=secure, samesite=samesite, httponly=httponly
+                )
+            return
+
+        payload = self.serializer.dumps(dict(session))
+        ttl = int(app.permanent_session_lifetime.total_seconds())
+        jetzt = int(time.time())
+
+        if session.sid and session.get('user_id') != session.benutzer_beim_laden:
+            # Anmeldung/Benutzerwechsel: neue ID, alte verwerfen (Session Fixation)
+            self.speicher.loeschen(session.sid)
+            session.sid = None
+
+        cookie_setzen = False
+        verlaengern = session.ablauf - jetzt < ttl - self.verlaengern_nach
+        if not session.sid:
+            session.sid = secrets.token_urlsafe(32)
+            self.speicher.speichern(session.sid, payload, ttl)
+            cookie_setzen = True
+        elif payload != session.geladen:
+            self.speicher.speichern(session.sid, payload, ttl)
+            cookie_setzen = verlaengern and session.permanent
+        elif verlaengern:
+            self.speicher.verlaengern(session.sid, ttl)
+            cookie_setzen = session.permanent
+
+        if cookie_setzen:
+            response.vary.add('Cookie')
+            response.set_cookie(
+                name,
+                self._signer(app).sign(session.sid).decode('ascii'),
+                expires=self.get_expiration_time(app, session),
+                httponly=httponly,
+                domain=domain,
+                path=path,
+                secure=secure,
+                samesite=samesite,
+            )
+
+
+def init_server_session(app) -> None:
+    """Session-Backend gemäß ``SESSION_BACKEND`` setzen (von app.py aufgerufen)."""
+    backend = (app.config.get('SESSION_BACKEND') or 'db').strip().lower()
+    if backend not in SESSION_BACKENDS:
+        log.warning('Unbekanntes SESSION_BACKEND %r, verwende db', backend)
+        backend = 'db'
+    if backend == 'cookie':
+        return
+
+    speicher = None
+    if backend == 'redis':
+        from utils.beleuchtung_redis import resolve_redis_url
+
+        url = resolve_redis_url(app.config, None)
+        if url:
+            optionen = app.config.get('RATELIMIT_STORAGE_OPTIONS') or {}
+            speicher = _RedisSpeicher(
+                url,
+                connect_timeout=optionen.get('socket_connect_timeout', 0.25),
+                timeout=optionen.get('socket_timeout', 1.0),
+            )
+        else:
+            log.warning('SESSION_BACKEND=redis ohne Redis-URL, verwende db')
+    if speicher is None:
+        speicher = _DbSpeicher()
+
+    app.session_interface = ServerSessionInterface(
+        speicher, verlaengern_nach=app.config.get('SESSION_VERLAENGERN_NACH_SEKUNDEN', 300)
+    )
@@ -0,0 +1,408 @@
+"""
+Stammdaten-Cache (versioniert, je Prozess)
+
+Kleine Referenztabellen (Abteilungen, Bereiche, Gewerke, Status, Lieferanten, Lagerorte,
+Etikettendrucker, ...) ändern sich selten, werden aber auf vielen Seiten gelesen.
+``get_stammdaten(name)`` liefert die Zeilen einer registrierten Abfrage aus dem Cache des
+Prozesses (Liste von Dicts, je Aufruf kopiert); ``nur_aktiv=True`` filtert auf ``Aktiv``.
+
+Jede Abfrage hängt von einer oder mehreren Tabellen ab, jede Tabelle hat eine Versionsnummer.
+Ändert eine Route eine dieser Tabellen, erhöht ``stammdaten_invalidieren('Bereich')`` deren
+Version; alle davon abhängigen Einträge werden beim nächsten Zugriff neu geladen. Die
+Admin-Routen tun das per Dekorator ``@stammdaten_aendern(...)``.
+
+Mit Redis (``init_stammdaten_cache``, URL wie BIS_REDIS_URL) werden die Versionen zusätzlich
+in einem Redis-Hash hochgezählt; jeder Worker gleicht ihn höchstens einmal je
+STAMMDATEN_REDIS_ABGLEICH_SEKUNDEN ab und sieht Änderungen anderer Worker damit fast sofort.
+Ohne Redis (oder bei Ausfall) verfällt ein Eintrag in anderen Workern spätestens nach
+STAMMDATEN_CACHE_SEKUNDEN (Default 30).
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from functools import wraps
+
+from flask import current_app, has_app_context
+
+from utils.database import get_db_connection
+from utils.database_check_helpers import column_exists
+from utils.helpers import row_to_dict
+
+STAMMDATEN_CACHE_SEKUNDEN = 30
+STAMMDATEN_REDIS_ABGLEICH_SEKUNDEN = 1.0
+# Nach einem Redis-Fehler erst nach dieser Pause erneut versuchen
+_REDIS_PAUSE_NACH_FEHLER = 30.0
+REDIS_HASH_STAMMDATEN = 'bis:stammdaten:versionen'
+
+log = logging.getLogger('bis.stammdaten')
+
+_lock = threading.Lock()
+# Tabelle -> Version (fehlend = 0); lokal im Prozess hochgezählt
+_versionen: dict[str, int] = {}
+# Tabelle -> Version aus Redis (alle Worker), zuletzt abgeglichen
+_versionen_redis: dict[str, int] = {}
+# Name -> (Versionen der Tabellen beim Laden, Ladezeitpunkt, Zeilen)
+_eintraege: dict[str, tuple[tuple[int, ...], float, list[dict]]] = {}
+# Name -> (Tabellen, Loader(conn) -> Zeilen)
+_abfragen: dict[str, tuple[tuple[str, ...], object]] = {}
+
+# Caches anderer Module, die aus Stammdaten abgeleitet sind (mit geleert)
+_abgeleitete_caches: list[dict] = []
+
+_redis = None
+_redis_naechster_abgleich = 0.0
+
+
+def stammdaten_abfrage(name, *tabellen):
+    """Registriert ``loader(conn)`` als Stammdaten-Abfrage ``name``, abhängig von ``tabellen``."""
+    def decorator(loader):
+        _abfragen[name] = (tabellen, loader)
+        return loader
+    return decorator
+
+
+def _max_alter():
+    if has_app_context():
+        return current_app.config.get('STAMMDATEN_CACHE_SEKUNDEN', STAMMDATEN_CACHE_SEKUNDEN)
+    return STAMMDATEN_CACHE_SEKUNDEN
+
+
+def _stand(tabellen):
+    return tuple(_versionen.get(t, 0) + _versionen_redis.get(t, 0) for t in tabellen)
+
+
+def _kopien(zeilen, nur_aktiv):
+    # Aktiv-Spalte: deutsch in den Stammdaten, englisch bei Drucker-Tabellen
+    return [dict(z) for z in zeilen if not nur_aktiv or z.get('Aktiv', z.get('active'))]
+
+
+def init_stammdaten_cache(app):
+    """Redis-Abgleich der Versionen aktivieren, falls eine Redis-URL konfiguriert ist (app.py)."""
+    global _redis
+    if not app.config.get('STAMMDATEN_CACHE_REDIS', True):
+        return
+    from utils.beleuchtung_redis import resolve_redis_url
+
+    url = resolve_redis_url(app.config, None)
+    if not url:
+        return
+    try:
+        import redis
+    except ImportError:
+        log.warning('Stammdaten-Cache: redis-Paket fehlt, nur lokale Invalidierung')
+        return
+    optionen = app.config.get('RATELIMIT_STORAGE_OPTIONS') or {}
+    _redis = redis.from_url(
+        url,
+        decode_responses=True,
+        socket_connect_timeout=optionen.get('socket_connect_timeout', 0.25),
+        socket_timeout=optionen.get('socket_timeout', 1.0),
+    )
+
+
+def _redis_fehler(e):
+    global _redis_naechster_abgleich
+    _redis_naechster_abgleich = time.monotonic() + _REDIS_PAUSE_NACH_FEHLER
+    log.warning('Stammdaten-Cache: Redis nicht erreichbar (%s), nur lokale Invalidierung', e)
+
+
+def _redis_abgleichen():
+    """Versionen aus Redis übernehmen (höchstens einmal je Abgleich-Intervall)."""
+    global _redis_naechster_abgleich
+    if _redis is None or time.monotonic() < _redis_naechster_abgleich:
+        return
+    from redis.exceptions import RedisError
+
+    _redis_naechster_abgleich = time.monotonic() + STAMMDATEN_REDIS_ABGLEICH_SEKUNDEN
+    try:
+        werte = _redis.hgetall(REDIS_HASH_STAMMDATEN)
+    except RedisError as e:
+        _redis_fehler(e)
+        return
+    with _lock:
+        for tabelle, version in werte.items():
+            _versionen_redis[tabelle] = int(version)
+
+
+def get_stammdaten(name, conn=None, nur_aktiv=False):
+    """
+    Zeilen der Stammdaten-Abfrage ``name`` (aus dem Cache oder frisch geladen).
+
+    Args:
+        name: Name einer mit ``stammdaten_abfrage`` registrierten Abfrage
+        conn: Optionale Datenbankverbindung (nur beim Neuladen verwendet)
+        nur_aktiv: Nur Zeilen mit gesetztem ``Aktiv`` liefern
+
+    Returns:
+        Liste von Dicts (Kopien, dürfen verändert werden)
+    """
+    tabellen, loader = _abfragen[name]
+    _redis_abgleichen()
+    with _lock:
+        stand = _stand(tabellen)
+        eintrag = _eintraege.get(name)
+    if eintrag and eintrag[0] == stand and time.monotonic() - eintrag[1] < _max_alter():
+        return _kopien(eintrag[2], nur_aktiv)
+
+    if conn is None:
+        with get_db_connection() as neue_conn:
+            zeilen = [row_to_dict(r) for r in loader(neue_conn)]
+    else:
+        zeilen = [row_to_dict(r) for r in loader(conn)]
+
+    with _lock:
+        # Nur speichern, wenn während des Ladens niemand invalidiert hat
+        if _stand(tabellen) == stand:
+            _eintraege[name] = (stand, time.monotonic(), zeilen)
+    return _kopien(zeilen, nur_aktiv)
+
+
+def stammdaten_invalidieren(*tabellen):
+    """Erhöht die Version der Tabellen (lokal und in Redis); abhängige Einträge werden neu geladen."""
+    with _lock:
+        for tabelle in tabellen:
+            _versionen[tabelle] = _versionen.get(tabelle, 0) + 1
+    if _redis is None:
+        return
+    from redis.exceptions import RedisError
+
+    try:
+        pipe = _redis.pipeline()
+        for tabelle in tabellen:
+            pipe.hincrby(REDIS_HASH_STAMMDATEN, tabelle, 1)
+        neu = pipe.execute()
+    except RedisError as e:
+        _redis_fehler(e)
+        return
+    with _lock:
+        for tabelle, version in zip(tabellen, neu):
+            _versionen_redis[tabelle] = max(_versionen_redis.get(tabelle, 0), int(version))
+
+
+def stammdaten_version(*tabellen):
+    """Summe der Tabellenversionen (z. B. als Teil eines ETags)."""
+    with _lock:
+        return sum(_stand(tabellen))
+
+
+def stammdaten_aendern(*tabellen):
+    """Dekorator für Routen, die Stammdaten schreiben: invalidiert nach dem Aufruf."""
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            try:
+                return f(*args, **kwargs)
+            finally:
+                stammdaten_invalidieren(*tabellen)
+        return wrapper
+    return decorator
+
+
+def abgeleiteten_cache_registrieren(cache: dict) -> None:
+    """Dict-Cache eines anderen Moduls bei ``stammdaten_cache_leeren`` mit leeren."""
+    _abgeleitete_caches.append(cache)
+
+
+def stammdaten_cache_leeren():
+    """Verwirft alle Einträge (Tests, Datenbank-Reparatur)."""
+    with _lock:
+        _eintraege.clear()
+        for cache in _abgeleitete_caches:
+            cache.clear()
+
+
+def _hat_spalte(conn, tabelle, spalte):
+    try:
+        return column_exists(conn, tabelle, spalte)
+    except Exception:
+        return False
+
+
+# ========== Abfragen ==========
+
+@stammdaten_abfrage('abteilungen', 'Abteilung')
+def _abteilungen(conn):
+    return conn.execute('''
+        SELECT a.ID, a.Bezeichnung, a.ParentAbteilungID, a.Aktiv, a.Sortierung,
+               p.Bezeichnung AS ParentBezeichnung
+        FROM Abteilung a
+        LEFT JOIN Abteilung p ON a.ParentAbteilungID = p.ID
+        ORDER BY COALESCE(p.Bezeichnung, a.Bezeichnung), a.Bezeichnung
+    ''').fetchall()
+
+
+@stammdaten_abfrage('abteilungen_liste', 'Abteilung')
+def _abteilungen_liste(conn):
+    return conn.execute(
+        'SELECT ID, Bezeichnung, ParentAbteilungID, Aktiv, Sortierung FROM Abteilung ORDER BY Sortierung, Bezeichnung'
+    ).fetchall()
+
+
+@stammdaten_abfrage('bereiche', 'Bereich')
+def _bereiche(conn):
+    return conn.execute('SELECT ID, Bezeichnung, Aktiv FROM Bereich ORDER BY Bezeichnung').fetchall()
+
+
+@stammdaten_abfrage('gewerke', 'Gewerke', 'Bereich')
+def _gewerke(conn):
+    return conn.execute('''
+        SELECT G.ID, G.Bezeichnung, B.Bezeichnung AS Bereich, G.BereichID, G.Aktiv
+        FROM Gewerke G
+        JOIN Bereich B ON G.BereichID = B.ID
+        ORDER BY B.Bezeichnung, G.Bezeichnung
+    ''').fetchall()
+
+
+@stammdaten_abfrage('gewerke_aktiv', 'Gewerke', 'Bereich')
+def _gewerke_aktiv(conn):
+    return conn.execute('''
+        SELECT G.ID, G.Bezeichnung, G.BereichID, B.Bezeichnung AS Bereich
+        FROM Gewerke G
+        JOIN Bereich B ON G.BereichID = B.ID
+        WHERE G.Aktiv = 1 AND B.Aktiv = 1
+        ORDER BY B.Bezeichnung, G.Bezeichnung
+    ''').fetchall()
+
+
+@stammdaten_abfrage('taetigkeiten', 'Taetigkeit')
+def _taetigkeiten(conn):
+    return conn.execute(
+        'SELECT ID, Bezeichnung, Sortierung, Aktiv FROM Taetigkeit ORDER BY Sortierung ASC, Bezeichnung ASC'
+    ).fetchall()
+
+
+@stammdaten_abfrage('status', 'Status')
+def _status(conn):
+    return conn.execute(
+        'SELECT ID, Bezeichnung, Farbe, Sortierung, Aktiv FROM Status ORDER BY Sortierung ASC, Bezeichnung ASC'
+    ).fetchall()
+
+
+@stammdaten_abfrage('ersatzteil_kategorien', 'ErsatzteilKategorie')
+def _ersatzteil_kategorien(conn):
+    return conn.execute(
+        'SELECT ID, Bezeichnung, Beschreibung, Aktiv, Sortierung FROM ErsatzteilKategorie '
+        'ORDER BY Sortierung ASC, Bezeichnung ASC'
+    ).fetchall()
+
+
+@stammdaten_abfrage('lieferanten', 'Lieferant')
+def _lieferanten(conn):
+    return conn.execute(
+        'SELECT ID, Name, Kontaktperson, Telefon, Email, Strasse, PLZ, Ort, Website, CsvExportReihenfolge, Aktiv '
+        'FROM Lieferant WHERE Gelöscht = 0 ORDER BY Name'
+    ).fetchall()
+
+
+@stammdaten_abfrage('fremdfirmen', 'Fremdfirma')
+def _fremdfirmen(conn):
+    return conn.execute(
+        'SELECT ID, Firmenname, Adresse, Taetigkeitsbereich, Aktiv FROM Fremdfirma ORDER BY Firmenname'
+    ).fetchall()
+
+
+@stammdaten_abfrage('kostenstellen', 'Kostenstelle')
+def _kostenstellen(conn):
+    return conn.execute(
+        'SELECT ID, Bezeichnung, Beschreibung, Aktiv, Sortierung FROM Kostenstelle '
+        'ORDER BY Sortierung ASC, Bezeichnung ASC'
+    ).fetchall()
+
+
+@stammdaten_abfrage('lagerorte', 'Lagerort')
+def _lagerorte(conn):
+    return conn.execute(
+        'SELECT ID, Bezeichnung, Beschreibung, Aktiv, Sortierung FROM Lagerort '
+        'ORDER BY Sortierung ASC, Bezeichnung ASC'
+    ).fetchall()
+
+
+@stammdaten_abfrage('lagerplaetze', 'Lagerplatz')
+def _lagerplaetze(conn):
+    return conn.execute(
+        'SELECT ID, Bezeichnung, Beschreibung, Aktiv, Sortierung FROM Lagerplatz '
+        'ORDER BY Sortierung ASC, Bezeichnung ASC'
+    ).fetchall()
+
+
+@stammdaten_abfrage('firmendaten', 'Firmendaten')
+def _firmendaten(conn):
+    return conn.execute('SELECT * FROM Firmendaten LIMIT 1').fetchall()
+
+
+@stammdaten_abfrage('berechtigungen', 'Berechtigung')
+def _berechtigungen(conn):
+    return conn.execute(
+        'SELECT ID, Schluessel, Bezeichnung, Beschreibung, Aktiv FROM Berechtigung ORDER BY Bezeichnung'
+    ).fetchall()
+
+
+@stammdaten_abfrage('zebra_printers', 'zebra_printers', 'print_agents')
+def _zebra_printers(conn):
+    if _hat_spalte(conn, 'zebra_printers', 'agent_id'):
+        return conn.execute('''
+            SELECT p.id, p.name, p.ip_address, p.description, p.ort, p.active,
+                   p.agent_id, a.name AS agent_name
+            FROM zebra_printers p
+            LEFT JOIN print_agents a ON p.agent_id = a.id
+            ORDER BY COALESCE(p.ort, ''), p.name
+        ''').fetchall()
+    return conn.execute('''
+        SELECT p.id, p.name, p.ip_address, p.description, p.ort, p.active,
+               NULL AS agent_id, NULL AS agent_name
+        FROM zebra_printers p
+        ORDER BY COALESCE(p.ort, ''), p.name
+    ''').fetchall()
+
+
+@stammdaten_abfrage('print_agents', 'print_agents')
+def _print_agents(conn):
+    return conn.execute('SELECT id, name, standort, active FROM print_agents ORDER BY name').fetchall()
+
+
+@stammdaten_abfrage('label_formats', 'label_formats')
+def _label_formats(conn):
+    if _hat_spalte(conn, 'label_formats', 'zpl_zusatz'):
+        return conn.execute('''
+            SELECT id, name, description, width_mm, height_mm, orientation, zpl_header, zpl_zusatz
+            FROM label_formats
+            ORDER BY name
+        ''').fetchall()
+    return conn.execute('''
+        SELECT id, name, description, width_mm, height_mm, orientation, zpl_header, '' AS zpl_zusatz
+        FROM label_formats
+        ORDER BY name
+    ''').fetchall()
+
+
+@stammdaten_abfrage('etiketten', 'Etikett', 'label_formats')
+def _etiketten(conn):
+    return conn.execute('''
+        SELECT e.id, e.bezeichnung, e.etikettformat_id, e.druckbefehle,
+               lf.zpl_header
+        FROM Etikett e
+        LEFT JOIN label_formats lf ON e.etikettformat_id = lf.id
+        ORDER BY e.bezeichnung
+    ''').fetchall()
+
+
+@stammdaten_abfrage('etikett_druck_konfigen', 'etikett_druck_konfig', 'etikett_druck_konfig_abteilung', 'Etikett')
+def _etikett_druck_konfigen(conn):
+    konfig_abt = {}
+    for row in conn.execute('SELECT konfig_id, abteilung_id FROM etikett_druck_konfig_abteilung'):
+        konfig_abt.setdefault(row['konfig_id'], []).append(row['abteilung_id'])
+    konfigen = []
+    for r in conn.execute('''
+        SELECT k.id, k.funktion_code, k.etikett_id, k.drucker_id, k.prioritaet, k.aktiv,
+               e.bezeichnung AS etikett_bezeichnung
+        FROM etikett_druck_konfig k
+        JOIN Etikett e ON e.id = k.etikett_id
+        ORDER BY k.funktion_code, k.prioritaet DESC, k.id
+    ''').fetchall():
+        d = dict(r)
+        d['abteilung_ids'] = konfig_abt.get(r['id'], [])
+        konfigen.append(d)
+    return konfigen
@@ -0,0 +1,196 @@
+"""
+Fingerprinting und Vorkomprimierung der statischen Assets.
+
+``assets_bauen`` kopiert CSS/JS/Schriften/Icons aus ``static/`` nach ``static/dist/`` unter einem
+Namen mit Inhaltshash (``bootstrap.min.css`` -> ``bootstrap.min.1a2b3c4d5e.css``), legt für
+Textformate ``.gz``- und (falls das Paket ``brotli`` installiert ist) ``.br``-Geschwister an und
+schreibt ``static/dist/manifest.json``. Relative ``url(...)``-Verweise in CSS (z. B. auf die
+Bootstrap-Icons-Schrift) zeigen danach ebenfalls auf die gehashten Dateien.
+
+``init_static_assets`` baut beim App-Start (unter Gunicorn einmal im Master), biegt
+``url_for('static', filename=...)`` auf die gehashten Namen um und liefert ``dist/`` mit
+``Cache-Control: immutable`` und einem Jahr ``max-age`` aus, vorkomprimiert je nach
+``Accept-Encoding``. Bereits gebaute Dateien bleiben liegen, damit Seiten aus dem alten Stand
+ihre Assets nach einem Deployment weiterhin laden können.
+
+Manuell (z. B. im Docker-Build): ``python -m utils.static_assets`` bzw. ``flask assets-bauen``.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import posixpath
+import re
+
+try:
+    import brotli
+except ImportError:  # optional: ohne brotli nur .gz
+    brotli = None
+
+log = logging.getLogger('bis.static')
+
+DIST_ORDNER = 'dist'
+MANIFEST_NAME = 'manifest.json'
+HASH_LAENGE = 10
+MAX_ALTER_SEKUNDEN = 365 * 24 * 3600
+
+FINGERPRINT_ENDUNGEN = ('.css', '.js', '.woff2', '.woff', '.ttf', '.svg', '.png')
+KOMPRIMIER_ENDUNGEN = ('.css', '.js', '.svg')
+# Brauchen eine feste URL (Service-Worker-Scope, PWA-Manifest)
+AUSGENOMMEN = {'service-worker.js', 'manifest.json'}
+
+_CSS_URL = re.compile(r'''url\(\s*(['"]?)([^'")]+)\1\s*\)''')
+
+
+def _quellen(static_folder):
+    """Relative Pfade (``/``-getrennt) aller zu hashenden Dateien, CSS zuletzt."""
+    pfade = []
+    for wurzel, ordner, dateien in os.walk(static_folder):
+        rel_wurzel = os.path.relpath(wurzel, static_folder)
+        if rel_wurzel == DIST_ORDNER:
+            ordner[:] = []
+            continue
+        ordner.sort()
+        for name in sorted(dateien):
+            rel = posixpath.normpath(posixpath.join(rel_wurzel.replace(os.sep, '/'), name))
+            if rel in AUSGENOMMEN or not name.lower().endswith(FINGERPRINT_ENDUNGEN):
+                continue
+            pfade.append(rel)
+    # CSS verweist auf Schriften/Bilder; deren Hashes müssen vorher feststehen
+    return sorted(pfade, key=lambda p: (p.lower().endswith('.css'), p))
+
+
+def _gehashter_name(rel, inhalt):
+    stamm, endung = posixpath.splitext(rel)
+    digest = hashlib.sha256(inhalt).hexdigest()[:HASH_LAENGE]
+    return f'{stamm}.{digest}{endung}'
+
+
+def _css_verweise_umschreiben(rel, inhalt, manifest):
+    """Relative ``url(...)`` auf bereits gehashte Dateien umbiegen (gleiche Ordnerstruktur in dist/)."""
+    basis = posixpath.dirname(rel)
+
+    def _ersetzen(m):
+        quote, ziel = m.group(1), m.group(2).strip()
+        if ziel.startswith(('data:', 'http:', 'https:', '//', '/', '#')):
+            return m.group(0)
+        pfad, _, fragment = ziel.partition('#')
+        pfad = pfad.split('?', 1)[0]
+        gehasht = manifest.get(posixpath.normpath(posixpath.join(basis, pfad)))
+        if not gehasht:
+            return m.group(0)
+        neu = posixpath.relpath(gehasht, posixpath.join(DIST_ORDNER, basis))
+        if fragment:
+            neu += '#' + fragment
+        return f'url({quote}{neu}{quote})'
+
+    return _CSS_URL.sub(_ersetzen, inhalt.decode('utf-8')).encode('utf-8')
+
+
+def _schreiben(pfad, daten):
+    if os.path.exists(pfad):
+        return False
+    os.makedirs(os.path.dirname(pfad), exist_ok=True)
+    tmp = f'{pfad}.{os.getpid()}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(daten)
+    os.replace(tmp, pfad)
+    return True
+
+
+def assets_bauen(static_folder) -> dict:
+    """Gehashte und vorkomprimierte Kopien unter ``static/dist/`` anlegen; gibt das Manifest zurück.
+
+    Idempotent: unveränderte Dateien werden nur gehasht, nicht neu geschrieben.
+    """
+    manifest = {}
+    neu = 0
+    for rel in _quellen(static_folder):
+        with open(os.path.join(static_folder, rel), 'rb') as f:
+            inhalt = f.read()
+        if rel.lower().endswith('.css'):
+            inhalt = _css_verweise_umschreiben(rel, inhalt, manifest)
+        ziel_rel = posixpath.join(DIST_ORDNER, _gehashter_name(rel, inhalt))
+        ziel = os.path.join(static_folder, *ziel_rel.split('/'))
+        neu += _schreiben(ziel, inhalt)
+        if rel.lower().endswith(KOMPRIMIER_ENDUNGEN):
+            _schreiben(ziel + '.gz', gzip.compress(inhalt, compresslevel=9, mtime=0))
+            if brotli is not None:
+                _schreiben(ziel + '.br', brotli.compress(inhalt, quality=11))
+        manifest[rel] = ziel_rel
+
+    manifest_pfad = os.path.join(static_folder, DIST_ORDNER, MANIFEST_NAME)
+    os.makedirs(os.path.dirname(manifest_pfad), exist_ok=True)
+    tmp = f'{manifest_pfad}.{os.getpid()}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp, manifest_pfad)
+    log.info('Statische Assets: %d Dateien, %d neu gebaut (brotli=%s)', len(manifest), neu, brotli is not None)
+    return manifest
+
+
+def manifest_laden(static_folder) -> dict:
+    try:
+        with open(os.path.join(static_folder, DIST_ORDNER, MANIFEST_NAME), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _kodierung_waehlen(request, pfad):
+    """``('br'|'gzip', Endung)`` des besten vorhandenen Geschwisters, sonst ``(None, None)``."""
+    for kodierung, endung in (('br', '.br'), ('gzip', '.gz')):
+        if request.accept_encodings[kodierung] and os.path.isfile(pfad + endung):
+            return kodierung, endung
+    return None, None
+
+
+def init_static_assets(app) -> None:
+    """Assets bauen, ``url_for('static')`` umbiegen und ``dist/`` immutable ausliefern."""
+    from flask import request, send_from_directory
+
+    if not app.config.get('STATIC_ASSETS_FINGERPRINT', True) or not app.static_folder:
+        return
+    try:
+        manifest = assets_bauen(app.static_folder)
+    except OSError as e:
+        # z. B. schreibgeschütztes Image: zuvor gebauten Stand nutzen (python -m utils.static_assets)
+        log.warning('Statische Assets konnten nicht gebaut werden (%s), nutze vorhandenes Manifest', e)
+        manifest = manifest_laden(app.static_folder)
+    if not manifest:
+        return
+    app.extensions['static_assets_manifest'] = manifest
+
+    @app.url_defaults
+    def _gehashte_static_urls(endpoint, values):
+        if endpoint == 'static' and values.get('filename') in manifest:
+            values['filename'] = manifest[values['filename']]
+
+    static_ansicht = app.view_functions['static']
+
+    def static_ausliefern(filename):
+        if not filename.startswith(DIST_ORDNER + '/') or filename.endswith(('.gz', '.br')):
+            return static_ansicht(filename=filename)
+        pfad = os.path.join(app.static_folder, *filename.split('/'))
+        kodierung, endung = _kodierung_waehlen(request, pfad)
+        if kodierung:
+            mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+            response = send_from_directory(app.static_folder, filename + endung, mimetype=mimetype)
+            response.headers['Content-Encoding'] = kodierung
+        else:
+            response = send_from_directory(app.static_folder, filename)
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.headers['Cache-Control'] = f'public, max-age={MAX_ALTER_SEKUNDEN}, immutable'
+        return response
+
+    app.view_functions['static'] = static_ausliefern
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    assets_bauen(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'static'))